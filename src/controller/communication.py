@@ -24,8 +24,14 @@ import zmq
 class Communication:
     def __init__(self,
                  status_callback: Callable[[str, str], None] = None,
-                 data_callback: Callable[[str, str], None] = None):
-        """Initialize the communication manager"""
+                 data_callback: Callable[[str, str], None] = None,
+                 command_endpoint: str = "tcp://*:5555",
+                 status_endpoint: str = "tcp://*:5556"):
+        """Initialize the communication manager
+
+        The endpoints only change for the fleet simulator (src/simulator),
+        which binds a controller to ipc:// or spare ports next to a real one.
+        """
         self.logger = logging.getLogger(__name__)
         self.is_running = True
         self.status_callback = None
@@ -52,13 +58,13 @@ class Communication:
         # immediately take over without the old connection blocking it.
         self.command_socket = self.context.socket(zmq.ROUTER)
         self.command_socket.setsockopt(zmq.ROUTER_HANDOVER, 1)
-        self.command_socket.bind("tcp://*:5555")
+        self.command_socket.bind(command_endpoint)
 
         # SUB for receiving status updates from modules
         self.status_socket = self.context.socket(zmq.SUB)
         self.status_socket.subscribe("status/")
         self.status_socket.subscribe("data/")
-        self.status_socket.bind("tcp://*:5556")
+        self.status_socket.bind(status_endpoint)
 
         # Poller watches both sockets so we never block on one while the other has data
         self.poller = zmq.Poller()
@@ -66,7 +72,7 @@ class Communication:
         self.poller.register(self.command_socket, zmq.POLLIN)
 
         # Start the zmq listener thread
-        self.listener_thread = threading.Thread(target=self.listen_for_updates, daemon=True)
+        self.listener_thread = threading.Thread(target=self.listen_for_updates, daemon=True, name="zmq-listener")
         self.listener_thread.start()
 
         self.register_callbacks(status_callback, data_callback)
@@ -275,6 +275,10 @@ class Controller(ABC):
                     if status_data.get("error") == "Not recording":
                         self.modules.notify_recording_stopped(module_id, status_data)
 
+                case 'update_progress':
+                    # Rollout bookkeeping lives in the web layer (UpdateRollout)
+                    self.logger.debug(f"{module_id} update: {status_data.get('stage')}")
+
                 case "error":
                     message = status_data.get('message', 'No message...')
                     self.logger.warning(f"Received error from {module_id}: {message}")
@@ -381,6 +385,12 @@ class Controller(ABC):
             self.logger.info("Cleaning up communication manager")
             self.communication.cleanup()
 
+            # Stop session timers, then write out any buffered session events
+            self.logger.info("Stopping session timers")
+            self.recording.stop()
+            self.logger.info("Flushing session event journal")
+            self.recording.journal.stop()
+
             # Clean up database manager
             self.logger.info("Cleaning up database manager")
             # self.database.cleanup()
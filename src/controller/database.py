@@ -16,14 +16,6 @@ import time
 
 import supabase
 
-# Optional: For NWB format support
-try:
-    import pynwb
-    from pynwb import NWBHDF5IO, NWBFile
-    NWB_AVAILABLE = True
-except ImportError:
-    NWB_AVAILABLE = False
-    logging.warning("PyNWB not available. NWB file export will be disabled.")
 
 class Database:
     def __init__(self, config_manager=None):
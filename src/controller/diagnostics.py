@@ -0,0 +1,161 @@
+"""
+Controller Diagnostics Collection
+
+One DiagnosticsCollection per bug report. The controller sends
+get_diagnostics to every online module with an upload URL that embeds the
+collection's unguessable id; each module zips its logs, config and
+structured extras into a bundle, uploads it in chunks to that URL, and then
+acks with the bundle's size and sha256. The controller waits for all
+modules at once against a single deadline, then spools the combined
+archive to a temp file on disk rather than holding it in memory.
+
+Modules that predate bundles ack with their logs and config inline; those
+are still written into the report.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from collections.abc import Callable
+
+MAX_BUNDLE_BYTES = 64 * 1024 * 1024
+
+
+class UploadOffsetError(ValueError):
+    """A chunk didn't start where the previous one ended. received is how
+    much of the bundle the controller holds, so the module can resume."""
+
+    def __init__(self, received: int):
+        super().__init__(f"expected offset {received}")
+        self.received = received
+
+
+class DiagnosticsCollection:
+    """Bundle uploads and acks for one bug report."""
+
+    def __init__(self, module_ids: list[str], spool_dir: str | None = None,
+                 max_bundle_bytes: int = MAX_BUNDLE_BYTES,
+                 on_ack: Callable[[str, int, int], None] | None = None):
+        self.logger = logging.getLogger(__name__)
+        self.id = secrets.token_urlsafe(16)
+        self.module_ids = list(module_ids)
+        self.max_bundle_bytes = max_bundle_bytes
+        self._on_ack = on_ack
+        self._dir = tempfile.mkdtemp(prefix="saviour-diag-", dir=spool_dir)
+        self._cond = threading.Condition()
+        self._received = dict.fromkeys(self.module_ids, 0)
+        self._acks: dict[str, dict] = {}
+
+
+    def _bundle_file(self, module_id: str) -> str:
+        return os.path.join(self._dir, f"{module_id}.zip")
+
+
+    # ------------------------------------------------------------------
+    # Module side: upload + ack
+    # ------------------------------------------------------------------
+
+    def upload_chunk(self, module_id: str, offset: int, data: bytes) -> int:
+        """Append one chunk to module_id's bundle; returns bytes held.
+
+        Raises KeyError for a module not in this collection,
+        UploadOffsetError for an out-of-order chunk and OverflowError past
+        max_bundle_bytes. Offset 0 restarts the bundle.
+        """
+        with self._cond:
+            received = self._received[module_id]
+            if module_id in self._acks:
+                raise UploadOffsetError(received)
+            if offset == 0:
+                received = 0
+            elif offset != received:
+                raise UploadOffsetError(received)
+            if offset + len(data) > self.max_bundle_bytes:
+                raise OverflowError(f"bundle exceeds {self.max_bundle_bytes} bytes")
+            with open(self._bundle_file(module_id), "r+b" if offset else "wb") as f:
+                f.seek(offset)
+                f.write(data)
+                f.truncate()
+            self._received[module_id] = offset + len(data)
+            return self._received[module_id]
+
+
+    def acknowledge(self, module_id: str, data: dict) -> None:
+        with self._cond:
+            if module_id not in self._received or module_id in self._acks:
+                return
+            self._acks[module_id] = data
+            responded, total = len(self._acks), len(self.module_ids)
+            self._cond.notify_all()
+        if self._on_ack:
+            self._on_ack(module_id, responded, total)
+
+
+    def wait(self, deadline: float) -> list[str]:
+        """Block until every module has acked or time.monotonic() passes
+        deadline. Returns the modules that acked, in collection order."""
+        with self._cond:
+            while len(self._acks) < len(self.module_ids):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return [mid for mid in self.module_ids if mid in self._acks]
+
+
+    # ------------------------------------------------------------------
+    # Results
+    # ------------------------------------------------------------------
+
+    def ack(self, module_id: str) -> dict | None:
+        with self._cond:
+            return self._acks.get(module_id)
+
+
+    def bundle_path(self, module_id: str) -> str | None:
+        """The uploaded bundle, if its ack vouches for exactly what arrived."""
+        ack = self.ack(module_id) or {}
+        bundle = ack.get("bundle")
+        path = self._bundle_file(module_id)
+        if not isinstance(bundle, dict) or not os.path.exists(path):
+            return None
+        if os.path.getsize(path) != bundle.get("size"):
+            self.logger.warning(f"Diagnostics bundle from {module_id} is incomplete")
+            return None
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        if digest.hexdigest() != bundle.get("sha256"):
+            self.logger.warning(f"Diagnostics bundle from {module_id} failed its checksum")
+            return None
+        return path
+
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+
+def copy_bundle(zf: zipfile.ZipFile, bundle_path: str, prefix: str) -> list[str]:
+    """Stream every member of a module's bundle into zf under prefix.
+    Returns the member names copied."""
+    names = []
+    with zipfile.ZipFile(bundle_path) as bundle:
+        for info in bundle.infolist():
+            if info.is_dir() or info.filename.startswith("/") or ".." in info.filename.split("/"):
+                continue
+            with bundle.open(info) as src, zf.open(prefix + info.filename, "w") as dst:
+                shutil.copyfileobj(src, dst, 256 * 1024)
+            names.append(info.filename)
+    return names
+
+
+def write_json(zf: zipfile.ZipFile, name: str, data) -> None:
+    zf.writestr(name, json.dumps(data, indent=2, default=str))
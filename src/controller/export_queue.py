@@ -125,6 +125,11 @@ class ExportQueue:
             self._save()
             return True
 
+    def busy(self) -> bool:
+        """True while any export is queued or in flight."""
+        with self._lock:
+            return bool(self._queue or self._active)
+
     def on_export_complete(self, module_id: str) -> None:
         """Call when a module reports export_complete."""
         with self._lock:
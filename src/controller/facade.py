@@ -84,6 +84,10 @@ class ControllerFacade:
         return self.controller.recording.get_recording_sessions()
 
 
+    def get_ended_session_names(self) -> list[str]:
+        return self.controller.recording.get_ended_session_names()
+
+
     def get_system_state(self) -> dict:
         return {
             "example": "This is an example system state object",
@@ -338,9 +342,13 @@ class ControllerFacade:
         if self.controller.export_queue.enqueue(module_id, export_path):
             self.controller.recording.module_export_update(module_id, export_path, "pending")
 
+    def exports_in_progress(self) -> bool:
+        return self.controller.export_queue.busy()
+
     def export_complete(self, module_id: str, export_path: str = "") -> None:
         self.controller.export_queue.on_export_complete(module_id)
         self.controller.recording.module_export_update(module_id, export_path, "complete")
+        self.controller.web.on_export_complete(export_path)
 
     def export_failed(self, module_id: str, export_path: str = "") -> None:
         is_final = self.controller.export_queue.on_export_failed(module_id)
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+Controller File Index
+
+SQLite index of the files on the export share (and legacy NAS mount), so the
+web handlers can list a session's files, page through recordings and report
+per-session totals without walking the share on every request. Over CIFS a
+walk of a year of 16-camera sessions takes tens of seconds; a query on the
+index takes milliseconds.
+
+Each row is one file: (root, path relative to the root, session, module,
+size, mtime). The session is the first path component and the module is the
+module directory in the export layout <session>/<date>/<module>/<file>.
+
+The index is kept current by:
+    refresh_later() - called on export completion with the exported
+                      directory; only that subtree is rescanned.
+    inotify         - where the kernel supports it (local disks; CIFS only
+                      reports changes made by this host), directory events
+                      mark just the affected directory for a rescan.
+    full scans      - a reconciler thread rescans every root every
+                      scan_interval seconds, and never more often than
+                      min_scan_gap, to catch changes nothing reported.
+
+A rescan of a subtree compares (size, mtime) against the stored rows and
+writes only the differences in one transaction.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import sqlite3
+import struct
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    root    TEXT NOT NULL,
+    path    TEXT NOT NULL,
+    session TEXT NOT NULL,
+    module  TEXT NOT NULL,
+    size    INTEGER NOT NULL,
+    mtime   REAL NOT NULL,
+    PRIMARY KEY (root, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS files_by_session ON files (root, session, module);
+CREATE TABLE IF NOT EXISTS roots (
+    root       TEXT PRIMARY KEY,
+    scanned_at REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class IndexRoot:
+    """A directory tree kept in the index."""
+    name: str
+    path: Callable[[], str]                          # resolved at scan time (mount paths change)
+    include: Callable[[str], bool] | None = None     # filter on first-level entry names
+
+
+def split_path(rel_path: str) -> tuple[str, str]:
+    """Return (session, module) for a path relative to the share root."""
+    parts = rel_path.split("/")
+    session = parts[0] if len(parts) > 1 else ""
+    module = parts[2] if len(parts) >= 4 else ""
+    return session, module
+
+
+def _prefix_clause(prefix: str) -> tuple[str, tuple]:
+    """SQL matching prefix itself and everything below it ('' matches all)."""
+    if not prefix:
+        return "", ()
+    # '0' sorts immediately after '/', so this is a range scan on the primary key
+    return " AND (path = ? OR (path >= ? AND path < ?))", (prefix, prefix + "/", prefix + "0")
+
+
+class _Inotify:
+    """Minimal inotify binding over libc; None from create() where unavailable."""
+
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+    def __init__(self, libc, fd: int):
+        self._libc = libc
+        self.fd = fd
+        self.watches: dict[int, tuple[str, str]] = {}   # wd -> (root name, relative dir)
+        self.full = False
+
+    @classmethod
+    def create(cls) -> "_Inotify | None":
+        name = ctypes.util.find_library("c")
+        if not name:
+            return None
+        try:
+            libc = ctypes.CDLL(name, use_errno=True)
+            fd = libc.inotify_init1(cls.IN_NONBLOCK | cls.IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        return cls(libc, fd) if fd >= 0 else None
+
+    def watch(self, root: str, abs_dir: str, rel_dir: str) -> None:
+        if self.full:
+            return
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(abs_dir), self.MASK)
+        if wd < 0:
+            # ENOSPC: fs.inotify.max_user_watches reached; scans still cover the rest
+            self.full = ctypes.get_errno() == 28
+            return
+        self.watches[wd] = (root, rel_dir)
+
+    def read(self, timeout: float) -> list[tuple[str, str]]:
+        """Wait up to timeout; return (root, relative dir) of each changed directory."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        changed = []
+        offset = 0
+        while offset + 16 <= len(buf):
+            wd, mask, _cookie, length = struct.unpack_from("iIII", buf, offset)
+            name = buf[offset + 16:offset + 16 + length].rstrip(b"\0").decode(errors="replace")
+            offset += 16 + length
+            where = self.watches.get(wd)
+            if where is None:
+                continue
+            if mask & (self.IN_IGNORED | self.IN_DELETE_SELF):
+                self.watches.pop(wd, None)
+            root, rel_dir = where
+            if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                changed.append((root, f"{rel_dir}/{name}" if rel_dir else name))
+            changed.append((root, rel_dir))
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FileIndex:
+
+    def __init__(self, path: str, roots: Iterable[IndexRoot], scan_interval: float = 300.0,
+                 min_scan_gap: float = 30.0, settle: float = 2.0, use_inotify: bool = True):
+        """
+        Args:
+            path: SQLite database file
+            roots: Directory trees to index
+            scan_interval: Seconds between full reconciliation scans
+            min_scan_gap: Shortest time between full scans, even when requested
+            settle: Delay before rescanning a directory reported as changed, so
+                a burst of events costs one rescan
+            use_inotify: Watch indexed directories where the kernel allows it
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.roots = {r.name: r for r in roots}
+        self.scan_interval = scan_interval
+        self.min_scan_gap = min_scan_gap
+        self.settle = settle
+        self._use_inotify = use_inotify
+        self._inotify: _Inotify | None = None
+
+        self._lock = threading.Lock()
+        self._dirty: dict[tuple[str, str], float] = {}   # (root, rel dir) -> time first reported
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._full_scan_requested = False
+        self._last_full_scan: float | None = None
+        self._running = False
+        self._thread = threading.Thread(target=self._reconcile_loop, daemon=True, name="file-index")
+
+        self.scans = 0
+        self.rows_written = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+
+    def start(self) -> "FileIndex":
+        self._running = True
+        if self._use_inotify:
+            self._inotify = _Inotify.create()
+            if self._inotify is None:
+                self.logger.info("inotify unavailable — file index relies on periodic scans")
+            else:
+                threading.Thread(target=self._inotify_loop, daemon=True, name="file-index-inotify").start()
+        self._thread.start()
+        return self
+
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(5.0)
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+    # -----------------------------------------------------------------------
+    # Scanning
+    # -----------------------------------------------------------------------
+
+    def _walk(self, root: IndexRoot, base: str, rel: str) -> dict[str, tuple[int, float]]:
+        """stat every file under base/rel; returns {relative path: (size, mtime)}."""
+        found = {}
+        stack = [rel]
+        while stack:
+            rel_dir = stack.pop()
+            abs_dir = os.path.join(base, rel_dir) if rel_dir else base
+            if self._inotify is not None:
+                self._inotify.watch(root.name, abs_dir, rel_dir)
+            try:
+                entries = list(os.scandir(abs_dir))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            for entry in entries:
+                if not rel_dir and root.include is not None and not root.include(entry.name):
+                    continue
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(rel_path)
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        found[rel_path] = (st.st_size, st.st_mtime)
+                except OSError:
+                    continue
+        return found
+
+
+    def refresh(self, root_name: str, rel_dir: str = "") -> int:
+        """Rescan root_name/rel_dir now; returns the number of rows changed.
+
+        Raises OSError if the root itself cannot be read (e.g. share unmounted);
+        the stored rows are then left as they were.
+        """
+        root = self.roots[root_name]
+        base = root.path()
+        rel_dir = rel_dir.strip("/")
+        if not os.path.isdir(base):
+            raise FileNotFoundError(f"Index root '{root_name}' not available: {base}")
+        found = self._walk(root, base, rel_dir)
+
+        clause, params = _prefix_clause(rel_dir)
+        with self._lock:
+            stored = {
+                p: (s, m) for p, s, m in self._conn.execute(
+                    f"SELECT path, size, mtime FROM files WHERE root = ?{clause}", (root_name, *params)
+                )
+            }
+            upserts = [
+                (root_name, p, *split_path(p), s, m)
+                for p, (s, m) in found.items() if stored.get(p) != (s, m)
+            ]
+            deletes = [(root_name, p) for p in stored if p not in found]
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO files (root, path, session, module, size, mtime) VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (root, path) DO UPDATE SET size = excluded.size, mtime = excluded.mtime",
+                    upserts,
+                )
+                self._conn.executemany("DELETE FROM files WHERE root = ? AND path = ?", deletes)
+                if not rel_dir:
+                    self._conn.execute(
+                        "INSERT INTO roots (root, scanned_at) VALUES (?, ?)"
+                        " ON CONFLICT (root) DO UPDATE SET scanned_at = excluded.scanned_at",
+                        (root_name, time.time()),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.scans += 1
+        self.rows_written += len(upserts) + len(deletes)
+        return len(upserts) + len(deletes)
+
+
+    def refresh_later(self, root_name: str, rel_dir: str = "") -> None:
+        """Queue a background rescan of root_name/rel_dir (e.g. after an export lands)."""
+        if root_name not in self.roots:
+            return
+        with self._dirty_lock:
+            self._dirty.setdefault((root_name, rel_dir.strip("/")), time.monotonic())
+        self._wake.set()
+
+
+    def request_full_scan(self) -> None:
+        """Ask for a full rescan; honoured no sooner than min_scan_gap after the last one."""
+        self._full_scan_requested = True
+        self._wake.set()
+
+
+    def scanned_at(self, root_name: str) -> float | None:
+        """When root_name last completed a full scan (epoch seconds), or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT scanned_at FROM roots WHERE root = ?", (root_name,)).fetchone()
+        return row[0] if row else None
+
+
+    def process_pending(self, now: float | None = None) -> int:
+        """Rescan settled dirty directories and any due full scan; returns scans run."""
+        now = time.monotonic() if now is None else now
+        with self._dirty_lock:
+            due = [k for k, t in self._dirty.items() if now - t >= self.settle]
+            for k in due:
+                del self._dirty[k]
+        # A directory whose ancestor is also due is covered by the ancestor's scan
+        due_set = set(due)
+        ran = 0
+        for root_name, rel_dir in sorted(due):
+            parent = rel_dir
+            covered = False
+            while parent:
+                parent = parent.rpartition("/")[0]
+                if (root_name, parent) in due_set:
+                    covered = True
+                    break
+            if covered:
+                continue
+            try:
+                self.refresh(root_name, rel_dir)
+                ran += 1
+            except OSError as e:
+                self.logger.warning(f"File index rescan of {root_name}:{rel_dir or '/'} failed: {e}")
+
+        since_full = float("inf") if self._last_full_scan is None else now - self._last_full_scan
+        if (since_full >= self.scan_interval
+                or (self._full_scan_requested and since_full >= self.min_scan_gap)):
+            self._full_scan_requested = False
+            self._last_full_scan = now
+            for root_name in self.roots:
+                started = time.monotonic()
+                try:
+                    changed = self.refresh(root_name)
+                    ran += 1
+                    self.logger.info(
+                        f"File index scan of '{root_name}': {changed} change(s) "
+                        f"in {time.monotonic() - started:.1f}s"
+                    )
+                except OSError as e:
+                    self.logger.debug(f"File index skipped '{root_name}': {e}")
+        return ran
+
+
+    def _reconcile_loop(self) -> None:
+        while self._running:
+            try:
+                self.process_pending()
+            except Exception as e:
+                self.logger.error(f"File index reconcile error: {e}")
+            with self._dirty_lock:
+                wait = self.settle if self._dirty else min(self.scan_interval, 60.0)
+            self._wake.wait(wait)
+            self._wake.clear()
+
+
+    def _inotify_loop(self) -> None:
+        while self._running and self._inotify is not None:
+            try:
+                changed = self._inotify.read(1.0)
+            except (OSError, ValueError):
+                return   # closed by stop()
+            for root_name, rel_dir in changed:
+                self.refresh_later(root_name, rel_dir)
+
+
+    # -----------------------------------------------------------------------
+    # Queries
+    # -----------------------------------------------------------------------
+
+    def files(self, root_name: str, session: str | None = None, prefix: str = "",
+              suffixes: Iterable[str] | None = None, offset: int = 0,
+              limit: int | None = None) -> list[dict]:
+        """Indexed files ordered by path, optionally filtered and paginated."""
+        where, params = self._where(root_name, session, prefix, suffixes)
+        sql = f"SELECT path, session, module, size, mtime FROM files{where} ORDER BY path"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += (limit, offset)
+        elif offset:
+            sql += " LIMIT -1 OFFSET ?"
+            params += (offset,)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"path": p, "session": s, "module": m, "size": size, "mtime": mtime}
+            for p, s, m, size, mtime in rows
+        ]
+
+
+    def count(self, root_name: str, session: str | None = None, prefix: str = "",
+              suffixes: Iterable[str] | None = None) -> int:
+        where, params = self._where(root_name, session, prefix, suffixes)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM files{where}", params).fetchone()[0]
+
+
+    def session_summary(self, root_name: str, session: str) -> dict:
+        """{"file_count", "total_bytes", "modules": {module: {"file_count", "total_bytes"}}}."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT module, COUNT(*), COALESCE(SUM(size), 0) FROM files"
+                " WHERE root = ? AND session = ? GROUP BY module",
+                (root_name, session),
+            ).fetchall()
+        modules = {m: {"file_count": n, "total_bytes": b} for m, n, b in rows if m}
+        return {
+            "file_count": sum(n for _, n, _ in rows),
+            "total_bytes": sum(b for _, _, b in rows),
+            "modules": modules,
+        }
+
+
+    def session_totals(self, root_name: str) -> dict[str, dict]:
+        """{session: {"file_count", "total_bytes", "last_modified"}} for every indexed session."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session, COUNT(*), SUM(size), MAX(mtime) FROM files"
+                " WHERE root = ? AND session != '' GROUP BY session",
+                (root_name,),
+            ).fetchall()
+        return {s: {"file_count": n, "total_bytes": b, "last_modified": t} for s, n, b, t in rows}
+
+
+    @staticmethod
+    def _where(root_name, session, prefix, suffixes) -> tuple[str, tuple]:
+        where = " WHERE root = ?"
+        params: tuple = (root_name,)
+        if session is not None:
+            where += " AND session = ?"
+            params += (session,)
+        clause, prefix_params = _prefix_clause(prefix.strip("/"))
+        where += clause
+        params += prefix_params
+        if suffixes:
+            suffixes = list(suffixes)
+            where += " AND (" + " OR ".join("path LIKE ?" for _ in suffixes) + ")"
+            params += tuple(f"%{s}" for s in suffixes)
+        return where, params
@@ -0,0 +1,125 @@
+import { useEffect, useState } from "react";
+import socket from "/src/socket";
+import useIsLoggedIn from "/src/hooks/useIsLoggedIn";
+import "./RetentionPanel.css";
+
+// Retention dry run: what would be deleted, archived to cold storage, or
+// held (expired but its export isn't verified), with a manual run button.
+
+const ROW_LIMIT = 50;
+
+function formatBytes(n) {
+  if (n == null) return "-";
+  if (n >= 1024 ** 4) return `${(n / 1024 ** 4).toFixed(2)} TB`;
+  if (n >= 1024 ** 3) return `${(n / 1024 ** 3).toFixed(1)} GB`;
+  if (n >= 1024 ** 2) return `${(n / 1024 ** 2).toFixed(1)} MB`;
+  return `${Math.round(n / 1024)} KB`;
+}
+
+function formatDate(ts) {
+  return ts ? new Date(ts * 1000).toLocaleString() : "-";
+}
+
+function Totals({ group }) {
+  const entries = Object.entries(group ?? {});
+  if (!entries.length) return <span className="cell--muted">none</span>;
+  return entries.map(([name, t]) => (
+    <span key={name} className="retention-total">{name}: {t.files} ({formatBytes(t.bytes)})</span>
+  ));
+}
+
+function ActionTable({ rows, empty }) {
+  if (!rows?.length) return <p className="cell--muted">{empty}</p>;
+  return (
+    <div className="system-table-wrapper">
+      <table className="system-table">
+        <thead>
+          <tr>
+            <th>File</th>
+            <th>Class</th>
+            <th>Size</th>
+            <th>Modified</th>
+            <th>Action</th>
+            <th>Reason</th>
+          </tr>
+        </thead>
+        <tbody>
+          {rows.slice(0, ROW_LIMIT).map(a => (
+            <tr key={`${a.target}:${a.path}`}>
+              <td className="retention-path" title={a.path}>{a.target}:{a.path}</td>
+              <td>{a.file_class}</td>
+              <td>{formatBytes(a.size)}</td>
+              <td>{formatDate(a.mtime)}</td>
+              <td className={a.action === "hold" ? "val--warn" : a.action === "delete" ? "val--danger" : ""}>{a.action}</td>
+              <td className="cell--muted">{a.reason}</td>
+            </tr>
+          ))}
+        </tbody>
+      </table>
+      {rows.length > ROW_LIMIT && <p className="cell--muted">…and {rows.length - ROW_LIMIT} more</p>}
+    </div>
+  );
+}
+
+export default function RetentionPanel() {
+  const loggedIn = useIsLoggedIn();
+  const [report, setReport] = useState(null);
+  const [error, setError] = useState(null);
+  const [running, setRunning] = useState(false);
+
+  useEffect(() => {
+    const onReport = (r) => { setReport(r); setError(null); setRunning(false); };
+    const onError = (e) => { setError(e?.error ?? "Retention failed"); setRunning(false); };
+    socket.on("retention_report", onReport);
+    socket.on("retention_error", onError);
+    socket.emit("get_retention_report");
+    return () => {
+      socket.off("retention_report", onReport);
+      socket.off("retention_error", onError);
+    };
+  }, []);
+
+  const refresh = () => socket.emit("get_retention_report");
+  const runNow = () => { setRunning(true); socket.emit("run_retention"); };
+
+  const summary = report?.summary;
+  const last = report?.last_run;
+
+  return (
+    <div className="system-update-section retention-panel">
+      <div className="retention-panel__header">
+        <h3>Storage retention</h3>
+        <span className={report?.enabled ? "val--ok" : "cell--muted"}>
+          {report ? (report.enabled ? "Enabled" : "Disabled - report only") : "Loading…"}
+        </span>
+        <div className="retention-panel__actions">
+          <button className="save-button" type="button" onClick={refresh}>Refresh</button>
+          <button className="reset-button" type="button" onClick={runNow}
+            disabled={!loggedIn || running || !report?.actions?.length}
+            title={loggedIn ? undefined : "Login required for this action"}>
+            {running ? "Running…" : "Run now"}
+          </button>
+        </div>
+      </div>
+      {error && <p className="val--danger">{error}</p>}
+      {summary && (
+        <div className="retention-panel__summary">
+          <div><strong>By action</strong> <Totals group={summary.by_action} /></div>
+          <div><strong>By class</strong> <Totals group={summary.by_class} /></div>
+          <div><strong>By target</strong> <Totals group={summary.by_target} /></div>
+          <div className="cell--muted">
+            {summary.files_considered} files considered
+            {" "}- cold storage: {report.cold_storage_path || "not configured"}
+            {last && ` - last run ${formatDate(last.at)}: ${last.deleted} deleted, ${last.archived} archived (${formatBytes(last.bytes)}), ${last.remaining} left`}
+          </div>
+        </div>
+      )}
+      {report && <>
+        <h4>Due</h4>
+        <ActionTable rows={report.actions} empty="Nothing is due." />
+        <h4>Held</h4>
+        <ActionTable rows={report.held} empty="Nothing is held." />
+      </>}
+    </div>
+  );
+}
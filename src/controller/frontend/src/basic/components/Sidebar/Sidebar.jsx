@@ -125,7 +125,9 @@ function Sidebar({ navItems }) {
   useEffect(() => {
     const onStatus = ({ stage, count }) => {
       if (stage === "modules_notified") {
-        setDeployStatus(`Notified ${count} module${count !== 1 ? "s" : ""} - applying to controller…`);
+        setDeployStatus(`Rolling out to ${count} module${count !== 1 ? "s" : ""} - controller updates once they finish…`);
+      } else if (stage === "applying_controller") {
+        setDeployStatus("Modules finished - applying to controller…");
       }
     };
     const onError = ({ error }) => {
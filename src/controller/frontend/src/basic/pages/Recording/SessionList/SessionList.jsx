@@ -18,6 +18,7 @@ const DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"];
 
 // Sessions larger than this will have "Download all" disabled — use the NAS share instead.
 const DOWNLOAD_ALL_MAX_BYTES = 2 * 1024 ** 3; // 2 GB
+const FILE_PAGE_SIZE = 500; // files fetched per get_session_file_info page
 
 function copyToClipboard(text) {
   if (navigator.clipboard) {
@@ -198,15 +199,36 @@ function SessionList({ sessionList, modules = [] }) {
 
   useEffect(() => {
     const handler = ({ session_name, lines, total, truncated }) => {
-      setSessionLogs(prev => ({ ...prev, [session_name]: { lines: lines ?? [], total: total ?? 0, truncated: !!truncated } }));
+      setSessionLogs(prev => ({ ...prev, [session_name]: { lines: lines ?? [], total, truncated: !!truncated } }));
+    };
+    // Lines pushed to an open (subscribed) log as the controller writes them
+    const appendHandler = ({ session_name, lines }) => {
+      setSessionLogs(prev => {
+        const log = prev[session_name];
+        if (!log || log === "loading") return prev;
+        const all = [...log.lines, ...(lines ?? [])];
+        const total = log.total != null ? log.total + (lines?.length ?? 0) : undefined;
+        return { ...prev, [session_name]: { lines: all.slice(-200), total, truncated: log.truncated || all.length > 200 } };
+      });
     };
     socket.on("session_log_response", handler);
-    return () => socket.off("session_log_response", handler);
+    socket.on("session_log_append", appendHandler);
+    return () => {
+      socket.off("session_log_response", handler);
+      socket.off("session_log_append", appendHandler);
+    };
   }, []);
 
   useEffect(() => {
     const handler = (data) => {
-      setSessionFileInfo(prev => ({ ...prev, [data.session_name]: data }));
+      setSessionFileInfo(prev => {
+        const existing = prev[data.session_name];
+        // Later pages extend the list already shown
+        if (data.offset > 0 && existing && existing !== "loading") {
+          return { ...prev, [data.session_name]: { ...data, files: [...existing.files, ...(data.files ?? [])] } };
+        }
+        return { ...prev, [data.session_name]: data };
+      });
     };
     socket.on("session_file_info_response", handler);
     return () => socket.off("session_file_info_response", handler);
@@ -217,7 +239,7 @@ function SessionList({ sessionList, modules = [] }) {
     Object.entries(expandedSessions).forEach(([name, isOpen]) => {
       if (isOpen && !sessionFileInfo[name]) {
         setSessionFileInfo(prev => ({ ...prev, [name]: "loading" }));
-        socket.emit("get_session_file_info", { session_name: name });
+        socket.emit("get_session_file_info", { session_name: name, limit: FILE_PAGE_SIZE });
       }
     });
   }, [expandedSessions]);
@@ -225,9 +247,10 @@ function SessionList({ sessionList, modules = [] }) {
   const toggleSessionLog = (sessionName) => {
     if (sessionLogs[sessionName] !== undefined) {
       setSessionLogs(prev => { const n = { ...prev }; delete n[sessionName]; return n; });
+      socket.emit("unsubscribe_session_log", { session_name: sessionName });
     } else {
       setSessionLogs(prev => ({ ...prev, [sessionName]: "loading" }));
-      socket.emit("get_session_log", { session_name: sessionName });
+      socket.emit("subscribe_session_log", { session_name: sessionName });
     }
   };
 
@@ -486,14 +509,14 @@ function SessionList({ sessionList, modules = [] }) {
                     const sizeLabel = loading
                       ? "loading…"
                       : ready
-                        ? `${fi.files.length} file${fi.files.length !== 1 ? "s" : ""}, ${formatBytes(fi.total_bytes)}`
+                        ? `${fi.file_count} file${fi.file_count !== 1 ? "s" : ""}, ${formatBytes(fi.total_bytes)}`
                         : null;
                     return sizeLabel ? (
                       <div className="session-meta-grid">
                         <span className="session-meta-label">Files</span>
                         <span className="session-files-inline">
                           <span>{sizeLabel}</span>
-                          {ready && fi.files.length > 0 && (
+                          {ready && fi.file_count > 0 && (
                             fi.total_bytes > DOWNLOAD_ALL_MAX_BYTES ? (
                               <span
                                 className="session-file-dl session-file-dl--all session-file-dl--disabled"
@@ -585,7 +608,7 @@ function SessionList({ sessionList, modules = [] }) {
 
                   {isStopped && (() => {
                     const fi = sessionFileInfo[session.session_name];
-                    if (!fi || fi === "loading" || fi.files.length === 0) return null;
+                    if (!fi || fi === "loading" || !fi.file_count) return null;
                     const isOpen = fileListOpen[session.session_name];
                     return (
                       <div className="session-files-section">
@@ -594,7 +617,7 @@ function SessionList({ sessionList, modules = [] }) {
                           className="session-log-toggle"
                           onClick={() => setFileListOpen(prev => ({ ...prev, [session.session_name]: !prev[session.session_name] }))}
                         >
-                          {isOpen ? "▲ Hide files" : `▼ Browse files (${fi.files.length})`}
+                          {isOpen ? "▲ Hide files" : `▼ Browse files (${fi.file_count})`}
                         </button>
                         {isOpen && (
                           <div className="session-file-list">
@@ -609,6 +632,19 @@ function SessionList({ sessionList, modules = [] }) {
                                 </div>
                               );
                             })}
+                            {fi.files.length < fi.file_count && (
+                              <button
+                                type="button"
+                                className="session-log-toggle"
+                                onClick={() => socket.emit("get_session_file_info", {
+                                  session_name: session.session_name,
+                                  offset: fi.files.length,
+                                  limit: FILE_PAGE_SIZE,
+                                })}
+                              >
+                                Show more ({fi.files.length} of {fi.file_count})
+                              </button>
+                            )}
                           </div>
                         )}
                       </div>
@@ -637,7 +673,7 @@ function SessionList({ sessionList, modules = [] }) {
                               <>
                                 {log.truncated && (
                                   <div className="session-log-truncation">
-                                    {log.total} events total - showing last 200
+                                    {log.total != null ? `${log.total} events total - showing last 200` : "Showing last 200 events"}
                                   </div>
                                 )}
                                 {log.lines.map((line, i) => (
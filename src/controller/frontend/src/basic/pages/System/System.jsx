@@ -4,6 +4,7 @@ import useModules from "/src/hooks/useModules";
 import socket from "/src/socket";
 import ClockModal from "../../components/ClockModal/ClockModal";
 import ModuleActionsMenu from "../../components/ModuleActionsMenu/ModuleActionsMenu";
+import RetentionPanel from "../../components/RetentionPanel/RetentionPanel";
 import useIsLoggedIn from "/src/hooks/useIsLoggedIn";
 import "./System.css";
 
@@ -35,6 +36,23 @@ function pctCell(pct, warnAt = 70, dangerAt = 85) {
   return <span className={cls}>{pct.toFixed(1)}%</span>;
 }
 
+const ROLLOUT_STAGE_LABELS = {
+  queued:     "Queued",
+  dispatched: "Starting…",
+  manifest:   "Checking files…",
+  fetching:   "Fetching",
+  verifying:  "Verifying…",
+  applying:   "Applying…",
+  serving:    "Serving peers…",
+  restarting: "Restarting…",
+};
+
+function rolloutLabel(r) {
+  if (!r) return "Updating…";
+  const label = ROLLOUT_STAGE_LABELS[r.stage] ?? "Updating…";
+  return r.stage === "fetching" && r.total ? `${label} ${r.done}/${r.total}` : label;
+}
+
 function cpuCell(pct) {
   if (pct == null) return <span className="cell--muted">-</span>;
   const cls = pct >= 80 ? "val--danger" : pct >= 60 ? "val--warn" : "";
@@ -145,13 +163,21 @@ export default function System() {
   // ── Remove module ─────────────────────────────────────────────────────────
   // ── Bug report ────────────────────────────────────────────────────────────
   const [bugReportState, setBugReportState] = useState(null); // null | "collecting" | "ready"
+  const [bugReportProgress, setBugReportProgress] = useState(null); // { responded, total }
 
   useEffect(() => {
-    const onStatus = ({ status }) => {
-      if (status === "collecting") setBugReportState("collecting");
+    const onStatus = ({ status, responded, total }) => {
+      if (status === "collecting") {
+        setBugReportState("collecting");
+        if (total) setBugReportProgress({ responded, total });
+      } else if (status === "error") {
+        setBugReportState(null);
+        setBugReportProgress(null);
+      }
     };
     const onReady = ({ token, filename }) => {
       setBugReportState(null);
+      setBugReportProgress(null);
       const a = document.createElement("a");
       a.href = `/api/bug_report/${token}`;
       a.download = filename;
@@ -216,11 +242,13 @@ export default function System() {
   // ── Update all devices (ZIP-based deploy) ────────────────────────────────
   const [stagedMeta, setStagedMeta] = useState(null); // { version, size, filename } or null
   const [deviceStatuses, setDeviceStatuses] = useState({}); // id → "updating" | "restarting" | { success, output }
+  const [rollout, setRollout] = useState(null); // latest update_rollout summary
 
   useEffect(() => {
     socket.emit("get_update_info");
     const onUpdateInfo = (data) => {
       setStagedMeta(data?.staged ?? null);
+      if (data?.rollout?.active) setRollout(data.rollout);
     };
     socket.on("update_info", onUpdateInfo);
     return () => socket.off("update_info", onUpdateInfo);
@@ -243,6 +271,22 @@ export default function System() {
     const onDeployError = (data) => {
       setDeviceStatuses(prev => ({ ...prev, controller: { success: false, output: data.error } }));
     };
+    const onRollout = (summary) => {
+      setRollout(summary);
+      // Modules queued by a rollout show up as updating even when the
+      // deploy was started from another browser
+      setDeviceStatuses(prev => {
+        const next = { ...prev };
+        Object.entries(summary.modules ?? {}).forEach(([id, r]) => {
+          if (r.stage === "failed" && typeof next[id] !== "object") {
+            next[id] = { success: false, output: r.detail };
+          } else if (r.stage !== "done" && r.stage !== "failed" && typeof next[id] !== "string") {
+            next[id] = "updating";
+          }
+        });
+        return next;
+      });
+    };
     const onReconnect = () => {
       setDeviceStatuses(prev => {
         if (prev.controller === "restarting" || prev.controller === "updating") {
@@ -255,11 +299,13 @@ export default function System() {
     socket.on("module_update_result", onModuleResult);
     socket.on("deploy_update_status", onDeployStatus);
     socket.on("deploy_update_error", onDeployError);
+    socket.on("update_rollout", onRollout);
     socket.on("connect", onReconnect);
     return () => {
       socket.off("module_update_result", onModuleResult);
       socket.off("deploy_update_status", onDeployStatus);
       socket.off("deploy_update_error", onDeployError);
+      socket.off("update_rollout", onRollout);
       socket.off("connect", onReconnect);
     };
   }, [moduleList]);
@@ -289,7 +335,9 @@ export default function System() {
             disabled={bugReportState === "collecting"}
             title="Collect logs and system state from all devices and download as a ZIP"
           >
-            {bugReportState === "collecting" ? "Collecting…" : "Export Diagnostics"}
+            {bugReportState === "collecting"
+              ? (bugReportProgress ? `Collecting ${bugReportProgress.responded}/${bugReportProgress.total}…` : "Collecting…")
+              : "Export Diagnostics"}
           </button>
         </div>
       </div>
@@ -416,6 +464,13 @@ export default function System() {
       {/* ── Update results (shown only while/after update runs) ── */}
       {updateDevices.length > 0 && (
         <div className="system-update-section">
+          {rollout?.active && (
+            <p className="cell--muted">
+              Rollout: {rollout.counts?.done ?? 0}/{rollout.total} modules updated
+              {rollout.counts?.failed ? `, ${rollout.counts.failed} failed` : ""}
+              {" "}- controller updates last
+            </p>
+          )}
           <div className="system-table-wrapper">
             <table className="system-table">
               <thead>
@@ -434,7 +489,7 @@ export default function System() {
                       <td><span className="device-name">{name}</span></td>
                       <td>
                         {isInProgress
-                          ? <span className="cell--muted">{s === "restarting" ? "Restarting…" : "Updating…"}</span>
+                          ? <span className="cell--muted">{s === "restarting" ? "Restarting…" : rolloutLabel(rollout?.modules?.[id])}</span>
                           : s?.success
                             ? <span className="val--ok">&#10003; Updated</span>
                             : <span className="val--danger">&#10007; Failed</span>
@@ -452,6 +507,7 @@ export default function System() {
         </div>
       )}
 
+      <RetentionPanel />
 
       {showControllerActions && (
         <div className="modal-overlay" onClick={() => setShowControllerActions(false)}>
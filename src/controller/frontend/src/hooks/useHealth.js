@@ -5,25 +5,35 @@ export default function useHealth({ pollInterval = 30000 } = {}) {
   const [moduleHealth, setModuleHealth] = useState({});
   const [controllerHealth, setControllerHealth] = useState(null);
 
+  // Controller health is pushed (full snapshot on subscribe, then only the
+  // changed keys every couple of seconds); module health is still polled.
   const refresh = useCallback(() => {
     socket.emit("get_module_health");
-    socket.emit("get_controller_health");
   }, []);
 
   useEffect(() => {
     refresh();
     const interval = setInterval(refresh, pollInterval);
+    const subscribe = () => socket.emit("subscribe_controller_health");
+    subscribe();
 
     const handleModuleHealth = (data) => setModuleHealth(data.module_health || {});
     const handleControllerHealth = (data) => setControllerHealth(data);
+    const handleControllerDelta = (delta) =>
+      setControllerHealth((prev) => ({ ...(prev || {}), ...delta }));
 
     socket.on("module_health_update", handleModuleHealth);
     socket.on("controller_health_response", handleControllerHealth);
+    socket.on("controller_health_delta", handleControllerDelta);
+    socket.on("connect", subscribe);
 
     return () => {
       clearInterval(interval);
+      socket.emit("unsubscribe_controller_health");
       socket.off("module_health_update", handleModuleHealth);
       socket.off("controller_health_response", handleControllerHealth);
+      socket.off("controller_health_delta", handleControllerDelta);
+      socket.off("connect", subscribe);
     };
   }, [pollInterval, refresh]);
 
@@ -583,7 +583,7 @@ class Health:
             return
 
         self.is_monitoring = True
-        self.monitor_thread = threading.Thread(target=self.monitor_health, daemon=True)
+        self.monitor_thread = threading.Thread(target=self.monitor_health, daemon=True, name="health-monitor")
         self.monitor_thread.start()
         self.logger.info(f"Started health monitoring with {self.heartbeat_interval}s interval")
 
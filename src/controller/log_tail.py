@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Controller Log Tail
+
+Cached tail reader for append-only text logs on the share (session_events.log).
+
+The first read of a file seeks backwards from EOF in blocks until it has the
+last max_lines lines, so opening a log costs O(max_lines), not O(file size).
+After that the file is only stat()ed: if it grew, just the appended bytes
+are read and pushed onto the cached tail; if its inode changed or it shrank
+(rotated, replaced, truncated) the entry is rebuilt. Only complete lines are
+consumed, so a line being written concurrently is picked up whole on the
+next read.
+
+Lines are tracked by byte offset rather than counted: each cached line keeps
+where it starts, and a reader's position is (device, inode, offset), so
+read_since() can hand back exactly what was appended after a position
+without knowing how many lines precede the tail.
+
+EventIndex does the same for the structured session_events.jsonl: it keeps
+each record's offset, level and module, parsing only appended bytes, so a
+filtered view reads just the records it returns.
+"""
+
+import collections
+import json
+import os
+import threading
+
+
+def read_last_lines(f, end: int, n: int, block_size: int = 8192) -> list[bytes]:
+    """Return the last n lines of the byte range [0, end) of binary file f.
+
+    end must be just after a newline (or 0). Reads backwards in block_size
+    steps, so the cost depends on n, not on the file size.
+    """
+    pos = end
+    buf = b""
+    while pos > 0 and buf.count(b"\n") <= n:
+        step = min(block_size, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + buf
+    lines = buf.split(b"\n")[:-1]   # buf ends with the final newline
+    if pos > 0:
+        lines = lines[1:]           # first piece may be a partial line
+    return lines[-n:] if n else []
+
+
+def _decode(raw: bytes) -> str:
+    return raw.decode("utf-8", errors="replace").rstrip("\r")
+
+
+class _Entry:
+    __slots__ = ("dev", "ino", "offset", "tail")
+
+    def __init__(self, dev, ino, offset, tail):
+        self.dev = dev
+        self.ino = ino
+        self.offset = offset   # bytes consumed (always at a line boundary)
+        self.tail = tail       # deque of (start offset, line) for the last max_lines lines
+
+    def position(self) -> tuple[int, int, int]:
+        return self.dev, self.ino, self.offset
+
+    def truncated(self) -> bool:
+        """Whether the file has lines before the cached tail."""
+        return bool(self.tail) and self.tail[0][0] > 0
+
+
+def _with_offsets(lines: list[bytes], start: int) -> list[tuple[int, str]]:
+    out = []
+    for line in lines:
+        out.append((start, _decode(line)))
+        start += len(line) + 1
+    return out
+
+
+class LogTail:
+    """Per-file offset/inode cache serving the last lines of growing logs."""
+
+    def __init__(self, max_lines: int = 200, max_files: int = 64, block_size: int = 8192):
+        self.max_lines = max_lines
+        self.max_files = max_files
+        self.block_size = block_size
+        self._entries: collections.OrderedDict[str, _Entry] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_read = 0
+
+
+    def _build(self, path: str, st: os.stat_result) -> _Entry:
+        with open(path, "rb") as f:
+            # Only whole lines: find the last newline at or before EOF
+            end = st.st_size
+            while end > 0:
+                start = max(0, end - self.block_size)
+                f.seek(start)
+                chunk = f.read(end - start)
+                self.bytes_read += len(chunk)
+                nl = chunk.rfind(b"\n")
+                if nl >= 0:
+                    end = start + nl + 1
+                    break
+                end = start
+            lines = read_last_lines(f, end, self.max_lines, self.block_size)
+            self.bytes_read += sum(len(line) + 1 for line in lines)
+        first = end - sum(len(line) + 1 for line in lines)
+        tail = collections.deque(_with_offsets(lines, first), maxlen=self.max_lines)
+        return _Entry(st.st_dev, st.st_ino, end, tail)
+
+
+    def _refresh_locked(self, path: str) -> _Entry:
+        st = os.stat(path)
+        entry = self._entries.get(path)
+        if (entry is None or (entry.dev, entry.ino) != (st.st_dev, st.st_ino)
+                or st.st_size < entry.offset):
+            entry = self._build(path, st)
+        elif st.st_size > entry.offset:
+            with open(path, "rb") as f:
+                f.seek(entry.offset)
+                data = f.read(st.st_size - entry.offset)
+            self.bytes_read += len(data)
+            data = data[:data.rfind(b"\n") + 1]
+            if data:
+                entry.tail.extend(_with_offsets(data.split(b"\n")[:-1], entry.offset))
+                entry.offset += len(data)
+        self._entries[path] = entry
+        self._entries.move_to_end(path)
+        while len(self._entries) > self.max_files:
+            self._entries.popitem(last=False)
+        return entry
+
+
+    def read(self, path: str, n: int | None = None) -> tuple[list[str], bool, tuple[int, int, int]]:
+        """Return (last n lines, whether earlier lines exist, position after them).
+
+        Raises FileNotFoundError (and other OSErrors) like open() would.
+        """
+        with self._lock:
+            entry = self._refresh_locked(path)
+            lines = [line for _, line in entry.tail]
+            truncated = entry.truncated()
+            position = entry.position()
+        n = self.max_lines if n is None else n
+        if n < len(lines):
+            truncated = True
+        return lines[-n:] if n else [], truncated, position
+
+
+    def read_until(self, path: str, position: tuple[int, int, int]) -> tuple[list[str], bool] | None:
+        """Return (last lines ending at position, whether earlier lines exist),
+        or None if the cached tail can't give them: the file was replaced or
+        truncated since position, or the tail has moved past it."""
+        with self._lock:
+            entry = self._refresh_locked(path)
+            dev, ino, offset = position
+            if (dev, ino) != (entry.dev, entry.ino) or offset > entry.offset:
+                return None
+            if entry.tail and entry.tail[0][0] >= offset and offset > 0:
+                return None
+            kept = [(start, line) for start, line in entry.tail if start < offset]
+        return [line for _, line in kept], bool(kept) and kept[0][0] > 0
+
+
+    def read_since(self, path: str, position: tuple[int, int, int]) -> tuple[list[str] | None, tuple[int, int, int]]:
+        """Return (lines completed after position, new position).
+
+        The lines are None if they can't be given exactly: the file was
+        replaced or truncated since position, or more was appended than the
+        tail holds. Callers should then fall back to read().
+        """
+        with self._lock:
+            entry = self._refresh_locked(path)
+            dev, ino, offset = position
+            if (dev, ino) != (entry.dev, entry.ino) or offset > entry.offset:
+                return None, entry.position()
+            if offset == entry.offset:
+                return [], entry.position()
+            if not entry.tail or entry.tail[0][0] > offset:
+                return None, entry.position()
+            return [line for start, line in entry.tail if start >= offset], entry.position()
+
+
+    def forget(self, path: str) -> None:
+        with self._lock:
+            self._entries.pop(path, None)
+
+
+# ---------------------------------------------------------------------------
+# Structured event logs
+# ---------------------------------------------------------------------------
+
+class _IndexEntry:
+    __slots__ = ("dev", "ino", "offset", "records")
+
+    def __init__(self, dev, ino):
+        self.dev = dev
+        self.ino = ino
+        self.offset = 0        # bytes indexed (always at a line boundary)
+        self.records = []      # (start offset, length, level, module) per record
+
+
+class EventIndex:
+    """Per-file index of JSON-lines event logs (session_events.jsonl) for
+    level/module filtered views."""
+
+    def __init__(self, max_files: int = 16, block_size: int = 1 << 16):
+        self.max_files = max_files
+        self.block_size = block_size
+        self._entries: collections.OrderedDict[str, _IndexEntry] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_read = 0
+
+
+    def _refresh_locked(self, path: str) -> _IndexEntry:
+        st = os.stat(path)
+        entry = self._entries.get(path)
+        if (entry is None or (entry.dev, entry.ino) != (st.st_dev, st.st_ino)
+                or st.st_size < entry.offset):
+            entry = _IndexEntry(st.st_dev, st.st_ino)
+        if st.st_size > entry.offset:
+            with open(path, "rb") as f:
+                f.seek(entry.offset)
+                data = f.read(st.st_size - entry.offset)
+            self.bytes_read += len(data)
+            data = data[:data.rfind(b"\n") + 1]
+            start = entry.offset
+            for line in data.split(b"\n")[:-1]:
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                        entry.records.append((start, len(line), record.get("level"), record.get("module")))
+                    except (ValueError, AttributeError):
+                        pass
+                start += len(line) + 1
+            entry.offset += len(data)
+        self._entries[path] = entry
+        self._entries.move_to_end(path)
+        while len(self._entries) > self.max_files:
+            self._entries.popitem(last=False)
+        return entry
+
+
+    def select(self, path: str, levels=None, module_id: str | None = None,
+               n: int = 200) -> tuple[list[dict], int]:
+        """Return (last n records matching levels and module_id, how many match).
+
+        Raises FileNotFoundError (and other OSErrors) like open() would.
+        """
+        with self._lock:
+            entry = self._refresh_locked(path)
+            matches = [
+                (start, length) for start, length, level, module in entry.records
+                if (not levels or level in levels) and (not module_id or module == module_id)
+            ]
+        chosen = matches[-n:] if n else []
+        records = []
+        with open(path, "rb") as f:
+            for start, length in chosen:
+                f.seek(start)
+                records.append(json.loads(f.read(length)))
+                self.bytes_read += length
+        return records, len(matches)
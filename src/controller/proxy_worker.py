@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Controller Proxy Worker
+
+Makes small browse copies of exported video segments, so a session can be
+reviewed from the web UI without pulling full-resolution files over the
+LAN. For each video it writes, into a cache directory on the controller
+that mirrors the share layout:
+
+    {video}.proxy.mp4    - downscaled, frame-rate-capped, low-bitrate copy
+                           (ffmpeg/libx264 with +faststart where available,
+                           OpenCV mp4v otherwise), for scrubbing in a <video>
+    {video}.sprite.jpg   - thumbnail sprite sheet, `columns` tiles per row
+    {video}.sprite.json  - its index: tile size, columns, and per thumbnail
+                           the source frame, seconds into the proxy and the
+                           frame's timestamp_ns from the camera CSV
+
+The index is written last and records the source's size and mtime, so its
+presence means the set is complete and a re-exported source is redone.
+
+Both come from one decode pass. Work is queued by directory (relative to
+the share) from export completions, and a background thread renders it
+behind everything else: it waits while `busy()` says exports are in flight
+or the load average per CPU is over max_load, including part way through
+a file.
+"""
+
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+from collections.abc import Callable
+
+import cv2
+import numpy as np
+
+from src.controller.session_timeline import VIDEO_SUFFIXES, read_frame_csv
+from src.controller.video_compose import open_writer
+
+PROXY_SUFFIX = ".proxy.mp4"
+SPRITE_SUFFIX = ".sprite.jpg"
+INDEX_SUFFIX = ".sprite.json"
+INDEX_VERSION = 1
+
+# An overnight segment gets fewer, wider-spaced thumbnails rather than a
+# sprite sheet too big for the browser
+MAX_THUMBNAILS = 360
+
+# Frames decoded between checks on whether to pause for exports/load
+YIELD_CHECK_FRAMES = 150
+
+
+class _StoppedError(Exception):
+    """The worker was stopped part way through a file."""
+
+
+def _load_per_cpu() -> float:
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        return 0.0
+
+
+def _source_stamp(path: str) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _frame_timestamps(video_path: str) -> np.ndarray | None:
+    """timestamp_ns per frame from the camera's {stem}_timestamps.csv, if any."""
+    csv_path = f"{os.path.splitext(video_path)[0]}_timestamps.csv"
+    try:
+        return read_frame_csv(csv_path)[0]
+    except (OSError, ValueError):
+        return None
+
+
+def _even(n: float) -> int:
+    return max(2, int(round(n / 2)) * 2)
+
+
+def render_proxy(video_path: str, out_base: str, width: int = 320, max_fps: float = 15.0,
+                 thumbnail_width: int = 160, thumbnail_interval_s: float = 10.0,
+                 columns: int = 10, encoder: str = "auto", codec: str = "libx264",
+                 crf: int | None = 32, checkpoint: Callable[[], None] | None = None) -> dict:
+    """Write out_base + PROXY_SUFFIX / SPRITE_SUFFIX / INDEX_SUFFIX for one
+    video and return the sprite index.
+
+    checkpoint is called every YIELD_CHECK_FRAMES frames; it may block (to
+    yield to other work) or raise to abandon the file.
+    """
+    stamp = _source_stamp(video_path)
+    timestamps = _frame_timestamps(video_path)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open {video_path}")
+
+    # The CSV is the camera's own account of its frame rate; container
+    # metadata on raw .ts/.h264 segments is often missing or wrong
+    if timestamps is not None and len(timestamps) > 1:
+        fps = 1e9 / float(np.median(np.diff(timestamps)))
+        n_frames = len(timestamps)
+    else:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(1, round(fps / max_fps))
+    interval_s = max(thumbnail_interval_s, n_frames / fps / MAX_THUMBNAILS)
+    thumb_step = max(1, round(interval_s * fps))
+
+    os.makedirs(os.path.dirname(out_base), exist_ok=True)
+    proxy_tmp = f"{out_base}.partial{PROXY_SUFFIX}"
+    writer, size, tile = None, None, None
+    thumbs, thumb_frames = [], []
+    i = 0
+    try:
+        while True:
+            if checkpoint is not None and i % YIELD_CHECK_FRAMES == 0:
+                checkpoint()
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if writer is None:
+                h, w = frame.shape[:2]
+                size = (_even(width), _even(width * h / w))
+                tile = (_even(thumbnail_width), _even(thumbnail_width * h / w))
+                writer = open_writer(encoder, proxy_tmp, size, fps / step, codec, None, crf)
+            if i % step == 0:
+                writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+            if i % thumb_step == 0:
+                thumbs.append(cv2.resize(frame, tile, interpolation=cv2.INTER_AREA))
+                thumb_frames.append(i)
+            i += 1
+    except BaseException:
+        if writer is not None:
+            writer.release()
+        if os.path.exists(proxy_tmp):
+            os.remove(proxy_tmp)
+        raise
+    finally:
+        cap.release()
+    if writer is None:
+        raise ValueError(f"No frames decoded from {video_path}")
+    writer.release()
+    os.replace(proxy_tmp, out_base + PROXY_SUFFIX)
+
+    rows = math.ceil(len(thumbs) / columns)
+    sheet = np.zeros((rows * tile[1], min(columns, len(thumbs)) * tile[0], 3), np.uint8)
+    for k, thumb in enumerate(thumbs):
+        r, c = divmod(k, columns)
+        sheet[r * tile[1]:(r + 1) * tile[1], c * tile[0]:(c + 1) * tile[0]] = thumb
+    sprite_tmp = f"{out_base}.partial{SPRITE_SUFFIX}"
+    if not cv2.imwrite(sprite_tmp, sheet, [cv2.IMWRITE_JPEG_QUALITY, 70]):
+        raise RuntimeError(f"Could not write {sprite_tmp}")
+    os.replace(sprite_tmp, out_base + SPRITE_SUFFIX)
+
+    index = {
+        "version": INDEX_VERSION,
+        "source": stamp,
+        "frames": i,
+        "fps": round(fps, 6),
+        "proxy_fps": round(fps / step, 6),
+        "proxy_size": list(size),
+        "tile": list(tile),
+        "columns": columns,
+        "interval_s": round(thumb_step / fps, 6),
+        "thumbnails": [
+            {"frame": f, "t": round(f / fps, 6),
+             "timestamp_ns": int(timestamps[f]) if timestamps is not None and f < len(timestamps) else None}
+            for f in thumb_frames
+        ],
+    }
+    index_tmp = f"{out_base}.partial{INDEX_SUFFIX}"
+    with open(index_tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(index_tmp, out_base + INDEX_SUFFIX)
+    return index
+
+
+class ProxyWorker:
+
+    def __init__(self, cache_dir: str, share_root: Callable[[], str],
+                 busy: Callable[[], bool] | None = None, max_load: float = 0.75,
+                 load: Callable[[], float] = _load_per_cpu, poll_s: float = 5.0,
+                 **render_options):
+        """
+        Args:
+            cache_dir: Where proxies and sprites are written (mirrors the share)
+            share_root: The export share, resolved at render time (mount paths change)
+            busy: True while higher-priority work (exports) is in flight
+            max_load: 1-minute load average per CPU above which rendering waits
+            load: Current load per CPU (os.getloadavg based by default)
+            poll_s: How often a waiting worker re-checks busy/load
+            render_options: Passed to render_proxy (width, max_fps, crf, ...)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        self.share_root = share_root
+        self.busy = busy
+        self.max_load = max_load
+        self.load = load
+        self.poll_s = poll_s
+        self.render_options = render_options
+
+        self._pending: dict[str, None] = {}      # share-relative dirs, in arrival order
+        self._failed: dict[str, str] = {}        # share-relative video -> error
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        self.rendered = 0
+
+
+    def start(self) -> "ProxyWorker":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="proxy-worker")
+            self._thread.start()
+        return self
+
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(5.0)
+
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.process_pending()
+            except Exception as e:
+                self.logger.error(f"Proxy worker error: {e}")
+            with self._lock:
+                idle = not self._pending
+            self._wake.wait(None if idle else self.poll_s)
+            self._wake.clear()
+
+
+    # -----------------------------------------------------------------------
+    # Queue
+    # -----------------------------------------------------------------------
+
+    def enqueue(self, rel_dir: str) -> None:
+        """Queue every video under share/rel_dir that has no current proxy."""
+        rel_dir = rel_dir.strip("/")
+        if not rel_dir:
+            return
+        with self._lock:
+            self._pending.setdefault(rel_dir, None)
+            # A re-export gets another try at anything that failed before
+            for rel_video in [v for v in self._failed if v.startswith(rel_dir + "/")]:
+                del self._failed[rel_video]
+        self._wake.set()
+
+
+    def pending(self) -> list[str]:
+        with self._lock:
+            return list(self._pending)
+
+
+    def yielding(self) -> bool:
+        """Whether rendering should wait for exports or CPU load."""
+        if self.busy is not None and self.busy():
+            return True
+        return self.load() > self.max_load
+
+
+    def _checkpoint(self) -> None:
+        while self.yielding():
+            if self._stop.wait(self.poll_s):
+                raise _StoppedError
+
+
+    def process_pending(self) -> int:
+        """Render what is queued, oldest directory first; returns videos rendered.
+        A video that can't be rendered is marked failed until its directory
+        is queued again.
+
+        Returns early, leaving the rest queued, if exports or load say to
+        wait (checked before each file and, from the background thread,
+        every YIELD_CHECK_FRAMES frames within one).
+        """
+        done = 0
+        while not self.yielding():
+            with self._lock:
+                if not self._pending:
+                    break
+                rel_dir = next(iter(self._pending))
+            with self._lock:
+                failed = set(self._failed)
+            todo = [v for v in self._videos(rel_dir) if v not in failed and not self._current(v)]
+            for rel_video in todo:
+                if self.yielding():
+                    return done
+                try:
+                    done += self._render(rel_video)
+                except _StoppedError:
+                    return done
+            with self._lock:
+                self._pending.pop(rel_dir, None)
+        return done
+
+
+    def _videos(self, rel_dir: str) -> list[str]:
+        base = self.share_root()
+        found = []
+        for dirpath, dirnames, filenames in os.walk(os.path.join(base, rel_dir)):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.endswith(VIDEO_SUFFIXES) and not name.startswith(("PENDING_", ".")):
+                    found.append(os.path.relpath(os.path.join(dirpath, name), base).replace(os.sep, "/"))
+        return found
+
+
+    def _render(self, rel_video: str) -> bool:
+        src = os.path.join(self.share_root(), rel_video)
+        try:
+            render_proxy(src, self.out_base(rel_video),
+                         checkpoint=self._checkpoint if self._thread is not None else None,
+                         **self.render_options)
+        except _StoppedError:
+            raise
+        except Exception as e:
+            self.logger.warning(f"Proxy of {rel_video} failed: {e}")
+            with self._lock:
+                self._failed[rel_video] = str(e)
+            return False
+        with self._lock:
+            self._failed.pop(rel_video, None)
+        self.rendered += 1
+        self.logger.info(f"Proxy and sprite written for {rel_video}")
+        return True
+
+
+    # -----------------------------------------------------------------------
+    # Lookups
+    # -----------------------------------------------------------------------
+
+    def out_base(self, rel_video: str) -> str:
+        """Cache path a video's proxy files are named from; ValueError if
+        rel_video would lead outside the cache."""
+        cache = os.path.realpath(self.cache_dir)
+        base = os.path.realpath(os.path.join(cache, rel_video))
+        if not base.startswith(cache + os.sep):
+            raise ValueError(f"{rel_video} is outside the proxy cache")
+        return base
+
+
+    def index(self, rel_video: str) -> dict | None:
+        """The sprite index of a finished proxy set, or None."""
+        try:
+            with open(self.out_base(rel_video) + INDEX_SUFFIX) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+    def _current(self, rel_video: str) -> bool:
+        """Whether the cached set exists and was made from the source as it is now."""
+        index = self.index(rel_video)
+        if index is None or index.get("version") != INDEX_VERSION:
+            return False
+        try:
+            return _source_stamp(os.path.join(self.share_root(), rel_video)) == index["source"]
+        except OSError:
+            return True     # share unmounted: what we have is the best there is
+
+
+    def status(self, rel_video: str) -> str:
+        """"ready", "pending" (queued), "failed", or "missing" (not made yet, or
+        made from an earlier copy of the source)."""
+        with self._lock:
+            if rel_video in self._failed:
+                return "failed"
+        if self._current(rel_video):
+            return "ready"
+        with self._lock:
+            queued = any(rel_video.startswith(d + "/") for d in self._pending)
+        return "pending" if queued else "missing"
+
+
+    def error(self, rel_video: str) -> str | None:
+        with self._lock:
+            return self._failed.get(rel_video)
+
+
+    def remove(self, rel_dir: str) -> None:
+        """Drop the cached proxies under rel_dir (e.g. a deleted session)."""
+        try:
+            path = self.out_base(rel_dir.strip("/"))
+        except ValueError:
+            return
+        shutil.rmtree(path, ignore_errors=True)
@@ -208,7 +208,7 @@ class PTP:
 
         self.running = True
         self.status = 'starting'
-        self.monitor_thread = threading.Thread(target=self._monitor, daemon=True)
+        self.monitor_thread = threading.Thread(target=self._monitor, daemon=True, name="ptp-monitor")
         self.monitor_thread.start()
 
     def _monitor(self):
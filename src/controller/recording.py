@@ -7,7 +7,6 @@ Author: Andrew SG
 Created: 26/01/2026
 """
 
-import json
 import logging
 import os
 import shutil
@@ -17,10 +16,23 @@ from dataclasses import asdict, dataclass, field
 from datetime import date, datetime, timedelta
 from enum import StrEnum
 
+from src.controller.scheduler import DeadlineScheduler
+from src.controller.session_journal import SessionJournal
+from src.controller.session_store import ENDED_STATES, SessionStore
+
+# Legacy JSON session file. Only read once, to migrate it into the SQLite
+# store that lives next to it (sessions.db).
 SESSIONS_FILE = "/var/lib/saviour/controller/sessions.json"
 _SHARE_ROOT_DEFAULT = "/home/pi/controller_share"
 
+# Period of the per-session health and PTP checks
 _MONITOR_INTERVAL_SECS = 5
+# Period of NAS-space and export-health checks
+_HOUSEKEEPING_SECS = 300
+# Cooldown between get_health probes to a module in "unknown" state
+_REPROBE_INTERVAL_SECS = 60
+# Wait between dispatching validate_readiness and checking the replies
+_READINESS_WAIT_SECS = 5
 
 # How far into the future modules are told to start recording.
 # PTP-synchronised clocks mean all modules hit this timestamp together.
@@ -76,7 +88,7 @@ class RecordingSession:
     # export-stall check below. None until stopped.
     stopped_epoch:              float | None = None
     # Set once a stale-pending-export alert has fired for this stopped session,
-    # so the monitor loop doesn't re-alert every cycle.
+    # so the housekeeping check doesn't re-alert every time.
     export_stall_alerted:      bool = False
     # UTC epoch at which modules are scheduled to begin recording (time.time() + LEAD_SECS).
     # None for immediate starts (e.g. module_back_online).
@@ -109,7 +121,15 @@ class RecordingSession:
 
 class Recording:
 
-    def __init__(self):
+    def __init__(self, scheduler: DeadlineScheduler | None = None,
+                 journal_dir: str | None = None):
+        """
+        Args:
+            scheduler: Timer scheduler for session deadlines; tests pass one
+                built on a FakeClock. A real one is created and started otherwise.
+            journal_dir: Spool directory for the session event journal;
+                defaults to session_journal beside SESSIONS_FILE.
+        """
         self.logger = logging.getLogger(__name__)
         self.sessions: dict[str, RecordingSession] = {}
         self._lock = threading.Lock()
@@ -121,18 +141,18 @@ class Recording:
         self._export_failure_streak: dict[str, int] = {}   # module_id → consecutive export failures
         self._daily_run_export_start: dict[str, tuple] = {} # session_name → (complete, failed) at day-start
         self._daily_summary_sent: set = set()               # "session:date" already summarized
-        self._gap_check_date: str | None = None          # last date gap-check ran
-        self._monitor_cycle: int = 0                        # loop counter for periodic tasks
         self._readiness_checks: dict[str, float] = {}       # session_name → epoch when validate_readiness was dispatched
+        self._store: SessionStore | None = None             # opened by _load_sessions
+        self.journal = SessionJournal(
+            journal_dir or os.path.join(os.path.dirname(SESSIONS_FILE), "session_journal"),
+            self._get_share_root,
+        )
+        self.journal.start()
 
-        self._load_sessions()
+        self._scheduler = scheduler or DeadlineScheduler(name="session-timers")
 
-        self._monitor_thread = threading.Thread(
-            target=self._monitor_sessions,
-            daemon=True,
-            name="session-monitor",
-        )
-        self._monitor_thread.start()
+        self._load_sessions()
+        self._start_timers()
 
 
     # -----------------------------------------------------------------------
@@ -375,7 +395,8 @@ class Recording:
         for module_id in modules:
             self.facade.send_command(module_id, "start_recording", params)
         self.facade.update_sessions(self.sessions)
-        self._save_sessions()
+        self._save_sessions(session_name)
+        self._arm_session_timers(session_name)
 
         self.logger.info(
             f"Session '{session_name}' created targeting {target} ({len(modules)} modules)"
@@ -436,7 +457,8 @@ class Recording:
             self.sessions[session_name] = session
 
         self.facade.update_sessions(self.sessions)
-        self._save_sessions()
+        self._save_sessions(session_name)
+        self._arm_session_timers(session_name)
         self.logger.info(
             f"Scheduled session '{session_name}' created for {target} "
             f"between {start_time}–{end_time}"
@@ -490,7 +512,8 @@ class Recording:
             del self.sessions[session_name]
 
         self.facade.update_sessions(self.sessions)
-        self._save_sessions()
+        self._save_sessions(session_name)
+        self._arm_session_timers(session_name)
         self.logger.info(f"Session '{session_name}' deleted (delete_files={delete_files})")
         return {"success": True}
 
@@ -502,10 +525,7 @@ class Recording:
         for why. They stay visible (and clearable individually with force) until
         either the export resolves or an operator explicitly force-clears.
         """
-        ended = [
-            name for name, s in list(self.sessions.items())
-            if s.state not in (SessionState.ACTIVE, SessionState.SCHEDULED)
-        ]
+        ended = self.get_ended_session_names()
         cleared = []
         skipped = []
         for name in ended:
@@ -546,7 +566,7 @@ class Recording:
                 self.facade.send_command(module_id, "stop_recording", {})
 
         self.facade.update_sessions(self.sessions)
-        self._save_sessions()
+        self._save_sessions(session_name)
         self.logger.info(
             f"Stop command sent to {len(session.modules)} module(s) in '{session_name}'"
         )
@@ -581,6 +601,7 @@ class Recording:
                 session.state = SessionState.SCHEDULED
                 session.error_message = ""
         self._start_scheduled_session(session_name, today)
+        self._arm_session_timers(session_name)
 
         with self._lock:
             new_state = session.state
@@ -651,7 +672,7 @@ class Recording:
                 self._log_session_event(session_name, "WARNING",
                     f"Export failed for {module_id} — path: {export_path}"
                     + (f" ({streak} consecutive failures)" if streak > 1 else "")
-                    + ("" if final else " — will retry"))
+                    + ("" if final else " — will retry"), module_id=module_id)
                 if final:
                     session.pending_exports = max(0, session.pending_exports - 1)
 
@@ -663,7 +684,7 @@ class Recording:
                 session.export_stall_alerted = False
 
         self.facade.update_sessions(self.sessions)
-        self._save_sessions()
+        self._save_sessions(session_name)
         self.logger.info(f"Export state for {module_id} in '{session_name}': {state}")
 
 
@@ -702,7 +723,7 @@ class Recording:
                 self.facade.send_command(module_id, "start_export", {"export_path": export_path})
 
         self.facade.update_sessions(self.sessions)
-        self._save_sessions()
+        self._save_sessions(session_name)
         self._log_session_event(
             session_name, "RECOVERY", f"Export manually retried for {', '.join(failed_modules)}"
         )
@@ -723,6 +744,13 @@ class Recording:
     def get_active_recording_sessions(self) -> dict:
         return {k: v for k, v in self.sessions.items() if v.state == SessionState.ACTIVE}
 
+    def get_ended_session_names(self) -> list[str]:
+        """Stopped/error sessions, oldest first, from the store's state index
+        (or the in-memory sessions before the store is open)."""
+        if self._store is None:
+            return [k for k, v in self.sessions.items() if v.state in ENDED_STATES]
+        return [name for name in self._store.names(states=ENDED_STATES) if name in self.sessions]
+
     def get_session_name_from_target(self, target: str) -> str | None:
         """Find a non-stopped session that the target belongs to."""
         non_stopped = {
@@ -783,7 +811,7 @@ class Recording:
         params = {"duration": 0, "session_name": session_name}
         self.facade.send_command(module_id, "start_recording", params)
         self.facade.update_sessions(self.sessions)
-        self._save_sessions()
+        self._save_sessions(session_name)
         self.logger.info(f"Module {module_id} added to session '{session_name}'")
         return {"success": True}
 
@@ -806,9 +834,10 @@ class Recording:
                 session.error_time = datetime.now().strftime("%Y%m%d-%H%M%S")
             session.state = SessionState.ERROR
             self.facade.update_sessions(self.sessions)
-            self._save_sessions()
+            self._save_sessions(session_name)
             self.logger.info(f"Session '{session_name}' → ERROR: {module_id} offline")
-            self._log_session_event(session_name, "FAULT", f"{module_id} went offline")
+            self._log_session_event(session_name, "FAULT", f"{module_id} went offline",
+                module_id=module_id)
             if self._notify_enabled("notify_module_offline"):
                 self.facade.send_alert(
                     key=f"module_offline_{module_id}",
@@ -821,7 +850,7 @@ class Recording:
         """Record a module-reported recording failure (e.g. recording_start_failed /
         recording_stop_failed) against whatever session it belongs to.
 
-        Unlike the periodic "not recording" strikes check in _monitor_sessions
+        Unlike the periodic "not recording" strikes check in _check_session_health
         (which needs several missed polls before it notices), this reacts the
         moment the module itself says something went wrong — closing the gap
         where a module-side failure was previously silently dropped rather
@@ -841,9 +870,10 @@ class Recording:
             session.error_time = datetime.now().strftime("%Y%m%d-%H%M%S")
         session.state = SessionState.ERROR
         self.facade.update_sessions(self.sessions)
-        self._save_sessions()
+        self._save_sessions(session_name)
         self.logger.info(f"Session '{session_name}' → ERROR: {module_id} reported fault: {message}")
-        self._log_session_event(session_name, "FAULT", f"{module_id}: {message}")
+        self._log_session_event(session_name, "FAULT", f"{module_id}: {message}",
+            module_id=module_id)
         if self._notify_enabled("notify_session_faults"):
             self.facade.send_alert(
                 key=f"module_fault_{module_id}",
@@ -883,9 +913,9 @@ class Recording:
             self.logger.warning(f"Session '{session_name}': {warning}")
             with self._lock:
                 session.recording_health_warning = warning
-            self._log_session_event(session_name, "WARNING", warning)
+            self._log_session_event(session_name, "WARNING", warning, module_id=module_id)
             self.facade.update_sessions(self.sessions)
-            self._save_sessions()
+            self._save_sessions(session_name)
             if self._notify_enabled("notify_recording_health"):
                 self.facade.send_alert(
                     key=f"recording_health_{module_id}",
@@ -901,9 +931,9 @@ class Recording:
             with self._lock:
                 session.recording_health_warning = None
             self._log_session_event(session_name, "RECOVERY",
-                f"Recording health recovered — {module_id}")
+                f"Recording health recovered — {module_id}", module_id=module_id)
             self.facade.update_sessions(self.sessions)
-            self._save_sessions()
+            self._save_sessions(session_name)
 
 
     def module_back_online(self, module_id: str) -> None:
@@ -940,12 +970,13 @@ class Recording:
                     session.error_message = ""
                     session.state = SessionState.ACTIVE
             self.facade.update_sessions(self.sessions)
-            self._save_sessions()
+            self._save_sessions(session_name)
+            self._arm_session_timers(session_name)
             self.logger.info(
                 f"Module {module_id} back online — restarted recording in '{session_name}'"
             )
             self._log_session_event(session_name, "RECOVERY",
-                f"{module_id} came back online — recording resumed")
+                f"{module_id} came back online — recording resumed", module_id=module_id)
             if self._notify_enabled("notify_module_online", default=False):
                 self.facade.send_alert(
                     key=f"module_online_{module_id}",
@@ -987,7 +1018,7 @@ class Recording:
             with self._lock:
                 session.module_stop_states[module_id] = "stopped"
             self.facade.update_sessions(self.sessions)
-            self._save_sessions()
+            self._save_sessions(session_name)
 
 
     # -----------------------------------------------------------------------
@@ -1038,7 +1069,8 @@ class Recording:
             self._log_session_event(session_name, "INFO",
                 "Daily recording run ended")
         self.facade.update_sessions(self.sessions)
-        self._save_sessions()
+        self._save_sessions(session_name)
+        self._arm_session_timers(session_name)
 
         if new_state == SessionState.STOPPED and self._notify_enabled("notify_recording_stopped", default=False):
             self.facade.send_alert(
@@ -1061,7 +1093,7 @@ class Recording:
         # Modules online at session-creation time may differ from today's set.
         current_modules = list(self.facade.get_modules_by_target(session.target).keys())
         if not current_modules:
-            # Transient — modules may not have connected yet.  Retry next cycle.
+            # Transient — modules may not have connected yet.  Retried shortly.
             self.logger.info(
                 f"Scheduled session '{session_name}': no '{session.target}' modules online yet "
                 f"— will retry"
@@ -1072,7 +1104,7 @@ class Recording:
         busy = self._busy_modules()
         available = [m for m in current_modules if m not in busy]
         if not available:
-            # Transient — busy modules may finish stopping soon.  Retry next cycle.
+            # Transient — busy modules may finish stopping soon.  Retried shortly.
             self.logger.info(
                 f"Scheduled session '{session_name}': all target modules are busy — will retry"
             )
@@ -1089,23 +1121,24 @@ class Recording:
         # ── Pre-flight readiness check (two-pass, non-blocking) ───────────────
         # Pass 1: dispatch validate_readiness + get_health to all target modules
         #         and return — responses arrive asynchronously over the PoE LAN.
-        # Pass 2: one monitor cycle later (≥5 s) the responses have arrived;
-        #         check module statuses and alert on NOT_READY before proceeding.
-        _READINESS_WAIT_SECS = 5  # one monitor cycle is ample for LAN round-trips
+        # Pass 2: _READINESS_WAIT_SECS later (the scheduler's readiness-verify
+        #         deadline) the responses have arrived; check module statuses
+        #         and alert on NOT_READY before proceeding.
         sent_at = self._readiness_checks.get(session_name)
+        now = self._scheduler.clock.now()
         if sent_at is None:
             for mid in available:
                 self.facade.send_command(mid, "get_health", {})
                 self.facade.send_command(mid, "validate_readiness", {})
-            self._readiness_checks[session_name] = time.time()
+            self._readiness_checks[session_name] = now
             self.logger.info(
                 f"Scheduled session '{session_name}': dispatched readiness checks "
-                f"to {len(available)} module(s) — will verify next cycle"
+                f"to {len(available)} module(s) — will verify in {_READINESS_WAIT_SECS}s"
             )
             return
 
-        if time.time() - sent_at < _READINESS_WAIT_SECS:
-            return  # responses still in flight — wait one more cycle
+        if now - sent_at < _READINESS_WAIT_SECS:
+            return  # responses still in flight
 
         # Responses should be in by now — check and clear the pending entry
         del self._readiness_checks[session_name]
@@ -1192,7 +1225,7 @@ class Recording:
                 session.error_time = datetime.now().strftime("%Y%m%d-%H%M%S")
                 session.scheduled_last_start_date = today
             self.facade.update_sessions(self.sessions)
-            self._save_sessions()
+            self._save_sessions(session_name)
             self._log_session_event(session_name, "FAULT",
                 f"Scheduled recording blocked — NAS full: {err}")
             if self._notify_enabled("notify_session_faults"):
@@ -1220,7 +1253,7 @@ class Recording:
         if not ptp["ok"]:
             # Distinguish transient "still settling" from confirmed bad offsets.
             # "No health data" and "not yet reported" are startup-transient — retry
-            # next cycle rather than locking out the entire day.
+            # shortly rather than locking out the entire day.
             settling_phrases = ("not yet reported", "still be settling", "no health data")
             failures = ptp.get("failures", [])
             all_settling = bool(failures) and all(
@@ -1230,7 +1263,7 @@ class Recording:
             if all_settling:
                 self.logger.info(
                     f"Scheduled session '{session_name}': PTP still settling on "
-                    f"{len(failures)} module(s) — will retry next cycle"
+                    f"{len(failures)} module(s) — will retry shortly"
                 )
                 return  # don't lock out the day
 
@@ -1243,7 +1276,7 @@ class Recording:
                 session.error_time = datetime.now().strftime("%Y%m%d-%H%M%S")
                 session.scheduled_last_start_date = today
             self.facade.update_sessions(self.sessions)
-            self._save_sessions()
+            self._save_sessions(session_name)
             self._log_session_event(session_name, "FAULT",
                 f"Scheduled recording blocked — PTP not synchronised: {ptp['error']}")
             if self._notify_enabled("notify_session_faults"):
@@ -1278,7 +1311,7 @@ class Recording:
         for module_id in session.modules:
             self.facade.send_command(module_id, "start_recording", params)
         self.facade.update_sessions(self.sessions)
-        self._save_sessions()
+        self._save_sessions(session_name)
         self.logger.info(f"Scheduled session '{session_name}' started for {today}")
         self._log_session_event(session_name, "INFO",
             f"Scheduled recording started — run for {today}, modules: {', '.join(session.modules)}")
@@ -1314,7 +1347,7 @@ class Recording:
             self.facade.send_command(module_id, "stop_recording", {})
 
         self.facade.update_sessions(self.sessions)
-        self._save_sessions()
+        self._save_sessions(session_name)
         self.logger.info(f"Scheduled session '{session_name}' stop commands sent")
 
 
@@ -1362,7 +1395,7 @@ class Recording:
                 session.ptp_warning = warning
             self._log_session_event(session_name, "WARNING", warning)
             self.facade.update_sessions(self.sessions)
-            self._save_sessions()
+            self._save_sessions(session_name)
             if self._notify_enabled("notify_ptp_degraded"):
                 self.facade.send_alert(
                     key=f"ptp_degraded_{session_name}",
@@ -1378,7 +1411,7 @@ class Recording:
             self._log_session_event(session_name, "RECOVERY",
                 "PTP sync recovered — all modules within threshold")
             self.facade.update_sessions(self.sessions)
-            self._save_sessions()
+            self._save_sessions(session_name)
 
 
     def _check_nas_space_periodic(self) -> None:
@@ -1484,7 +1517,7 @@ class Recording:
             with self._lock:
                 session.export_stall_alerted = True
             self.facade.update_sessions(self.sessions)
-            self._save_sessions()
+            self._save_sessions(session_name)
 
 
     def _check_session_gaps(self, today: str) -> None:
@@ -1532,7 +1565,7 @@ class Recording:
     @staticmethod
     def _scheduled_session_action(session: "RecordingSession", today: str, yesterday: str,
                                    current_time: str, today_weekday: int) -> str | None:
-        """Decide whether a scheduled session's monitor tick should start or stop it.
+        """Decide whether a scheduled session should start or stop at a given moment.
 
         end < start means the window spans midnight (e.g. 22:00-06:00): the stop
         check then looks for a session started yesterday whose end time has been
@@ -1568,192 +1601,369 @@ class Recording:
 
         return None
 
-    def _monitor_sessions(self) -> None:
-        """Background thread: drive scheduled timers and health-check active sessions."""
-        while True:
-            time.sleep(_MONITOR_INTERVAL_SECS)
-            self._monitor_cycle += 1
-            current_time = datetime.now().strftime("%H:%M")
-            today = date.today().isoformat()
-
-            # ── Periodic checks (every ~5 min = 60 × 5 s cycles) ─────────────
-            if self._monitor_cycle % 60 == 0:
-                self._check_nas_space_periodic()
-                self._check_export_staleness()
-                self._check_export_stall_after_stop()
-
-            # ── Daily gap detection (once per calendar day) ───────────────────
-            if self._gap_check_date != today:
-                self._gap_check_date = today
-                self._check_session_gaps(today)
-
-            for session_name, session in list(self.sessions.items()):
-                try:
-                    if session.state == SessionState.STOPPED:
-                        continue
-
-                    if session.scheduled:
-                        today_weekday = date.today().weekday()
-                        yesterday = (date.today() - timedelta(days=1)).isoformat()
-                        action = self._scheduled_session_action(
-                            session, today, yesterday, current_time, today_weekday
-                        )
-                        if action == "start":
-                            self._start_scheduled_session(session_name, today)
-                        elif action == "stop":
-                            self._stop_scheduled_session(session_name)
-
-                    elif session.state in (SessionState.ACTIVE, SessionState.ERROR):
-                        # Skip health check during lead window and startup grace period
-                        if (session.recording_start_at
-                                and time.time() < session.recording_start_at + _STARTUP_GRACE_SECS):
-                            continue
-
-                        # Auto-stop timed sessions when their duration has elapsed
-                        if (session.timed_stop_at
-                                and time.time() >= session.timed_stop_at
-                                and session.state == SessionState.ACTIVE):
-                            self.logger.info(
-                                f"Timed session '{session_name}' duration elapsed — stopping"
-                            )
-                            self.stop_session(session_name)
-                            continue
-
-                        # Probe any modules whose state is unknown (e.g. after black start).
-                        # Re-probe on a cooldown so slow-booting modules are not abandoned
-                        # after a single unanswered attempt.
-                        _REPROBE_INTERVAL_S = 60
-                        now_ts = time.time()
-                        for m in session.modules:
-                            if session.module_stop_states.get(m) != "unknown":
-                                continue
-                            last_probe = self._health_probe_times.get(m, 0)
-                            if now_ts - last_probe >= _REPROBE_INTERVAL_S:
-                                self._health_probe_times[m] = now_ts
-                                try:
-                                    self.facade.send_command(m, "get_health", {})
-                                    self.logger.info(
-                                        f"Sent get_health probe to {m} to resolve unknown state"
-                                    )
-                                except Exception as e:
-                                    self.logger.warning(f"Could not probe {m}: {e}")
-
-                        # Check every module that should be recording actually is.
-                        # Require _NOT_RECORDING_STRIKES_THRESHOLD consecutive misses before
-                        # declaring ERROR — one miss is normal during a segment transition.
-                        _NOT_RECORDING_STRIKES_THRESHOLD = 2
-                        should_be_recording = [
-                            m for m in session.modules
-                            if session.module_stop_states.get(m) == "recording"
-                        ]
-                        not_recording = []
-                        for m in should_be_recording:
-                            key = (session_name, m)
-                            if not self.facade.is_module_recording(m):
-                                strikes = self._not_recording_strikes.get(key, 0) + 1
-                                self._not_recording_strikes[key] = strikes
-                                if strikes >= _NOT_RECORDING_STRIKES_THRESHOLD:
-                                    not_recording.append(m)
-                            else:
-                                self._not_recording_strikes.pop(key, None)
-                        if not_recording:
-                            msg = f"Not recording: {', '.join(not_recording)}"
-                            if session.error_message != msg or session.state != SessionState.ERROR:
-                                session.error_message = msg
-                                if session.state != SessionState.ERROR:
-                                    session.error_time = datetime.now().strftime("%Y%m%d-%H%M%S")
-                                session.state = SessionState.ERROR
-                                self.facade.update_sessions(self.sessions)
-                                self._log_session_event(session_name, "FAULT", msg)
-                                if self._notify_enabled("notify_session_faults"):
-                                    self.facade.send_alert(
-                                        key=f"session_error_{session_name}",
-                                        title=f"Recording error — {session_name}",
-                                        message=(
-                                            f"Session **{session_name}** has entered an error state. "
-                                            f"The following modules are not recording: {', '.join(not_recording)}."
-                                        ),
-                                    )
-                            # Actively attempt recovery, not just flag the fault -- this is the
-                            # only place that notices a module lost its recording state without
-                            # the module ever having been marked offline (e.g. a service restart
-                            # fast enough to stay under health.py's suspicion_timeout, so the
-                            # offline->online edge that module_back_online() normally hangs off
-                            # of never fires). Confirmed live: a module restarted mid-recording,
-                            # the fault above correctly triggered ("Not recording: <module>"),
-                            # but nothing ever re-sent start_recording -- the session just sat in
-                            # ERROR indefinitely. module_back_online() already has the right
-                            # guards (session.state in ACTIVE/ERROR, skips a redundant resend if
-                            # already confirmed recording) and retries harmlessly on the next
-                            # cycle if this attempt doesn't stick (the module's own
-                            # start_recording is a no-op error, not a crash, if already recording).
-                            for m in not_recording:
-                                self.module_back_online(m)
-                        elif session.state == SessionState.ERROR and should_be_recording:
-                            # All modules we were actively checking are now recording — recover.
-                            # Guard: if should_be_recording is empty (e.g. all states are "unknown"
-                            # after a restart) we cannot confirm recovery, so leave the ERROR state.
-                            reason = session.error_message or "faulted modules"
-                            recovery_msg = f"Recovered — {reason} now recording"
-                            self._log_session_event(
-                                session_name, "RECOVERY", recovery_msg
-                            )
-                            session.error_message = ""
-                            session.state = SessionState.ACTIVE
-                            for m in session.modules:
-                                self._not_recording_strikes.pop((session_name, m), None)
-                            self.facade.update_sessions(self.sessions)
-
-                        if session.state == SessionState.ACTIVE:
-                            self._check_ptp_mid_recording(session_name, session)
+    # -----------------------------------------------------------------------
+    # Session timers
+    # -----------------------------------------------------------------------
 
-                except Exception as e:
-                    self.logger.error(f"Error monitoring session '{session_name}': {e}")
+    def _start_timers(self) -> None:
+        """Register controller-wide timers and arm every loaded session.
+
+        Sessions are armed one monitor interval after startup, so the facade
+        is wired up before any callback fires.
+        """
+        now = self._scheduler.clock.now()
+        self._scheduler.schedule("housekeeping", now + _HOUSEKEEPING_SECS,
+                                 self._housekeeping, interval=_HOUSEKEEPING_SECS)
+        self._scheduler.schedule("gap_check", now + _MONITOR_INTERVAL_SECS, self._daily_gap_check)
+        self._scheduler.schedule("startup", now + _MONITOR_INTERVAL_SECS, self._arm_all_sessions)
+        self._scheduler.start()
+
+
+    def stop(self) -> None:
+        """Stop the session timers, so none fire into a controller that is
+        shutting down."""
+        self._scheduler.stop()
+
+
+    def _arm_all_sessions(self) -> None:
+        for session_name in list(self.sessions):
+            self._arm_session_timers(session_name)
+
+
+    def _arm_session_timers(self, session_name: str) -> None:
+        """(Re)register the deadlines a session needs in its current state.
+
+        Called after every lifecycle transition. One-shot deadlines (start,
+        stop, timed stop) are recomputed from session fields and replaced;
+        periodic checks are only added if not already running, so re-arming
+        does not postpone them.
+        """
+        scheduler = self._scheduler
+        session = self.sessions.get(session_name)
+        if session is None or session.state == SessionState.STOPPED:
+            scheduler.cancel_group(session_name)
+            self._readiness_checks.pop(session_name, None)
+            return
+        now = scheduler.clock.now()
+
+        if session.scheduled and session.state != SessionState.ACTIVE:
+            at = self._next_scheduled_start(session, now)
+            if at is not None and session_name not in self._readiness_checks:
+                scheduler.schedule((session_name, "start"), at, self._scheduled_start_due, session_name)
+        else:
+            scheduler.cancel((session_name, "start"))
+
+        stop_at = None
+        if session.scheduled and session.state == SessionState.ACTIVE and not session.scheduled_stopping:
+            stop_at = self._scheduled_stop_deadline(session)
+        if stop_at is not None:
+            scheduler.schedule((session_name, "stop"), stop_at, self._scheduled_stop_due, session_name)
+        else:
+            scheduler.cancel((session_name, "stop"))
+
+        if not session.scheduled and session.state in (SessionState.ACTIVE, SessionState.ERROR):
+            grace_end = max(now, (session.recording_start_at or 0) + _STARTUP_GRACE_SECS)
+            scheduler.ensure((session_name, "health"), grace_end, self._check_session_health,
+                             session_name, interval=_MONITOR_INTERVAL_SECS)
+            scheduler.ensure((session_name, "ptp"), grace_end, self._check_session_ptp,
+                             session_name, interval=_MONITOR_INTERVAL_SECS)
+            if any(v == "unknown" for v in session.module_stop_states.values()):
+                scheduler.ensure((session_name, "reprobe"), grace_end, self._reprobe_unknown_modules,
+                                 session_name, interval=_REPROBE_INTERVAL_SECS)
+            if session.timed_stop_at and session.state == SessionState.ACTIVE:
+                scheduler.schedule((session_name, "timed_stop"),
+                                   max(session.timed_stop_at, grace_end),
+                                   self._timed_stop_due, session_name)
+        else:
+            for kind in ("health", "ptp", "reprobe", "timed_stop"):
+                scheduler.cancel((session_name, kind))
+
+
+    @staticmethod
+    def _next_scheduled_start(session: RecordingSession, now: float) -> float | None:
+        """Epoch of the next start a scheduled session is due, per _scheduled_session_action.
+
+        Today's start counts (returned as now if already passed) unless the
+        session already started today; otherwise the next matching weekday.
+        """
+        try:
+            start = datetime.strptime(session.scheduled_start_time, "%H:%M").time()
+        except (TypeError, ValueError):
+            return None
+        today = datetime.fromtimestamp(now).date()
+        for offset in range(8):
+            day = today + timedelta(days=offset)
+            if session.scheduled_days and day.weekday() not in session.scheduled_days:
+                continue
+            if day.isoformat() == session.scheduled_last_start_date:
+                continue
+            return max(datetime.combine(day, start).timestamp(), now)
+        return None
+
+
+    @staticmethod
+    def _scheduled_stop_deadline(session: RecordingSession) -> float | None:
+        """Epoch at which the current run of a scheduled session ends."""
+        try:
+            started = date.fromisoformat(session.scheduled_last_start_date)
+            start = datetime.strptime(session.scheduled_start_time, "%H:%M").time()
+            end = datetime.strptime(session.scheduled_end_time, "%H:%M").time()
+        except (TypeError, ValueError):
+            return None
+        day = started + timedelta(days=1) if end < start else started
+        return datetime.combine(day, end).timestamp()
+
+
+    def _scheduled_action_at(self, session: RecordingSession, now: float) -> str | None:
+        dt = datetime.fromtimestamp(now)
+        return self._scheduled_session_action(
+            session,
+            dt.date().isoformat(),
+            (dt.date() - timedelta(days=1)).isoformat(),
+            dt.strftime("%H:%M"),
+            dt.weekday(),
+        )
+
+
+    def _retry_later(self, session_name: str, kind: str, callback, at: float | None = None) -> None:
+        now = self._scheduler.clock.now()
+        self._scheduler.schedule((session_name, kind), at or now + _MONITOR_INTERVAL_SECS,
+                                 callback, session_name)
+
+
+    def _scheduled_start_due(self, session_name: str) -> None:
+        session = self.sessions.get(session_name)
+        if session is None:
+            return
+        now = self._scheduler.clock.now()
+        if self._scheduled_action_at(session, now) != "start":
+            # Deadline no longer matches the session (e.g. clock stepped) — look again shortly
+            self._retry_later(session_name, "start", self._scheduled_start_due)
+            return
+
+        today = datetime.fromtimestamp(now).date().isoformat()
+        self._start_scheduled_session(session_name, today)
+        if session.state == SessionState.ACTIVE or session.scheduled_last_start_date == today:
+            self._arm_session_timers(session_name)
+            return
+        # Not started: readiness replies in flight, or a transient condition
+        sent_at = self._readiness_checks.get(session_name)
+        at = sent_at + _READINESS_WAIT_SECS if sent_at is not None else None
+        self._retry_later(session_name, "start", self._scheduled_start_due, at)
+
+
+    def _scheduled_stop_due(self, session_name: str) -> None:
+        session = self.sessions.get(session_name)
+        if session is None:
+            return
+        if self._scheduled_action_at(session, self._scheduler.clock.now()) == "stop":
+            self._stop_scheduled_session(session_name)
+            self._arm_session_timers(session_name)
+        elif session.state == SessionState.ACTIVE and not session.scheduled_stopping:
+            self._retry_later(session_name, "stop", self._scheduled_stop_due)
+
+
+    def _timed_stop_due(self, session_name: str) -> None:
+        session = self.sessions.get(session_name)
+        if (session is None or session.state != SessionState.ACTIVE
+                or not session.timed_stop_at):
+            return
+        if self._scheduler.clock.now() < session.timed_stop_at:
+            self._arm_session_timers(session_name)
+            return
+        self.logger.info(f"Timed session '{session_name}' duration elapsed — stopping")
+        self.stop_session(session_name)
+
+
+    def _reprobe_unknown_modules(self, session_name: str) -> None:
+        """Probe modules whose state is unknown (e.g. after a black start).
+
+        Repeats every _REPROBE_INTERVAL_SECS so slow-booting modules are not
+        abandoned after a single unanswered attempt; stops once none are unknown.
+        """
+        session = self.sessions.get(session_name)
+        unknown = [m for m in (session.modules if session else [])
+                   if session.module_stop_states.get(m) == "unknown"]
+        if not unknown or session.state not in (SessionState.ACTIVE, SessionState.ERROR):
+            self._scheduler.cancel((session_name, "reprobe"))
+            return
+        now = self._scheduler.clock.now()
+        for m in unknown:
+            if now - self._health_probe_times.get(m, 0) < _REPROBE_INTERVAL_SECS:
+                continue
+            self._health_probe_times[m] = now
+            try:
+                self.facade.send_command(m, "get_health", {})
+                self.logger.info(f"Sent get_health probe to {m} to resolve unknown state")
+            except Exception as e:
+                self.logger.warning(f"Could not probe {m}: {e}")
+
+
+    def _check_session_ptp(self, session_name: str) -> None:
+        session = self.sessions.get(session_name)
+        if session is not None and session.state == SessionState.ACTIVE:
+            self._check_ptp_mid_recording(session_name, session)
+
+
+    def _check_session_health(self, session_name: str) -> None:
+        """Periodic check that every module which should be recording actually is."""
+        session = self.sessions.get(session_name)
+        if session is None or session.state not in (SessionState.ACTIVE, SessionState.ERROR):
+            self._arm_session_timers(session_name)
+            return
+
+        # Require _NOT_RECORDING_STRIKES_THRESHOLD consecutive misses before
+        # declaring ERROR — one miss is normal during a segment transition.
+        _NOT_RECORDING_STRIKES_THRESHOLD = 2
+        should_be_recording = [
+            m for m in session.modules
+            if session.module_stop_states.get(m) == "recording"
+        ]
+        not_recording = []
+        for m in should_be_recording:
+            key = (session_name, m)
+            if not self.facade.is_module_recording(m):
+                strikes = self._not_recording_strikes.get(key, 0) + 1
+                self._not_recording_strikes[key] = strikes
+                if strikes >= _NOT_RECORDING_STRIKES_THRESHOLD:
+                    not_recording.append(m)
+            else:
+                self._not_recording_strikes.pop(key, None)
+        if not_recording:
+            msg = f"Not recording: {', '.join(not_recording)}"
+            if session.error_message != msg or session.state != SessionState.ERROR:
+                session.error_message = msg
+                if session.state != SessionState.ERROR:
+                    session.error_time = datetime.now().strftime("%Y%m%d-%H%M%S")
+                session.state = SessionState.ERROR
+                self.facade.update_sessions(self.sessions)
+                self._save_sessions(session_name)
+                self._log_session_event(session_name, "FAULT", msg)
+                if self._notify_enabled("notify_session_faults"):
+                    self.facade.send_alert(
+                        key=f"session_error_{session_name}",
+                        title=f"Recording error — {session_name}",
+                        message=(
+                            f"Session **{session_name}** has entered an error state. "
+                            f"The following modules are not recording: {', '.join(not_recording)}."
+                        ),
+                    )
+            # Actively attempt recovery, not just flag the fault -- this is the
+            # only place that notices a module lost its recording state without
+            # the module ever having been marked offline (e.g. a service restart
+            # fast enough to stay under health.py's suspicion_timeout, so the
+            # offline->online edge that module_back_online() normally hangs off
+            # of never fires). Confirmed live: a module restarted mid-recording,
+            # the fault above correctly triggered ("Not recording: <module>"),
+            # but nothing ever re-sent start_recording -- the session just sat in
+            # ERROR indefinitely. module_back_online() already has the right
+            # guards (session.state in ACTIVE/ERROR, skips a redundant resend if
+            # already confirmed recording) and retries harmlessly on the next
+            # cycle if this attempt doesn't stick (the module's own
+            # start_recording is a no-op error, not a crash, if already recording).
+            for m in not_recording:
+                self.module_back_online(m)
+        elif session.state == SessionState.ERROR and should_be_recording:
+            # All modules we were actively checking are now recording — recover.
+            # Guard: if should_be_recording is empty (e.g. all states are "unknown"
+            # after a restart) we cannot confirm recovery, so leave the ERROR state.
+            reason = session.error_message or "faulted modules"
+            recovery_msg = f"Recovered — {reason} now recording"
+            self._log_session_event(
+                session_name, "RECOVERY", recovery_msg
+            )
+            session.error_message = ""
+            session.state = SessionState.ACTIVE
+            for m in session.modules:
+                self._not_recording_strikes.pop((session_name, m), None)
+            self.facade.update_sessions(self.sessions)
+            self._save_sessions(session_name)
+            self._arm_session_timers(session_name)
+
+
+    def _housekeeping(self) -> None:
+        """Every _HOUSEKEEPING_SECS: NAS space and export health checks."""
+        self._check_nas_space_periodic()
+        self._check_export_staleness()
+        self._check_export_stall_after_stop()
+
+
+    def _daily_gap_check(self) -> None:
+        """Run the missed-run check now, then again just after each local midnight."""
+        self._check_session_gaps(date.today().isoformat())
+        now = self._scheduler.clock.now()
+        tomorrow = datetime.fromtimestamp(now).date() + timedelta(days=1)
+        at = datetime.combine(tomorrow, datetime.min.time()).timestamp() + 1
+        self._scheduler.schedule("gap_check", at, self._daily_gap_check)
 
 
     # -----------------------------------------------------------------------
     # Persistence
     # -----------------------------------------------------------------------
 
-    def _save_sessions(self) -> None:
-        """Write all sessions to disk as JSON."""
+    def _save_sessions(self, *session_names: str) -> None:
+        """Persist sessions to the SQLite session store.
+
+        With names, only those sessions are written (a name no longer in
+        self.sessions is deleted), and within them only the session and
+        module-state rows whose content changed. With no names the store is
+        brought fully in line with self.sessions.
+        """
+        if self._store is None:
+            self.logger.error("Failed to save sessions: session store unavailable")
+            return
         try:
-            os.makedirs(os.path.dirname(SESSIONS_FILE), exist_ok=True)
-            data = {name: asdict(session) for name, session in self.sessions.items()}
-            with open(SESSIONS_FILE, "w") as f:
-                json.dump(data, f, indent=2)
+            if not session_names:
+                self._store.sync({name: asdict(s) for name, s in list(self.sessions.items())})
+                return
+            present = [self.sessions[n] for n in session_names if n in self.sessions]
+            gone = [n for n in session_names if n not in self.sessions]
+            if present:
+                self._store.save(asdict(s) for s in present)
+            if gone:
+                self._store.delete(gone)
         except Exception as e:
             self.logger.error(f"Failed to save sessions: {e}")
 
 
     def _load_sessions(self) -> None:
-        """Load sessions from disk on startup.
+        """Open the session store and load sessions on startup.
 
-        Sessions that were ACTIVE when the controller last stopped are marked ERROR
-        so the operator can see they need attention.
+        A legacy sessions.json is migrated into the store first. Sessions that
+        were ACTIVE when the controller last stopped are marked ERROR so the
+        operator can see they need attention.
         """
         share_err = self._check_share_writable()
         if share_err:
             self.logger.warning(f"Startup share check: {share_err}")
 
-        if not os.path.exists(SESSIONS_FILE):
-            return
         try:
-            with open(SESSIONS_FILE) as f:
-                data = json.load(f)
-            for name, d in data.items():
-                session = RecordingSession(**d)
-                if session.state == SessionState.ACTIVE:
-                    session.state = SessionState.ERROR
-                    session.error_time = datetime.now().strftime("%Y%m%d-%H%M%S")
-                    session.error_message = "Controller restarted during active session"
-                    session.module_stop_states = {m: "unknown" for m in session.modules}
-                    self._log_session_event(name, "FAULT",
-                        "Controller restarted during active session — awaiting module reconnect")
-                self.sessions[name] = session
-            self.logger.info(f"Loaded {len(self.sessions)} session(s) from disk")
+            self._store = SessionStore(os.path.splitext(SESSIONS_FILE)[0] + ".db")
+            self._store.migrate_json(SESSIONS_FILE)
+            data = self._store.load()
         except Exception as e:
             self.logger.error(f"Failed to load sessions: {e}")
+            return
+
+        recovered = []
+        for name, d in data.items():
+            try:
+                session = RecordingSession(**d)
+            except TypeError as e:
+                self.logger.error(f"Skipping unreadable session '{name}': {e}")
+                continue
+            if session.state == SessionState.ACTIVE:
+                session.state = SessionState.ERROR
+                session.error_time = datetime.now().strftime("%Y%m%d-%H%M%S")
+                session.error_message = "Controller restarted during active session"
+                session.module_stop_states = {m: "unknown" for m in session.modules}
+                self._log_session_event(name, "FAULT",
+                    "Controller restarted during active session — awaiting module reconnect")
+                recovered.append(name)
+            self.sessions[name] = session
+        if recovered:
+            self._save_sessions(*recovered)
+        self.logger.info(f"Loaded {len(self.sessions)} session(s) from disk")
 
 
     def _get_share_root(self) -> str:
@@ -1762,19 +1972,12 @@ class Recording:
         except AttributeError:
             return _SHARE_ROOT_DEFAULT
 
-    def _log_session_event(self, session_name: str, level: str, message: str) -> None:
-        """Append a timestamped event line to session_events.log on the NAS share.
+    def _log_session_event(self, session_name: str, level: str, message: str,
+                           module_id: str | None = None) -> None:
+        """Record a session event for session_events.log on the NAS share.
 
-        Silently swallows all errors — the log is best-effort and must never
-        affect session operation or propagate exceptions to the caller.
+        Hands the event to the journal (see session_journal.py), which spools
+        it locally and writes it to the share in the background, so this never
+        blocks on or raises from share I/O.
         """
-        log_path = os.path.join(self._get_share_root(), session_name, "session_events.log")
-        line = f"{datetime.now().strftime('%Y-%m-%dT%H:%M:%S')} [{level:<8}] {message}\n"
-        try:
-            session_dir = os.path.dirname(log_path)
-            os.makedirs(session_dir, exist_ok=True)
-            os.chmod(session_dir, 0o777)
-            with open(log_path, "a") as f:
-                f.write(line)
-        except Exception:
-            pass
+        self.journal.log(session_name, level, message, module_id=module_id)
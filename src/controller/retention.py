@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Controller Retention
+
+Keeps the export share from filling up by ageing files out under
+retention policies, rather than only alerting when it is nearly full.
+
+Files come from the file index (the share and NAS roots, see
+file_index.py) plus any extra target directories (e.g. tile_recordings'
+output) and are classed by name:
+    raw_video  - camera segments (VIDEO_SUFFIXES)
+    raw_audio  - microphone recordings
+    derived    - tiled, aligned and aggregated videos, NWB files, proxies
+                 and sprites, timelines, QC reports
+    metadata   - everything else (timestamps and event CSVs, logs,
+                 manifests), kept unless a policy says otherwise
+
+A policy matches sessions and targets by glob and gives each class a number
+of days to keep (None: forever) and what happens once that has passed:
+"delete", or "archive" (moved to cold storage, mirroring the target's
+layout). The first matching policy applies.
+
+retention.cold_storage_path must already exist and be either a mount point
+or a directory holding a COLD_STORAGE_MARKER file. If it isn't, e.g. the
+archive disk is not mounted and only the empty mount point is left,
+archive actions are held rather than copied onto the controller's own disk.
+
+Nothing on an export root is removed unless its export is verified:
+    - its session is on record at the controller as ended (stopped or
+      error), with no unresolved or failed exports (the same rule as
+      delete_session), or
+    - its session has no such record and the file is listed in an export
+      manifest in its directory (export.manifest_enabled on the module)
+      with the size it has on the share. Modules write the manifest
+      before copying, so a listing alone doesn't show the copy finished,
+      and it never overrides a session record's pending or failed exports
+Expired files that fail this are held, with the reason, in the plan.
+
+plan_retention() only computes; it is what the UI shows as the dry-run
+report. execute_plan() works through a plan oldest first within per-run
+file and byte caps, copying to cold storage at a limited rate, and skips
+any file that has changed since the plan was made.
+RetentionManager ties these to the config, the index and the session
+records and runs them periodically when retention.enabled is set.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import asdict, dataclass, field
+from fnmatch import fnmatch
+
+from src.controller.file_index import FileIndex
+from src.controller.session_timeline import VIDEO_SUFFIXES
+from src.controller.update_distribution import TransferLimiter
+
+FILE_CLASSES = ("raw_video", "raw_audio", "derived", "metadata")
+AUDIO_SUFFIXES = (".flac", ".wav")
+DERIVED_PATTERNS = (
+    "*_4x4.*", "*_aligned.mp4", "*_aggregated.mp4", "*.nwb",
+    "*.proxy.mp4", "*.sprite.jpg", "*.sprite.json",
+    ".session_timeline.npz", "sync_qc*",
+)
+MANIFEST_PATTERN = "export_manifest_*.txt"
+ACTIONS = ("delete", "archive")
+
+# Roots whose files are exports from modules, and so must be verified
+EXPORT_ROOTS = ("share", "nas")
+
+# Marks a cold storage directory that is not itself a mount point
+COLD_STORAGE_MARKER = ".saviour_cold_storage"
+
+COPY_CHUNK = 1 << 20
+DAY_S = 86400
+
+
+def classify(path: str) -> str:
+    name = os.path.basename(path)
+    if any(fnmatch(name, p) for p in DERIVED_PATTERNS):
+        return "derived"
+    if name.endswith(VIDEO_SUFFIXES):
+        return "raw_video"
+    if name.endswith(AUDIO_SUFFIXES):
+        return "raw_audio"
+    return "metadata"
+
+
+@dataclass
+class RetentionPolicy:
+    name: str
+    keep_days: dict[str, float | None] = field(default_factory=dict)   # class -> days
+    action: str = "delete"
+    sessions: str = "*"         # glob on the session name
+    target: str = "*"           # glob on the target (index root or extra target) name
+
+    def __post_init__(self):
+        if self.action not in ACTIONS:
+            raise ValueError(f"Retention policy '{self.name}': unknown action '{self.action}'")
+        unknown = set(self.keep_days) - set(FILE_CLASSES)
+        if unknown:
+            raise ValueError(f"Retention policy '{self.name}': unknown file class(es) {sorted(unknown)}")
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RetentionPolicy":
+        return cls(name=d.get("name", "policy"), keep_days=dict(d.get("keep_days", {})),
+                   action=d.get("action", "delete"), sessions=d.get("sessions", "*"),
+                   target=d.get("target", "*"))
+
+    def matches(self, target: str, session: str) -> bool:
+        return fnmatch(target, self.target) and fnmatch(session, self.sessions)
+
+
+DEFAULT_POLICIES = [
+    RetentionPolicy("default", {"raw_video": 30, "raw_audio": 30, "derived": 180}),
+]
+
+
+@dataclass
+class PlannedAction:
+    target: str
+    path: str                   # relative to the target
+    session: str
+    file_class: str
+    size: int
+    mtime: float
+    action: str                 # "delete", "archive" or "hold"
+    policy: str
+    reason: str
+
+
+@dataclass
+class RetentionPlan:
+    created_at: float
+    files_considered: int
+    actions: list[PlannedAction]        # due, oldest first
+    held: list[PlannedAction]           # due but not safe to touch
+
+    def summary(self) -> dict:
+        """Files and bytes per action, class, target and session."""
+        out = {"files_considered": self.files_considered, "by_action": {}, "by_class": {},
+               "by_target": {}, "by_session": {}}
+        for a in self.actions + self.held:
+            for key, group in (("by_action", a.action), ("by_class", a.file_class),
+                               ("by_target", a.target), ("by_session", a.session or "-")):
+                entry = out[key].setdefault(group, {"files": 0, "bytes": 0})
+                entry["files"] += 1
+                entry["bytes"] += a.size
+        return out
+
+    def to_dict(self, limit: int | None = 200) -> dict:
+        return {
+            "created_at": self.created_at,
+            "summary": self.summary(),
+            "actions": [asdict(a) for a in self.actions[:limit]],
+            "held": [asdict(a) for a in self.held[:limit]],
+        }
+
+
+# ---------------------------------------------------------------------------
+# Verification
+# ---------------------------------------------------------------------------
+
+def read_manifest(path: str) -> dict[str, float | None]:
+    """File names listed in an export_manifest_*.txt ("- name" lines), with
+    the size in MB given on the "  Size: N MB" line under each (None if
+    there is none)."""
+    listed: dict[str, float | None] = {}
+    name = None
+    with open(path, errors="replace") as f:
+        for line in f:
+            if line.startswith("- "):
+                name = line[2:].strip()
+                listed[name] = None
+            elif name is not None and line.strip().startswith("Size:"):
+                try:
+                    listed[name] = float(line.split()[1])
+                except (IndexError, ValueError):
+                    pass
+    return listed
+
+
+def manifest_size_matches(listed_mb: float | None, size: int) -> bool:
+    """Whether a file of size bytes is the one a manifest listed at listed_mb
+    (written to two decimal places)."""
+    return listed_mb is not None and abs(size / (1024 * 1024) - listed_mb) <= 0.005 + 1e-9
+
+
+def session_unverified(session: dict | None) -> str | None:
+    """Why an ended session's exports can't be trusted yet, or None if they
+    can. session is None for a session that is not on record as ended."""
+    if session is None:
+        return "session not ended or not on record, and file not listed at its size in an export manifest"
+    if session.get("pending_exports", 0) > 0:
+        return f"{session['pending_exports']} export(s) unresolved"
+    if session.get("total_exports_failed", 0) > 0:
+        return f"{session['total_exports_failed']} export(s) failed"
+    states = session.get("module_export_states") or {}
+    bad = sorted(m for m, s in states.items() if s in ("pending", "failed"))
+    if bad:
+        return f"exports {'/'.join(states[m] for m in bad)} for {', '.join(bad)}"
+    return None
+
+
+def cold_storage_unavailable(path: str | None) -> str | None:
+    """Why archives can't be moved to path, or None if they can."""
+    if not path:
+        return "no cold storage configured"
+    if not os.path.isdir(path):
+        return f"cold storage {path} does not exist"
+    if not (os.path.ismount(path) or os.path.isfile(os.path.join(path, COLD_STORAGE_MARKER))):
+        return f"cold storage {path} is not a mount point and has no {COLD_STORAGE_MARKER}"
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Planning
+# ---------------------------------------------------------------------------
+
+def scan_tree(base: str) -> list[dict]:
+    """File rows, as FileIndex.files() returns them, for a directory the
+    index doesn't cover."""
+    rows = []
+    for dirpath, _, filenames in os.walk(base):
+        for name in filenames:
+            full = os.path.join(dirpath, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            rel = os.path.relpath(full, base).replace(os.sep, "/")
+            parts = rel.split("/")
+            rows.append({"path": rel, "session": parts[0] if len(parts) > 1 else "",
+                         "module": parts[2] if len(parts) >= 4 else "",
+                         "size": st.st_size, "mtime": st.st_mtime})
+    return rows
+
+
+def plan_retention(files: dict[str, Iterable[dict]], policies: list[RetentionPolicy],
+                   sessions: dict[str, dict],
+                   manifests: dict[tuple[str, str], dict[str, float | None]],
+                   now: float | None = None,
+                   cold_storage_error: str | None = None) -> RetentionPlan:
+    """What retention would do now.
+
+    files maps target name to its file rows (path, session, size, mtime);
+    manifests maps (target, directory) to the file names its export
+    manifests list and their listed sizes (see read_manifest()); sessions are the records of the controller's ended
+    (stopped or error) sessions as dicts.
+    Archive actions are held, with cold_storage_error as the reason, if it is
+    set (see cold_storage_unavailable()).
+    """
+    now = time.time() if now is None else now
+    actions, held, considered = [], [], 0
+    for target, rows in files.items():
+        for row in rows:
+            path = row["path"]
+            name = os.path.basename(path)
+            if name.startswith("PENDING_"):
+                continue
+            considered += 1
+            session = row.get("session") or ""
+            policy = next((p for p in policies if p.matches(target, session)), None)
+            if policy is None:
+                continue
+            file_class = classify(path)
+            days = policy.keep_days.get(file_class)
+            if days is None:
+                continue
+            age_days = (now - row["mtime"]) / DAY_S
+            if age_days < days:
+                continue
+
+            reason = f"{file_class} older than {days:g} days ({age_days:.0f})"
+            blocker = None
+            if target in EXPORT_ROOTS:
+                record = sessions.get(session)
+                blocker = session_unverified(record)
+                listed = manifests.get((target, os.path.dirname(path)), {})
+                if record is None and name in listed and manifest_size_matches(listed[name], int(row["size"])):
+                    blocker = None
+            if blocker is None and policy.action == "archive" and cold_storage_error:
+                blocker = cold_storage_error
+            entry = PlannedAction(target, path, session, file_class, int(row["size"]),
+                                  float(row["mtime"]), policy.action if blocker is None else "hold",
+                                  policy.name, reason if blocker is None else f"{reason}; held: {blocker}")
+            (actions if blocker is None else held).append(entry)
+    actions.sort(key=lambda a: a.mtime)
+    held.sort(key=lambda a: a.mtime)
+    return RetentionPlan(now, considered, actions, held)
+
+
+# ---------------------------------------------------------------------------
+# Execution
+# ---------------------------------------------------------------------------
+
+def _archive(src: str, dest: str, limiter: TransferLimiter | None) -> None:
+    """Copy src to dest (via a PENDING_ name, fsynced and size-checked),
+    then remove src."""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = os.path.join(os.path.dirname(dest), f"PENDING_{os.path.basename(dest)}")
+    try:
+        with open(src, "rb") as fin, open(tmp, "wb") as fout:
+            while chunk := fin.read(COPY_CHUNK):
+                if limiter is not None:
+                    limiter.throttle(len(chunk))
+                fout.write(chunk)
+            fout.flush()
+            os.fsync(fout.fileno())
+        if os.path.getsize(tmp) != os.path.getsize(src):
+            raise OSError(f"size mismatch copying {src}")
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.remove(src)
+
+
+def execute_plan(plan: RetentionPlan, roots: dict[str, str], cold_root: str | None = None,
+                 max_files: int | None = None, max_bytes: int | None = None,
+                 limiter: TransferLimiter | None = None,
+                 stop: threading.Event | None = None) -> dict:
+    """Carry out a plan's actions, oldest first, until a cap is reached.
+
+    roots maps target name to its directory. A file whose size or mtime no
+    longer match the plan (re-exported, or already gone) is skipped, as are
+    archive actions once cold_root is found unavailable (it is checked
+    before each copy, in case the archive disk goes away mid-run).
+    Returns counts, bytes freed, errors, the directories touched (for
+    reindexing) and how many actions were left for a later run.
+    """
+    result = {"deleted": 0, "archived": 0, "skipped": 0, "bytes": 0,
+              "errors": [], "remaining": 0, "touched": []}
+    touched = set()
+    archive_blocked = False
+    for n, a in enumerate(plan.actions):
+        done = result["deleted"] + result["archived"]
+        if ((stop is not None and stop.is_set())
+                or (max_files is not None and done >= max_files)
+                or (max_bytes is not None and result["bytes"] + a.size > max_bytes and done)):
+            result["remaining"] = len(plan.actions) - n
+            break
+        base = roots.get(a.target)
+        src = os.path.join(base, a.path) if base else None
+        try:
+            st = os.stat(src) if src else None
+        except OSError:
+            st = None
+        if st is None or st.st_size != a.size or abs(st.st_mtime - a.mtime) > 1e-3:
+            result["skipped"] += 1
+            continue
+        if a.action == "archive" and not archive_blocked:
+            blocker = cold_storage_unavailable(cold_root)
+            if blocker is not None:
+                result["errors"].append(f"archiving stopped: {blocker}")
+                archive_blocked = True
+        if a.action == "archive" and archive_blocked:
+            result["skipped"] += 1
+            continue
+        try:
+            if a.action == "archive":
+                _archive(src, os.path.join(cold_root, a.target, a.path), limiter)
+                result["archived"] += 1
+            else:
+                os.remove(src)
+                result["deleted"] += 1
+        except OSError as e:
+            result["errors"].append(f"{a.target}:{a.path}: {e}")
+            continue
+        result["bytes"] += a.size
+        touched.add((a.target, os.path.dirname(a.path)))
+    result["touched"] = sorted(touched)
+    return result
+
+
+class RetentionManager:
+    """Builds plans from the file index and session records, and applies
+    them on a timer when retention.enabled is set."""
+
+    def __init__(self, config, file_index: Callable[[], FileIndex],
+                 roots: dict[str, Callable[[], str]],
+                 sessions: Callable[[], dict[str, dict]]):
+        """
+        Args:
+            config: Controller config (retention.* keys)
+            file_index: Returns the FileIndex; its roots are planned from the index
+            roots: Directory of every indexed root, resolved when used
+            sessions: The controller's ended session records, as dicts
+        """
+        self.logger = logging.getLogger(__name__)
+        self.config = config
+        self.file_index = file_index
+        self.roots = roots
+        self.sessions = sessions
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.last_run: dict | None = None
+
+
+    def policies(self) -> list[RetentionPolicy]:
+        configured = self.config.get("retention.policies", None)
+        if not configured:
+            return list(DEFAULT_POLICIES)
+        return [RetentionPolicy.from_dict(p) for p in configured]
+
+
+    def _targets(self) -> dict[str, str]:
+        """Every target's directory: index roots plus retention.targets."""
+        targets = {name: path() for name, path in self.roots.items()}
+        targets.update(self.config.get("retention.targets", {}) or {})
+        return targets
+
+
+    def plan(self, now: float | None = None) -> RetentionPlan:
+        index = self.file_index()
+        files, manifests = {}, {}
+        for target, base in self._targets().items():
+            if not os.path.isdir(base):
+                continue
+            if target in self.roots:
+                rows = index.files(target)
+            else:
+                rows = scan_tree(base)
+            files[target] = rows
+            for row in rows:
+                if fnmatch(os.path.basename(row["path"]), MANIFEST_PATTERN):
+                    try:
+                        names = read_manifest(os.path.join(base, row["path"]))
+                    except OSError:
+                        continue
+                    manifests.setdefault((target, os.path.dirname(row["path"])), {}).update(names)
+        cold = self.config.get("retention.cold_storage_path", "")
+        return plan_retention(files, self.policies(), self.sessions(), manifests, now,
+                              cold_storage_error=cold_storage_unavailable(cold))
+
+
+    def run_once(self, dry_run: bool = False) -> dict:
+        """Plan and (unless dry_run) execute; returns the plan report with
+        the outcome under "result"."""
+        with self._lock:
+            plan = self.plan()
+            report = plan.to_dict()
+            report["dry_run"] = dry_run
+            if dry_run:
+                return report
+            cold = self.config.get("retention.cold_storage_path", "") or None
+            max_gb = self.config.get("retention.max_gb_per_run", None)
+            rate = int(float(self.config.get("retention.archive_rate_mbps", 0) or 0) * 125_000)
+            result = execute_plan(
+                plan, self._targets(), cold,
+                max_files=self.config.get("retention.max_files_per_run", None),
+                max_bytes=int(max_gb * 1_073_741_824) if max_gb else None,
+                limiter=TransferLimiter(1, rate) if rate else None,
+                stop=self._stop,
+            )
+            index = self.file_index()
+            for target, rel_dir in result["touched"]:
+                if target in self.roots:
+                    index.refresh_later(target, rel_dir)
+            self.logger.info(
+                f"Retention: deleted {result['deleted']}, archived {result['archived']} "
+                f"({result['bytes'] / 1_073_741_824:.1f} GiB), {result['remaining']} left, "
+                f"{len(plan.held)} held, {len(result['errors'])} error(s)"
+            )
+            for error in result["errors"][:10]:
+                self.logger.warning(f"Retention: {error}")
+            report["result"] = result
+            self.last_run = {"at": time.time(), **result}
+            return report
+
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="retention")
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+    def _run(self) -> None:
+        while not self._stop.wait(float(self.config.get("retention.interval_s", 3600))):
+            if not self.config.get("retention.enabled", False):
+                continue
+            try:
+                self.run_once()
+            except Exception as e:
+                self.logger.error(f"Retention run failed: {e}")
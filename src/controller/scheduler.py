@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Controller Deadline Scheduler
+
+Heap-based timer scheduler used by the recording manager for session
+lifecycle deadlines (scheduled start/stop, readiness verification, timed
+stop, health and PTP checks, module re-probes).
+
+Timers are keyed. Scheduling a key that is already pending replaces its
+deadline, so callers can simply re-arm whatever a session needs after each
+state change. Keys are usually tuples whose first element is a group (the
+session name), and callbacks in the same group never run concurrently;
+cancel_group() drops all of a session's timers at once. Periodic timers are
+re-armed from their previous deadline, not from when the callback finished,
+so they do not drift; missed periods are skipped rather than run in a burst.
+
+A dispatcher thread sleeps until the earliest deadline and hands due
+callbacks to a small worker pool. With workers=0 callbacks run inline in
+run_due(), and with a FakeClock, advance() fast-forwards through any number
+of deadlines deterministically — the tests step through days of schedules
+this way.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections.abc import Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SystemClock:
+    """Wall-clock time source (epoch seconds)."""
+
+    def now(self) -> float:
+        return time.time()
+
+
+class FakeClock:
+    """Manually advanced time source for tests."""
+
+    def __init__(self, start: float = 0.0):
+        self._now = float(start)
+
+    def now(self) -> float:
+        return self._now
+
+    def set(self, t: float) -> None:
+        self._now = float(t)
+
+    def advance(self, seconds: float) -> None:
+        self._now += seconds
+
+
+class _Timer:
+    __slots__ = ("args", "callback", "deadline", "interval", "seq")
+
+    def __init__(self, deadline, seq, callback, args, interval):
+        self.deadline = deadline
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+
+
+def _group(key: Hashable) -> Hashable:
+    return key[0] if isinstance(key, tuple) and key else key
+
+
+class DeadlineScheduler:
+
+    # Longest the dispatcher sleeps at once, so wall-clock steps (phc2sys,
+    # NTP at boot) are noticed within a second
+    MAX_SLEEP_S = 1.0
+
+    def __init__(self, clock=None, workers: int = 2, name: str = "scheduler"):
+        """
+        Args:
+            clock: Object with now() -> epoch seconds (SystemClock by default)
+            workers: Worker threads for callbacks; 0 runs them inline in run_due()
+            name: Thread name prefix
+        """
+        self.logger = logging.getLogger(__name__)
+        self.clock = clock or SystemClock()
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._timers: dict[Hashable, _Timer] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._group_locks: dict[Hashable, threading.Lock] = {}
+        self._running = False
+        self._pool = (
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-worker")
+            if workers > 0 else None
+        )
+        self._thread = threading.Thread(target=self._run, daemon=True, name=name)
+
+        self.fired = 0
+        self.errors = 0
+        self.max_lateness_s = 0.0
+
+
+    # -----------------------------------------------------------------------
+    # Timer management
+    # -----------------------------------------------------------------------
+
+    def schedule(self, key: Hashable, deadline: float, callback: Callable, *args,
+                 interval: float | None = None) -> None:
+        """Run callback(*args) at deadline (epoch seconds), replacing any pending timer for key.
+
+        With interval, the timer repeats every interval seconds until cancelled.
+        """
+        with self._cond:
+            seq = next(self._seq)
+            self._timers[key] = _Timer(deadline, seq, callback, args, interval)
+            heapq.heappush(self._heap, (deadline, seq, key))
+            self._cond.notify()
+
+
+    def ensure(self, key: Hashable, deadline: float, callback: Callable, *args,
+               interval: float | None = None) -> bool:
+        """Like schedule(), but leave an already-pending timer for key alone."""
+        with self._cond:
+            if key in self._timers:
+                return False
+            self.schedule(key, deadline, callback, *args, interval=interval)
+            return True
+
+
+    def cancel(self, key: Hashable) -> None:
+        with self._cond:
+            self._timers.pop(key, None)
+
+
+    def cancel_group(self, group: Hashable) -> None:
+        """Cancel every timer whose key belongs to group."""
+        with self._cond:
+            for key in [k for k in self._timers if _group(k) == group]:
+                del self._timers[key]
+
+
+    def deadline(self, key: Hashable) -> float | None:
+        with self._cond:
+            timer = self._timers.get(key)
+            return timer.deadline if timer else None
+
+
+    def keys(self) -> list:
+        with self._cond:
+            return list(self._timers)
+
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._timers),
+                "fired": self.fired,
+                "errors": self.errors,
+                "max_lateness_ms": round(self.max_lateness_s * 1000, 1),
+            }
+
+
+    # -----------------------------------------------------------------------
+    # Dispatch
+    # -----------------------------------------------------------------------
+
+    def _peek_locked(self) -> float | None:
+        """Earliest live deadline, discarding heap entries for replaced/cancelled timers."""
+        while self._heap:
+            deadline, seq, key = self._heap[0]
+            timer = self._timers.get(key)
+            if timer is not None and timer.seq == seq:
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+
+    def run_due(self) -> int:
+        """Dispatch every timer whose deadline has passed; returns how many fired."""
+        due = []
+        with self._cond:
+            now = self.clock.now()
+            while True:
+                deadline = self._peek_locked()
+                if deadline is None or deadline > now:
+                    break
+                _, _, key = heapq.heappop(self._heap)
+                timer = self._timers[key]
+                if timer.interval:
+                    nxt = timer.deadline + timer.interval
+                    if nxt <= now:
+                        nxt += ((now - nxt) // timer.interval + 1) * timer.interval
+                    self.schedule(key, nxt, timer.callback, *timer.args, interval=timer.interval)
+                else:
+                    del self._timers[key]
+                self.max_lateness_s = max(self.max_lateness_s, now - deadline)
+                self.fired += 1
+                due.append((key, timer.callback, timer.args))
+
+        for key, callback, args in due:
+            if self._pool is not None:
+                self._pool.submit(self._invoke, key, callback, args)
+            else:
+                self._invoke(key, callback, args)
+        return len(due)
+
+
+    def _invoke(self, key: Hashable, callback: Callable, args: tuple) -> None:
+        group = _group(key)
+        with self._cond:
+            lock = self._group_locks.setdefault(group, threading.Lock())
+        with lock:
+            try:
+                callback(*args)
+            except Exception as e:
+                self.errors += 1
+                self.logger.error(f"Timer {key!r} failed: {e}", exc_info=True)
+
+
+    def advance(self, seconds: float) -> int:
+        """Fake-clock fast-forward: step the clock through each deadline up to now + seconds.
+
+        Only meaningful with a FakeClock and workers=0. Returns timers fired.
+        """
+        target = self.clock.now() + seconds
+        fired = 0
+        while True:
+            with self._cond:
+                deadline = self._peek_locked()
+            if deadline is None or deadline > target:
+                break
+            self.clock.set(max(deadline, self.clock.now()))
+            fired += self.run_due()
+        self.clock.set(target)
+        return fired
+
+
+    def start(self) -> "DeadlineScheduler":
+        self._running = True
+        self._thread.start()
+        return self
+
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join(2.0)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+
+    def _run(self) -> None:
+        while self._running:
+            with self._cond:
+                deadline = self._peek_locked()
+                wait = self.MAX_SLEEP_S if deadline is None else deadline - self.clock.now()
+                if wait > 0:
+                    self._cond.wait(min(wait, self.MAX_SLEEP_S))
+            if self._running:
+                self.run_due()
@@ -0,0 +1,270 @@
+"""
+Controller Self Metrics
+
+Samples the controller host and process on a fixed interval in one
+background thread, so the web layer answers health requests from a cached
+snapshot instead of reading /proc (and sleeping between CPU samples) per
+request.
+
+Each sample holds whole-machine and per-core CPU, memory, disk, CPU
+temperature, per-interface network throughput, and CPU used by each of the
+controller's own named threads (ZMQ listener, health monitor, session
+timers, web server, ...). A rolling window of samples is kept for the
+dashboard's sparklines.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def read_cpu_times(proc_root: str = "/proc") -> dict[str, tuple[int, int]]:
+    """{"cpu": (idle, total), "cpu0": ..., ...} from /proc/stat. Idle
+    includes iowait so a core stalled on the SD card doesn't read as busy."""
+    times = {}
+    with open(os.path.join(proc_root, "stat")) as f:
+        for line in f:
+            if not line.startswith("cpu"):
+                break
+            fields = line.split()
+            vals = [int(v) for v in fields[1:]]
+            idle = vals[3] + (vals[4] if len(vals) > 4 else 0)
+            times[fields[0]] = (idle, sum(vals))
+    return times
+
+
+def read_meminfo(proc_root: str = "/proc") -> dict[str, int]:
+    """/proc/meminfo values in kB."""
+    info = {}
+    with open(os.path.join(proc_root, "meminfo")) as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            parts = rest.split()
+            if parts:
+                info[key] = int(parts[0])
+    return info
+
+
+def read_net_dev(proc_root: str = "/proc") -> dict[str, tuple[int, int]]:
+    """{iface: (rx_bytes, tx_bytes)} from /proc/net/dev, loopback excluded."""
+    counters = {}
+    with open(os.path.join(proc_root, "net", "dev")) as f:
+        for line in f.readlines()[2:]:
+            iface, _, rest = line.partition(":")
+            iface = iface.strip()
+            fields = rest.split()
+            if iface == "lo" or len(fields) < 9:
+                continue
+            counters[iface] = (int(fields[0]), int(fields[8]))
+    return counters
+
+
+def read_thread_ticks(tids: dict[int, str], proc_root: str = "/proc") -> dict[str, int]:
+    """utime+stime clock ticks per thread name, for the given native ids.
+    Threads sharing a name are summed; threads that have exited are skipped."""
+    ticks: dict[str, int] = {}
+    for tid, name in tids.items():
+        try:
+            with open(os.path.join(proc_root, "self", "task", str(tid), "stat")) as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # comm (field 2) may contain spaces; everything after its ")" is fixed
+        fields = stat[stat.rindex(")") + 2:].split()
+        ticks[name] = ticks.get(name, 0) + int(fields[11]) + int(fields[12])
+    return ticks
+
+
+def _python_threads() -> dict[int, str]:
+    return {t.native_id: t.name for t in threading.enumerate() if t.native_id is not None}
+
+
+def _pct(busy: float, total: float) -> float | None:
+    return round(100.0 * busy / total, 1) if total > 0 else None
+
+
+class SelfMetrics:
+    """Background sampler with a cached latest snapshot and rolling window."""
+
+    def __init__(self, interval_s: float = 2.0, window: int = 150,
+                 disk_path: str = "/var/lib/saviour", proc_root: str = "/proc",
+                 thermal_path: str = "/sys/class/thermal/thermal_zone0/temp",
+                 thread_source: Callable[[], dict[int, str]] = _python_threads,
+                 on_sample: Callable[[dict], None] | None = None):
+        self.logger = logging.getLogger(__name__)
+        self.interval_s = interval_s
+        self.disk_path = disk_path
+        self.proc_root = proc_root
+        self.thermal_path = thermal_path
+        self.thread_source = thread_source
+        self.on_sample = on_sample
+        self._history: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._prev: dict | None = None
+        self._latest: dict | None = None
+        self._stop = threading.Event()
+        self._thread = None
+
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="self-metrics")
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                sample = self.sample()
+                if self.on_sample:
+                    self.on_sample(sample)
+            except Exception as e:
+                self.logger.error(f"Controller metrics sample failed: {e}")
+            self._stop.wait(self.interval_s)
+
+
+    # ------------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------------
+
+    def _raw(self, now: float) -> dict:
+        raw = {"mono": now, "cpu": {}, "net": {}, "threads": {}, "process": None}
+        for key, reader in (("cpu", read_cpu_times), ("net", read_net_dev)):
+            try:
+                raw[key] = reader(self.proc_root)
+            except (OSError, ValueError, IndexError):
+                pass
+        try:
+            raw["threads"] = read_thread_ticks(self.thread_source(), self.proc_root)
+        except Exception:
+            pass
+        try:
+            with open(os.path.join(self.proc_root, "self", "stat")) as f:
+                stat = f.read()
+            fields = stat[stat.rindex(")") + 2:].split()
+            raw["process"] = int(fields[11]) + int(fields[12])
+        except (OSError, ValueError, IndexError):
+            pass
+        return raw
+
+
+    def sample(self, now: float | None = None) -> dict:
+        """Take one sample, append it to the window and return it. Rates
+        (CPU, network, thread CPU) need a previous sample and are None on
+        the first."""
+        now = time.monotonic() if now is None else now
+        raw = self._raw(now)
+        prev = self._prev
+        dt = now - prev["mono"] if prev else 0.0
+
+        snap = {"timestamp": time.time(), "cpu_usage": None, "cpu_per_core": [],
+                "process_cpu": None, "threads": {}, "net": {}}
+        if prev and dt > 0:
+            cores = []
+            for key, (idle, total) in raw["cpu"].items():
+                p_idle, p_total = prev["cpu"].get(key, (idle, total))
+                d_total = total - p_total
+                usage = _pct(d_total - (idle - p_idle), d_total)
+                if key == "cpu":
+                    snap["cpu_usage"] = usage
+                else:
+                    cores.append(usage)
+            snap["cpu_per_core"] = cores
+            for iface, (rx, tx) in raw["net"].items():
+                if iface in prev["net"]:
+                    p_rx, p_tx = prev["net"][iface]
+                    snap["net"][iface] = {
+                        "rx_bps": max(0, round((rx - p_rx) / dt)),
+                        "tx_bps": max(0, round((tx - p_tx) / dt)),
+                    }
+            ticks_per_interval = _CLK_TCK * dt
+            for name, ticks in raw["threads"].items():
+                if name in prev["threads"]:
+                    snap["threads"][name] = _pct(max(0, ticks - prev["threads"][name]), ticks_per_interval)
+            if raw["process"] is not None and prev["process"] is not None:
+                snap["process_cpu"] = _pct(raw["process"] - prev["process"], ticks_per_interval)
+
+        snap.update(self._memory())
+        snap.update(self._disk())
+        snap["cpu_temp"] = self._temperature()
+
+        with self._lock:
+            self._prev = raw
+            self._latest = snap
+            self._history.append(snap)
+        return snap
+
+
+    def _memory(self) -> dict:
+        try:
+            info = read_meminfo(self.proc_root)
+            total = info.get("MemTotal", 0)
+            available = info.get("MemAvailable", 0)
+            return {
+                "memory_usage": round((total - available) / total * 100, 1) if total else None,
+                "memory_total_gb": round(total / (1024 ** 2), 1) if total else None,  # kB → GB
+            }
+        except (OSError, ValueError):
+            return {"memory_usage": None, "memory_total_gb": None}
+
+
+    def _disk(self) -> dict:
+        for path in (self.disk_path, "/"):
+            try:
+                usage = shutil.disk_usage(path)
+            except OSError:
+                continue
+            return {
+                "disk_used_pct": round(usage.used / usage.total * 100, 1),
+                "disk_free_gb": round(usage.free / (1024 ** 3), 1),
+                "disk_used_gb": round(usage.used / (1024 ** 3), 1),
+                "disk_total_gb": round(usage.total / (1024 ** 3), 1),
+            }
+        return {"disk_used_pct": None, "disk_free_gb": None, "disk_used_gb": None, "disk_total_gb": None}
+
+
+    def _temperature(self) -> float | None:
+        try:
+            with open(self.thermal_path) as f:
+                return round(int(f.read().strip()) / 1000, 1)
+        except (OSError, ValueError):
+            return None
+
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        """The latest sample (a copy). Samples once on demand if the
+        background thread hasn't produced one yet."""
+        with self._lock:
+            latest = self._latest
+        if latest is None:
+            latest = self.sample()
+        return dict(latest)
+
+
+    def history(self, keys: tuple = ("timestamp", "cpu_usage", "memory_usage", "process_cpu")) -> list[dict]:
+        """The rolling window, trimmed to keys."""
+        with self._lock:
+            return [{k: s.get(k) for k in keys} for s in self._history]
+
+
+def diff(old: dict | None, new: dict) -> dict:
+    """Top-level keys of new whose values differ from old."""
+    if not old:
+        return dict(new)
+    return {k: v for k, v in new.items() if k not in old or old[k] != v}
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Controller Session Event Journal
+
+Asynchronous writer for each session's session_events.log on the NAS share.
+
+Events used to be appended to the share synchronously by the caller (makedirs,
+chmod, open, write, close per line) and were silently dropped if the share was
+slow or unmounted, which is exactly when the log matters most. Here:
+
+    log()      - builds a record and puts it on a bounded queue; never blocks.
+                 If the queue is full the event is counted as dropped.
+    spool      - a thread drains the queue in batches and appends each record
+                 as a JSON line to a per-session spool file on local disk
+                 (one write + fsync per batch).
+    flush      - a second thread copies unflushed spool bytes to the share
+                 with one open per file per batch, writing both the human-
+                 readable session_events.log and the structured
+                 session_events.jsonl. A per-session offset file records how
+                 far the share has been written.
+
+While the share is unavailable, events keep accumulating in the spool. The
+flusher retries every retry_interval seconds and, when the share comes back,
+replays the spool from the stored offset, so ordering is preserved. Spools
+left from a previous run are replayed at startup. If the controller dies
+between a share write and the offset update, that batch is written again:
+delivery is at-least-once.
+
+Spool layout (spool_dir):
+    <session>.jsonl      structured records not yet compacted away
+    <session>.offset     bytes of <session>.jsonl already on the share
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime
+
+TEXT_LOG = "session_events.log"
+JSON_LOG = "session_events.jsonl"
+
+
+def format_event_line(record: dict) -> str:
+    """Render a journal record in the session_events.log text format."""
+    stamp = datetime.fromtimestamp(record["ts"]).strftime("%Y-%m-%dT%H:%M:%S")
+    return f"{stamp} [{record['level']:<8}] {record['message']}\n"
+
+
+class SessionJournal:
+
+    def __init__(self, spool_dir: str, share_root: Callable[[], str],
+                 max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, retry_interval: float = 30.0):
+        """
+        Args:
+            spool_dir: Local directory for spool and offset files
+            share_root: Returns the share root at flush time (the mount path can change)
+            max_queue: Events held in memory before log() starts dropping
+            batch_size: Most events spooled per write
+            flush_interval: Longest delay between spooling and flushing to the share
+            retry_interval: Wait after a share error before trying again
+        """
+        self.logger = logging.getLogger(__name__)
+        self.spool_dir = spool_dir
+        self._share_root = share_root
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._file_locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._dirty: set[str] = set()
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        self._spool_stopped = False     # the stop sentinel has been dequeued
+        self._share_ok = True
+        self._retry_at = 0.0
+        self._ready_dirs: set[str] = set()
+
+        self.dropped = 0
+        self.spooled = 0
+        self.flushed = 0
+        self.share_errors = 0
+        self.last_error: str | None = None
+
+        os.makedirs(spool_dir, exist_ok=True)
+        for fn in os.listdir(spool_dir):
+            if fn.endswith(".jsonl"):
+                self._dirty.add(fn[:-len(".jsonl")])
+
+        self._spool_thread = threading.Thread(
+            target=self._spool_loop, daemon=True, name="journal-spool"
+        )
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop, daemon=True, name="journal-flush"
+        )
+
+
+    def start(self) -> "SessionJournal":
+        self._running = True
+        self._spool_thread.start()
+        self._flush_thread.start()
+        return self
+
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Spool everything queued and make one last attempt to reach the share.
+
+        The spool thread ends when it reaches the stop sentinel, draining
+        the queue as it goes; queuing the sentinel gives up after timeout
+        rather than blocking on a full queue. Without a spool thread the
+        queue is drained from here.
+        """
+        if self._spool_thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+                self._spool_thread.join(timeout)
+            except queue.Full:
+                self.logger.warning("Session journal spool thread is not draining its queue at stop")
+        if not self._spool_thread.is_alive():
+            while self.spool_pending():
+                pass
+        self._running = False
+        self._wake.set()
+        if self._flush_thread.is_alive():
+            self._flush_thread.join(timeout)
+
+
+    # -----------------------------------------------------------------------
+    # Producer side
+    # -----------------------------------------------------------------------
+
+    def log(self, session_name: str, level: str, message: str,
+            module_id: str | None = None) -> bool:
+        """Queue an event; returns False if it had to be dropped."""
+        record = {
+            "ts": time.time(),
+            "session": session_name,
+            "level": level,
+            "module": module_id,
+            "message": message,
+        }
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                self.logger.warning(f"Session journal queue full — {self.dropped} event(s) dropped")
+            return False
+
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "spooled": self.spooled,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "pending_sessions": len(self._dirty),
+            "share_ok": self._share_ok,
+            "share_errors": self.share_errors,
+            "last_error": self.last_error,
+        }
+
+
+    # -----------------------------------------------------------------------
+    # Spool
+    # -----------------------------------------------------------------------
+
+    def _lock_for(self, session_name: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._file_locks.setdefault(session_name, threading.Lock())
+
+
+    def _spool_path(self, session_name: str) -> str:
+        return os.path.join(self.spool_dir, f"{session_name}.jsonl")
+
+
+    def _offset_path(self, session_name: str) -> str:
+        return os.path.join(self.spool_dir, f"{session_name}.offset")
+
+
+    def spool_pending(self, block: float | None = None) -> int:
+        """Move queued events into the spool; returns how many were spooled.
+
+        With block, waits up to that long for the first event.
+        """
+        batch = []
+        stop = False
+        try:
+            item = self._queue.get(timeout=block) if block else self._queue.get_nowait()
+            while True:
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                item = self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        if batch:
+            self._append_to_spool(batch)
+        if stop:
+            self._spool_stopped = True
+        return len(batch)
+
+
+    def _append_to_spool(self, batch: list[dict]) -> None:
+        by_session: dict[str, list[str]] = {}
+        for record in batch:
+            by_session.setdefault(record["session"], []).append(json.dumps(record) + "\n")
+        for session_name, lines in by_session.items():
+            try:
+                with self._lock_for(session_name):
+                    with open(self._spool_path(session_name), "a") as f:
+                        f.write("".join(lines))
+                        f.flush()
+                        os.fsync(f.fileno())
+                self.spooled += len(lines)
+                with self._dirty_lock:
+                    self._dirty.add(session_name)
+            except OSError as e:
+                self.dropped += len(lines)
+                self.logger.error(f"Could not spool {len(lines)} event(s) for '{session_name}': {e}")
+        self._wake.set()
+
+
+    def _spool_loop(self) -> None:
+        while not self._spool_stopped:
+            try:
+                self.spool_pending(block=0.5)
+            except Exception as e:
+                self.logger.error(f"Session journal spool error: {e}")
+                time.sleep(1)
+        # Anything logged while stopping
+        while self.spool_pending():
+            pass
+
+
+    # -----------------------------------------------------------------------
+    # Flush to share
+    # -----------------------------------------------------------------------
+
+    def _read_offset(self, session_name: str) -> int:
+        try:
+            with open(self._offset_path(session_name)) as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+
+    def _write_offset(self, session_name: str, offset: int) -> None:
+        path = self._offset_path(session_name)
+        with open(path + ".tmp", "w") as f:
+            f.write(str(offset))
+        os.replace(path + ".tmp", path)
+
+
+    def _flush_session(self, session_name: str) -> int:
+        """Copy unflushed spool records for one session to the share. Raises OSError."""
+        spool = self._spool_path(session_name)
+        offset = self._read_offset(session_name)
+        with self._lock_for(session_name):
+            try:
+                with open(spool, "rb") as f:
+                    f.seek(offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return 0
+        data = data[:data.rfind(b"\n") + 1]   # complete lines only
+        if not data:
+            return 0
+
+        records = []
+        for raw in data.splitlines():
+            try:
+                records.append(json.loads(raw))
+            except ValueError:
+                self.logger.warning(f"Skipping corrupt journal line for '{session_name}'")
+        session_dir = os.path.join(self._share_root(), session_name)
+        if session_dir not in self._ready_dirs:
+            os.makedirs(session_dir, exist_ok=True)
+            os.chmod(session_dir, 0o777)
+            self._ready_dirs.add(session_dir)
+        with open(os.path.join(session_dir, TEXT_LOG), "a") as f:
+            f.write("".join(format_event_line(r) for r in records))
+        with open(os.path.join(session_dir, JSON_LOG), "a") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records))
+
+        offset += len(data)
+        with self._lock_for(session_name):
+            if os.path.getsize(spool) == offset:
+                # Everything is on the share: compact the spool away
+                os.remove(spool)
+                try:
+                    os.remove(self._offset_path(session_name))
+                except FileNotFoundError:
+                    pass
+            else:
+                self._write_offset(session_name, offset)
+        return len(records)
+
+
+    def flush_pending(self, force: bool = False) -> int:
+        """Flush every session with unflushed spool data; returns records written.
+
+        Skipped until the retry interval has passed after a share error,
+        unless force is set.
+        """
+        if not force and time.monotonic() < self._retry_at:
+            return 0
+        with self._dirty_lock:
+            pending = sorted(self._dirty)
+        written = 0
+        for session_name in pending:
+            try:
+                written += self._flush_session(session_name)
+            except OSError as e:
+                self.share_errors += 1
+                self.last_error = str(e)
+                self._retry_at = time.monotonic() + self.retry_interval
+                self._ready_dirs.clear()
+                if self._share_ok:
+                    self.logger.warning(
+                        f"Session journal cannot reach the share ({e}) — "
+                        f"spooling locally, retrying every {self.retry_interval:.0f}s"
+                    )
+                self._share_ok = False
+                break
+            with self._dirty_lock:
+                if not os.path.exists(self._spool_path(session_name)):
+                    self._dirty.discard(session_name)
+        else:
+            if not self._share_ok:
+                self.logger.info(f"Session journal share recovered — replayed {written} event(s)")
+            self._share_ok = True
+        self.flushed += written
+        return written
+
+
+    def _flush_loop(self) -> None:
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush_pending()
+            except Exception as e:
+                self.logger.error(f"Session journal flush error: {e}")
+        self._spool_thread.join(self.flush_interval * 5)
+        try:
+            self.flush_pending(force=True)
+        except Exception as e:
+            self.logger.error(f"Session journal final flush error: {e}")
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Controller Session Store
+
+SQLite-backed persistence for RecordingSession records.
+
+Sessions used to be saved by rewriting the whole sessions.json file on every
+state change, so the cost of a single export acknowledgement grew with the
+entire session history and a crash mid-write could truncate the file. Here
+each session is one row in `sessions` (indexed by state / scheduled flag and
+end time) and each module's stop/export state is one row in `module_states`,
+so an update writes only the rows that actually changed, inside a single
+transaction. The database runs in WAL mode, so readers never block the
+writer and a crash leaves the last committed state intact.
+
+The store works on plain dicts (dataclasses.asdict of a RecordingSession) so
+it has no dependency on recording.py. An existing sessions.json is imported
+once by migrate_json() and renamed to sessions.json.migrated.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_name TEXT PRIMARY KEY,
+    state        TEXT NOT NULL,
+    scheduled    INTEGER NOT NULL DEFAULT 0,
+    start_time   TEXT,
+    end_time     TEXT,
+    updated_at   REAL NOT NULL,
+    data         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_state ON sessions (state, scheduled);
+CREATE INDEX IF NOT EXISTS sessions_by_end_time ON sessions (end_time);
+CREATE TABLE IF NOT EXISTS module_states (
+    session_name TEXT NOT NULL REFERENCES sessions (session_name) ON DELETE CASCADE,
+    module_id    TEXT NOT NULL,
+    stop_state   TEXT,
+    export_state TEXT,
+    PRIMARY KEY (session_name, module_id)
+) WITHOUT ROWID;
+"""
+
+# Per-module dicts stored as module_states rows rather than in the data column
+_MODULE_FIELDS = ("module_stop_states", "module_export_states")
+
+# States in which a session has finished and will not run again
+ENDED_STATES = ("stopped", "error")
+
+
+class SessionStore:
+
+    def __init__(self, path: str):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self._lock = threading.Lock()
+        # session_name -> (data JSON, {module_id: (stop_state, export_state)}) as last written
+        self._written: dict[str, tuple[str, dict]] = {}
+        self.rows_written = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+    # -----------------------------------------------------------------------
+    # Writes
+    # -----------------------------------------------------------------------
+
+    @staticmethod
+    def _split(session: dict) -> tuple[str, dict]:
+        """Split a session dict into its data JSON and per-module rows."""
+        data = {k: v for k, v in session.items() if k not in _MODULE_FIELDS}
+        stop = session.get("module_stop_states") or {}
+        export = session.get("module_export_states") or {}
+        modules = {m: (stop.get(m), export.get(m)) for m in (*stop, *export)}
+        return json.dumps(data, sort_keys=True), modules
+
+
+    def _upsert_locked(self, session: dict) -> None:
+        name = session["session_name"]
+        data_json, modules = self._split(session)
+        old_json, old_modules = self._written.get(name, (None, {}))
+
+        if data_json != old_json:
+            self._conn.execute(
+                "INSERT INTO sessions (session_name, state, scheduled, start_time, end_time, updated_at, data)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (session_name) DO UPDATE SET"
+                " state = excluded.state, scheduled = excluded.scheduled,"
+                " start_time = excluded.start_time, end_time = excluded.end_time,"
+                " updated_at = excluded.updated_at, data = excluded.data",
+                (name, str(session.get("state")), int(bool(session.get("scheduled"))),
+                 session.get("start_time"), session.get("end_time"), time.time(), data_json),
+            )
+            self.rows_written += 1
+
+        changed = [(name, m, s, e) for m, (s, e) in modules.items() if old_modules.get(m) != (s, e)]
+        if changed:
+            self._conn.executemany(
+                "INSERT INTO module_states (session_name, module_id, stop_state, export_state)"
+                " VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (session_name, module_id) DO UPDATE SET"
+                " stop_state = excluded.stop_state, export_state = excluded.export_state",
+                changed,
+            )
+            self.rows_written += len(changed)
+
+        removed = [(name, m) for m in old_modules if m not in modules]
+        if removed:
+            self._conn.executemany(
+                "DELETE FROM module_states WHERE session_name = ? AND module_id = ?", removed
+            )
+            self.rows_written += len(removed)
+
+        self._written[name] = (data_json, modules)
+
+
+    def _delete_locked(self, names: Iterable[str]) -> None:
+        for name in names:
+            self._conn.execute("DELETE FROM sessions WHERE session_name = ?", (name,))
+            self._written.pop(name, None)
+            self.rows_written += 1
+
+
+    def save(self, sessions: Iterable[dict]) -> None:
+        """Upsert the given sessions in one transaction, writing only changed rows."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for session in sessions:
+                    self._upsert_locked(session)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._written.clear()  # cache may no longer match the database
+                raise
+
+
+    def delete(self, names: Iterable[str]) -> None:
+        """Remove sessions (and their module rows) in one transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_locked(names)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._written.clear()
+                raise
+
+
+    def sync(self, sessions: dict[str, dict]) -> None:
+        """Make the store match *sessions* exactly: upsert all, delete the rest."""
+        with self._lock:
+            stored = {row[0] for row in self._conn.execute("SELECT session_name FROM sessions")}
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_locked(stored - sessions.keys())
+                for session in sessions.values():
+                    self._upsert_locked(session)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._written.clear()
+                raise
+
+
+    # -----------------------------------------------------------------------
+    # Reads
+    # -----------------------------------------------------------------------
+
+    def load(self) -> dict[str, dict]:
+        """Return {session_name: session dict} for every stored session."""
+        with self._lock:
+            sessions = {}
+            for name, data_json in self._conn.execute("SELECT session_name, data FROM sessions"):
+                session = json.loads(data_json)
+                session["module_stop_states"] = {}
+                session["module_export_states"] = {}
+                sessions[name] = session
+            rows = self._conn.execute(
+                "SELECT session_name, module_id, stop_state, export_state FROM module_states"
+            ).fetchall()
+            modules: dict[str, dict] = {}
+            for name, module_id, stop_state, export_state in rows:
+                session = sessions.get(name)
+                if session is None:
+                    continue
+                if stop_state is not None:
+                    session["module_stop_states"][module_id] = stop_state
+                if export_state is not None:
+                    session["module_export_states"][module_id] = export_state
+                modules.setdefault(name, {})[module_id] = (stop_state, export_state)
+            for name, session in sessions.items():
+                data = {k: v for k, v in session.items() if k not in _MODULE_FIELDS}
+                self._written[name] = (json.dumps(data, sort_keys=True), modules.get(name, {}))
+            return sessions
+
+
+    def names(self, states: Iterable[str] | None = None, scheduled: bool | None = None) -> list[str]:
+        """Session names filtered by state and/or scheduled flag, oldest start first."""
+        clauses, params = [], []
+        if states is not None:
+            states = [str(s) for s in states]
+            clauses.append(f"state IN ({', '.join('?' * len(states))})")
+            params.extend(states)
+        if scheduled is not None:
+            clauses.append("scheduled = ?")
+            params.append(int(scheduled))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT session_name FROM sessions{where} ORDER BY start_time, session_name", params
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+    def ended_before(self, end_time: str) -> list[str]:
+        """Non-scheduled ended sessions whose end_time (YYYYMMDD-HHMMSS) is before end_time."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_name FROM sessions"
+                f" WHERE end_time < ? AND scheduled = 0 AND state IN ({', '.join('?' * len(ENDED_STATES))})"
+                " ORDER BY end_time",
+                (end_time, *ENDED_STATES),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+    # -----------------------------------------------------------------------
+    # Migration
+    # -----------------------------------------------------------------------
+
+    def migrate_json(self, json_path: str) -> int:
+        """Import a legacy sessions.json once, then rename it to *.migrated.
+
+        Sessions already in the store win over the JSON copy (a previous
+        migration may have committed but crashed before the rename). Returns
+        the number of sessions imported.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        with open(json_path) as f:
+            data = json.load(f)
+        with self._lock:
+            existing = {row[0] for row in self._conn.execute("SELECT session_name FROM sessions")}
+        new = [d for name, d in data.items() if name not in existing]
+        self.save(new)
+        os.replace(json_path, json_path + ".migrated")
+        self.logger.info(f"Migrated {len(new)} session(s) from {json_path} to {self.path}")
+        return len(new)
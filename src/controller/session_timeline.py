@@ -0,0 +1,673 @@
+#!/usr/bin/env python3
+"""
+Controller Session Timeline
+
+One index of every timed stream in an exported session, so analysis tools
+stop re-parsing each module's sidecar format and re-deriving alignment.
+
+A session is indexed into per-stream columnar arrays on the shared PTP clock
+(epoch ns, int64):
+    video  - camera *_timestamps.csv: a timestamp per frame across all
+             segments, with the offset of each segment's first frame
+    audio  - microphone .flac + _timestamps.txt: per segment the fitted
+             ANCHOR (sample index, epoch) pairs, sample count and rate
+    events - TTL edges (*_events.csv), APA shocks (*_shock_events.csv),
+             sound events (*_sound_events_*.csv): a timestamp per event with
+             the same (key, code, value) columns as modules' binary event
+             logs, code indexing the stream's labels
+
+and queried with binary searches on those arrays:
+    frame_at / frames_nearest  - frame of camera X nearest time t (vectorised)
+    audio_range                - sample ranges of mic X covering [t0, t1)
+    events                     - every event of every stream in [t0, t1)
+
+The index is saved next to the session as .session_timeline.npz, with each
+source file's size and mtime, and load_or_index() re-parses only streams
+whose files have changed since.
+
+Usage:
+    python3 src/controller/session_timeline.py /path/to/share/SESSION
+    python3 src/controller/session_timeline.py /path/to/share/SESSION --at 12.5 --window 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+
+TIMELINE_NAME = ".session_timeline.npz"
+TIMELINE_VERSION = 2
+
+VIDEO_SUFFIXES = (".ts", ".mp4", ".h264", ".mkv")
+
+
+def nearest_indices(ts: np.ndarray, ticks: np.ndarray, gap_factor: float | None = None) -> np.ndarray:
+    """Index of the timestamp in sorted ts nearest each tick (the later one
+    on a tie), -1 where that is more than gap_factor median intervals away."""
+    last = len(ts) - 1
+    after = np.searchsorted(ts, ticks, side="left").clip(0, last)
+    before = (after - 1).clip(0, last)
+    take_after = np.abs(ts[after] - ticks) <= np.abs(ts[before] - ticks)
+    idx = np.where(take_after, after, before).astype(np.int32)
+    if gap_factor is not None and len(ts) > 1:
+        interval = np.median(np.diff(ts))
+        idx[np.abs(ts[idx] - ticks) > gap_factor * interval] = -1
+    return idx
+
+
+# ---------------------------------------------------------------------------
+# Query results
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Frame:
+    camera: str
+    file: str           # video file, relative to the session directory
+    index: int          # frame index within that file
+    timestamp_ns: int
+
+
+@dataclass
+class AudioSpan:
+    mic: str
+    file: str           # audio file, relative to the session directory
+    start: int          # first sample
+    stop: int           # one past the last sample
+    start_ns: int       # time of the first sample
+
+
+@dataclass
+class Event:
+    timestamp_ns: int
+    stream: str
+    label: str
+    key: int
+    value: float
+
+
+# ---------------------------------------------------------------------------
+# Stream indexes
+# ---------------------------------------------------------------------------
+
+@dataclass
+class VideoIndex:
+    """Frame timestamps of one camera across its segments.
+
+    timestamps holds every segment's frames end to end; segment_starts[i]
+    is the position of segment i's first frame in it.
+    """
+
+    name: str
+    files: list[str]                # video file per segment ("" if missing)
+    csvs: list[str]                 # timestamp CSV per segment
+    timestamps: np.ndarray          # int64 epoch ns
+    segment_starts: np.ndarray      # int64
+    dropped_before: np.ndarray      # int32, frames dropped before each frame
+    kind: str = field(default="video", init=False)
+
+    ARRAYS = ("timestamps", "segment_starts", "dropped_before")
+
+    def segment(self, i: int) -> np.ndarray:
+        end = self.segment_starts[i + 1] if i + 1 < len(self.segment_starts) else len(self.timestamps)
+        return self.timestamps[self.segment_starts[i]:end]
+
+    def locate(self, idx: int) -> tuple[int, int]:
+        """(segment, frame within segment) of a position in timestamps."""
+        seg = int(np.searchsorted(self.segment_starts, idx, side="right")) - 1
+        return seg, int(idx - self.segment_starts[seg])
+
+    def nearest(self, t_ns, gap_factor: float | None = None) -> np.ndarray:
+        return nearest_indices(self.timestamps, np.asarray(t_ns, dtype=np.int64), gap_factor)
+
+    def between(self, t0_ns: int, t1_ns: int) -> slice:
+        """Positions of the frames captured in [t0_ns, t1_ns)."""
+        return slice(int(np.searchsorted(self.timestamps, t0_ns, side="left")),
+                     int(np.searchsorted(self.timestamps, t1_ns, side="left")))
+
+
+@dataclass
+class AudioIndex:
+    """Sample clock of one microphone across its segments.
+
+    Segment i's anchors are anchor_sample/anchor_ns[anchor_starts[i]:
+    anchor_starts[i + 1]]; between anchors sample times are interpolated,
+    outside them extrapolated at the segment's rate.
+    """
+
+    name: str
+    files: list[str]
+    samples: np.ndarray             # int64 sample count per segment
+    rates: np.ndarray               # float64 Hz per segment
+    anchor_starts: np.ndarray       # int64, len(files) + 1
+    anchor_sample: np.ndarray       # int64, file sample index
+    anchor_ns: np.ndarray           # int64 epoch ns
+    kind: str = field(default="audio", init=False)
+
+    ARRAYS = ("samples", "rates", "anchor_starts", "anchor_sample", "anchor_ns")
+
+    def _anchors(self, seg: int) -> tuple[np.ndarray, np.ndarray]:
+        a, b = self.anchor_starts[seg], self.anchor_starts[seg + 1]
+        return self.anchor_sample[a:b], self.anchor_ns[a:b]
+
+    def time_of(self, seg: int, sample: int) -> int:
+        samples, times = self._anchors(seg)
+        j = max(int(np.searchsorted(samples, sample, side="right")) - 1, 0)
+        return int(times[j] + (sample - samples[j]) * 1e9 / self.rates[seg])
+
+    def sample_at(self, seg: int, t_ns: int) -> int:
+        samples, times = self._anchors(seg)
+        j = max(int(np.searchsorted(times, t_ns, side="right")) - 1, 0)
+        return int(samples[j] + math.floor((t_ns - times[j]) * self.rates[seg] / 1e9))
+
+    @cached_property
+    def segment_start_ns(self) -> np.ndarray:
+        return np.array([self.time_of(i, 0) for i in range(len(self.files))], dtype=np.int64)
+
+    @cached_property
+    def segment_end_ns(self) -> np.ndarray:
+        return np.array([self.time_of(i, int(n)) for i, n in enumerate(self.samples)], dtype=np.int64)
+
+
+@dataclass
+class EventIndex:
+    """Timestamped events of one module, sorted by time.
+
+    Columns follow modules' binary event logs (src/modules/event_log.py):
+    key is the TTL pin (0 for single-channel streams), code indexes labels
+    and value is the numeric field of the row (rpm, volume), NaN if none.
+    """
+
+    name: str
+    files: list[str]
+    labels: list[str]
+    timestamps: np.ndarray          # int64 epoch ns
+    key: np.ndarray                 # int32
+    code: np.ndarray                # int32
+    value: np.ndarray               # float64
+    key_labels: dict[str, str] = field(default_factory=dict)    # TTL pin -> description
+    key_modes: dict[str, str] = field(default_factory=dict)     # TTL pin -> configured mode
+    kind: str = field(default="events", init=False)
+
+    ARRAYS = ("timestamps", "key", "code", "value")
+
+    def between(self, t0_ns: int, t1_ns: int) -> slice:
+        return slice(int(np.searchsorted(self.timestamps, t0_ns, side="left")),
+                     int(np.searchsorted(self.timestamps, t1_ns, side="left")))
+
+
+STREAM_TYPES = {"video": VideoIndex, "audio": AudioIndex, "events": EventIndex}
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+def _segment_index(name: str) -> int:
+    m = re.search(r'_\((\d+)_', name)
+    return int(m.group(1)) if m else 0
+
+
+def _by_segment(names) -> list[str]:
+    return sorted(names, key=lambda p: (_segment_index(os.path.basename(p)), p))
+
+
+def _data_lines(f):
+    return (line for line in f if line.strip() and not line.startswith("#"))
+
+
+def read_frame_csv(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """(timestamp_ns int64, dropped_before int32) columns of a camera
+    *_timestamps.csv; rows without a timestamp are skipped."""
+    with open(path, newline="") as f:
+        header = [c.strip() for c in next(csv.reader(f), [])]
+        if "timestamp_ns" not in header:
+            raise ValueError(f"{path} has no timestamp_ns column")
+        ts_col = header.index("timestamp_ns")
+        drop_col = header.index("dropped_before") if "dropped_before" in header else None
+        ts, dropped = [], []
+        for row in csv.reader(f):
+            try:
+                t = int(row[ts_col])
+            except (IndexError, ValueError):
+                continue
+            ts.append(t)
+            try:
+                dropped.append(int(row[drop_col]) if drop_col is not None else 0)
+            except (IndexError, ValueError):
+                dropped.append(0)
+    return np.array(ts, dtype=np.int64), np.array(dropped, dtype=np.int32)
+
+
+def read_audio_sidecar(path: str, nominal_rate: float | None = None) -> dict:
+    """Sample clock from a microphone _timestamps.txt.
+
+    Returns {"anchors": [(sample, epoch_ns), ...], "rate": Hz, "samples": n
+    or None}. Sidecars from before the ANCHOR lines (one epoch per block)
+    give a single anchor at sample 0 from STARTED or the first block time.
+    """
+    anchors, started, first_block, samples = [], None, None, None
+    rate = sample_rate = None
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            try:
+                if parts[0] == "ANCHOR":
+                    anchors.append((int(parts[1]), round(float(parts[2]) * 1e9)))
+                elif parts[0] == "RATE_ESTIMATE":
+                    rate = float(parts[1])
+                elif parts[0] == "SAMPLE_RATE":
+                    sample_rate = float(parts[1])
+                elif parts[0] == "SAMPLES":
+                    samples = int(parts[1])
+                elif parts[0] == "STARTED":
+                    started = float(parts[1])
+                elif first_block is None and len(parts) == 1:
+                    first_block = float(parts[0])
+            except (IndexError, ValueError):
+                continue
+    if not anchors:
+        start = started if started is not None else first_block
+        if start is not None:
+            anchors = [(0, round(start * 1e9))]
+    return {"anchors": sorted(anchors), "rate": rate or sample_rate or nominal_rate,
+            "samples": samples}
+
+
+def _audio_frames(path: str) -> int | None:
+    try:
+        import soundfile
+    except ImportError:
+        return None
+    try:
+        return soundfile.info(path).frames
+    except RuntimeError:
+        return None
+
+
+def _event_csv_kind(header: list[str]) -> str | None:
+    """'ttl', 'shock', 'sound' or 'events' for an event CSV header whose
+    first column is an epoch-ns timestamp, else None."""
+    if not header:
+        return None
+    first = header[0].lower()
+    if not first.startswith("timestamp") or not ("nanosecond" in first or "(ns)" in first):
+        return None
+    rest = [c.lower() for c in header[1:]]
+    if rest[:1] == ["pin_number"]:
+        return "ttl"
+    if rest[:1] == ["event"]:
+        return "shock"
+    if rest[:1] == ["sound played"]:
+        return "sound"
+    return "events"
+
+
+def _read_header(path: str) -> list[str]:
+    with open(path, newline="") as f:
+        return [c.strip() for c in next(csv.reader(_data_lines(f)), [])]
+
+
+def read_event_csvs(paths: list[str]) -> dict:
+    """Columns of one module's event CSVs, merged and sorted by time."""
+    labels: dict[str, int] = {}
+    key_labels: dict[str, str] = {}
+    key_modes: dict[str, str] = {}
+    ts, keys, codes, values = [], [], [], []
+    for path in paths:
+        with open(path, newline="") as f:
+            reader = csv.reader(_data_lines(f), skipinitialspace=True)
+            header = [c.strip() for c in next(reader, [])]
+            kind = _event_csv_kind(header)
+            for row in reader:
+                try:
+                    t = int(row[0])
+                except (IndexError, ValueError):
+                    continue
+                key, value = 0, math.nan
+                if kind == "ttl":
+                    # Timestamp, pin_number, pin_mode, pin_state, pin_description
+                    try:
+                        key = int(row[1])
+                    except (IndexError, ValueError):
+                        continue
+                    label = row[3].strip() if len(row) > 3 else ""
+                    if len(row) > 2:
+                        key_modes.setdefault(str(key), row[2].strip())
+                    if len(row) > 4:
+                        key_labels.setdefault(str(key), row[4].strip())
+                else:
+                    label = row[1].strip() if len(row) > 1 else ""
+                    try:
+                        value = float(row[2])
+                    except (IndexError, ValueError):
+                        pass
+                ts.append(t)
+                keys.append(key)
+                codes.append(labels.setdefault(label, len(labels)))
+                values.append(value)
+    order = np.argsort(np.array(ts, dtype=np.int64), kind="stable")
+    return {
+        "labels": list(labels), "key_labels": key_labels, "key_modes": key_modes,
+        "timestamps": np.array(ts, dtype=np.int64)[order],
+        "key": np.array(keys, dtype=np.int32)[order],
+        "code": np.array(codes, dtype=np.int32)[order],
+        "value": np.array(values, dtype=np.float64)[order],
+    }
+
+
+def discover_streams(session_dir: str) -> dict[str, tuple[str, list[str]]]:
+    """{stream: (kind, [source files relative to session_dir])} for every
+    indexable stream under the session's {date}/{module} directories.
+
+    A stream is named after its module; a module with more than one kind of
+    stream (a camera that also logs events) has the others named
+    "{module}.{kind}". A module recording across midnight has segments in
+    two date directories; they are merged into one stream."""
+    found: dict[str, dict[str, list[str]]] = {}
+    for date in sorted(os.listdir(session_dir)):
+        date_dir = os.path.join(session_dir, date)
+        if not (re.fullmatch(r"\d{8}", date) and os.path.isdir(date_dir)):
+            continue
+        for module in sorted(os.listdir(date_dir)):
+            module_dir = os.path.join(date_dir, module)
+            if not os.path.isdir(module_dir):
+                continue
+            kinds = found.setdefault(module, {})
+            for name in sorted(os.listdir(module_dir)):
+                rel = os.path.join(date, module, name)
+                if name.startswith("PENDING_"):
+                    continue
+                if name.endswith("_timestamps.csv"):
+                    kinds.setdefault("video", []).append(rel)
+                elif name.endswith(".flac") or name.endswith(".wav"):
+                    kinds.setdefault("audio", []).append(rel)
+                elif (name.endswith(".csv") and "_health_metadata_" not in name
+                      and _event_csv_kind(_read_header(os.path.join(session_dir, rel)))):
+                    kinds.setdefault("events", []).append(rel)
+
+    streams = {}
+    for module, kinds in found.items():
+        for kind in ("video", "audio", "events"):
+            if kinds.get(kind):
+                name = f"{module}.{kind}" if module in streams else module
+                streams[name] = (kind, _by_segment(kinds[kind]))
+    return streams
+
+
+def _sources(session_dir: str, kind: str, files: list[str]) -> dict[str, list[int]]:
+    """Every file a stream is built from, with its (size, mtime_ns)."""
+    paths = list(files)
+    if kind == "audio":
+        paths += [os.path.splitext(f)[0] + "_timestamps.txt" for f in files]
+    out = {}
+    for rel in paths:
+        try:
+            st = os.stat(os.path.join(session_dir, rel))
+        except OSError:
+            continue
+        out[rel] = [st.st_size, st.st_mtime_ns]
+    return out
+
+
+def build_stream(session_dir: str, name: str, kind: str, files: list[str]):
+    """Parse one stream's source files into its index."""
+    full = [os.path.join(session_dir, f) for f in files]
+    if kind == "video":
+        parts = [read_frame_csv(p) for p in full]
+        videos = []
+        for f in files:
+            stem = f[:-len("_timestamps.csv")]
+            videos.append(next((stem + s for s in VIDEO_SUFFIXES
+                                if os.path.exists(os.path.join(session_dir, stem + s))), ""))
+        counts = np.array([len(ts) for ts, _ in parts], dtype=np.int64)
+        return VideoIndex(
+            name=name, files=videos, csvs=list(files),
+            timestamps=np.concatenate([ts for ts, _ in parts]) if parts else np.zeros(0, np.int64),
+            segment_starts=np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64),
+            dropped_before=np.concatenate([d for _, d in parts]) if parts else np.zeros(0, np.int32),
+        )
+    if kind == "audio":
+        kept, samples, rates, starts, anchor_sample, anchor_ns = [], [], [], [0], [], []
+        for rel, path in zip(files, full, strict=True):
+            sidecar = os.path.splitext(path)[0] + "_timestamps.txt"
+            if not os.path.exists(sidecar):
+                continue
+            clock = read_audio_sidecar(sidecar)
+            n = clock["samples"]
+            if n is None:
+                n = _audio_frames(path)
+            if not clock["anchors"] or not clock["rate"] or n is None:
+                continue
+            kept.append(rel)
+            samples.append(n)
+            rates.append(clock["rate"])
+            anchor_sample += [s for s, _ in clock["anchors"]]
+            anchor_ns += [t for _, t in clock["anchors"]]
+            starts.append(len(anchor_sample))
+        return AudioIndex(
+            name=name, files=kept, samples=np.array(samples, dtype=np.int64),
+            rates=np.array(rates, dtype=np.float64), anchor_starts=np.array(starts, dtype=np.int64),
+            anchor_sample=np.array(anchor_sample, dtype=np.int64),
+            anchor_ns=np.array(anchor_ns, dtype=np.int64),
+        )
+    if kind == "events":
+        return EventIndex(name=name, files=list(files), **read_event_csvs(full))
+    raise ValueError(f"Unknown stream kind {kind!r}")
+
+
+# ---------------------------------------------------------------------------
+# Timeline
+# ---------------------------------------------------------------------------
+
+class SessionTimeline:
+    """Every indexed stream of one session, by module name."""
+
+    def __init__(self, session_dir: str, streams: dict | None = None,
+                 sources: dict[str, dict] | None = None):
+        self.session_dir = session_dir
+        self.streams: dict = streams or {}
+        self.sources: dict[str, dict] = sources or {}
+
+    def _of_kind(self, kind: str) -> dict:
+        return {n: s for n, s in self.streams.items() if s.kind == kind}
+
+    @property
+    def video(self) -> dict[str, VideoIndex]:
+        return self._of_kind("video")
+
+    @property
+    def audio(self) -> dict[str, AudioIndex]:
+        return self._of_kind("audio")
+
+    @property
+    def event_streams(self) -> dict[str, EventIndex]:
+        return self._of_kind("events")
+
+    # --- Queries ---
+
+    def frames_nearest(self, camera: str, t_ns, gap_factor: float | None = None) -> np.ndarray:
+        """Positions in video[camera].timestamps nearest each time (-1 in a gap)."""
+        return self.video[camera].nearest(t_ns, gap_factor)
+
+    def frame_at(self, camera: str, t_ns: int, gap_factor: float | None = None) -> Frame | None:
+        """The frame of camera nearest t_ns, or None if it has none there."""
+        video = self.video[camera]
+        if not len(video.timestamps):
+            return None
+        idx = int(video.nearest([t_ns], gap_factor)[0])
+        if idx < 0:
+            return None
+        seg, local = video.locate(idx)
+        return Frame(camera, video.files[seg], local, int(video.timestamps[idx]))
+
+    def audio_range(self, mic: str, t0_ns: int, t1_ns: int) -> list[AudioSpan]:
+        """Sample ranges of mic covering [t0_ns, t1_ns), one per segment it spans."""
+        audio = self.audio[mic]
+        starts, ends = audio.segment_start_ns, audio.segment_end_ns
+        first = int(np.searchsorted(ends, t0_ns, side="right"))
+        last = int(np.searchsorted(starts, t1_ns, side="left"))
+        spans = []
+        for seg in range(first, last):
+            n = int(audio.samples[seg])
+            a = min(max(audio.sample_at(seg, t0_ns), 0), n)
+            b = min(max(audio.sample_at(seg, t1_ns), 0), n)
+            if b > a:
+                spans.append(AudioSpan(mic, audio.files[seg], a, b, audio.time_of(seg, a)))
+        return spans
+
+    def events(self, t0_ns: int, t1_ns: int, streams: list[str] | None = None) -> list[Event]:
+        """Events of the given (default all) event streams in [t0_ns, t1_ns), by time."""
+        out = []
+        for name, index in self.event_streams.items():
+            if streams is not None and name not in streams:
+                continue
+            window = index.between(t0_ns, t1_ns)
+            for t, k, c, v in zip(index.timestamps[window], index.key[window],
+                                  index.code[window], index.value[window], strict=True):
+                out.append(Event(int(t), name, index.labels[c], int(k), float(v)))
+        out.sort(key=lambda e: e.timestamp_ns)
+        return out
+
+    def span_ns(self) -> tuple[int, int] | None:
+        """(first, last) timestamp of anything in the session."""
+        bounds = []
+        for s in self.streams.values():
+            if s.kind == "audio" and len(s.files):
+                bounds += [int(s.segment_start_ns.min()), int(s.segment_end_ns.max())]
+            elif s.kind != "audio" and len(s.timestamps):
+                bounds += [int(s.timestamps[0]), int(s.timestamps[-1])]
+        return (min(bounds), max(bounds)) if bounds else None
+
+    # --- Storage ---
+
+    def save(self, path: str | None = None) -> str:
+        path = path or os.path.join(self.session_dir, TIMELINE_NAME)
+        arrays, meta = {}, {"version": TIMELINE_VERSION, "streams": []}
+        for name, s in self.streams.items():
+            entry = {"name": name, "kind": s.kind, "files": s.files, "sources": self.sources.get(name, {})}
+            if s.kind == "video":
+                entry["csvs"] = s.csvs
+            if s.kind == "events":
+                entry["labels"], entry["key_labels"] = s.labels, s.key_labels
+                entry["key_modes"] = s.key_modes
+            meta["streams"].append(entry)
+            for col in s.ARRAYS:
+                arrays[f"{name}/{col}"] = getattr(s, col)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, session_dir: str, path: str | None = None) -> SessionTimeline:
+        path = path or os.path.join(session_dir, TIMELINE_NAME)
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != TIMELINE_VERSION:
+                raise ValueError(f"{path} is timeline version {meta.get('version')}, "
+                                 f"expected {TIMELINE_VERSION}")
+            streams, sources = {}, {}
+            for entry in meta["streams"]:
+                name, stream_type = entry["name"], STREAM_TYPES[entry["kind"]]
+                kwargs = {col: data[f"{name}/{col}"] for col in stream_type.ARRAYS}
+                for extra in ("csvs", "labels", "key_labels", "key_modes"):
+                    if extra in entry:
+                        kwargs[extra] = entry[extra]
+                streams[name] = stream_type(name=name, files=entry["files"], **kwargs)
+                sources[name] = entry["sources"]
+        return cls(session_dir, streams, sources)
+
+
+def index_session(session_dir: str, previous: SessionTimeline | None = None) -> SessionTimeline:
+    """Index every stream of a session, reusing streams from previous whose
+    source files are unchanged."""
+    timeline = SessionTimeline(session_dir)
+    for name, (kind, files) in discover_streams(session_dir).items():
+        sources = _sources(session_dir, kind, files)
+        old = previous.streams.get(name) if previous else None
+        if old is not None and old.kind == kind and previous.sources.get(name) == sources:
+            timeline.streams[name] = old
+        else:
+            timeline.streams[name] = build_stream(session_dir, name, kind, files)
+        timeline.sources[name] = sources
+    return timeline
+
+
+def load_or_index(session_dir: str, path: str | None = None, save: bool = True) -> SessionTimeline:
+    """The session's saved timeline, brought up to date with its files.
+
+    Only streams whose source files were added, removed or modified since
+    the timeline was saved are parsed again. A read-only share is fine: the
+    index is still returned if it can't be saved.
+    """
+    path = path or os.path.join(session_dir, TIMELINE_NAME)
+    previous = None
+    if os.path.exists(path):
+        try:
+            previous = SessionTimeline.load(session_dir, path)
+        except (OSError, ValueError, KeyError):
+            previous = None  # unreadable or old format — rebuild it
+    timeline = index_session(session_dir, previous)
+    unchanged = previous is not None and previous.sources == timeline.sources
+    if save and not unchanged:
+        try:
+            timeline.save(path)
+        except OSError:
+            pass
+    return timeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("session_dir", help="Exported session directory")
+    parser.add_argument("--at", type=float, default=None,
+                        help="Show what every stream has at this many seconds into the session")
+    parser.add_argument("--window", type=float, default=1.0,
+                        help="Seconds of audio and events to show around --at (default: 1)")
+    parser.add_argument("--no-save", action="store_true", help="Don't write the index file")
+    args = parser.parse_args()
+
+    timeline = load_or_index(args.session_dir, save=not args.no_save)
+    span = timeline.span_ns()
+    if span is None:
+        raise SystemExit(f"Nothing to index under {args.session_dir}")
+    print(f"{args.session_dir}: {(span[1] - span[0]) / 1e9:.1f} s")
+    for name, s in timeline.streams.items():
+        if s.kind == "video":
+            detail = f"{len(s.timestamps)} frames in {len(s.files)} segments, {int(s.dropped_before.sum())} dropped"
+        elif s.kind == "audio":
+            detail = f"{int(s.samples.sum())} samples in {len(s.files)} segments"
+        else:
+            detail = f"{len(s.timestamps)} events ({', '.join(s.labels)})"
+        print(f"  {s.kind:6s}  {name:28s}  {detail}")
+
+    if args.at is not None:
+        t = span[0] + int(args.at * 1e9)
+        half = int(args.window * 1e9 / 2)
+        print(f"\nAt +{args.at:.3f} s:")
+        for camera in timeline.video:
+            frame = timeline.frame_at(camera, t)
+            if frame:
+                print(f"  {camera}: frame {frame.index} of {frame.file} "
+                      f"({(frame.timestamp_ns - t) / 1e6:+.2f} ms)")
+        for mic in timeline.audio:
+            for a in timeline.audio_range(mic, t - half, t + half):
+                print(f"  {mic}: samples {a.start}-{a.stop} of {a.file}")
+        for e in timeline.events(t - half, t + half):
+            print(f"  {e.stream}: {e.label} key={e.key} at {(e.timestamp_ns - t) / 1e6:+.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Controller Sync QC
+
+Checks after a session that cameras, microphones and TTL inputs agree in
+time with the TTL experiment clock (TTLModule's experiment_clock pins).
+Each modality's view of the clock is detected independently:
+    ttl    - the clock pin's active edges are the reference; any other TTL
+             input pin that records a clock of the same period is checked
+             against it directly
+    video  - mean brightness in a region of interest (a sync LED in view)
+             per frame; an onset is the first lit frame, placed half way
+             back to the last dark one
+    audio  - amplitude onsets (a click driven by the clock), the first
+             sample over half way from the noise floor to the peak
+
+Every detected onset is matched to the nearest reference onset (within half
+a clock period) and module time minus clock time is fitted as offset +
+drift; what is left is the residual. Drift is only kept if it stands out
+from the module's timing resolution (a camera can't place an onset better
+than a frame, and over a short session that quantisation can look like
+drift), otherwise offset alone is fitted. A module passes if its offset and p95
+residual are within tolerance (one frame for cameras, AUDIO_TOLERANCE_MS
+for audio, TTL_TOLERANCE_MS for TTL), its drift within MAX_DRIFT_PPM, and
+it saw at least MIN_MATCHED of the clock onsets during its recording. A
+camera whose ROI shows no contrast is reported as NO SIGNAL, not failed,
+since most cameras can't see the sync LED.
+
+Streams are read through the session timeline (session_timeline.py). The
+report is printed and written to {session}/sync_qc.json, with a residual
+histogram per module, and to sync_qc_residuals.png if matplotlib is
+installed. Exits 1 if any module fails.
+
+Usage:
+    python3 src/controller/sync_qc.py /path/to/share/SESSION --roi 600,40,32,32
+    python3 src/controller/sync_qc.py /path/to/share/SESSION --roi camera_5e4f=600,40,32,32 --clock-pin 19
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+import soundfile
+
+try:
+    from src.controller.session_timeline import (
+        EventIndex,
+        SessionTimeline,
+        load_or_index,
+    )
+except ImportError:  # run as a script: python3 src/controller/sync_qc.py
+    from session_timeline import EventIndex, SessionTimeline, load_or_index
+
+AUDIO_TOLERANCE_MS = 1.0
+TTL_TOLERANCE_MS = 0.5
+VIDEO_TOLERANCE_FRAMES = 1.0
+MAX_DRIFT_PPM = 100.0
+MIN_MATCHED = 0.9
+
+# Grey levels between the ROI's dark and lit frames below which a camera
+# is taken not to see the sync LED at all
+MIN_CONTRAST = 20.0
+
+# A fitted drift is only kept if it is this many standard errors from zero
+DRIFT_SIGMAS = 3.0
+
+# Another TTL pin is taken to record the clock if its onsets are this
+# close (fractionally) to the reference period
+PERIOD_MATCH = 0.02
+
+HISTOGRAM_BINS = 20
+
+Roi = tuple[int, int, int, int]
+
+
+@dataclass
+class ModuleFit:
+    """One module's view of the clock, fitted against the reference."""
+
+    module: str
+    kind: str                   # "video", "audio" or "ttl"
+    tolerance_ms: float
+    resolution_ms: float = 0.0  # sample or frame interval the onsets are quantised to
+    detected: int = 0
+    expected: int = 0           # reference onsets while the module was recording
+    matched: int = 0
+    offset_ms: float = math.nan     # module time - clock time at the first clock onset
+    drift_ppm: float = math.nan
+    drift_sd_ppm: float = math.nan
+    drift_resolved: bool = False    # drift fitted, rather than offset only
+    residual_p95_ms: float = math.nan
+    residual_max_ms: float = math.nan
+    residuals_ms: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    status: str = "NO SIGNAL"
+    problems: list[str] = field(default_factory=list)
+
+    def histogram(self) -> dict:
+        """Residual counts over +-2 tolerances; outliers land in the end bins."""
+        edges = np.linspace(-2 * self.tolerance_ms, 2 * self.tolerance_ms, HISTOGRAM_BINS + 1)
+        clipped = np.clip(self.residuals_ms, edges[0], edges[-1])
+        counts, _ = np.histogram(clipped, bins=edges)
+        return {"edges_ms": edges.round(4).tolist(), "counts": counts.tolist()}
+
+    def to_dict(self) -> dict:
+        out = {k: v for k, v in vars(self).items() if k != "residuals_ms"}
+        for k, v in out.items():
+            if isinstance(v, float) and not math.isfinite(v):
+                out[k] = None
+        out["histogram"] = self.histogram()
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Detection
+# ---------------------------------------------------------------------------
+
+def _onsets(events: EventIndex, pin: int) -> np.ndarray:
+    """Times pin went active. TTLModule logs an input's active edge (a
+    "press") as LOW and an output's as HIGH."""
+    if events.key_modes.get(str(pin), "input") == "input":
+        active_label, active_value = "LOW", "0"
+    else:
+        active_label, active_value = "HIGH", "1"
+    active = np.array([label.upper().endswith(active_label) or label == active_value
+                       for label in events.labels])
+    if not active.size:
+        return np.zeros(0, dtype=np.int64)
+    mask = (events.key == pin) & active[events.code]
+    return events.timestamps[mask]
+
+
+def _period_ns(onsets: np.ndarray) -> float:
+    return float(np.median(np.diff(onsets))) if len(onsets) > 1 else math.nan
+
+
+def find_reference(timeline: SessionTimeline, clock_pin: int | None = None) -> tuple[str, int, np.ndarray]:
+    """(TTL stream, pin, onset times) of the experiment clock.
+
+    The pin is clock_pin if given, otherwise the pin configured as
+    experiment_clock, otherwise the pin with the most regular onsets.
+    """
+    candidates = []
+    for name, events in timeline.event_streams.items():
+        for pin in sorted({int(k) for k in np.unique(events.key)}):
+            if clock_pin is not None and pin != clock_pin:
+                continue
+            onsets = _onsets(events, pin)
+            if len(onsets) < 3:
+                continue
+            intervals = np.diff(onsets)
+            regularity = float(np.std(intervals) / np.mean(intervals))
+            is_clock = events.key_modes.get(str(pin)) == "experiment_clock"
+            candidates.append((not is_clock, regularity, name, pin, onsets))
+    if not candidates:
+        raise ValueError("No TTL experiment clock found in this session"
+                         + (f" on pin {clock_pin}" if clock_pin is not None else ""))
+    _, _, name, pin, onsets = min(candidates, key=lambda c: c[:2])
+    return name, pin, onsets
+
+
+def roi_brightness(video_path: str, roi: Roi | None = None) -> np.ndarray:
+    """Mean grey level of roi (x, y, w, h; whole frame if None) per frame."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open {video_path}")
+    values = []
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if roi is not None:
+                x, y, w, h = roi
+                frame = frame[y:y + h, x:x + w]
+            values.append(float(frame.mean()))
+    finally:
+        cap.release()
+    return np.array(values)
+
+
+def detect_video_onsets(timeline: SessionTimeline, camera: str, roi: Roi | None) -> np.ndarray:
+    """Times the sync LED came on, per the camera's frame timestamps."""
+    video = timeline.video[camera]
+    onsets = []
+    for seg, rel in enumerate(video.files):
+        if not rel:
+            continue
+        brightness = roi_brightness(os.path.join(timeline.session_dir, rel), roi)
+        ts = video.segment(seg)
+        n = min(len(brightness), len(ts))
+        if n < 2:
+            continue
+        brightness, ts = brightness[:n], ts[:n]
+        dark, lit = np.percentile(brightness, [5, 95])
+        if lit - dark < MIN_CONTRAST:
+            continue
+        on = brightness >= (dark + lit) / 2
+        rising = np.flatnonzero(on[1:] & ~on[:-1]) + 1
+        onsets.append((ts[rising - 1] + ts[rising]) // 2)
+    return np.concatenate(onsets) if onsets else np.zeros(0, dtype=np.int64)
+
+
+def detect_audio_onsets(timeline: SessionTimeline, mic: str, refractory_s: float,
+                        block: int = 1 << 16) -> np.ndarray:
+    """Times of amplitude onsets (clicks), read block by block."""
+    audio = timeline.audio[mic]
+    onsets = []
+    for seg, rel in enumerate(audio.files):
+        path = os.path.join(timeline.session_dir, rel)
+        peak, floors = 0.0, []
+        for data in soundfile.blocks(path, blocksize=block, dtype="float32", always_2d=True):
+            level = np.abs(data).max(axis=1)
+            peak = max(peak, float(level.max(initial=0)))
+            floors.append(float(np.median(level)))
+        floor = float(np.median(floors)) if floors else 0.0
+        if peak - floor <= 0:
+            continue
+        threshold = floor + (peak - floor) / 2
+        refractory = int(refractory_s * audio.rates[seg])
+        next_allowed, pos = 0, 0
+        for data in soundfile.blocks(path, blocksize=block, dtype="float32", always_2d=True):
+            for i in np.flatnonzero(np.abs(data).max(axis=1) >= threshold) + pos:
+                if i >= next_allowed:
+                    onsets.append(audio.time_of(seg, int(i)))
+                    next_allowed = i + refractory
+            pos += len(data)
+    return np.array(onsets, dtype=np.int64)
+
+
+# ---------------------------------------------------------------------------
+# Fitting
+# ---------------------------------------------------------------------------
+
+def fit_against_reference(fit: ModuleFit, reference: np.ndarray, detected: np.ndarray,
+                          span: tuple[int, int] | None) -> ModuleFit:
+    """Match detected onsets to the reference clock and fit offset + drift."""
+    detected = np.sort(detected)
+    fit.detected = len(detected)
+    if span is not None:
+        fit.expected = int(np.count_nonzero((reference >= span[0]) & (reference <= span[1])))
+    if not len(detected):
+        fit.status = "NO SIGNAL"
+        return fit
+
+    period = _period_ns(reference)
+    idx = np.searchsorted(reference, detected).clip(1, len(reference) - 1)
+    idx -= np.abs(detected - reference[idx - 1]) < np.abs(detected - reference[idx])
+    error = detected - reference[idx]
+    keep = np.abs(error) < period / 2
+    # One detection per clock onset: the closest
+    order = np.lexsort((np.abs(error), idx))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = idx[order][1:] != idx[order][:-1]
+    chosen = order[first & keep[order]]
+    ref_t, err = reference[idx[chosen]], error[chosen]
+    fit.matched = len(chosen)
+    if fit.matched == 0:
+        fit.status = "FAIL"
+        fit.problems.append("no onsets within half a clock period of the reference")
+        return fit
+
+    x = (ref_t - reference[0]) / 1e9
+    y = err / 1e6
+    slope, intercept = 0.0, float(np.mean(y))
+    if fit.matched >= 3 and np.ptp(x) > 0:
+        fitted_slope, fitted_intercept = np.polyfit(x, y, 1)
+        dof_residuals = y - (fitted_intercept + fitted_slope * x)
+        sigma = max(float(np.sqrt(np.sum(dof_residuals ** 2) / (fit.matched - 2))),
+                    fit.resolution_ms / math.sqrt(12))
+        slope_sd = sigma / float(np.sqrt(np.sum((x - x.mean()) ** 2)))
+        fit.drift_ppm, fit.drift_sd_ppm = float(fitted_slope * 1e3), slope_sd * 1e3
+        # and it must add up to more than a frame/sample over the session,
+        # as quantisation beating against the clock period is a bounded ramp
+        if (abs(fitted_slope) > DRIFT_SIGMAS * slope_sd
+                and abs(fitted_slope) * np.ptp(x) > fit.resolution_ms):
+            slope, intercept = float(fitted_slope), float(fitted_intercept)
+            fit.drift_resolved = True
+    fit.offset_ms = intercept
+    fit.residuals_ms = y - (intercept + slope * x)
+    fit.residual_p95_ms = float(np.percentile(np.abs(fit.residuals_ms), 95))
+    fit.residual_max_ms = float(np.abs(fit.residuals_ms).max())
+
+    if abs(fit.offset_ms) > fit.tolerance_ms:
+        fit.problems.append(f"offset {fit.offset_ms:+.3f} ms beyond ±{fit.tolerance_ms:g} ms")
+    if fit.residual_p95_ms > fit.tolerance_ms:
+        fit.problems.append(f"p95 residual {fit.residual_p95_ms:.3f} ms beyond {fit.tolerance_ms:g} ms")
+    if fit.drift_resolved and abs(fit.drift_ppm) > MAX_DRIFT_PPM:
+        fit.problems.append(f"drift {fit.drift_ppm:+.1f} ppm beyond ±{MAX_DRIFT_PPM:g} ppm")
+    if fit.expected and fit.matched < MIN_MATCHED * fit.expected:
+        fit.problems.append(f"saw {fit.matched} of {fit.expected} clock onsets")
+    fit.status = "FAIL" if fit.problems else "PASS"
+    return fit
+
+
+@dataclass
+class SyncReport:
+    session_dir: str
+    clock_stream: str
+    clock_pin: int
+    clock_period_ms: float
+    clock_onsets: int
+    fits: list[ModuleFit]
+
+    @property
+    def passed(self) -> bool:
+        return all(f.status != "FAIL" for f in self.fits)
+
+    def to_dict(self) -> dict:
+        return {
+            "session": os.path.basename(os.path.normpath(self.session_dir)),
+            "result": "PASS" if self.passed else "FAIL",
+            "clock": {"stream": self.clock_stream, "pin": self.clock_pin,
+                      "period_ms": self.clock_period_ms, "onsets": self.clock_onsets},
+            "modules": [f.to_dict() for f in self.fits],
+        }
+
+
+def run_qc(session_dir: str, rois: dict[str, Roi] | None = None, clock_pin: int | None = None,
+           timeline: SessionTimeline | None = None) -> SyncReport:
+    """Detect the experiment clock in every module of a session and fit
+    each against the TTL reference.
+
+    rois maps camera name (or "*" for every camera) to the sync LED's
+    (x, y, w, h); cameras without one use the whole frame.
+    """
+    timeline = timeline or load_or_index(session_dir)
+    rois = rois or {}
+    ref_stream, ref_pin, reference = find_reference(timeline, clock_pin)
+    period_ns = _period_ns(reference)
+    fits = []
+
+    for name, events in timeline.event_streams.items():
+        for pin in sorted({int(k) for k in np.unique(events.key)}):
+            if (name, pin) == (ref_stream, ref_pin) or events.key_modes.get(str(pin), "input") != "input":
+                continue
+            onsets = _onsets(events, pin)
+            if len(onsets) < 2 or abs(_period_ns(onsets) / period_ns - 1) > PERIOD_MATCH:
+                continue
+            fit = ModuleFit(f"{name}:pin{pin}", "ttl", TTL_TOLERANCE_MS)
+            fits.append(fit_against_reference(fit, reference, onsets,
+                                              (int(events.timestamps[0]), int(events.timestamps[-1]))))
+
+    for camera, video in timeline.video.items():
+        if not len(video.timestamps):
+            continue
+        frame_ms = float(np.median(np.diff(video.timestamps))) / 1e6 if len(video.timestamps) > 1 else 0.0
+        fit = ModuleFit(camera, "video", VIDEO_TOLERANCE_FRAMES * frame_ms, frame_ms)
+        onsets = detect_video_onsets(timeline, camera, rois.get(camera, rois.get("*")))
+        fits.append(fit_against_reference(fit, reference, onsets,
+                                          (int(video.timestamps[0]), int(video.timestamps[-1]))))
+
+    for mic, audio in timeline.audio.items():
+        if not len(audio.files):
+            continue
+        fit = ModuleFit(mic, "audio", AUDIO_TOLERANCE_MS, 1e3 / float(np.median(audio.rates)))
+        onsets = detect_audio_onsets(timeline, mic, refractory_s=period_ns / 2e9)
+        fits.append(fit_against_reference(fit, reference, onsets,
+                                          (int(audio.segment_start_ns.min()), int(audio.segment_end_ns.max()))))
+
+    return SyncReport(session_dir, ref_stream, ref_pin, period_ns / 1e6, len(reference), fits)
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+_BARS = " ▁▂▃▄▅▆▇█"
+
+
+def _sparkline(counts: list[int]) -> str:
+    top = max(counts) if counts else 0
+    return "".join(_BARS[math.ceil(c / top * (len(_BARS) - 1))] if top else " " for c in counts)
+
+
+def _num(v: float, spec: str, width: int) -> str:
+    return format(v, spec) if math.isfinite(v) else "-".rjust(width)
+
+
+def print_report(report: SyncReport) -> None:
+    print(f"Clock: {report.clock_stream} pin {report.clock_pin}, "
+          f"{report.clock_onsets} onsets every {report.clock_period_ms:.1f} ms\n")
+    print(f"  {'module':28s} {'kind':5s} {'seen':>9s} {'offset ms':>10s} {'drift ppm':>10s} "
+          f"{'p95 ms':>8s} {'tol ms':>7s}  residuals (±2 tol)     result")
+    for f in report.fits:
+        print(f"  {f.module:28s} {f.kind:5s} {f'{f.matched}/{f.expected}':>9s} "
+              f"{_num(f.offset_ms, '+10.3f', 10)} {_num(f.drift_ppm if f.drift_resolved else math.nan, '+10.1f', 10)} "
+              f"{_num(f.residual_p95_ms, '8.3f', 8)} {f.tolerance_ms:7.2f}  "
+              f"|{_sparkline(f.histogram()['counts'])}|  {f.status}")
+        for problem in f.problems:
+            print(f"      - {problem}")
+    print(f"\nSync QC: {'PASS' if report.passed else 'FAIL'}")
+
+
+def write_report(report: SyncReport, out_dir: str | None = None) -> list[str]:
+    """Write sync_qc.json (and sync_qc_residuals.png with matplotlib)."""
+    out_dir = out_dir or report.session_dir
+    written = [os.path.join(out_dir, "sync_qc.json")]
+    with open(written[0], "w") as f:
+        json.dump(report.to_dict(), f, indent=2)
+
+    fitted = [f for f in report.fits if len(f.residuals_ms)]
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return written
+    if not fitted:
+        return written
+    fig, axes = plt.subplots(len(fitted), 1, figsize=(8, 2.2 * len(fitted)), squeeze=False)
+    for ax, f in zip(axes[:, 0], fitted, strict=True):
+        hist = f.histogram()
+        edges = np.array(hist["edges_ms"])
+        ax.bar(edges[:-1], hist["counts"], width=np.diff(edges), align="edge",
+               color="tab:green" if f.status == "PASS" else "tab:red")
+        for x in (-f.tolerance_ms, f.tolerance_ms):
+            ax.axvline(x, color="grey", linestyle="--", linewidth=0.8)
+        ax.set_title(f"{f.module} ({f.kind}): offset {f.offset_ms:+.3f} ms, "
+                     f"drift {f.drift_ppm:+.1f} ppm — {f.status}", fontsize=9)
+        ax.set_xlabel("residual (ms)")
+    fig.tight_layout()
+    written.append(os.path.join(out_dir, "sync_qc_residuals.png"))
+    fig.savefig(written[-1], dpi=100)
+    plt.close(fig)
+    return written
+
+
+def _parse_roi(text: str) -> tuple[str, Roi]:
+    camera, _, box = text.rpartition("=")
+    x, y, w, h = (int(v) for v in box.split(","))
+    return camera or "*", (x, y, w, h)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("session_dir", help="Exported session directory")
+    parser.add_argument("--roi", action="append", default=[], metavar="[CAMERA=]X,Y,W,H",
+                        help="Sync LED region in camera frames, for every camera or one (repeatable)")
+    parser.add_argument("--clock-pin", type=int, default=None,
+                        help="TTL pin carrying the experiment clock (default: the experiment_clock pin)")
+    parser.add_argument("--output-dir", default=None, help="Where to write the report (default: the session)")
+    args = parser.parse_args()
+
+    rois = dict(_parse_roi(r) for r in args.roi)
+    try:
+        report = run_qc(args.session_dir, rois, args.clock_pin)
+    except ValueError as e:
+        sys.exit(str(e))
+    print_report(report)
+    for path in write_report(report, args.output_dir):
+        print(f"  → {path}")
+    sys.exit(0 if report.passed else 1)
+
+
+if __name__ == "__main__":
+    main()
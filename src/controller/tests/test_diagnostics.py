@@ -0,0 +1,110 @@
+"""
+Tests for src/controller/diagnostics.py
+
+Bundles are real ZIPs written into tmp_path; acks are delivered from
+threads to check that one deadline covers every module.
+"""
+
+import hashlib
+import io
+import threading
+import time
+import zipfile
+
+import pytest
+
+from src.controller.diagnostics import (
+    DiagnosticsCollection,
+    UploadOffsetError,
+    copy_bundle,
+)
+
+
+def _bundle(files):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def _ack(data):
+    return {"result": "success", "bundle": {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}}
+
+
+@pytest.fixture
+def collection(tmp_path):
+    c = DiagnosticsCollection(["cam1", "mic1"], str(tmp_path), max_bundle_bytes=1000)
+    yield c
+    c.cleanup()
+
+
+class TestUpload:
+
+    def test_chunks_reassemble_and_verify(self, collection):
+        data = _bundle({"logs.txt": "hello"})
+        assert collection.upload_chunk("cam1", 0, data[:50]) == 50
+        assert collection.upload_chunk("cam1", 50, data[50:]) == len(data)
+        collection.acknowledge("cam1", _ack(data))
+        path = collection.bundle_path("cam1")
+        with open(path, "rb") as f:
+            assert f.read() == data
+
+    def test_out_of_order_chunk_reports_resume_point(self, collection):
+        collection.upload_chunk("cam1", 0, b"x" * 10)
+        with pytest.raises(UploadOffsetError) as exc:
+            collection.upload_chunk("cam1", 30, b"y")
+        assert exc.value.received == 10
+
+    def test_offset_zero_restarts(self, collection):
+        collection.upload_chunk("cam1", 0, b"x" * 10)
+        assert collection.upload_chunk("cam1", 0, b"abc") == 3
+        collection.acknowledge("cam1", _ack(b"abc"))
+        assert collection.bundle_path("cam1") is not None
+
+    def test_limits_and_unknown_modules(self, collection):
+        with pytest.raises(OverflowError):
+            collection.upload_chunk("cam1", 0, b"x" * 1001)
+        with pytest.raises(KeyError):
+            collection.upload_chunk("stranger", 0, b"x")
+
+    def test_checksum_mismatch_rejects_bundle(self, collection):
+        collection.upload_chunk("cam1", 0, b"abc")
+        collection.acknowledge("cam1", _ack(b"abd"))
+        assert collection.bundle_path("cam1") is None
+
+    def test_inline_ack_has_no_bundle(self, collection):
+        collection.acknowledge("mic1", {"result": "success", "logs": "inline"})
+        assert collection.bundle_path("mic1") is None
+        assert collection.ack("mic1")["logs"] == "inline"
+
+
+class TestWait:
+
+    def test_one_deadline_for_all_modules(self, collection):
+        threading.Timer(0.05, collection.acknowledge, ("mic1", {})).start()
+        started = time.monotonic()
+        assert collection.wait(started + 0.3) == ["mic1"]
+        assert time.monotonic() - started < 0.6
+
+    def test_returns_early_when_everyone_acks(self, tmp_path):
+        acks = []
+        c = DiagnosticsCollection(["a", "b"], str(tmp_path), on_ack=lambda *args: acks.append(args))
+        for mid in ("b", "a"):
+            threading.Timer(0.02, c.acknowledge, (mid, {})).start()
+        started = time.monotonic()
+        assert c.wait(started + 5) == ["a", "b"]
+        assert time.monotonic() - started < 1
+        assert sorted(mid for mid, _, _ in acks) == ["a", "b"]
+        assert sorted(responded for _, responded, _ in acks) == [1, 2]
+        c.cleanup()
+
+
+def test_copy_bundle_skips_unsafe_names(tmp_path):
+    bundle = tmp_path / "b.zip"
+    bundle.write_bytes(_bundle({"logs.txt": "ok", "../escape.txt": "no", "ptp.json": "{}"}))
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w") as zf:
+        assert copy_bundle(zf, str(bundle), "report/modules/cam1/") == ["logs.txt", "ptp.json"]
+    with zipfile.ZipFile(out) as zf:
+        assert zf.read("report/modules/cam1/logs.txt") == b"ok"
@@ -0,0 +1,187 @@
+"""
+Tests for src/controller/file_index.py.
+
+Each test builds a small share in tmp_path using the export layout
+<session>/<date>/<module>/<file> and drives refresh()/process_pending()
+directly; the reconciler thread is only started in the inotify test.
+"""
+
+import os
+import time
+
+import pytest
+
+from src.controller.file_index import FileIndex, IndexRoot, _Inotify, split_path
+
+
+def _touch(base, rel, size=10):
+    path = os.path.join(base, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return path
+
+
+@pytest.fixture
+def share(tmp_path):
+    base = tmp_path / "share"
+    base.mkdir()
+    _touch(base, "exp1/session_events.log", 5)
+    _touch(base, "exp1/20260101/camera_aa/a.mp4", 100)
+    _touch(base, "exp1/20260101/camera_aa/a.txt", 20)
+    _touch(base, "exp1/20260101/mic_bb/a.flac", 50)
+    _touch(base, "exp2/20260102/camera_aa/b.mp4", 200)
+    return str(base)
+
+
+@pytest.fixture
+def index(tmp_path, share):
+    idx = FileIndex(str(tmp_path / "index.db"), [IndexRoot("share", lambda: share)],
+                    settle=0.0, use_inotify=False)
+    yield idx
+    idx.stop()
+
+
+# ---------------------------------------------------------------------------
+# Scanning
+# ---------------------------------------------------------------------------
+
+class TestRefresh:
+
+    def test_split_path(self):
+        assert split_path("exp1/20260101/camera_aa/a.mp4") == ("exp1", "camera_aa")
+        assert split_path("exp1/session_events.log") == ("exp1", "")
+        assert split_path("loose.txt") == ("", "")
+
+    def test_full_scan_indexes_every_file(self, index):
+        assert index.refresh("share") == 5
+        assert index.count("share") == 5
+        assert index.scanned_at("share") is not None
+        row = index.files("share", session="exp1", prefix="exp1/20260101/mic_bb")[0]
+        assert row == {
+            "path": "exp1/20260101/mic_bb/a.flac", "session": "exp1",
+            "module": "mic_bb", "size": 50, "mtime": row["mtime"],
+        }
+
+    def test_rescan_writes_only_changes(self, index, share):
+        index.refresh("share")
+        assert index.refresh("share") == 0
+
+        _touch(share, "exp1/20260101/camera_aa/a.mp4", 150)
+        os.remove(os.path.join(share, "exp2/20260102/camera_aa/b.mp4"))
+        assert index.refresh("share") == 2
+        assert index.session_summary("share", "exp2")["file_count"] == 0
+
+    def test_subtree_refresh_leaves_other_sessions(self, index, share):
+        index.refresh("share")
+        os.remove(os.path.join(share, "exp2/20260102/camera_aa/b.mp4"))
+        _touch(share, "exp1/20260101/camera_aa/c.mp4")
+
+        assert index.refresh("share", "exp1/20260101/camera_aa") == 1
+        assert index.count("share", session="exp2") == 1   # not rescanned yet
+
+    def test_missing_root_raises_and_keeps_rows(self, tmp_path, share):
+        location = {"path": share}
+        idx = FileIndex(str(tmp_path / "i.db"), [IndexRoot("share", lambda: location["path"])],
+                        use_inotify=False)
+        idx.refresh("share")
+        location["path"] = str(tmp_path / "unmounted")
+        with pytest.raises(FileNotFoundError):
+            idx.refresh("share")
+        assert idx.count("share") == 5
+
+    def test_include_filters_first_level(self, tmp_path, share):
+        idx = FileIndex(str(tmp_path / "i.db"),
+                        [IndexRoot("share", lambda: share, include=lambda n: n == "exp2")],
+                        use_inotify=False)
+        idx.refresh("share")
+        assert [r["path"] for r in idx.files("share")] == ["exp2/20260102/camera_aa/b.mp4"]
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+class TestQueries:
+
+    def test_pagination_and_suffix_filter(self, index):
+        index.refresh("share")
+        paths = [r["path"] for r in index.files("share", suffixes=(".mp4", ".txt"))]
+        assert paths == [
+            "exp1/20260101/camera_aa/a.mp4",
+            "exp1/20260101/camera_aa/a.txt",
+            "exp2/20260102/camera_aa/b.mp4",
+        ]
+        assert [r["path"] for r in index.files("share", suffixes=(".mp4", ".txt"), offset=1, limit=1)] == paths[1:2]
+        assert [r["path"] for r in index.files("share", suffixes=(".mp4", ".txt"), offset=2)] == paths[2:]
+        assert index.count("share", suffixes=(".mp4",)) == 2
+
+    def test_session_summary_per_module(self, index):
+        index.refresh("share")
+        assert index.session_summary("share", "exp1") == {
+            "file_count": 4,
+            "total_bytes": 175,
+            "modules": {
+                "camera_aa": {"file_count": 2, "total_bytes": 120},
+                "mic_bb": {"file_count": 1, "total_bytes": 50},
+            },
+        }
+
+    def test_session_totals(self, index):
+        index.refresh("share")
+        totals = index.session_totals("share")
+        assert {s: (t["file_count"], t["total_bytes"]) for s, t in totals.items()} == {
+            "exp1": (4, 175), "exp2": (1, 200),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Reconciliation
+# ---------------------------------------------------------------------------
+
+class TestReconcile:
+
+    def test_refresh_later_rescans_only_that_directory(self, index, share):
+        index.process_pending()   # initial full scan
+        _touch(share, "exp1/20260101/camera_aa/new.mp4")
+        _touch(share, "exp2/20260102/camera_aa/other.mp4")
+
+        index.refresh_later("share", "exp1/20260101/camera_aa")
+        index.refresh_later("share", "exp1/20260101/camera_aa/")
+        assert index.process_pending(now=time.monotonic() + 1) == 1
+
+        assert index.count("share", session="exp1") == 5
+        assert index.count("share", session="exp2") == 1
+
+    def test_ancestor_scan_covers_descendants(self, index):
+        index.process_pending()
+        index.refresh_later("share", "exp1")
+        index.refresh_later("share", "exp1/20260101/camera_aa")
+        assert index.process_pending(now=time.monotonic() + 1) == 1
+
+    def test_full_scans_are_rate_limited(self, index):
+        index.scan_interval = 300.0
+        index.min_scan_gap = 30.0
+        assert index.process_pending(now=1000.0) == 1
+        index.request_full_scan()
+        assert index.process_pending(now=1010.0) == 0
+        assert index.process_pending(now=1031.0) == 1
+        assert index.process_pending(now=1100.0) == 0
+        assert index.process_pending(now=1331.0) == 1
+
+
+@pytest.mark.skipif(_Inotify.create() is None, reason="inotify not available")
+def test_inotify_reindexes_changed_directory(tmp_path, share):
+    idx = FileIndex(str(tmp_path / "i.db"), [IndexRoot("share", lambda: share)],
+                    scan_interval=3600.0, settle=0.05)
+    idx.start()
+    try:
+        deadline = time.monotonic() + 5
+        while idx.count("share") < 5 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        _touch(share, "exp2/20260102/camera_aa/late.mp4")
+        while idx.count("share", session="exp2") < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert idx.count("share", session="exp2") == 2
+    finally:
+        idx.stop()
@@ -0,0 +1,197 @@
+"""
+Tests for src/controller/log_tail.py.
+
+Logs are plain files in tmp_path; bytes_read shows whether a read was
+incremental (appended bytes only) or a rebuild.
+"""
+
+import json
+import os
+
+import pytest
+
+from src.controller.log_tail import EventIndex, LogTail, read_last_lines
+
+
+def _write(path, lines, mode="w"):
+    with open(path, mode) as f:
+        f.writelines(f"{line}\n" for line in lines)
+
+
+# ---------------------------------------------------------------------------
+# read_last_lines
+# ---------------------------------------------------------------------------
+
+class TestReadLastLines:
+
+    def test_small_blocks_span_line_boundaries(self, tmp_path):
+        path = tmp_path / "log"
+        _write(path, [f"event number {i}" for i in range(100)])
+        with open(path, "rb") as f:
+            lines = read_last_lines(f, os.path.getsize(path), 5, block_size=7)
+        assert lines == [f"event number {i}".encode() for i in range(95, 100)]
+
+    def test_fewer_lines_than_requested(self, tmp_path):
+        path = tmp_path / "log"
+        _write(path, ["a", "b"])
+        with open(path, "rb") as f:
+            assert read_last_lines(f, os.path.getsize(path), 10) == [b"a", b"b"]
+
+    def test_empty_file(self, tmp_path):
+        path = tmp_path / "log"
+        path.write_bytes(b"")
+        with open(path, "rb") as f:
+            assert read_last_lines(f, 0, 10) == []
+
+
+# ---------------------------------------------------------------------------
+# LogTail
+# ---------------------------------------------------------------------------
+
+class TestLogTail:
+
+    def test_first_read_returns_tail_without_reading_the_whole_file(self, tmp_path):
+        path = tmp_path / "log"
+        _write(path, [f"line {i}" for i in range(5000)])
+        tail = LogTail(max_lines=200, block_size=64)
+        lines, truncated, _ = tail.read(str(path))
+        assert truncated
+        assert lines[0] == "line 4800"
+        assert lines[-1] == "line 4999"
+        assert tail.bytes_read < os.path.getsize(path) / 10
+
+    def test_append_reads_only_new_bytes(self, tmp_path):
+        path = tmp_path / "log"
+        _write(path, [f"line {i}" for i in range(500)])
+        tail = LogTail(max_lines=10)
+        _, _, position = tail.read(str(path))
+        before = tail.bytes_read
+        _write(path, ["new 1", "new 2"], mode="a")
+
+        assert tail.read_since(str(path), position)[0] == ["new 1", "new 2"]
+        lines, truncated, _ = tail.read(str(path))
+
+        assert tail.bytes_read - before == len("new 1\nnew 2\n")
+        assert truncated
+        assert lines[-3:] == ["line 499", "new 1", "new 2"]
+        assert len(lines) == 10
+
+    def test_partial_line_waits_for_newline(self, tmp_path):
+        path = tmp_path / "log"
+        _write(path, ["a"])
+        tail = LogTail()
+        with open(path, "a") as f:
+            f.write("half")
+        lines, truncated, position = tail.read(str(path))
+        assert (lines, truncated) == (["a"], False)
+        assert tail.read_since(str(path), position)[0] == []
+        with open(path, "a") as f:
+            f.write(" done\n")
+        assert tail.read_since(str(path), position)[0] == ["half done"]
+        assert tail.read(str(path))[0] == ["a", "half done"]
+
+    def test_read_since_needs_a_full_read_when_it_cannot_be_exact(self, tmp_path):
+        path = tmp_path / "log"
+        _write(path, ["a", "b"])
+        tail = LogTail(max_lines=3)
+        _, _, position = tail.read(str(path))
+
+        # More appended than the tail holds
+        _write(path, ["c", "d", "e", "f"], mode="a")
+        lines, latest = tail.read_since(str(path), position)
+        assert lines is None
+        assert tail.read_since(str(path), latest)[0] == []
+
+        # Rotated
+        os.rename(path, str(path) + ".1")
+        _write(path, ["g", "h", "i", "j", "k", "l", "m"])
+        assert tail.read_since(str(path), latest)[0] is None
+
+    def test_rotation_and_truncation_rebuild(self, tmp_path):
+        path = tmp_path / "log"
+        _write(path, ["old 1", "old 2", "old 3"])
+        tail = LogTail()
+        tail.read(str(path))
+
+        os.remove(path)
+        _write(path, ["new 1"])
+        assert tail.read(str(path))[:2] == (["new 1"], False)
+
+        _write(path, [], mode="w")
+        assert tail.read(str(path))[:2] == ([], False)
+
+    def test_n_limits_lines(self, tmp_path):
+        path = tmp_path / "log"
+        _write(path, ["a", "b", "c"])
+        assert LogTail().read(str(path), n=2)[:2] == (["b", "c"], True)
+
+    def test_lru_evicts_oldest_file(self, tmp_path):
+        tail = LogTail(max_files=2)
+        paths = []
+        for i in range(3):
+            path = tmp_path / f"log{i}"
+            _write(path, [str(i)])
+            paths.append(str(path))
+            tail.read(paths[-1])
+        assert list(tail._entries) == paths[1:]
+
+    def test_read_until_stops_at_an_earlier_position(self, tmp_path):
+        path = tmp_path / "log"
+        _write(path, ["a", "b"])
+        tail = LogTail(max_lines=3)
+        _, _, position = tail.read(str(path))
+        _write(path, ["c"], mode="a")
+        assert tail.read_until(str(path), position) == (["a", "b"], False)
+        _write(path, ["d", "e", "f"], mode="a")
+        assert tail.read_until(str(path), position) is None       # tail has moved past it
+
+    def test_missing_file_raises(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            LogTail().read(str(tmp_path / "nope"))
+
+
+# ---------------------------------------------------------------------------
+# EventIndex
+# ---------------------------------------------------------------------------
+
+def _events(path, records, mode="w"):
+    with open(path, mode) as f:
+        f.writelines(json.dumps(r) + "\n" for r in records)
+
+
+class TestEventIndex:
+
+    def test_filters_by_level_and_module(self, tmp_path):
+        path = tmp_path / "session_events.jsonl"
+        _events(path, [{"level": "INFO", "module": "cam1", "message": "a"},
+                       {"level": "ERROR", "module": "cam1", "message": "b"},
+                       {"level": "ERROR", "module": "cam2", "message": "c"},
+                       {"level": "ERROR", "module": "cam1", "message": "d"}])
+        index = EventIndex()
+        records, total = index.select(str(path), levels=["ERROR"], module_id="cam1", n=1)
+        assert [r["message"] for r in records] == ["d"] and total == 2
+        records, total = index.select(str(path), module_id="cam2")
+        assert [r["message"] for r in records] == ["c"] and total == 1
+
+    def test_appended_records_are_parsed_incrementally(self, tmp_path):
+        path = tmp_path / "session_events.jsonl"
+        _events(path, [{"level": "INFO", "message": str(i)} for i in range(100)])
+        index = EventIndex()
+        index.select(str(path), levels=["ERROR"])
+        before = index.bytes_read
+
+        _events(path, [{"level": "ERROR", "message": "late"}], mode="a")
+        with open(path, "a") as f:
+            f.write('{"level": "ERROR", "mess')     # still being written
+        records, total = index.select(str(path), levels=["ERROR"])
+        assert [r["message"] for r in records] == ["late"] and total == 1
+        assert index.bytes_read - before < 100
+
+    def test_replaced_file_is_reindexed(self, tmp_path):
+        path = tmp_path / "session_events.jsonl"
+        _events(path, [{"level": "ERROR", "message": "old"}] * 3)
+        index = EventIndex()
+        index.select(str(path))
+        os.remove(path)
+        _events(path, [{"level": "ERROR", "message": "new"}])
+        assert index.select(str(path)) == ([{"level": "ERROR", "message": "new"}], 1)
@@ -0,0 +1,142 @@
+"""
+Tests for src/controller/proxy_worker.py.
+
+A small share is built in tmp_path with OpenCV-written camera segments and
+their _timestamps.csv; process_pending() is driven directly (no thread)
+with the OpenCV encoder, so no system ffmpeg is needed.
+"""
+
+import csv
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from src.controller.proxy_worker import (
+    INDEX_SUFFIX,
+    PROXY_SUFFIX,
+    SPRITE_SUFFIX,
+    ProxyWorker,
+    render_proxy,
+)
+
+T0 = 1_780_000_000_000_000_000
+FPS = 30
+
+
+def _segment(base, rel, frames=90, size=(128, 96)):
+    """A video whose frame i has grey level 2*i, plus its timestamps CSV."""
+    path = os.path.join(base, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    writer = cv2.VideoWriter(path + ".mp4", cv2.VideoWriter_fourcc(*"mp4v"), FPS, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), 2 * i, np.uint8))
+    writer.release()
+    os.replace(path + ".mp4", path)
+    with open(f"{os.path.splitext(path)[0]}_timestamps.csv", "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["frame_id", "timestamp_ns", "dropped_before"])
+        for i in range(frames):
+            out.writerow([i, T0 + i * 1_000_000_000 // FPS, 0])
+    return path
+
+
+@pytest.fixture
+def share(tmp_path):
+    base = tmp_path / "share"
+    _segment(str(base), "s1/20260101/camera_aa/s1_aa_(0_20260101-090000).ts")
+    _segment(str(base), "s1/20260101/camera_aa/s1_aa_(1_20260101-090003).ts")
+    _segment(str(base), "s1/20260101/camera_bb/s1_bb_(0_20260101-090000).ts", frames=30)
+    (base / "s1/20260101/mic_cc").mkdir(parents=True)
+    (base / "s1/20260101/mic_cc/a.flac").write_bytes(b"")
+    return str(base)
+
+
+def _worker(tmp_path, share, **kwargs):
+    kwargs.setdefault("load", lambda: 0.0)
+    return ProxyWorker(str(tmp_path / "cache"), lambda: share, encoder="opencv",
+                       thumbnail_interval_s=1.0, **kwargs)
+
+
+def test_render_proxy_writes_proxy_sprite_and_index(tmp_path, share):
+    src = os.path.join(share, "s1/20260101/camera_aa/s1_aa_(0_20260101-090000).ts")
+    out = str(tmp_path / "out" / "a")
+
+    index = render_proxy(src, out, width=64, max_fps=10, thumbnail_width=32,
+                         thumbnail_interval_s=1.0, columns=2, encoder="opencv")
+
+    proxy = cv2.VideoCapture(out + PROXY_SUFFIX)
+    assert (proxy.get(cv2.CAP_PROP_FRAME_WIDTH), proxy.get(cv2.CAP_PROP_FRAME_HEIGHT)) == (64, 48)
+    assert proxy.get(cv2.CAP_PROP_FRAME_COUNT) == 30     # 90 frames at 30 fps, capped to 10
+    proxy.release()
+    assert index["fps"] == pytest.approx(30, abs=0.01)
+    assert index["proxy_fps"] == pytest.approx(10, abs=0.01)
+    assert [t["frame"] for t in index["thumbnails"]] == [0, 30, 60]
+    assert [t["timestamp_ns"] for t in index["thumbnails"]] == [T0, T0 + 1_000_000_000, T0 + 2_000_000_000]
+
+    # Three 32x24 tiles, two per row; each tile is its frame
+    sheet = cv2.imread(out + SPRITE_SUFFIX)
+    assert sheet.shape == (48, 64, 3)
+    assert sheet[24:, :32].mean() == pytest.approx(120, abs=6)
+    with open(out + INDEX_SUFFIX) as f:
+        assert json.load(f) == index
+
+
+def test_exported_directory_is_rendered_once(tmp_path, share):
+    worker = _worker(tmp_path, share)
+    rel = "s1/20260101/camera_aa/s1_aa_(0_20260101-090000).ts"
+    assert worker.status(rel) == "missing"
+
+    worker.enqueue("s1/20260101/camera_aa")
+    assert worker.status(rel) == "pending"
+    assert worker.process_pending() == 2
+    assert worker.status(rel) == "ready"
+    assert worker.status("s1/20260101/camera_bb/s1_bb_(0_20260101-090000).ts") == "missing"
+    assert worker.pending() == []
+
+    worker.enqueue("s1")
+    assert worker.process_pending() == 1        # camera_bb only; camera_aa is current
+
+    # A re-exported source is redone
+    _segment(share, rel, frames=60)
+    assert worker.status(rel) == "missing"
+    worker.enqueue("s1/20260101/camera_aa")
+    assert worker.process_pending() == 1
+    assert worker.index(rel)["frames"] == 60
+
+
+def test_waits_for_exports_and_load(tmp_path, share):
+    state = {"busy": True, "load": 0.0}
+    worker = _worker(tmp_path, share, busy=lambda: state["busy"],
+                     load=lambda: state["load"], max_load=0.8)
+    worker.enqueue("s1")
+
+    assert worker.process_pending() == 0
+    state.update(busy=False, load=1.5)
+    assert worker.process_pending() == 0
+    assert worker.pending() == ["s1"]
+
+    state["load"] = 0.2
+    assert worker.process_pending() == 3
+
+
+def test_unreadable_video_is_failed_until_reexported(tmp_path, share):
+    bad = os.path.join(share, "s1/20260101/camera_bb/broken.mp4")
+    with open(bad, "wb") as f:
+        f.write(b"not a video")
+    worker = _worker(tmp_path, share)
+    worker.enqueue("s1/20260101/camera_bb")
+    assert worker.process_pending() == 1
+    assert worker.status("s1/20260101/camera_bb/broken.mp4") == "failed"
+    assert worker.error("s1/20260101/camera_bb/broken.mp4")
+
+    worker.enqueue("s1/20260101/camera_bb")
+    assert worker.status("s1/20260101/camera_bb/broken.mp4") == "pending"
+
+
+def test_paths_outside_the_cache_are_rejected(tmp_path, share):
+    worker = _worker(tmp_path, share)
+    with pytest.raises(ValueError):
+        worker.out_base("s1/../../etc/passwd")
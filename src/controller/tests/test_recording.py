@@ -14,6 +14,7 @@ import json
 import os
 import tempfile
 import time
+from dataclasses import asdict
 from unittest.mock import MagicMock, patch
 
 import src.controller.recording as recording_module
@@ -21,10 +22,11 @@ from src.controller.recording import Recording, RecordingSession, SessionState
 
 
 def _make_recording(sessions_file: str | None = None, **config_overrides) -> tuple:
-    """A Recording instance with the background monitor thread suppressed
-    (Thread is patched during __init__ so _monitor_sessions never actually
-    starts looping) and a MagicMock facade wired up with defaults that pass
-    the PTP gate most lifecycle methods check before acting.
+    """A Recording instance with its background threads suppressed
+    (Thread is patched during __init__ so the session timer dispatcher and
+    the event journal never actually run) and a MagicMock facade wired up with defaults that pass
+    the PTP gate most lifecycle methods check before acting, and a temporary
+    share root.
 
     SESSIONS_FILE is repointed at a fresh temp path per call (unless the
     caller supplies its own, for tests that specifically exercise
@@ -36,9 +38,12 @@ def _make_recording(sessions_file: str | None = None, **config_overrides) -> tup
     state)."""
     recording_module.SESSIONS_FILE = sessions_file or os.path.join(tempfile.mkdtemp(), "sessions.json")
     with patch("src.controller.recording.threading.Thread"):
-        rec = Recording()
+        rec = Recording(journal_dir=tempfile.mkdtemp())
     facade = MagicMock()
     facade.get_config.return_value = config_overrides or {}
+    # A real directory: an unset MagicMock return value would be used as a
+    # relative path, and anything written to the share lands in the cwd
+    facade.get_share_path.return_value = tempfile.mkdtemp()
     facade.get_module_health.return_value = {
         "status": "online", "last_heartbeat": time.time(), "ptp4l_offset_ns": 1000,
     }
@@ -317,6 +322,7 @@ class TestClearEndedSessions:
             session_name="active", state=SessionState.ACTIVE
         )
 
+        rec._save_sessions()
         result = rec.clear_ended_sessions()
 
         assert result == {"cleared": 2, "skipped": 0, "skipped_sessions": []}
@@ -329,6 +335,7 @@ class TestClearEndedSessions:
             session_name="stuck", state=SessionState.STOPPED, pending_exports=1
         )
 
+        rec._save_sessions()
         result = rec.clear_ended_sessions()
 
         assert result == {"cleared": 1, "skipped": 1, "skipped_sessions": ["stuck"]}
@@ -340,11 +347,37 @@ class TestClearEndedSessions:
             session_name="stuck", state=SessionState.STOPPED, pending_exports=1
         )
 
+        rec._save_sessions()
         result = rec.clear_ended_sessions(force=True)
 
         assert result == {"cleared": 1, "skipped": 0, "skipped_sessions": []}
         assert rec.sessions == {}
 
+    def test_ended_sessions_come_from_the_store(self):
+        rec, _facade = _make_recording()
+        rec.sessions["old"] = _session(session_name="old", state=SessionState.STOPPED,
+                                       start_time="20260101-090000")
+        rec.sessions["new"] = _session(session_name="new", state=SessionState.ERROR,
+                                       start_time="20260301-090000")
+        rec.sessions["live"] = _session(session_name="live", state=SessionState.ACTIVE)
+        rec._save_sessions()
+
+        assert rec.get_ended_session_names() == ["old", "new"]
+
+
+def test_stop_stops_session_timers():
+    from src.controller.scheduler import DeadlineScheduler
+
+    recording_module.SESSIONS_FILE = os.path.join(tempfile.mkdtemp(), "sessions.json")
+    scheduler = DeadlineScheduler(workers=0)
+    rec = Recording(scheduler=scheduler, journal_dir=tempfile.mkdtemp())
+    try:
+        assert scheduler._thread.is_alive()
+    finally:
+        rec.stop()
+        rec.journal.stop()
+    assert not scheduler._thread.is_alive()
+
 
 class TestStopSession:
     def test_unknown_session_is_a_no_op(self):
@@ -755,13 +788,35 @@ class TestSessionPersistence:
             )
             rec._save_sessions()
 
-            with open(sessions_file) as f:
-                saved = json.load(f)
-            assert saved["exp1"]["session_name"] == "exp1"
+            assert rec._store.path == os.path.join(tmpdir, "sessions.db")
+            assert {n: d["state"] for n, d in rec._store.load().items()} == {"exp1": "stopped"}
 
             with patch("src.controller.recording.threading.Thread"):
-                rec2 = Recording()
+                rec2 = Recording(journal_dir=tempfile.mkdtemp())
             assert rec2.sessions["exp1"].state == SessionState.STOPPED
+            assert rec2.sessions["exp1"].modules == ["cam1"]
+
+    def test_named_save_deletes_sessions_no_longer_in_memory(self):
+        rec, _facade = _make_recording()
+        rec.sessions["exp1"] = _session(state=SessionState.STOPPED)
+        rec._save_sessions("exp1")
+        del rec.sessions["exp1"]
+        rec._save_sessions("exp1")
+        assert rec._store.load() == {}
+
+    def test_legacy_json_migrated_on_load(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sessions_file = os.path.join(tmpdir, "sessions.json")
+            legacy = _session(state=SessionState.STOPPED, modules=["cam1"],
+                              module_export_states={"cam1": "complete"})
+            with open(sessions_file, "w") as f:
+                json.dump({"exp1": asdict(legacy)}, f)
+
+            rec, _facade = _make_recording(sessions_file=sessions_file)
+
+            assert rec.sessions["exp1"].module_export_states == {"cam1": "complete"}
+            assert not os.path.exists(sessions_file)
+            assert os.path.exists(sessions_file + ".migrated")
 
     def test_active_session_recovered_as_error_on_load(self):
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -773,7 +828,7 @@ class TestSessionPersistence:
             rec._save_sessions()
 
             with patch("src.controller.recording.threading.Thread"):
-                rec2 = Recording()
+                rec2 = Recording(journal_dir=tempfile.mkdtemp())
 
             session = rec2.sessions["exp1"]
             assert session.state == SessionState.ERROR
@@ -3,10 +3,19 @@ Tests for scheduled-session start/stop decisions in src/controller/recording.py
 
 Covers same-day windows and windows that cross midnight (e.g. 22:00-06:00),
 where a naive lexicographic "HH:MM" comparison stops the session seconds
-after it starts.
+after it starts. The last section drives the deadline timers end to end on
+a FakeClock scheduler, fast-forwarding through several days of runs.
 """
 
+import os
+import tempfile
+import time
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import src.controller.recording as recording_module
 from src.controller.recording import Recording, RecordingSession, SessionState
+from src.controller.scheduler import DeadlineScheduler, FakeClock
 
 
 def _session(**overrides) -> RecordingSession:
@@ -109,3 +118,114 @@ class TestDayFilterAndAlreadyStarted:
     def test_does_not_start_twice_same_day(self):
         session = _session(scheduled_last_start_date=TODAY)
         assert _action(session, "22:00") is None
+
+
+# ---------------------------------------------------------------------------
+# Deadline-driven lifecycle on a fake clock
+# ---------------------------------------------------------------------------
+
+def _timed_recording(start: float) -> tuple:
+    """A Recording whose scheduler runs callbacks inline on a FakeClock.
+
+    All threads are suppressed; facade commands are recorded as
+    (module_id, command) tuples.
+    """
+    tmpdir = tempfile.mkdtemp()
+    recording_module.SESSIONS_FILE = os.path.join(tmpdir, "sessions.json")
+    with patch("src.controller.recording.threading.Thread"):
+        scheduler = DeadlineScheduler(clock=FakeClock(start), workers=0)
+        rec = Recording(scheduler=scheduler, journal_dir=os.path.join(tmpdir, "journal"))
+    facade = MagicMock()
+    facade.get_config.return_value = {}
+    facade.get_share_path.return_value = tmpdir
+    facade.get_modules_by_target.return_value = {"cam1": {"status": "READY"}}
+    facade.get_module_health.return_value = {
+        "status": "online", "last_heartbeat": time.time(), "ptp4l_offset_ns": 1000,
+    }
+    facade.is_module_recording.return_value = True
+    commands = []
+    facade.send_command.side_effect = lambda mid, cmd, params: commands.append((mid, cmd))
+    rec.facade = facade
+    rec._check_share_writable = lambda: None
+    return rec, scheduler, commands
+
+
+def _ts(*args) -> float:
+    return datetime(*args).timestamp()
+
+
+class TestDeadlineLifecycle:
+    def test_scheduled_session_runs_each_day_at_its_window(self):
+        # Monday 2026-07-13 08:00 local
+        rec, sched, commands = _timed_recording(_ts(2026, 7, 13, 8, 0))
+        rec.create_scheduled_session("day", "camera", "09:00", "17:00", raw_name=True)
+        assert sched.deadline(("day", "start")) == _ts(2026, 7, 13, 9, 0)
+
+        starts = []
+        for day in (13, 14, 15):
+            sched.advance(_ts(2026, 7, day, 9, 0) - sched.clock.now())
+            assert ("cam1", "validate_readiness") in commands   # readiness dispatched at 09:00
+            sched.advance(5)                                   # readiness-verify deadline
+            session = rec.sessions["day"]
+            assert session.state == SessionState.ACTIVE
+            starts.append(session.scheduled_last_start_date)
+            assert sched.deadline(("day", "stop")) == _ts(2026, 7, day, 17, 0)
+
+            commands.clear()
+            sched.advance(_ts(2026, 7, day, 17, 0) - sched.clock.now())
+            assert ("cam1", "stop_recording") in commands
+            rec.module_stopped("cam1")
+            assert rec.sessions["day"].state == SessionState.SCHEDULED
+            assert sched.deadline(("day", "start")) == _ts(2026, 7, day + 1, 9, 0)
+            commands.clear()
+
+        assert starts == ["2026-07-13", "2026-07-14", "2026-07-15"]
+
+    def test_midnight_window_skips_excluded_days(self):
+        # Friday 2026-07-17 12:00; runs Fri and Mon only (4, 0)
+        rec, sched, _commands = _timed_recording(_ts(2026, 7, 17, 12, 0))
+        rec.create_scheduled_session("night", "camera", "22:00", "06:00",
+                                     days=[4, 0], raw_name=True)
+        sched.advance(_ts(2026, 7, 17, 22, 0, 5) - sched.clock.now())
+        assert rec.sessions["night"].state == SessionState.ACTIVE
+        assert sched.deadline(("night", "stop")) == _ts(2026, 7, 18, 6, 0)
+
+        sched.advance(_ts(2026, 7, 18, 6, 0) - sched.clock.now())
+        rec.module_stopped("cam1")
+        assert sched.deadline(("night", "start")) == _ts(2026, 7, 20, 22, 0)
+
+    def test_timed_session_stops_at_its_deadline(self):
+        rec, sched, commands = _timed_recording(time.time())
+        result = rec.create_session("timed", "camera", duration_minutes=2, raw_name=True)
+        assert result["success"]
+        stop_at = rec.sessions["timed"].timed_stop_at
+
+        sched.advance(stop_at - sched.clock.now() - 1)
+        assert ("cam1", "stop_recording") not in commands
+        sched.advance(1)
+        assert ("cam1", "stop_recording") in commands
+
+    def test_health_check_starts_after_grace_and_recovers_module(self):
+        rec, sched, commands = _timed_recording(time.time())
+        rec.create_session("live", "camera", raw_name=True)
+        rec.facade.is_module_recording.return_value = False
+        rec._log_session_event = MagicMock()
+
+        sched.advance(recording_module.LEAD_SECS + recording_module._STARTUP_GRACE_SECS - 1)
+        assert commands.count(("cam1", "start_recording")) == 1
+        rec._log_session_event.assert_not_called()
+
+        # Two consecutive misses fault the session, then recovery re-sends start
+        sched.advance(recording_module._MONITOR_INTERVAL_SECS * 2)
+        assert ("live", "FAULT", "Not recording: cam1") in [
+            c.args for c in rec._log_session_event.call_args_list
+        ]
+        assert commands.count(("cam1", "start_recording")) == 2
+
+    def test_stopped_session_has_no_timers(self):
+        rec, sched, _commands = _timed_recording(time.time())
+        rec.create_session("live", "camera", raw_name=True)
+        rec.facade.is_module_recording.return_value = False  # all modules count as stopped
+        rec.stop_session("live")
+        assert rec.sessions["live"].state == SessionState.STOPPED
+        assert not [k for k in sched.keys() if isinstance(k, tuple) and k[0] == "live"]
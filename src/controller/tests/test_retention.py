@@ -0,0 +1,272 @@
+"""
+Tests for src/controller/retention.py.
+
+A share, a tiled-output target and a cold store are built in tmp_path with
+fabricated sizes and mtimes (os.utime), aged from a "now" taken once so
+plans are exact. The manager is driven through run_once() against a real FileIndex.
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from src.controller.file_index import FileIndex, IndexRoot
+from src.controller.retention import (
+    COLD_STORAGE_MARKER,
+    DAY_S,
+    RetentionManager,
+    RetentionPolicy,
+    classify,
+    cold_storage_unavailable,
+    execute_plan,
+    plan_retention,
+    read_manifest,
+    scan_tree,
+)
+from src.controller.update_distribution import TransferLimiter
+
+NOW = time.time()
+
+DONE = {"state": "stopped", "pending_exports": 0, "total_exports_failed": 0,
+        "module_export_states": {"camera_aa": "complete"}}
+
+
+def _file(base, rel, size, age_days):
+    path = os.path.join(base, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    mtime = NOW - age_days * DAY_S
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+@pytest.fixture
+def share(tmp_path):
+    base = str(tmp_path / "share")
+    for session in ("old", "new", "busy"):
+        age = 40 if session != "new" else 5
+        _file(base, f"{session}/20260101/camera_aa/{session}_aa_(0_20260101-090000).ts", 1000, age)
+        _file(base, f"{session}/20260101/camera_aa/{session}_aa_(0_20260101-090000)_timestamps.csv", 10, age)
+        _file(base, f"{session}/20260101/mic_cc/{session}.flac", 500, age)
+        _file(base, f"{session}/{session}_aligned.mp4", 300, age)
+    _file(base, "old/20260101/camera_aa/PENDING_old_aa_(1_20260101-100000).ts", 1000, 40)
+    return base
+
+
+SESSIONS = {"old": DONE, "new": DONE, "busy": {**DONE, "pending_exports": 1}}
+
+
+def _plan(share, policies=None, sessions=SESSIONS, manifests=None, **kwargs):
+    policies = policies or [RetentionPolicy("default", {"raw_video": 30, "raw_audio": 30, "derived": 180})]
+    return plan_retention({"share": scan_tree(share)}, policies, sessions, manifests or {},
+                          now=NOW, **kwargs)
+
+
+def test_classify():
+    assert classify("s/d/camera_aa/x_(0_20260101-090000).ts") == "raw_video"
+    assert classify("s/d/mic_cc/x.flac") == "raw_audio"
+    assert classify("s_2026010109_4x4.mkv") == "derived"
+    assert classify("s/s_aligned.mp4") == "derived"
+    assert classify("s/d/camera_aa/x.ts.proxy.mp4") == "derived"
+    assert classify("s/d/camera_aa/x_timestamps.csv") == "metadata"
+
+
+def test_expired_raw_files_of_verified_sessions_are_due(share):
+    plan = _plan(share)
+
+    due = {a.path for a in plan.actions}
+    assert due == {"old/20260101/camera_aa/old_aa_(0_20260101-090000).ts",
+                   "old/20260101/mic_cc/old.flac"}
+    assert all(a.action == "delete" for a in plan.actions)
+    # Derived outputs are kept longer, metadata and in-flight exports always
+    assert not any(p.endswith(("_aligned.mp4", ".csv")) or "PENDING_" in p for p in due)
+
+    assert {a.session for a in plan.held} == {"busy"}
+    assert all("1 export(s) unresolved" in a.reason for a in plan.held)
+    summary = plan.summary()
+    assert summary["by_action"] == {"delete": {"files": 2, "bytes": 1500},
+                                    "hold": {"files": 2, "bytes": 1500}}
+
+
+@pytest.mark.parametrize("record, reason", [
+    (None, "not on record"),
+    ({**DONE, "total_exports_failed": 2}, "2 export(s) failed"),
+    ({**DONE, "module_export_states": {"camera_aa": "failed"}}, "exports failed for camera_aa"),
+])
+def test_unverified_exports_are_held(share, record, reason):
+    sessions = {"old": record} if record is not None else {}
+    plan = _plan(share, sessions=sessions)
+    held = [a for a in plan.held if a.session == "old"]
+    assert len(held) == 2 and not [a for a in plan.actions if a.session == "old"]
+    assert all(reason in a.reason for a in held)
+
+
+def test_export_manifest_verifies_files_it_lists(share):
+    manifests = {("share", "old/20260101/camera_aa"): {"old_aa_(0_20260101-090000).ts": 0.0}}
+    plan = _plan(share, sessions={}, manifests=manifests)
+    assert [a.path for a in plan.actions] == ["old/20260101/camera_aa/old_aa_(0_20260101-090000).ts"]
+    assert "old/20260101/mic_cc/old.flac" in {a.path for a in plan.held}
+
+
+@pytest.mark.parametrize("sessions, listed_mb", [
+    ({}, None),                                                     # no size listed
+    ({}, 1.5),                                                      # copy not finished
+    ({"old": {**DONE, "module_export_states": {"camera_aa": "failed"}}}, 0.0),
+    ({"old": {**DONE, "pending_exports": 1}}, 0.0),
+])
+def test_export_manifest_alone_does_not_verify(share, sessions, listed_mb):
+    manifests = {("share", "old/20260101/camera_aa"): {"old_aa_(0_20260101-090000).ts": listed_mb}}
+    plan = _plan(share, sessions=sessions, manifests=manifests)
+    assert not [a for a in plan.actions if a.session == "old" and a.file_class == "raw_video"]
+
+
+def test_read_manifest_keeps_listed_sizes(tmp_path):
+    path = tmp_path / "export_manifest_20260101_090000.txt"
+    path.write_text("Export Manifest - 20260101_090000\nFiles to be exported:\n"
+                    "- a.ts\n  Size: 12.50 MB\n  Modified: 2026-01-01 09:00:00\n- a.csv\n")
+    assert read_manifest(str(path)) == {"a.ts": 12.5, "a.csv": None}
+
+
+def test_first_matching_policy_applies(share):
+    policies = [RetentionPolicy("keep-old", {}, sessions="old"),
+                RetentionPolicy("archive", {"raw_video": 3, "derived": 3}, action="archive")]
+    plan = _plan(share, policies=policies)
+    assert {a.session for a in plan.actions} == {"new"}
+    assert {a.file_class for a in plan.actions} == {"raw_video", "derived"}
+    assert all(a.action == "archive" for a in plan.actions)
+
+    # Without cold storage, archiving can only be held
+    plan = _plan(share, policies=policies, cold_storage_error="no cold storage configured")
+    assert not plan.actions
+    assert any("no cold storage" in a.reason for a in plan.held)
+
+    with pytest.raises(ValueError):
+        RetentionPolicy.from_dict({"name": "x", "keep_days": {"video": 1}})
+
+
+def _cold(tmp_path):
+    cold = tmp_path / "cold"
+    cold.mkdir()
+    (cold / COLD_STORAGE_MARKER).touch()
+    return str(cold)
+
+
+def test_cold_storage_must_be_a_mount_or_marked(tmp_path):
+    cold = tmp_path / "cold"
+    assert "no cold storage" in cold_storage_unavailable("")
+    assert "does not exist" in cold_storage_unavailable(str(cold))
+    cold.mkdir()
+    assert "not a mount point" in cold_storage_unavailable(str(cold))
+    (cold / COLD_STORAGE_MARKER).touch()
+    assert cold_storage_unavailable(str(cold)) is None
+    assert cold_storage_unavailable("/") is None
+
+
+def test_archive_refused_when_cold_storage_is_missing(tmp_path, share):
+    plan = _plan(share, policies=[RetentionPolicy("a", {"raw_video": 30, "raw_audio": 30},
+                                                  action="archive")])
+    assert len(plan.actions) == 2
+    # An unmounted archive disk: nothing may land on the local disk under it
+    cold = str(tmp_path / "cold")
+
+    result = execute_plan(plan, {"share": share}, cold)
+
+    assert (result["archived"], result["skipped"]) == (0, 2)
+    assert result["errors"] == [f"archiving stopped: cold storage {cold} does not exist"]
+    assert not os.path.exists(cold)
+    assert os.path.exists(os.path.join(share, plan.actions[0].path))
+
+
+def test_archive_moves_files_at_a_limited_rate(tmp_path, share):
+    plan = _plan(share, policies=[RetentionPolicy("a", {"raw_video": 30, "raw_audio": 30},
+                                                  action="archive")])
+    clock = {"t": 0.0}
+    limiter = TransferLimiter(1, 500, clock=lambda: clock["t"],
+                              sleep=lambda s: clock.__setitem__("t", clock["t"] + s))
+    cold = _cold(tmp_path)
+
+    result = execute_plan(plan, {"share": share}, cold, limiter=limiter)
+
+    assert (result["archived"], result["bytes"], result["errors"]) == (2, 1500, [])
+    assert clock["t"] >= 2.0          # 1500 bytes at 500 B/s, after the first burst
+    moved = os.path.join(cold, "share", "old/20260101/camera_aa/old_aa_(0_20260101-090000).ts")
+    assert os.path.getsize(moved) == 1000
+    assert not os.path.exists(os.path.join(share, "old/20260101/camera_aa/old_aa_(0_20260101-090000).ts"))
+    assert not [n for _, _, names in os.walk(cold) for n in names if n.startswith("PENDING_")]
+    assert result["touched"] == [("share", "old/20260101/camera_aa"), ("share", "old/20260101/mic_cc")]
+
+
+def test_execution_is_capped_and_skips_changed_files(share):
+    plan = _plan(share, sessions={**SESSIONS, "busy": DONE})
+    assert len(plan.actions) == 4
+
+    # Re-exported since the plan: left alone
+    _file(share, plan.actions[0].path, 2000, 0)
+    result = execute_plan(plan, {"share": share}, max_files=2)
+    assert (result["skipped"], result["deleted"], result["remaining"]) == (1, 2, 1)
+    assert os.path.getsize(os.path.join(share, plan.actions[0].path)) == 2000
+
+    stop = threading.Event()
+    stop.set()
+    assert execute_plan(plan, {"share": share}, stop=stop)["remaining"] == 4
+
+    # A byte cap still lets the first file through
+    result = execute_plan(_plan(share, sessions={**SESSIONS, "busy": DONE}), {"share": share},
+                          max_bytes=100)
+    assert result["deleted"] == 1
+
+
+class _Config:
+    def __init__(self, values):
+        self.values = values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+
+def test_manager_dry_run_then_run(tmp_path, share):
+    tiled = str(tmp_path / "tiled")
+    _file(tiled, "old_2026010109_4x4.mkv", 700, 200)
+    _file(tiled, "new_2026010109_4x4.mkv", 700, 10)
+    index = FileIndex(str(tmp_path / "index.db"), [IndexRoot("share", lambda: share)])
+    index.refresh("share")
+    config = _Config({"retention.targets": {"tiled": tiled}})
+    manager = RetentionManager(config, lambda: index, {"share": lambda: share},
+                               lambda: SESSIONS)
+    before = sorted(os.path.join(d, n) for d, _, names in os.walk(str(tmp_path)) for n in names)
+
+    report = manager.run_once(dry_run=True)
+    assert report["dry_run"]
+    assert report["summary"]["by_target"] == {"share": {"files": 4, "bytes": 3000},
+                                              "tiled": {"files": 1, "bytes": 700}}
+    assert sorted(os.path.join(d, n) for d, _, names in os.walk(str(tmp_path)) for n in names) == before
+
+    report = manager.run_once()
+    assert report["result"]["deleted"] == 3
+    assert not os.path.exists(os.path.join(tiled, "old_2026010109_4x4.mkv"))
+    assert os.path.exists(os.path.join(tiled, "new_2026010109_4x4.mkv"))
+    assert manager.last_run["bytes"] == 2200
+    index.refresh("share")
+    assert index.count("share", session="old") == 3
+
+
+def test_manager_holds_archives_without_usable_cold_storage(tmp_path, share):
+    index = FileIndex(str(tmp_path / "index.db"), [IndexRoot("share", lambda: share)])
+    index.refresh("share")
+    cold = tmp_path / "cold"
+    cold.mkdir()
+    config = _Config({"retention.cold_storage_path": str(cold),
+                      "retention.policies": [{"name": "a", "keep_days": {"raw_video": 30},
+                                              "action": "archive"}]})
+    manager = RetentionManager(config, lambda: index, {"share": lambda: share},
+                               lambda: SESSIONS)
+
+    plan = manager.plan(now=NOW)
+    assert not plan.actions
+    assert [a.session for a in plan.held if "is not a mount point" in a.reason] == ["old"]
+
+    (cold / COLD_STORAGE_MARKER).touch()
+    assert {a.action for a in manager.plan(now=NOW).actions} == {"archive"}
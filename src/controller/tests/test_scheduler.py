@@ -0,0 +1,144 @@
+"""
+Tests for src/controller/scheduler.py.
+
+Almost everything runs on a FakeClock with workers=0, so callbacks execute
+inline inside advance()/run_due(); one smoke test drives the real dispatcher
+thread and worker pool on the system clock.
+"""
+
+import threading
+import time
+
+from src.controller.scheduler import DeadlineScheduler, FakeClock
+
+
+def _scheduler(start=1000.0):
+    return DeadlineScheduler(clock=FakeClock(start), workers=0)
+
+
+# ---------------------------------------------------------------------------
+# One-shot timers
+# ---------------------------------------------------------------------------
+
+class TestOneShot:
+    def test_fire_in_deadline_order_at_their_deadline(self):
+        sched = _scheduler()
+        fired = []
+        sched.schedule("b", 1020, lambda: fired.append(("b", sched.clock.now())))
+        sched.schedule("a", 1010, lambda: fired.append(("a", sched.clock.now())))
+        assert sched.advance(5) == 0
+        assert sched.advance(30) == 2
+        assert fired == [("a", 1010), ("b", 1020)]
+        assert sched.clock.now() == 1035
+
+    def test_rescheduling_a_key_replaces_it(self):
+        sched = _scheduler()
+        fired = []
+        sched.schedule("k", 1010, fired.append, "old")
+        sched.schedule("k", 1020, fired.append, "new")
+        sched.advance(60)
+        assert fired == ["new"]
+
+    def test_ensure_keeps_pending_timer(self):
+        sched = _scheduler()
+        assert sched.ensure("k", 1010, lambda: None)
+        assert not sched.ensure("k", 1050, lambda: None)
+        assert sched.deadline("k") == 1010
+
+    def test_cancel_group_drops_only_that_group(self):
+        sched = _scheduler()
+        fired = []
+        sched.schedule(("s1", "start"), 1010, fired.append, 1)
+        sched.schedule(("s1", "stop"), 1020, fired.append, 2)
+        sched.schedule(("s2", "start"), 1010, fired.append, 3)
+        sched.cancel_group("s1")
+        sched.advance(60)
+        assert fired == [3]
+
+    def test_callback_may_schedule_further_timers(self):
+        sched = _scheduler()
+        fired = []
+
+        def _chain(n):
+            fired.append(sched.clock.now())
+            if n:
+                sched.schedule("chain", sched.clock.now() + 5, _chain, n - 1)
+
+        sched.schedule("chain", 1005, _chain, 3)
+        sched.advance(100)
+        assert fired == [1005, 1010, 1015, 1020]
+
+    def test_failing_callback_is_counted_not_raised(self):
+        sched = _scheduler()
+        sched.schedule("bad", 1001, lambda: 1 / 0)
+        sched.advance(2)
+        assert sched.stats()["errors"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Periodic timers
+# ---------------------------------------------------------------------------
+
+class TestPeriodic:
+    def test_period_does_not_drift_over_a_day(self):
+        sched = _scheduler(0)
+        times = []
+        sched.schedule("tick", 5, lambda: times.append(sched.clock.now()), interval=5)
+        sched.advance(86_400)
+        assert len(times) == 86_400 // 5
+        assert times[-1] == 86_400
+
+    def test_missed_periods_are_skipped(self):
+        sched = _scheduler(0)
+        times = []
+        sched.schedule("tick", 5, lambda: times.append(sched.clock.now()), interval=5)
+        sched.clock.set(23)   # e.g. the process was stalled
+        sched.run_due()
+        assert times == [23]
+        assert sched.deadline("tick") == 25
+
+
+# ---------------------------------------------------------------------------
+# Threaded dispatch
+# ---------------------------------------------------------------------------
+
+def test_dispatcher_thread_runs_due_callbacks_on_workers():
+    sched = DeadlineScheduler(workers=2).start()
+    try:
+        done = threading.Event()
+        names = []
+
+        def _cb():
+            names.append(threading.current_thread().name)
+            done.set()
+
+        sched.schedule("soon", time.time() + 0.05, _cb)
+        assert done.wait(2.0)
+        assert names[0].startswith("scheduler-worker")
+    finally:
+        sched.stop()
+
+
+def test_same_group_callbacks_never_overlap():
+    sched = DeadlineScheduler(workers=4).start()
+    try:
+        active = []
+        overlaps = []
+        finished = threading.Semaphore(0)
+
+        def _cb():
+            active.append(1)
+            if len(active) > 1:
+                overlaps.append(True)
+            time.sleep(0.02)
+            active.pop()
+            finished.release()
+
+        now = time.time()
+        for i in range(4):
+            sched.schedule(("s1", i), now + 0.02, _cb)
+        for _ in range(4):
+            assert finished.acquire(timeout=2.0)
+        assert not overlaps
+    finally:
+        sched.stop()
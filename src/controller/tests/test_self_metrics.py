@@ -0,0 +1,92 @@
+"""
+Tests for src/controller/self_metrics.py
+
+The sampler reads a fake /proc tree in tmp_path, rewritten between samples,
+so CPU, network and per-thread rates are exact.
+"""
+
+import pytest
+
+from src.controller import self_metrics
+from src.controller.self_metrics import SelfMetrics, diff, read_net_dev
+
+
+def _write_proc(root, cpu, cores, rx_tx, threads, process):
+    (root / "net").mkdir(exist_ok=True)
+    (root / "self").mkdir(exist_ok=True)
+    lines = [f"cpu {cpu[0]} 0 {cpu[1]} {cpu[2]} {cpu[3]} 0 0 0"]
+    for i, (user, idle) in enumerate(cores):
+        lines.append(f"cpu{i} {user} 0 0 {idle} 0 0 0 0")
+    lines.append("intr 12345")
+    (root / "stat").write_text("\n".join(lines) + "\n")
+    (root / "meminfo").write_text("MemTotal:  4194304 kB\nMemAvailable: 1048576 kB\n")
+    (root / "net" / "dev").write_text(
+        "Inter-|   Receive\n face |bytes packets\n"
+        f"    lo: 999 0 0 0 0 0 0 0 999 0 0 0 0 0 0 0\n"
+        f"  eth0: {rx_tx[0]} 0 0 0 0 0 0 0 {rx_tx[1]} 0 0 0 0 0 0 0\n"
+    )
+    for tid, ticks in threads.items():
+        task = root / "self" / "task" / str(tid)
+        task.mkdir(parents=True, exist_ok=True)
+        task.joinpath("stat").write_text(f"{tid} (python (x)) S " + "0 " * 10 + f"{ticks} 0 0\n")
+    (root / "self" / "stat").write_text("1 (python) S " + "0 " * 10 + f"{process} 0 0\n")
+
+
+@pytest.fixture
+def metrics(tmp_path, monkeypatch):
+    monkeypatch.setattr(self_metrics, "_CLK_TCK", 100)
+    return SelfMetrics(proc_root=str(tmp_path), disk_path=str(tmp_path),
+                       thermal_path=str(tmp_path / "temp"),
+                       thread_source=lambda: {11: "zmq-listener", 12: "web-server", 13: "gone"})
+
+
+def test_first_sample_has_no_rates(tmp_path, metrics):
+    _write_proc(tmp_path, (0, 0, 0, 0), [(0, 0)], (0, 0), {11: 0}, 0)
+    snap = metrics.sample(now=100.0)
+    assert snap["cpu_usage"] is None
+    assert snap["net"] == {}
+    assert snap["memory_usage"] == 75.0
+    assert snap["memory_total_gb"] == 4.0
+    assert snap["cpu_temp"] is None
+
+
+def test_rates_between_samples(tmp_path, metrics):
+    _write_proc(tmp_path, (100, 0, 800, 100), [(50, 450), (50, 450)], (1000, 500),
+                {11: 10, 12: 0}, 20)
+    metrics.sample(now=100.0)
+    # 2 s later: 100 busy + 100 idle + 100 iowait of 300 total -> 33.3% busy
+    _write_proc(tmp_path, (150, 50, 900, 200), [(150, 450), (50, 550)], (5000, 2500),
+                {11: 110, 12: 20}, 240)
+    (tmp_path / "temp").write_text("48500\n")
+    snap = metrics.sample(now=102.0)
+
+    assert snap["cpu_usage"] == 33.3
+    assert snap["cpu_per_core"] == [100.0, 0.0]
+    assert snap["net"] == {"eth0": {"rx_bps": 2000, "tx_bps": 1000}}
+    assert snap["threads"] == {"zmq-listener": 50.0, "web-server": 10.0}
+    assert snap["process_cpu"] == 110.0
+    assert snap["cpu_temp"] == 48.5
+    assert [h["cpu_usage"] for h in metrics.history()] == [None, 33.3]
+
+
+def test_snapshot_samples_once_on_demand(tmp_path, metrics):
+    _write_proc(tmp_path, (0, 0, 0, 0), [], (0, 0), {}, 0)
+    first = metrics.snapshot()
+    assert metrics.snapshot()["timestamp"] == first["timestamp"]
+    assert len(metrics.history()) == 1
+
+
+def test_missing_proc_files_degrade_to_none(tmp_path, metrics):
+    snap = metrics.sample(now=1.0)
+    assert snap["cpu_usage"] is None
+    assert snap["memory_usage"] is None
+
+
+def test_read_net_dev_skips_loopback(tmp_path):
+    _write_proc(tmp_path, (0, 0, 0, 0), [], (7, 8), {}, 0)
+    assert read_net_dev(str(tmp_path)) == {"eth0": (7, 8)}
+
+
+def test_diff():
+    assert diff(None, {"a": 1}) == {"a": 1}
+    assert diff({"a": 1, "b": [1]}, {"a": 1, "b": [2], "c": None}) == {"b": [2], "c": None}
@@ -0,0 +1,154 @@
+"""
+Tests for src/controller/session_journal.py.
+
+The spool and flush steps are driven directly (spool_pending / flush_pending)
+rather than through the background threads, against a temp spool directory
+and a temp "share" whose availability is toggled by pointing share_root at a
+path that cannot be created.
+"""
+
+import json
+import os
+
+import pytest
+
+from src.controller.session_journal import SessionJournal, format_event_line
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    spool = tmp_path / "spool"
+    share = tmp_path / "share"
+    share.mkdir()
+    return spool, share
+
+
+def _journal(spool, share_root, **kwargs):
+    return SessionJournal(str(spool), share_root, **kwargs)
+
+
+def _share_lines(share, session="exp1"):
+    with open(share / session / "session_events.log") as f:
+        return f.read().splitlines()
+
+
+# ---------------------------------------------------------------------------
+# Queue and spool
+# ---------------------------------------------------------------------------
+
+class TestQueueAndSpool:
+    def test_full_queue_drops_without_blocking(self, dirs):
+        spool, share = dirs
+        journal = _journal(spool, lambda: str(share), max_queue=2)
+        assert journal.log("exp1", "INFO", "a")
+        assert journal.log("exp1", "INFO", "b")
+        assert not journal.log("exp1", "INFO", "c")
+        assert journal.dropped == 1
+
+    def test_spool_holds_structured_records_in_order(self, dirs):
+        spool, share = dirs
+        journal = _journal(spool, lambda: str(share))
+        journal.log("exp1", "INFO", "first")
+        journal.log("exp1", "FAULT", "cam1 went offline", module_id="cam1")
+        assert journal.spool_pending() == 2
+        records = [json.loads(line) for line in (spool / "exp1.jsonl").read_text().splitlines()]
+        assert [r["message"] for r in records] == ["first", "cam1 went offline"]
+        assert records[1]["module"] == "cam1" and records[1]["level"] == "FAULT"
+
+
+# ---------------------------------------------------------------------------
+# Flush to share
+# ---------------------------------------------------------------------------
+
+class TestFlush:
+    def test_writes_text_and_jsonl_and_compacts_spool(self, dirs):
+        spool, share = dirs
+        journal = _journal(spool, lambda: str(share))
+        journal.log("exp1", "WARNING", "Export failed", module_id="cam1")
+        journal.spool_pending()
+        assert journal.flush_pending() == 1
+
+        lines = _share_lines(share)
+        assert len(lines) == 1 and lines[0].endswith("[WARNING ] Export failed")
+        structured = json.loads((share / "exp1" / "session_events.jsonl").read_text())
+        assert structured["module"] == "cam1"
+        assert not (spool / "exp1.jsonl").exists()
+
+    def test_replays_in_order_after_share_recovers(self, dirs, tmp_path):
+        spool, share = dirs
+        blocker = tmp_path / "not_a_dir"
+        blocker.write_text("")  # makedirs under a regular file fails
+        root = {"path": str(blocker)}
+        journal = _journal(spool, lambda: root["path"], retry_interval=60)
+
+        for i in range(3):
+            journal.log("exp1", "INFO", f"event {i}")
+        journal.spool_pending()
+        assert journal.flush_pending() == 0
+        assert journal.stats()["share_ok"] is False
+
+        journal.log("exp1", "INFO", "event 3")
+        journal.spool_pending()
+        root["path"] = str(share)
+        assert journal.flush_pending() == 0            # still inside the retry interval
+        assert journal.flush_pending(force=True) == 4
+        assert [line.split("] ")[1] for line in _share_lines(share)] == [f"event {i}" for i in range(4)]
+        assert journal.stats()["share_ok"] is True
+
+    def test_partial_flush_resumes_from_offset_on_restart(self, dirs):
+        spool, share = dirs
+        journal = _journal(spool, lambda: str(share))
+        journal.log("exp1", "INFO", "one")
+        journal.spool_pending()
+        journal.flush_pending()
+        # Simulate a crash after spooling but before the next flush
+        journal.log("exp1", "INFO", "two")
+        journal.spool_pending()
+
+        restarted = _journal(spool, lambda: str(share))
+        assert restarted.stats()["pending_sessions"] == 1
+        restarted.flush_pending()
+        assert [line.split("] ")[1] for line in _share_lines(share)] == ["one", "two"]
+
+    def test_sessions_flushed_independently(self, dirs):
+        spool, share = dirs
+        journal = _journal(spool, lambda: str(share))
+        journal.log("a", "INFO", "x")
+        journal.log("b", "INFO", "y")
+        journal.spool_pending()
+        assert journal.flush_pending() == 2
+        assert os.path.exists(share / "a" / "session_events.log")
+        assert os.path.exists(share / "b" / "session_events.log")
+
+
+def test_threads_flush_on_stop(dirs):
+    spool, share = dirs
+    journal = _journal(spool, lambda: str(share), flush_interval=0.05).start()
+    journal.log("exp1", "INFO", "hello")
+    journal.stop()
+    assert _share_lines(share)[0].endswith("hello")
+
+
+def test_stop_spools_everything_queued(dirs):
+    spool, share = dirs
+    journal = _journal(spool, lambda: str(share), batch_size=2, flush_interval=0.05).start()
+    for i in range(50):
+        journal.log("exp1", "INFO", f"event {i}")
+    journal.stop()
+    lines = _share_lines(share)
+    assert len(lines) == 50
+    assert lines[-1].endswith("event 49")
+
+
+def test_stop_does_not_block_on_a_full_queue(dirs):
+    spool, share = dirs
+    journal = _journal(spool, lambda: str(share), max_queue=3)
+    for i in range(3):
+        assert journal.log("exp1", "INFO", f"event {i}")
+    journal.stop(timeout=0.1)
+    assert journal.spooled == 3
+
+
+def test_format_matches_legacy_text_log():
+    line = format_event_line({"ts": 0, "level": "INFO", "message": "m"})
+    assert line.endswith(" [INFO    ] m\n")
@@ -0,0 +1,133 @@
+"""
+Tests for src/controller/session_store.py.
+
+Sessions are plain dicts shaped like dataclasses.asdict(RecordingSession);
+each test gets its own database in a temp directory. Covers round-tripping,
+row-level incremental writes, sync/delete, the state and end-time queries,
+and the one-shot sessions.json migration.
+"""
+
+import json
+import os
+import sqlite3
+
+import pytest
+
+from src.controller.session_store import SessionStore
+
+
+def _session(name="exp1", **overrides) -> dict:
+    session = dict(
+        session_name=name, target="camera", state="active", modules=["cam1", "cam2"],
+        start_time="20260101-090000", end_time=None, scheduled=False,
+        module_stop_states={"cam1": "recording", "cam2": "recording"},
+        module_export_states={"cam1": "idle", "cam2": "idle"},
+        pending_exports=0,
+    )
+    session.update(overrides)
+    return session
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = SessionStore(str(tmp_path / "sessions.db"))
+    yield s
+    s.close()
+
+
+# ---------------------------------------------------------------------------
+# Writes and reads
+# ---------------------------------------------------------------------------
+
+class TestSaveAndLoad:
+    def test_round_trip(self, store, tmp_path):
+        store.save([_session()])
+        reopened = SessionStore(str(tmp_path / "sessions.db"))
+        assert reopened.load() == {"exp1": _session()}
+        reopened.close()
+
+    def test_database_uses_wal(self, store):
+        conn = sqlite3.connect(store.path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
+
+    def test_only_changed_rows_are_written(self, store):
+        session = _session()
+        store.save([session])
+        assert store.rows_written == 3  # session row + two module rows
+
+        store.save([session])
+        assert store.rows_written == 3
+
+        session["module_export_states"]["cam1"] = "pending"
+        store.save([session])
+        assert store.rows_written == 4  # one module row, session row unchanged
+
+        session["pending_exports"] = 1
+        store.save([session])
+        assert store.rows_written == 5
+
+    def test_removed_module_row_is_deleted(self, store, tmp_path):
+        session = _session()
+        store.save([session])
+        del session["module_stop_states"]["cam2"]
+        del session["module_export_states"]["cam2"]
+        store.save([session])
+        assert store.load()["exp1"]["module_stop_states"] == {"cam1": "recording"}
+
+    def test_sync_deletes_sessions_not_given(self, store):
+        store.save([_session("a"), _session("b")])
+        store.sync({"b": _session("b")})
+        assert store.names() == ["b"]
+        conn = sqlite3.connect(store.path)
+        assert conn.execute("SELECT COUNT(*) FROM module_states WHERE session_name = 'a'").fetchone()[0] == 0
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+class TestQueries:
+    def test_names_filtered_by_state_and_scheduled(self, store):
+        store.save([
+            _session("live"),
+            _session("sched", state="scheduled", scheduled=True),
+            _session("done", state="stopped"),
+        ])
+        assert store.names(states=["active"]) == ["live"]
+        assert store.names(scheduled=True) == ["sched"]
+        assert store.names(states=["stopped", "error"], scheduled=False) == ["done"]
+
+    def test_ended_before(self, store):
+        store.save([
+            _session("old", state="stopped", end_time="20260101-120000"),
+            _session("new", state="stopped", end_time="20260301-120000"),
+            _session("sched", state="error", scheduled=True, end_time="20260101-120000"),
+        ])
+        assert store.ended_before("20260201-000000") == ["old"]
+
+
+# ---------------------------------------------------------------------------
+# Migration
+# ---------------------------------------------------------------------------
+
+class TestMigrateJson:
+    def test_imports_and_renames(self, store, tmp_path):
+        path = tmp_path / "sessions.json"
+        path.write_text(json.dumps({"exp1": _session(), "exp2": _session("exp2")}))
+        assert store.migrate_json(str(path)) == 2
+        assert not path.exists()
+        assert (tmp_path / "sessions.json.migrated").exists()
+        assert set(store.load()) == {"exp1", "exp2"}
+
+    def test_existing_rows_win(self, store, tmp_path):
+        store.save([_session(state="stopped")])
+        path = tmp_path / "sessions.json"
+        path.write_text(json.dumps({"exp1": _session()}))
+        assert store.migrate_json(str(path)) == 0
+        assert store.load()["exp1"]["state"] == "stopped"
+
+    def test_missing_file_is_a_no_op(self, store, tmp_path):
+        assert store.migrate_json(str(tmp_path / "nope.json")) == 0
+        assert not os.path.exists(tmp_path / "nope.json.migrated")
@@ -0,0 +1,179 @@
+"""
+Tests for src/controller/session_timeline.py
+
+Sessions are written into tmp_path by hand in the exported layout: a camera
+with two segments, a microphone with ANCHOR sidecars, and TTL, shock and
+sound event CSVs in the formats the modules write.
+"""
+
+import csv
+import math
+
+import numpy as np
+import pytest
+
+import src.controller.session_timeline as session_timeline
+from src.controller.session_timeline import (
+    SessionTimeline,
+    discover_streams,
+    index_session,
+    load_or_index,
+    read_audio_sidecar,
+)
+
+T0 = 1_780_000_000_000_000_000      # epoch ns
+FRAME_NS = 100_000_000              # 10 fps
+
+
+def _camera(module_dir, seg, start_ns, frames, drop_after=None):
+    stem = module_dir / f"s_cam1_({seg}_20260703-0900{seg:02d})"
+    (module_dir / f"{stem.name}.ts").write_bytes(b"")
+    with open(f"{stem}_timestamps.csv", "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["frame_id", "timestamp_ns", "dropped_before"])
+        t = start_ns
+        for i in range(frames):
+            out.writerow([i, t, 2 if i and i - 1 == drop_after else 0])
+            t += FRAME_NS * (3 if i == drop_after else 1)
+
+
+def _mic(module_dir, seg, start_s, samples, rate):
+    stem = f"s_mic1_({seg}_20260703-0900{seg:02d})"
+    (module_dir / f"{stem}.flac").write_bytes(b"")
+    with open(module_dir / f"{stem}_timestamps.txt", "w") as f:
+        f.write(f"START_AT {start_s}\nSTARTED {start_s}\nSAMPLE_RATE 1000\n")
+        for idx in range(0, samples + 1, 1000):
+            f.write(f"ANCHOR {idx} {start_s + idx / rate:.9f}\n")
+        f.write(f"SAMPLES {samples}\nRATE_ESTIMATE {rate} RESIDUAL_US 10.0\n")
+
+
+@pytest.fixture
+def session(tmp_path):
+    date_dir = tmp_path / "s" / "20260703"
+    cam = date_dir / "camera_1"
+    cam.mkdir(parents=True)
+    _camera(cam, 0, T0, 10, drop_after=4)
+    _camera(cam, 1, T0 + 2_000_000_000, 10)
+
+    mic = date_dir / "mic_1"
+    mic.mkdir()
+    _mic(mic, 0, T0 / 1e9, 2000, 1000.0)
+    _mic(mic, 1, T0 / 1e9 + 2.5, 2000, 1000.5)
+
+    ttl = date_dir / "ttl_1"
+    ttl.mkdir()
+    with open(ttl / "s_ttl1_(0_20260703-090000)_events.csv", "w") as f:
+        f.write("Timestamp_nanoseconds,pin_number,pin_mode,pin_state,pin_description\n")
+        f.write(f"{T0 + 300_000_000},17,input,TTLValue.HIGH,sync\n")
+        f.write(f"{T0 + 310_000_000},17,input,TTLValue.LOW,sync\n")
+        f.write(f"{T0 + 305_000_000},27,output,TTLValue.HIGH,LED\n")
+
+    apa = date_dir / "apa_1"
+    apa.mkdir()
+    with open(apa / "s_apa1_(0_20260703-090000)_shock_events.csv", "w") as f:
+        f.write("# Shock Events Recording\n#\nTimestamp_nanoseconds, event, rotation speed (rpm)\n")
+        f.write(f"{T0 + 302_000_000},SENDING_SHOCK,1.5\n")
+        f.write(f"{T0 + 900_000_000},STOPPING_SHOCK,nan\n")
+
+    sound = date_dir / "sound_1"
+    sound.mkdir()
+    with open(sound / "s_sound1_sound_events_(0_20260703-090000).csv", "w") as f:
+        f.write("# Sound Events Recording\n#\nTimestamp (ns), sound played, volume factor, duration (s)\n")
+        f.write(f"{T0 + 308_000_000},tone.wav,0.8,0.5\n")
+    (sound / "s_sound1_health_metadata_(0_20260703-090000).csv").write_text("timestamp,cpu_temp\n1,2\n")
+    return tmp_path / "s"
+
+
+def test_discover_streams(session):
+    streams = discover_streams(str(session))
+    assert {name: kind for name, (kind, _) in streams.items()} == {
+        "apa_1": "events", "camera_1": "video", "mic_1": "audio",
+        "sound_1": "events", "ttl_1": "events",
+    }
+    assert [f.split("/")[-1] for f in streams["camera_1"][1]] == [
+        "s_cam1_(0_20260703-090000)_timestamps.csv", "s_cam1_(1_20260703-090001)_timestamps.csv",
+    ]
+
+
+class TestQueries:
+
+    def test_frames_across_segments(self, session):
+        timeline = index_session(str(session))
+        video = timeline.video["camera_1"]
+        assert len(video.timestamps) == 20
+        assert video.segment_starts.tolist() == [0, 10]
+        assert int(video.dropped_before.sum()) == 2
+
+        frame = timeline.frame_at("camera_1", T0 + 2_140_000_000)
+        assert frame.file.endswith("s_cam1_(1_20260703-090001).ts")
+        assert (frame.index, frame.timestamp_ns) == (1, T0 + 2_100_000_000)
+        # Vectorised, with a gap where camera_1 dropped frames
+        idx = timeline.frames_nearest("camera_1", [T0 + 550_000_000, T0 + 680_000_000],
+                                      gap_factor=0.5)
+        assert idx.tolist() == [-1, 5]
+        assert timeline.frame_at("camera_1", T0 + 550_000_000, gap_factor=0.5) is None
+
+    def test_audio_range_spans_segments(self, session):
+        timeline = index_session(str(session))
+        spans = timeline.audio_range("mic_1", T0 + 1_500_000_000, T0 + 3_000_000_000)
+        assert [(s.file.split("/")[-1][:9], s.start, s.stop) for s in spans] == [
+            ("s_mic1_(0", 1500, 2000), ("s_mic1_(1", 0, 500),
+        ]
+        assert spans[1].start_ns == T0 + 2_500_000_000
+        # Between anchors the fitted rate is used, not the nominal one
+        (late,) = timeline.audio_range("mic_1", T0 + 4_000_000_000, T0 + 4_500_000_000)
+        assert late.start == math.floor(1.5 * 1000.5)
+        assert timeline.audio_range("mic_1", T0 + 9_000_000_000, T0 + 10_000_000_000) == []
+
+    def test_events_window(self, session):
+        timeline = index_session(str(session))
+        events = timeline.events(T0 + 300_000_000, T0 + 310_000_000)
+        assert [(e.stream, e.label, e.key) for e in events] == [
+            ("ttl_1", "TTLValue.HIGH", 17), ("apa_1", "SENDING_SHOCK", 0),
+            ("ttl_1", "TTLValue.HIGH", 27), ("sound_1", "tone.wav", 0),
+        ]
+        assert events[1].value == 1.5 and events[3].value == 0.8
+        assert math.isnan(events[0].value)
+        assert timeline.event_streams["ttl_1"].key_labels == {"17": "sync", "27": "LED"}
+        assert timeline.event_streams["ttl_1"].key_modes == {"17": "input", "27": "output"}
+        assert [e.stream for e in timeline.events(T0, T0 + 10**9, streams=["apa_1"])] == ["apa_1"] * 2
+
+
+class TestStorage:
+
+    def test_round_trip(self, session):
+        timeline = index_session(str(session))
+        path = timeline.save()
+        loaded = SessionTimeline.load(str(session), path)
+        assert loaded.sources == timeline.sources
+        for name, stream in timeline.streams.items():
+            other = loaded.streams[name]
+            assert (other.kind, other.files) == (stream.kind, stream.files)
+            for col in stream.ARRAYS:
+                assert np.array_equal(getattr(other, col), getattr(stream, col), equal_nan=True)
+        assert loaded.event_streams["ttl_1"].labels == timeline.event_streams["ttl_1"].labels
+
+    def test_only_changed_streams_are_reparsed(self, session, monkeypatch):
+        load_or_index(str(session))
+        built = []
+        real = session_timeline.build_stream
+        monkeypatch.setattr(session_timeline, "build_stream",
+                            lambda d, name, *a: built.append(name) or real(d, name, *a))
+
+        load_or_index(str(session))
+        assert built == []
+
+        with open(next(session.glob("*/ttl_1/*_events.csv")), "a") as f:
+            f.write(f"{T0 + 5_000_000_000},17,input,TTLValue.HIGH,sync\n")
+        timeline = load_or_index(str(session))
+        assert built == ["ttl_1"]
+        assert len(timeline.event_streams["ttl_1"].timestamps) == 4
+        assert len(SessionTimeline.load(str(session)).event_streams["ttl_1"].timestamps) == 4
+
+
+def test_legacy_audio_sidecar(tmp_path):
+    path = tmp_path / "old_timestamps.txt"
+    path.write_text("START_AT 100.0\nSTARTED 100.25\n100.9\n101.6\n")
+    assert read_audio_sidecar(str(path), 48000) == {
+        "anchors": [(0, 100_250_000_000)], "rate": 48000, "samples": None,
+    }
@@ -0,0 +1,155 @@
+"""
+Tests for src/controller/update_distribution.py
+
+Rollouts are driven with pump(now=...) and a fake clock rather than the
+background ticker; send_command and emit are plain recorders.
+"""
+
+import pytest
+
+from src.controller.update_distribution import TransferLimiter, UpdateRollout
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return _Clock()
+
+
+def _rollout(clock, modules=("m1", "m2", "m3", "m4"), **kwargs):
+    sent, summaries, finished = [], [], []
+    kwargs.setdefault("max_parallel", 2)
+    kwargs.setdefault("stagger_s", 0.0)
+    rollout = UpdateRollout(
+        modules, "http://10.0.0.1:5000",
+        lambda mid, cmd, params: sent.append((mid, cmd, params)),
+        emit=summaries.append, on_finished=finished.append, clock=clock, **kwargs,
+    )
+    return rollout, sent, summaries, finished
+
+
+# ---------------------------------------------------------------------------
+# TransferLimiter
+# ---------------------------------------------------------------------------
+
+class TestTransferLimiter:
+
+    def test_slots(self):
+        limiter = TransferLimiter(max_concurrent=2)
+        assert limiter.try_acquire() and limiter.try_acquire()
+        assert not limiter.try_acquire()
+        limiter.release()
+        assert limiter.try_acquire()
+        assert limiter.active == 2
+
+    def test_throttle_sleeps_off_the_deficit(self, clock):
+        sleeps = []
+        limiter = TransferLimiter(rate_bytes_per_s=1000, clock=clock, sleep=sleeps.append)
+        limiter.throttle(1000)   # the initial one-second bucket covers this
+        limiter.throttle(500)
+        assert sleeps == [0.5]
+        clock.now += 10          # idle time refills at most one second's worth
+        list(limiter.limited([b"x" * 1500]))
+        assert sleeps == [0.5, 0.5]
+
+    def test_unlimited_rate_never_sleeps(self):
+        limiter = TransferLimiter(rate_bytes_per_s=0, sleep=lambda s: pytest.fail("slept"))
+        assert list(limiter.limited([b"a" * 10_000_000])) == [b"a" * 10_000_000]
+
+
+# ---------------------------------------------------------------------------
+# UpdateRollout
+# ---------------------------------------------------------------------------
+
+class TestRolloutDispatch:
+
+    def test_waves_limited_by_fetching_modules(self, clock):
+        rollout, sent, _, _ = _rollout(clock)
+        assert rollout.pump() == 2
+        assert [m for m, _, _ in sent] == ["m1", "m2"]
+        assert rollout.pump() == 0
+
+        rollout.on_progress("m1", {"stage": "fetching", "done": 3, "total": 10})
+        assert rollout.pump() == 0   # still holding its slot
+        rollout.on_progress("m1", {"stage": "applying"})
+        assert [m for m, _, _ in sent] == ["m1", "m2", "m3"]
+
+    def test_stagger_spaces_dispatches(self, clock):
+        rollout, sent, _, _ = _rollout(clock, max_parallel=4, stagger_s=5.0)
+        assert rollout.pump() == 1
+        clock.now += 4
+        assert rollout.pump() == 0
+        clock.now += 1
+        assert rollout.pump() == 1
+
+    def test_later_waves_get_serving_peers(self, clock):
+        rollout, sent, _, _ = _rollout(clock, max_parallel=1, serve_peers_s=60)
+        rollout.pump()
+        assert sent[0][2] == {"controller_url": "http://10.0.0.1:5000", "serve_peers_s": 60}
+        rollout.on_progress("m1", {"stage": "serving", "peer_url": "http://10.0.0.11:8765"})
+        assert sent[1][2]["peers"] == ["http://10.0.0.11:8765"]
+
+    def test_last_module_is_not_asked_to_serve(self, clock):
+        rollout, sent, _, _ = _rollout(clock, modules=["m1"], serve_peers_s=60)
+        rollout.pump()
+        assert sent == [("m1", "update_saviour", {"controller_url": "http://10.0.0.1:5000"})]
+
+
+class TestRolloutCompletion:
+
+    def test_finishes_once_every_module_acks(self, clock):
+        rollout, _, summaries, finished = _rollout(clock, modules=["m1", "m2"])
+        rollout.pump()
+        rollout.on_ack("m1", True)
+        assert finished == []
+        rollout.on_ack("m2", False, "rsync failed")
+        assert rollout.finished
+        assert finished[0]["counts"] == {"done": 1, "failed": 1}
+        assert summaries[-1]["modules"]["m2"]["detail"] == "rsync failed"
+        assert not summaries[-1]["active"]
+
+    def test_no_modules_finishes_immediately(self, clock):
+        rollout, sent, _, finished = _rollout(clock, modules=[])
+        rollout.start()
+        assert sent == [] and len(finished) == 1
+
+    def test_stalled_module_times_out_and_frees_slot(self, clock):
+        rollout, sent, _, _ = _rollout(clock, max_parallel=1, module_timeout_s=60)
+        rollout.pump()
+        clock.now += 61
+        rollout.pump()
+        state = rollout.summary()["modules"]["m1"]
+        assert state["stage"] == "failed" and "timed out" in state["detail"]
+        assert [m for m, _, _ in sent] == ["m1", "m2"]
+
+    def test_send_failure_marks_module_failed(self, clock):
+        def boom(mid, cmd, params):
+            raise RuntimeError("no route")
+        rollout = UpdateRollout(["m1"], "http://c", boom, clock=clock)
+        rollout.pump()
+        assert rollout.summary()["modules"]["m1"]["stage"] == "failed"
+        rollout.pump()
+        assert rollout.finished
+
+    def test_add_requeues_until_finished(self, clock):
+        rollout, sent, _, _ = _rollout(clock, modules=["m1"])
+        rollout.pump()
+        assert rollout.add("m9")
+        rollout.pump()
+        assert [m for m, _, _ in sent] == ["m1", "m9"]
+        rollout.on_ack("m1", True)
+        rollout.on_ack("m9", True)
+        assert not rollout.add("m1")
+
+    def test_unknown_modules_and_stages_ignored(self, clock):
+        rollout, _, summaries, _ = _rollout(clock, modules=["m1"])
+        rollout.on_progress("stranger", {"stage": "fetching"})
+        rollout.on_progress("m1", {"stage": "bogus"})
+        assert summaries == []
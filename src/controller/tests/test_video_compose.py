@@ -0,0 +1,221 @@
+"""
+Tests for src/controller/video_compose.py
+
+Sessions are a couple of tiny solid-colour mp4v streams written with
+OpenCV into tmp_path. The ffmpeg writer is pointed at small shell scripts
+standing in for the ffmpeg binary, since only the pipe handling is ours.
+"""
+
+import csv
+import os
+import stat
+
+import cv2
+import numpy as np
+import pytest
+
+from src.controller.video_compose import (
+    CameraStream,
+    FramePlan,
+    _FfmpegWriter,
+    _nearest_frames,
+    _StreamDecoder,
+    build_frame_plan,
+    compose_session_video,
+    discover_camera_streams,
+)
+
+RED, BLUE = (0, 0, 255), (255, 0, 0)
+
+
+def _stream(date_dir, name, colour, frames=12, fps=10, start_ns=0):
+    module_dir = os.path.join(date_dir, name)
+    os.makedirs(module_dir)
+    writer = cv2.VideoWriter(os.path.join(module_dir, f"{name}.mp4"),
+                             cv2.VideoWriter_fourcc(*"mp4v"), fps, (64, 48))
+    with open(os.path.join(module_dir, f"{name}_timestamps.csv"), "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["frame_id", "timestamp_ns"])
+        for i in range(frames):
+            writer.write(np.full((48, 64, 3), colour, np.uint8))
+            out.writerow([i, start_ns + i * 1_000_000_000 // fps])
+    writer.release()
+
+
+@pytest.fixture
+def session(tmp_path):
+    date_dir = str(tmp_path / "sess" / "20260101")
+    _stream(date_dir, "cam1", RED)
+    _stream(date_dir, "cam2", BLUE, start_ns=20_000_000)
+    return date_dir
+
+
+def _script(tmp_path, body):
+    path = tmp_path / "fake-ffmpeg"
+    path.write_text(f"#!/bin/sh\n{body}\n")
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+def test_compose_fills_tiles_and_reports_stages(session, tmp_path):
+    out = str(tmp_path / "out.mp4")
+    stats = {}
+    compose_session_video(session, out, fps=10, encoder="opencv", queue_size=2, stats=stats)
+
+    cap = cv2.VideoCapture(out)
+    ok, frame = cap.read()
+    assert ok
+    assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == stats["frames"] == 10
+    cap.release()
+    # Grid of two 960x540 panes; sample below the name label
+    left, right = frame[300, 480].astype(int), frame[300, 1440].astype(int)
+    assert left[2] > 200 and left[0] < 60
+    assert right[0] > 200 and right[2] < 60
+    assert set(stats["decode_fps"]) == {"cam1", "cam2"}
+    assert stats["compose_fps"] and stats["encode_fps"]
+
+
+@pytest.mark.parametrize("layout, size", [("side", (1920, 540)), ("stack", (960, 1080))])
+def test_strip_layouts(session, tmp_path, layout, size):
+    out = str(tmp_path / f"{layout}.mp4")
+    compose_session_video(session, out, layout=layout, fps=10, encoder="opencv")
+    cap = cv2.VideoCapture(out)
+    assert (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))) == size
+    ok, frame = cap.read()
+    cap.release()
+    # Second pane is to the right of (side) or below (stack) the first
+    second = frame[300, 1440] if layout == "side" else frame[800, 480]
+    assert second[0] > 200 and second[2] < 60
+
+
+def _numbered_stream(tmp_path, frames=25):
+    """Frame i is a flat grey of value 10*i, so decoded frames identify
+    themselves (mp4v shifts flat greys by a few levels)."""
+    path = str(tmp_path / "numbered.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 10, (64, 48))
+    for i in range(frames):
+        writer.write(np.full((48, 64, 3), 10 * i, np.uint8))
+    writer.release()
+    return CameraStream("num", path, "")
+
+
+class TestFramePlan:
+
+    def test_nearest_frame_holds_and_gaps(self):
+        ts = np.array([0, 100, 200, 300, 900, 1000], dtype=np.int64)
+        ticks = np.arange(0, 1000, 50, dtype=np.int64)
+        idx = _nearest_frames(ts, ticks, gap_factor=2.0)
+        # Ties go to the later frame, as stepping forward through frames did
+        assert idx[:5].tolist() == [0, 1, 1, 2, 2]
+        # 300 is held until ticks get > 200 ns (2 median intervals) from
+        # any frame, then there's a gap until 900 is close enough
+        assert idx[6:15].tolist() == [3, 3, 3, 3, 3, -1, -1, -1, 4]
+        assert idx[-1] == 5
+        assert _nearest_frames(ts, ticks, gap_factor=None).min() == 0
+
+    def test_build_and_round_trip(self, session, tmp_path):
+        plan = build_frame_plan(discover_camera_streams(session), fps=10)
+        assert plan.n_out == 10
+        assert plan.row("cam1").tolist() == list(range(10))
+        # cam2 starts 20 ms later, so its frames sit just after each tick
+        assert plan.row("cam2").tolist() == list(range(10))
+        assert plan.summary()["cam1"] == {"frames": 10, "holds": 0, "gaps": 0}
+
+        path = str(tmp_path / "plan.npz")
+        plan.save(path)
+        loaded = FramePlan.load(path)
+        assert loaded.streams == plan.streams
+        assert loaded.t_start_ns == plan.t_start_ns
+        assert np.array_equal(loaded.indices, plan.indices)
+
+    def test_reused_plan_drives_render(self, session, tmp_path):
+        plan = build_frame_plan(discover_camera_streams(session), fps=5)
+        stats = {}
+        compose_session_video(None, str(tmp_path / "o.mp4"), encoder="opencv",
+                              plan=plan, stats=stats)
+        assert stats["frames"] == plan.n_out == 5
+        # 10 fps sources on a 5 fps grid: every other frame is grab()bed past
+        assert stats["skipped_frames"]["cam1"] >= 4
+
+
+class TestStreamDecoder:
+
+    def test_delivers_only_wanted_frames(self, tmp_path):
+        stream = _numbered_stream(tmp_path)
+        decoder = _StreamDecoder(stream, np.array([0, 3, 4, 22]), seek_threshold=10)
+        got = []
+        while (item := decoder.get()) is not None:
+            got.append((item[0], round(item[1].mean() / 10)))
+        assert got == [(0, 0), (3, 3), (4, 4), (22, 22)]
+        assert (decoder.seeks, decoder.skipped) == (1, 2)
+
+    def test_ts_streams_never_seek(self, tmp_path):
+        stream = _numbered_stream(tmp_path)
+        # mp4 content under a .ts name: the extension alone rules out seeking
+        ts_path = str(tmp_path / "numbered.ts")
+        os.rename(stream.video_path, ts_path)
+        decoder = _StreamDecoder(CameraStream("num", ts_path, ""), np.array([20]), seek_threshold=1)
+        item = decoder.get()
+        assert decoder.seeks == 0
+        assert item[0] == 20
+        assert round(item[1].mean() / 10) == 20
+
+    def test_overshooting_seek_disables_seeking(self, tmp_path, monkeypatch):
+        real_capture = cv2.VideoCapture
+        seeks = []
+
+        class OvershootingCapture:
+            """Lands a few frames past every seek, as inaccurate demuxers do."""
+
+            def __init__(self, path):
+                self.cap = real_capture(path)
+
+            def set(self, prop, value):
+                seeks.append(value)
+                return self.cap.set(prop, value + 3)
+
+            def __getattr__(self, name):
+                return getattr(self.cap, name)
+
+        monkeypatch.setattr(cv2, "VideoCapture", OvershootingCapture)
+        decoder = _StreamDecoder(_numbered_stream(tmp_path), np.array([8, 16, 24]), seek_threshold=3)
+        got = []
+        while (item := decoder.get()) is not None:
+            got.append((item[0], round(item[1].mean() / 10)))
+        assert got == [(8, 8), (16, 16), (24, 24)]
+        # One attempt, then forward from the start: no rewind per jump
+        assert seeks == [8]
+        assert not decoder.seekable
+        assert decoder.skipped == 8 + 7 + 7
+
+    def test_close_does_not_hang(self, tmp_path):
+        decoder = _StreamDecoder(_numbered_stream(tmp_path), np.arange(25), queue_size=1)
+        assert decoder.get() is not None
+        decoder.close()
+        assert not decoder._thread.is_alive()
+
+
+class TestFfmpegWriter:
+
+    def test_pipes_raw_frames_and_builds_command(self, tmp_path):
+        raw = tmp_path / "raw.bin"
+        writer = _FfmpegWriter(str(tmp_path / "o.mp4"), (4, 2), 30, codec="libsvtav1",
+                               ffmpeg=_script(tmp_path, f"cat > {raw}"))
+        frame = np.arange(24, dtype=np.uint8).reshape(2, 4, 3)
+        writer.write(frame)
+        writer.write(frame)
+        writer.release()
+
+        assert raw.read_bytes() == frame.tobytes() * 2
+        cmd = writer.cmd
+        assert cmd[cmd.index("-s") + 1] == "4x2"
+        assert cmd[cmd.index("-c:v") + 1] == "libsvtav1"
+        assert cmd[cmd.index("-preset") + 1] == "10"
+
+    def test_failure_surfaces_stderr(self, tmp_path):
+        writer = _FfmpegWriter(str(tmp_path / "o.mp4"), (4, 2), 30,
+                               ffmpeg=_script(tmp_path, "echo 'Unknown encoder' >&2; exit 1"))
+        with pytest.raises(RuntimeError, match="Unknown encoder"):
+            for _ in range(10000):
+                writer.write(np.zeros((2, 4, 3), np.uint8))
+            writer.release()
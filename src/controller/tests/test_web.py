@@ -9,11 +9,13 @@ reboot/shutdown, timedatectl) is deliberately out of scope -- that needs
 subprocess mocked too and belongs in a separate test module.
 """
 
+import hashlib
 import io
+import json
 import os
-import queue
 import re
 import tempfile
+import time
 import zipfile
 from unittest.mock import MagicMock, patch
 
@@ -21,7 +23,6 @@ from src.controller.recording import RecordingSession
 from src.controller.web import (
     Web,
     _filter_private_keys,
-    _QueueStream,
     _sanitise_config_dict,
 )
 
@@ -105,24 +106,6 @@ class TestAdminPassword:
             assert web._get_or_create_admin_password() == password
 
 
-class TestQueueStream:
-    def test_write_feeds_bytes_into_queue_in_order(self):
-        q = queue.SimpleQueue()
-        stream = _QueueStream(q)
-
-        stream.write(b"hello ")
-        stream.write(b"world")
-
-        assert q.get() == b"hello "
-        assert q.get() == b"world"
-
-    def test_writable_but_not_seekable_or_readable(self):
-        stream = _QueueStream(queue.SimpleQueue())
-        assert stream.writable() is True
-        assert stream.seekable() is False
-        assert stream.readable() is False
-
-
 # ---------------------------------------------------------------------------
 # Tier 2: plain HTTP routes, no facade required
 # ---------------------------------------------------------------------------
@@ -240,6 +223,65 @@ class TestDownloadSessionZip:
                 assert zf.namelist() == ["data.txt"]
                 assert zf.read("data.txt") == b"recorded data"
 
+    def _session_with_modules(self, tmpdir):
+        files = {
+            "session_events.log": b"log",
+            "20260101/camera_aa/a.mp4": os.urandom(5000),
+            "20260101/mic_bb/a.flac": os.urandom(3000),
+        }
+        for rel, data in files.items():
+            path = os.path.join(tmpdir, "session1", rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        return _make_web(**{"export.mount_path": tmpdir}), files
+
+    def test_content_length_and_resume_with_range(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, files = self._session_with_modules(tmpdir)
+            client = web.app.test_client()
+            full = client.get("/api/sessions/session1/download")
+            assert full.headers["Accept-Ranges"] == "bytes"
+            assert int(full.headers["Content-Length"]) == len(full.data)
+
+            # A second client resumes part-way through the first file's data
+            cut = 2000
+            rest = web.app.test_client().get(
+                "/api/sessions/session1/download",
+                headers={"Range": f"bytes={cut}-", "If-Range": full.headers["ETag"]},
+            )
+            assert rest.status_code == 206
+            assert rest.headers["Content-Range"] == f"bytes {cut}-{len(full.data) - 1}/{len(full.data)}"
+            assert full.data[:cut] + rest.data == full.data
+            with zipfile.ZipFile(io.BytesIO(full.data)) as zf:
+                assert zf.testzip() is None
+                assert zf.read("20260101/mic_bb/a.flac") == files["20260101/mic_bb/a.flac"]
+
+    def test_stale_if_range_returns_whole_archive(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, _ = self._session_with_modules(tmpdir)
+            resp = web.app.test_client().get(
+                "/api/sessions/session1/download",
+                headers={"Range": "bytes=10-", "If-Range": '"stale"'},
+            )
+            assert resp.status_code == 200
+
+    def test_unsatisfiable_range_returns_416(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, _ = self._session_with_modules(tmpdir)
+            resp = web.app.test_client().get(
+                "/api/sessions/session1/download", headers={"Range": "bytes=99999999-"},
+            )
+            assert resp.status_code == 416
+
+    def test_module_subset_keeps_session_level_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, _ = self._session_with_modules(tmpdir)
+            resp = web.app.test_client().get("/api/sessions/session1/download?modules=mic_bb")
+            assert "session1_subset.zip" in resp.headers["Content-Disposition"]
+            with zipfile.ZipFile(io.BytesIO(resp.data)) as zf:
+                assert zf.namelist() == ["session_events.log", "20260101/mic_bb/a.flac"]
+
 
 # ---------------------------------------------------------------------------
 # Tier 3: Socket.IO event handlers -- self.facade mocked, no real modules
@@ -248,10 +290,12 @@ class TestDownloadSessionZip:
 def _make_web_with_facade(**config_overrides):
     """A Web instance with a MagicMock facade wired up. get_modules() must
     return a real dict (not a bare MagicMock) since handle_connect iterates
-    it as soon as a client connects."""
+    it as soon as a client connects. The share path is a real temporary
+    directory, not a MagicMock that would resolve relative to the cwd."""
     web = _make_web(**config_overrides)
     facade = MagicMock()
     facade.get_modules.return_value = {}
+    facade.get_share_path.return_value = tempfile.mkdtemp()
     web.facade = facade
     return web, facade
 
@@ -339,6 +383,360 @@ class TestReadOnlySocketIOHandlers:
         }
 
 
+class TestSessionLogSubscription:
+    """get_session_log / subscribe_session_log against a real log file. The
+    watcher task is not started; tests call push_session_log_updates()."""
+
+    def _setup(self, tmpdir, lines=3):
+        web, _ = _make_web_with_facade(**{"export.mount_path": tmpdir})
+        os.makedirs(os.path.join(tmpdir, "sess1"))
+        path = os.path.join(tmpdir, "sess1", "session_events.log")
+        with open(path, "w") as f:
+            f.writelines(f"line {i}\n" for i in range(lines))
+        web.socketio.start_background_task = MagicMock()
+        return web, path
+
+    def test_get_session_log_returns_tail(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, _ = self._setup(tmpdir, lines=250)
+            client = _connected_client(web)
+
+            client.emit("get_session_log", {"session_name": "sess1"})
+
+            payload = client.get_received()[0]["args"][0]
+            assert payload["truncated"] is True
+            assert payload["lines"][0] == "line 50"
+            assert payload["lines"][-1] == "line 249"
+
+    def test_filtered_log_comes_from_the_event_index(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, _ = self._setup(tmpdir)
+            with open(os.path.join(tmpdir, "sess1", "session_events.jsonl"), "w") as f:
+                for i, level in enumerate(["INFO", "ERROR", "INFO", "ERROR"]):
+                    f.write(json.dumps({"ts": 1775894400 + i, "level": level,
+                                        "module": f"cam{i % 2}", "message": f"event {i}"}) + "\n")
+            client = _connected_client(web)
+
+            client.emit("get_session_log", {"session_name": "sess1", "levels": ["ERROR"]})
+
+            payload = client.get_received()[0]["args"][0]
+            assert [line.split("] ")[1] for line in payload["lines"]] == ["event 1", "event 3"]
+            assert payload["total"] == 2 and payload["truncated"] is False
+            assert web._event_index.select(
+                os.path.join(tmpdir, "sess1", "session_events.jsonl"), module_id="cam0")[1] == 2
+
+    def test_subscriber_receives_appended_lines(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, path = self._setup(tmpdir)
+            client = _connected_client(web)
+            client.emit("subscribe_session_log", {"session_name": "sess1"})
+            received = client.get_received()
+            assert received[0]["name"] == "session_log_response"
+            assert received[0]["args"][0]["lines"] == ["line 0", "line 1", "line 2"]
+            web.socketio.start_background_task.assert_called_once()
+
+            with open(path, "a") as f:
+                f.write("line 3\nline 4\n")
+            assert web.push_session_log_updates() == 1
+
+            received = client.get_received()
+            assert received[0]["name"] == "session_log_append"
+            assert received[0]["args"][0] == {"session_name": "sess1", "lines": ["line 3", "line 4"]}
+            assert web.push_session_log_updates() == 0
+
+    def test_late_subscriber_snapshot_stops_where_pushes_resume(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, path = self._setup(tmpdir)
+            a, b = _connected_client(web), _connected_client(web)
+            a.emit("subscribe_session_log", {"session_name": "sess1"})
+            a.get_received()
+
+            with open(path, "a") as f:
+                f.write("line 3\n")
+            b.emit("subscribe_session_log", {"session_name": "sess1"})
+            assert b.get_received()[0]["args"][0]["lines"] == ["line 0", "line 1", "line 2"]
+
+            web.push_session_log_updates()
+            for client in (a, b):
+                assert client.get_received()[0]["args"][0]["lines"] == ["line 3"]
+
+    def test_rotated_log_sends_full_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, path = self._setup(tmpdir)
+            client = _connected_client(web)
+            client.emit("subscribe_session_log", {"session_name": "sess1"})
+            client.get_received()
+
+            os.remove(path)
+            with open(path, "w") as f:
+                f.write("fresh\n")
+            web.push_session_log_updates()
+
+            received = client.get_received()
+            assert received[0]["name"] == "session_log_response"
+            assert received[0]["args"][0]["lines"] == ["fresh"]
+
+    def test_unsubscribe_and_disconnect_stop_pushes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, path = self._setup(tmpdir)
+            a, b = _connected_client(web), _connected_client(web)
+            a.emit("subscribe_session_log", {"session_name": "sess1"})
+            b.emit("subscribe_session_log", {"session_name": "sess1"})
+            a.get_received()
+            b.get_received()
+
+            a.emit("unsubscribe_session_log", {"session_name": "sess1"})
+            with open(path, "a") as f:
+                f.write("line 3\n")
+            web.push_session_log_updates()
+            assert a.get_received() == []
+            assert b.get_received()[0]["name"] == "session_log_append"
+
+            b.disconnect()
+            assert web._log_subs == {}
+
+    def test_subscribe_rejects_invalid_name(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, _ = self._setup(tmpdir)
+            client = _connected_client(web)
+
+            client.emit("subscribe_session_log", {"session_name": "../etc"})
+
+            assert client.get_received()[0]["args"][0]["error"] == "invalid name"
+            assert web._log_subs == {}
+
+
+class TestControllerHealth:
+    """get_controller_health answers from the sampler's cached snapshot;
+    subscribers get a full snapshot, then only changed keys. The sampler
+    thread is not started; tests call its on_sample callback directly."""
+
+    def _setup(self):
+        web, facade = _make_web_with_facade()
+        facade.get_uptime.return_value = 42.0
+        web._eth0_ip = ("10.0.0.5", time.monotonic())
+        return web
+
+    def test_get_controller_health_uses_cached_snapshot(self):
+        web = self._setup()
+        web._self_metrics.sample()
+        client = _connected_client(web)
+
+        with patch("src.controller.web.subprocess.run") as run:
+            client.emit("get_controller_health")
+        run.assert_not_called()
+
+        payload = client.get_received()[0]["args"][0]
+        assert payload["ip"] == "10.0.0.5"
+        assert payload["uptime"] == 42
+        for key in ("cpu_usage", "cpu_per_core", "memory_usage", "disk_used_pct", "threads", "net"):
+            assert key in payload
+
+    def test_subscriber_gets_snapshot_then_deltas(self):
+        web = self._setup()
+        web._self_metrics.sample()
+        client = _connected_client(web)
+
+        client.emit("subscribe_controller_health")
+        received = client.get_received()
+        assert received[0]["name"] == "controller_health_response"
+        assert len(received[0]["args"][0]["history"]) == 1
+
+        web._self_metrics.on_sample(None)
+        first = client.get_received()[0]
+        assert first["name"] == "controller_health_delta"
+        assert "memory_usage" in first["args"][0]
+
+        web._self_metrics.on_sample(None)
+        delta = client.get_received()[0]["args"][0]
+        assert "memory_usage" not in delta
+        assert set(delta) <= {"controller_time"}
+
+    def test_no_broadcast_without_subscribers(self):
+        web = self._setup()
+        a = _connected_client(web)
+        a.emit("subscribe_controller_health")
+        a.get_received()
+        a.emit("unsubscribe_controller_health")
+        web._self_metrics.snapshot = MagicMock()
+
+        web._self_metrics.on_sample(None)
+
+        web._self_metrics.snapshot.assert_not_called()
+        assert a.get_received() == []
+
+        a.emit("subscribe_controller_health")
+        a.disconnect()
+        assert web._health_subs == set()
+
+
+class TestSessionFileInfo:
+    """get_session_file_info / get_exported_recordings served from the file
+    index (a temp database over a temp share)."""
+
+    def _setup(self, tmpdir):
+        share = os.path.join(tmpdir, "share")
+        for rel, size in [("sess1/session_events.log", 5),
+                          ("sess1/20260101/camera_aa/a.mp4", 100),
+                          ("sess1/20260101/camera_aa/b.mp4", 100),
+                          ("sess1/20260101/mic_bb/a.flac", 50)]:
+            path = os.path.join(share, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(b"x" * size)
+        web, _ = _make_web_with_facade(**{"export.mount_path": share})
+        web._FILE_INDEX_DB = os.path.join(tmpdir, "file_index.db")
+        return web, share
+
+    def test_first_request_indexes_session_and_pages(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, _ = self._setup(tmpdir)
+            client = _connected_client(web)
+
+            client.emit("get_session_file_info", {"session_name": "sess1", "offset": 1, "limit": 2})
+
+            payload = client.get_received()[0]["args"][0]
+            assert payload["file_count"] == 4
+            assert payload["total_bytes"] == 255
+            assert payload["modules"] == {
+                "camera_aa": {"file_count": 2, "total_bytes": 200},
+                "mic_bb": {"file_count": 1, "total_bytes": 50},
+            }
+            assert [f["path"] for f in payload["files"]] == [
+                "20260101/camera_aa/b.mp4", "20260101/mic_bb/a.flac",
+            ]
+
+    def test_export_complete_reindexes_in_background(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, share = self._setup(tmpdir)
+            client = _connected_client(web)
+            client.emit("get_session_file_info", {"session_name": "sess1", "limit": 0})
+            client.get_received()
+            with open(os.path.join(share, "sess1/20260101/camera_aa/c.mp4"), "wb") as f:
+                f.write(b"x" * 10)
+
+            web.on_export_complete("sess1/20260101/camera_aa")
+            web._file_index.settle = 0.0
+            web._file_index.process_pending()
+            client.emit("get_session_file_info", {"session_name": "sess1", "limit": 0})
+
+            payload = client.get_received()[0]["args"][0]
+            assert payload["file_count"] == 5
+            assert payload["files"] == []
+
+    def test_exported_recordings_lists_recording_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, _ = self._setup(tmpdir)
+            web.NAS_MOUNT_POINT = os.path.join(tmpdir, "nas")
+            web.mount_nas = MagicMock(return_value=False)
+
+            recordings = web.get_exported_recordings(offset=1)
+
+            assert [r["filename"] for r in recordings] == ["controller/sess1/20260101/camera_aa/b.mp4"]
+            assert recordings[0]["size"] == 100
+
+
+class TestSessionProxies:
+    """/proxies lists a session's videos and queues missing proxies; the
+    proxy and sprite routes serve the rendered files with Range support."""
+
+    def _setup(self, tmpdir):
+        import cv2
+        import numpy as np
+
+        share = os.path.join(tmpdir, "share")
+        camera = os.path.join(share, "sess1", "20260101", "camera_aa")
+        os.makedirs(camera)
+        writer = cv2.VideoWriter(os.path.join(camera, "a.mp4"), cv2.VideoWriter_fourcc(*"mp4v"), 30, (64, 48))
+        for i in range(30):
+            writer.write(np.full((48, 64, 3), i * 8, np.uint8))
+        writer.release()
+        web = _make_web(**{"export.mount_path": share})
+        web._FILE_INDEX_DB = os.path.join(tmpdir, "file_index.db")
+        web._PROXY_CACHE_DIR = os.path.join(tmpdir, "proxies")
+        web._get_proxy_worker().load = lambda: 0.0
+        return web
+
+    def test_listing_queues_then_serves_ranges(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web = self._setup(tmpdir)
+            client = web.app.test_client()
+
+            videos = client.get("/api/sessions/sess1/proxies").get_json()["videos"]
+            assert [(v["path"], v["status"]) for v in videos] == [("20260101/camera_aa/a.mp4", "pending")]
+            assert client.get("/api/sessions/sess1/proxy/20260101/camera_aa/a.mp4").status_code == 404
+
+            assert web._proxy_worker.process_pending() == 1
+            (video,) = client.get("/api/sessions/sess1/proxies").get_json()["videos"]
+            assert video["status"] == "ready"
+            assert video["sprite"]["thumbnails"][0]["frame"] == 0
+
+            resp = client.get(video["proxy_url"], headers={"Range": "bytes=0-99"})
+            try:
+                assert resp.status_code == 206
+                assert resp.mimetype == "video/mp4"
+                assert resp.headers["Content-Range"].startswith("bytes 0-99/")
+                assert len(resp.data) == 100
+            finally:
+                resp.close()
+            resp = client.get(video["sprite_url"])
+            try:
+                assert resp.status_code == 200
+                assert resp.mimetype == "image/jpeg"
+            finally:
+                resp.close()
+
+    def test_rejects_bad_names_and_traversal(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            client = self._setup(tmpdir).app.test_client()
+            assert client.get("/api/sessions/bad!name/proxies").status_code == 400
+            assert client.get("/api/sessions/sess1/sprite/../../../etc/passwd").status_code in (403, 404)
+            assert client.get("/api/sessions/sess1/proxy/..%2F..%2Fx").status_code in (403, 404)
+
+
+class TestRetention:
+    """get_retention_report is a dry run anyone may see; run_retention
+    needs a login."""
+
+    def _setup(self, tmpdir):
+        video = os.path.join(tmpdir, "share", "sess1", "20260101", "camera_aa", "a.ts")
+        os.makedirs(os.path.dirname(video))
+        with open(video, "wb") as f:
+            f.write(b"x" * 100)
+        os.utime(video, (time.time() - 90 * 86400,) * 2)
+        web, facade = _make_web_with_facade(**{"export.mount_path": os.path.join(tmpdir, "share")})
+        facade.get_recording_sessions.return_value = {}
+        web._FILE_INDEX_DB = os.path.join(tmpdir, "file_index.db")
+        web.NAS_MOUNT_POINT = os.path.join(tmpdir, "nas")
+        return web, video
+
+    def test_report_holds_exports_not_on_record(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, video = self._setup(tmpdir)
+            web._get_file_index().refresh("share")
+            client = _connected_client(web)
+
+            client.emit("get_retention_report")
+
+            (msg,) = client.get_received()
+            assert msg["name"] == "retention_report"
+            report = msg["args"][0]
+            assert report["dry_run"] and not report["enabled"]
+            assert report["actions"] == []
+            assert [h["path"] for h in report["held"]] == ["sess1/20260101/camera_aa/a.ts"]
+            assert os.path.exists(video)
+
+    def test_run_blocked_without_login(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, video = self._setup(tmpdir)
+            client = _connected_client(web)
+
+            client.emit("run_retention")
+
+            assert client.get_received()[0]["name"] == "retention_error"
+            assert web._retention is None
+
+
 class TestAuthGatedHandlers:
     """Mutating handlers must no-op (and tell the client) without a prior
     successful 'login' on the same connection."""
@@ -715,6 +1113,128 @@ class TestDeployUpdateToModule:
                 "cam1", "update_saviour", {"controller_url": "http://10.0.0.5:5000"}
             )
 
+    def test_joins_active_rollout(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, facade = _make_web_with_facade()
+            web._update_rollout = MagicMock()
+            web._update_rollout.add.return_value = True
+            client = _connected_client(web)
+            _login(web, client, tmpdir)
+
+            with patch("src.controller.web.os.path.exists", return_value=True):
+                client.emit("deploy_update_to_module", {"module_id": "cam1"})
+
+            web._update_rollout.add.assert_called_once_with("cam1")
+            facade.send_command.assert_not_called()
+
+    def test_progress_and_ack_reach_rollout(self):
+        web, _facade = _make_web_with_facade()
+        web._update_rollout = MagicMock()
+
+        web.handle_module_status("cam1", {"type": "update_progress", "stage": "fetching"})
+        web.handle_module_status("cam1", {
+            "type": "cmd_ack", "command": "update_saviour",
+            "result": "error", "output": "rsync failed",
+        })
+
+        web._update_rollout.on_progress.assert_called_once_with(
+            "cam1", {"type": "update_progress", "stage": "fetching"}
+        )
+        web._update_rollout.on_ack.assert_called_once_with("cam1", False, "rsync failed")
+
+
+class TestBugReport:
+    """_collect_bug_report run synchronously. send_command is faked so each
+    "module" answers the way a real one would: cam1 uploads a bundle over
+    the HTTP route then acks, mic1 predates bundles and acks inline, and
+    ttl1 never answers."""
+
+    def _run(self, tmpdir, timeout=1.0):
+        web, facade = _make_web_with_facade()
+        web._DIAGNOSTICS_SPOOL = tmpdir
+        web.BUG_REPORT_TIMEOUT_S = timeout
+        facade.controller.network.ip = "10.0.0.5"
+        facade.get_modules.return_value = {
+            "cam1": {"online": True}, "mic1": {"online": True},
+            "ttl1": {"online": True}, "old1": {"online": False},
+        }
+        facade.get_config.return_value = {"export": {"share_password": "hunter2"}}
+        facade.get_module_health.return_value = {}
+        facade.get_recording_sessions.return_value = {}
+        http = web.app.test_client()
+        bundle = io.BytesIO()
+        with zipfile.ZipFile(bundle, "w") as zf:
+            zf.writestr("logs.txt", "camera log")
+            zf.writestr("ptp.json", '{"status": {}}')
+        bundle = bundle.getvalue()
+
+        def send_command(mid, command, params):
+            assert command == "get_diagnostics"
+            if mid == "cam1":
+                path = params["upload_url"].split("10.0.0.5:5000", 1)[1]
+                assert http.post(f"{path}?offset=0", data=bundle[:100]).json == {"received": 100}
+                assert http.post(f"{path}?offset=7", data=b"x").status_code == 409
+                http.post(f"{path}?offset=100", data=bundle[100:])
+                web.handle_diagnostics_ack(mid, {"result": "success", "bundle": {
+                    "size": len(bundle), "sha256": hashlib.sha256(bundle).hexdigest()}})
+            elif mid == "mic1":
+                web.handle_diagnostics_ack(mid, {"result": "success", "logs": "mic log",
+                                                 "config": {"token": "abc"}})
+        facade.send_command.side_effect = send_command
+
+        with patch("src.controller.web.subprocess.run",
+                   return_value=MagicMock(returncode=0, stdout="controller log")):
+            web._collect_bug_report()
+        return web, http
+
+    def test_archive_combines_bundles_inline_and_missing(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, http = self._run(tmpdir, timeout=0.3)
+            (path, filename), = web._bug_report_store.values()
+            assert path.startswith(tmpdir)
+
+            with zipfile.ZipFile(path) as zf:
+                root = filename[:-4]
+                assert zf.read(f"{root}/modules/cam1/logs.txt") == b"camera log"
+                assert f"{root}/modules/cam1/ptp.json" in zf.namelist()
+                assert zf.read(f"{root}/modules/mic1/logs.txt") == b"mic log"
+                assert b"***" in zf.read(f"{root}/modules/mic1/config.json")
+                assert zf.read(f"{root}/modules/ttl1/logs.txt") == b"(no response within timeout)"
+                assert b"hunter2" not in zf.read(f"{root}/controller/config.json")
+                manifest = json.loads(zf.read(f"{root}/manifest.json"))
+            assert manifest["modules_that_responded"] == ["cam1", "mic1"]
+            assert manifest["module_sources"] == {"cam1": "bundle", "mic1": "inline"}
+            assert manifest["offline_modules"] == ["old1"]
+            # Upload route closes with the collection
+            assert web._diag_collection is None
+            assert [n for n in os.listdir(tmpdir) if n.startswith("saviour-diag-")] == []
+
+    def test_download_serves_spooled_file_and_replaces_previous(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            web, http = self._run(tmpdir, timeout=0.1)
+            (first_path, _), = web._bug_report_store.values()
+            token, = web._bug_report_store
+            response = http.get(f"/api/bug_report/{token}")
+            assert response.status_code == 200
+            assert zipfile.is_zipfile(io.BytesIO(response.data))
+            response.close()
+
+            web._collect_bug_report()
+            assert not os.path.exists(first_path)
+            assert http.get(f"/api/bug_report/{token}").status_code == 404
+
+    def test_archive_removed_when_writing_it_fails(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch("src.controller.web.write_json", side_effect=OSError("disk full")):
+                web, _http = self._run(tmpdir, timeout=0.1)
+            assert not web._bug_report_store
+            assert [n for n in os.listdir(tmpdir) if n.endswith(".zip")] == []
+
+    def test_upload_rejected_without_active_collection(self):
+        web, _facade = _make_web_with_facade()
+        response = web.app.test_client().post("/api/diagnostics/nope/cam1?offset=0", data=b"x")
+        assert response.status_code == 404
+
 
 class TestDestructiveSystemActions:
     """shutdown/reboot handlers ack immediately, then do the actual
@@ -0,0 +1,131 @@
+"""
+Tests for src/controller/zip_stream.py.
+
+Archives are built from files in tmp_path and checked with the standard
+zipfile reader. ZIP64 paths are exercised by lowering _ZIP64_LIMIT rather
+than writing 4 GiB files.
+"""
+
+import io
+import os
+import threading
+import time
+import zipfile
+
+import pytest
+
+from src.controller import zip_stream
+from src.controller.zip_stream import CrcCache, ZipLayout, collect_entries
+
+
+@pytest.fixture
+def session(tmp_path):
+    root = tmp_path / "sess"
+    files = {
+        "session_events.log": b"events\n",
+        "20260101/camera_aa/clip.mp4": os.urandom(70_000),
+        "20260101/camera_aa/clip.txt": b"timestamps\n" * 100,
+        "20260101/mic_bb/audio.flac": os.urandom(30_000),
+        "20260101/mic_bb/nömé.txt": b"utf-8 name",
+    }
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return str(root), files
+
+
+def _archive(layout, start=0, stop=None):
+    return b"".join(layout.stream(start, stop))
+
+
+def _check(data, files):
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert {n: zf.read(n) for n in zf.namelist()} == files
+
+
+class TestLayout:
+
+    def test_archive_matches_precomputed_size(self, session):
+        root, files = session
+        layout = ZipLayout(collect_entries(root), chunk_size=4096)
+        data = _archive(layout)
+        assert len(data) == layout.total_size
+        assert not layout.zip64_end
+        _check(data, files)
+
+    def test_zip64_entries_and_end_records(self, session, monkeypatch):
+        monkeypatch.setattr(zip_stream, "_ZIP64_LIMIT", 50_000)
+        root, files = session
+        layout = ZipLayout(collect_entries(root), chunk_size=4096)
+        data = _archive(layout)
+        assert layout.zip64_end
+        assert len(data) == layout.total_size
+        _check(data, files)
+
+    def test_any_range_matches_full_archive(self, session):
+        root, _ = session
+        layout = ZipLayout(collect_entries(root), chunk_size=4096)
+        full = _archive(layout)
+        for start, stop in [(0, 10), (35, 80_000), (71_000, layout.total_size), (layout.total_size - 5, None)]:
+            fresh = ZipLayout(collect_entries(root), CrcCache(), chunk_size=4096)
+            assert _archive(fresh, start, stop) == full[start:stop]
+
+    def test_resume_reuses_cached_crcs(self, session, monkeypatch):
+        root, _ = session
+        cache = CrcCache()
+        layout = ZipLayout(collect_entries(root), cache, chunk_size=4096)
+        _archive(layout)
+
+        reads = []
+        original = ZipLayout._read_file
+        monkeypatch.setattr(ZipLayout, "_read_file",
+                            lambda self, i, a, b: reads.append(i) or original(self, i, a, b))
+        tail_start = layout.segments[-1][0]   # central directory only
+        ZipLayout(collect_entries(root), cache).stream(tail_start).__next__()
+        assert reads == []
+
+    def test_file_changed_after_layout_keeps_length(self, session):
+        root, _ = session
+        layout = ZipLayout(collect_entries(root), chunk_size=4096)
+        with open(os.path.join(root, "20260101/mic_bb/audio.flac"), "wb") as f:
+            f.write(b"short")
+        assert len(_archive(layout)) == layout.total_size
+
+
+class TestCollectEntries:
+
+    def test_module_subset(self, session):
+        root, _ = session
+        names = [e.arcname for e in collect_entries(root, modules={"mic_bb"})]
+        assert names == ["session_events.log", "20260101/mic_bb/audio.flac", "20260101/mic_bb/nömé.txt"]
+
+    def test_time_window(self, session):
+        root, _ = session
+        old = time.time() - 3600
+        os.utime(os.path.join(root, "20260101/camera_aa/clip.mp4"), (old, old))
+        names = [e.arcname for e in collect_entries(root, since=time.time() - 60)]
+        assert "20260101/camera_aa/clip.mp4" not in names
+        assert "session_events.log" in names
+
+
+def test_slow_consumer_bounds_read_ahead(session):
+    root, _ = session
+    layout = ZipLayout(collect_entries(root), chunk_size=1024, read_ahead=2)
+    reads = []
+    original = layout._read_file
+
+    def counting(i, a, b):
+        for block in original(i, a, b):
+            reads.append(len(block))
+            yield block
+    layout._read_file = counting
+
+    gen = layout.stream()
+    next(gen)
+    time.sleep(0.2)   # consumer stalls; the reader must block on the full queue
+    assert len(reads) <= 2 + 2
+    gen.close()
+    time.sleep(0.6)
+    assert not any(t.name == "zip-read-ahead" and t.is_alive() for t in threading.enumerate())
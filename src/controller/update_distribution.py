@@ -0,0 +1,299 @@
+"""
+Controller Update Distribution
+
+Paces a fleet-wide update so modules don't all pull the package over the
+controller's uplink at once.
+
+TransferLimiter caps concurrent update downloads and their aggregate byte
+rate; a request that can't get a slot is answered 503 + Retry-After and the
+module backs off. UpdateRollout dispatches update_saviour in staggered
+waves of at most max_parallel modules, tracks each module's progress from
+its update_progress status messages, hands later waves the URLs of modules
+that have already applied the update (so they can fetch from a peer
+instead of the controller), and fires on_finished once every module has
+either finished or failed, which is when the controller applies its own
+update and restarts.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+
+# Stages in which a module is still pulling from the controller (or a
+# peer) and so holds one of the rollout's parallel slots.
+FETCH_STAGES = ("dispatched", "manifest", "fetching", "verifying")
+DONE_STAGES = ("done", "failed")
+STAGES = ("queued",) + FETCH_STAGES + ("applying", "serving", "restarting") + DONE_STAGES
+
+
+class TransferLimiter:
+    """Concurrent-download slots plus a shared token bucket.
+
+    rate_bytes_per_s of 0 disables the byte-rate limit. Slots are taken
+    with try_acquire() (non-blocking -- the caller sheds load rather than
+    queueing a Flask worker) and returned with release().
+    """
+
+    def __init__(self, max_concurrent: int = 4, rate_bytes_per_s: int = 0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.rate = max(0, int(rate_bytes_per_s))
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._active = 0
+        self._tokens = float(self.rate)
+        self._last = clock()
+
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._active >= self.max_concurrent:
+                return False
+            self._active += 1
+            return True
+
+
+    def release(self) -> None:
+        with self._lock:
+            self._active = max(0, self._active - 1)
+
+
+    def throttle(self, nbytes: int) -> None:
+        """Block until nbytes may be sent under the shared byte rate."""
+        if not self.rate:
+            return
+        with self._lock:
+            now = self._clock()
+            # Bucket depth is one second of traffic, so an idle period
+            # can't bank a burst larger than that.
+            self._tokens = min(float(self.rate), self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= nbytes
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self._sleep(wait)
+
+
+    def limited(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self.throttle(len(chunk))
+            yield chunk
+
+
+class UpdateRollout:
+    """Staggered, progress-tracked update_saviour dispatch to a set of modules.
+
+    Drive it with pump() -- start() runs a background ticker that does so
+    every tick_s until the rollout finishes; tests call pump(now=...)
+    directly. Progress arrives through on_progress()/on_ack() from the web
+    layer's status routing.
+    """
+
+    def __init__(self, modules: Iterable[str], controller_url: str,
+                 send_command: Callable[[str, str, dict], None],
+                 emit: Callable[[dict], None] | None = None,
+                 on_finished: Callable[[dict], None] | None = None,
+                 max_parallel: int = 3, stagger_s: float = 2.0,
+                 module_timeout_s: float = 900.0, serve_peers_s: float = 120.0,
+                 max_peers: int = 3, tick_s: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.logger = logging.getLogger(__name__)
+        self.controller_url = controller_url
+        self.max_parallel = max(1, int(max_parallel))
+        self.stagger_s = float(stagger_s)
+        self.module_timeout_s = float(module_timeout_s)
+        self.serve_peers_s = float(serve_peers_s)
+        self.max_peers = int(max_peers)
+        self.tick_s = tick_s
+        self._send_command = send_command
+        self._emit = emit or (lambda summary: None)
+        self._on_finished = on_finished
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._order: list[str] = []
+        self._modules: dict[str, dict] = {}
+        self._next_dispatch = 0.0
+        self._finished = False
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = clock()
+        for module_id in modules:
+            self._add(module_id)
+
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Dispatch the first wave now, then keep pumping in the background."""
+        self.pump()
+        if self._finished:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True, name="update-rollout")
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.tick_s):
+            self.pump()
+            if self._finished:
+                return
+
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+
+    def add(self, module_id: str) -> bool:
+        """Queue another module (or re-queue a finished one) into a running
+        rollout. Returns False once the rollout has finished."""
+        with self._lock:
+            if self._finished:
+                return False
+            self._add(module_id)
+        self._emit(self.summary())
+        return True
+
+
+    def _add(self, module_id: str) -> None:
+        if module_id not in self._modules:
+            self._order.append(module_id)
+        self._modules[module_id] = {
+            "stage": "queued", "detail": "", "done": 0, "total": 0,
+            "bytes": 0, "peer_url": None, "updated_at": self._clock(),
+        }
+
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    def pump(self, now: float | None = None) -> int:
+        """Time out stalled modules, dispatch whatever the parallel limit
+        and stagger allow, and fire on_finished when nothing is left.
+        Returns the number of modules dispatched."""
+        now = self._clock() if now is None else now
+        to_send = []
+        changed = False
+        with self._lock:
+            if self._finished:
+                return 0
+            for module_id, state in self._modules.items():
+                if state["stage"] not in DONE_STAGES and state["stage"] != "queued" \
+                        and now - state["updated_at"] > self.module_timeout_s:
+                    self.logger.warning(f"Update of {module_id} timed out in stage '{state['stage']}'")
+                    state.update(stage="failed", detail=f"timed out while {state['stage']}", updated_at=now)
+                    changed = True
+
+            in_flight = sum(1 for s in self._modules.values() if s["stage"] in FETCH_STAGES)
+            for module_id in self._order:
+                state = self._modules[module_id]
+                if state["stage"] != "queued":
+                    continue
+                if in_flight >= self.max_parallel or now < self._next_dispatch:
+                    break
+                state.update(stage="dispatched", updated_at=now)
+                in_flight += 1
+                self._next_dispatch = now + self.stagger_s
+                to_send.append((module_id, self._params_locked()))
+
+            finished = all(s["stage"] in DONE_STAGES for s in self._modules.values())
+            if finished:
+                self._finished = True
+
+        for module_id, params in to_send:
+            self.logger.info(f"Dispatching update to {module_id} (peers: {len(params.get('peers', []))})")
+            try:
+                self._send_command(module_id, "update_saviour", params)
+            except Exception as e:
+                self.logger.error(f"Failed to send update to {module_id}: {e}")
+                self._set(module_id, stage="failed", detail=str(e))
+        if to_send or changed or finished:
+            self._emit(self.summary())
+        if finished:
+            self.logger.info(f"Update rollout finished: {self.summary()['counts']}")
+            if self._on_finished:
+                self._on_finished(self.summary())
+        return len(to_send)
+
+
+    def _params_locked(self) -> dict:
+        params = {"controller_url": self.controller_url}
+        peers = [s["peer_url"] for s in self._modules.values()
+                 if s["stage"] == "serving" and s["peer_url"]]
+        if peers:
+            params["peers"] = peers[: self.max_peers]
+        # Only worth holding a restart to serve peers while others still
+        # have the update to fetch.
+        waiting = sum(1 for s in self._modules.values() if s["stage"] == "queued")
+        if self.serve_peers_s > 0 and waiting:
+            params["serve_peers_s"] = self.serve_peers_s
+        return params
+
+
+    # ------------------------------------------------------------------
+    # Progress
+    # ------------------------------------------------------------------
+
+    def on_progress(self, module_id: str, status: dict) -> None:
+        stage = status.get("stage")
+        if stage not in STAGES or module_id not in self._modules:
+            return
+        self._set(
+            module_id, stage=stage,
+            detail=status.get("detail", ""),
+            done=int(status.get("done", 0) or 0),
+            total=int(status.get("total", 0) or 0),
+            bytes=int(status.get("bytes", 0) or 0),
+            peer_url=status.get("peer_url") if stage == "serving" else None,
+        )
+        # A module leaving the fetch stages frees a slot; don't wait a tick.
+        if stage not in FETCH_STAGES:
+            self.pump()
+
+
+    def on_ack(self, module_id: str, success: bool, output: str = "") -> None:
+        """The final cmd_ack from update_saviour -- sent by modules that
+        report progress and by ones that predate it alike."""
+        if module_id not in self._modules:
+            return
+        self._set(module_id, stage="done" if success else "failed", detail=output)
+        self.pump()
+
+
+    def _set(self, module_id: str, **fields) -> None:
+        with self._lock:
+            state = self._modules.get(module_id)
+            if state is None:
+                return
+            state.update(fields, updated_at=self._clock())
+        self._emit(self.summary())
+
+
+    def summary(self) -> dict:
+        with self._lock:
+            modules = {mid: {k: v for k, v in self._modules[mid].items() if k != "updated_at"}
+                       for mid in self._order}
+            counts = {}
+            for state in modules.values():
+                counts[state["stage"]] = counts.get(state["stage"], 0) + 1
+            return {
+                "active": not self._finished,
+                "total": len(modules),
+                "counts": counts,
+                "modules": modules,
+            }
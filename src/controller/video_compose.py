@@ -13,13 +13,29 @@ from each camera's `_timestamps.csv` `timestamp_ns` column.
 
 Unlike tools/make_aligned_video.py, this does not require PTP framesync
 (camera.sync_mode) — it works from each camera's own capture timestamps,
-so it also produces a (best-effort) result for unsynced sessions. It has
-no ffmpeg dependency — composites directly through OpenCV's bundled
-ffmpeg-backed VideoCapture/VideoWriter, so it also works on a machine
-with no system ffmpeg install.
+so it also produces a (best-effort) result for unsynced sessions.
+
+Alignment is planned up front: every stream's timestamps are loaded as
+int64 arrays and searchsorted against the output grid, giving the source
+frame (or a hold, or a gap) for every camera at every output tick. The
+plan only depends on the recordings, so it can be saved (--save-plan) and
+reused (--plan) to re-render with another layout.
+
+Rendering is split into stages so a many-camera session isn't bound by one
+core: every stream decodes only the frames the plan needs on its own thread
+(grab() past the rest, seeking for long jumps) into a small bounded queue,
+the compositor resizes frames in place into tile views of one reused
+canvas (only tiles whose frame changed are redrawn), and raw canvases are
+piped to an ffmpeg subprocess (libx264 or libsvtav1) that encodes in
+parallel. Without a system ffmpeg it falls back to OpenCV's bundled
+VideoWriter (mp4v), so it still works on a bare machine.
 
 Usage:
     python3 src/controller/video_compose.py /path/to/session/date_dir [--output out.mp4]
+    python3 src/controller/video_compose.py /path/to/date_dir --codec libsvtav1 --preset 8
+    python3 src/controller/video_compose.py /path/to/date_dir --save-plan plan.npz
+    python3 src/controller/video_compose.py /path/to/date_dir --plan plan.npz --layout loom
+    python3 src/controller/video_compose.py /path/to/date_dir --timeline
 
     # e.g., matching the tools/analyse_framesync.py convention:
     python3 src/controller/video_compose.py \
@@ -31,15 +47,46 @@ from __future__ import annotations
 import argparse
 import csv
 import glob
+import json
 import math
 import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
 from dataclasses import dataclass
 
 import cv2
 import numpy as np
 
+try:
+    from src.controller.session_timeline import (
+        SessionTimeline,
+        load_or_index,
+        nearest_indices,
+    )
+except ImportError:  # run as a script: python3 src/controller/video_compose.py
+    from session_timeline import SessionTimeline, load_or_index, nearest_indices
+
 DEFAULT_CANVAS_WIDTH = 1920
 DEFAULT_FPS = 30
+DEFAULT_QUEUE_SIZE = 8
+
+# A jump of more source frames than this is a seek rather than a run of
+# grab()s -- comfortably past a typical keyframe interval, so the seek
+# (keyframe + decode forward) is the cheaper of the two
+SEEK_THRESHOLD_FRAMES = 90
+
+# A camera whose nearest frame is further than this many of its own frame
+# intervals from an output tick has a gap there (shown as a blank tile)
+# rather than a hold of whatever frame is nearest
+DEFAULT_GAP_FACTOR = 2.0
+
+# Encoder presets used when none is given: fast enough to keep up with the
+# compositor on a Pi 5 without the file size blowing up
+DEFAULT_PRESETS = {"libx264": "veryfast", "libsvtav1": "10"}
 
 
 @dataclass
@@ -74,54 +121,294 @@ def discover_camera_streams(date_dir: str) -> list[CameraStream]:
     return streams
 
 
-class _StreamCursor:
-    """Sequential, forward-only frame+timestamp reader for one camera.
+def load_timestamps(csv_path: str) -> np.ndarray:
+    """The timestamp_ns column of a *_timestamps.csv as int64."""
+    with open(csv_path, newline="") as f:
+        header = next(csv.reader(f), [])
+        if "timestamp_ns" not in header:
+            raise ValueError(f"{csv_path} has no timestamp_ns column")
+        return np.loadtxt(f, delimiter=",", usecols=header.index("timestamp_ns"),
+                          dtype=np.int64, ndmin=1)
+
+
+@dataclass
+class FramePlan:
+    """Which source frame every stream shows at every output tick.
+
+    indices[k, i] is stream k's frame index at output tick i, or -1 where
+    the stream has a gap. A value repeated across ticks is a hold (the
+    camera dropped frames or runs slower than the output). The plan is
+    independent of layout, so it can be saved once and re-rendered with
+    the grid or loom layout.
+    """
+
+    fps: int
+    t_start_ns: int
+    step_ns: int
+    streams: list[CameraStream]
+    indices: np.ndarray
+
+    @property
+    def n_out(self) -> int:
+        return self.indices.shape[1]
+
+    def row(self, name: str) -> np.ndarray:
+        return self.indices[[s.name for s in self.streams].index(name)]
+
+    def summary(self) -> dict:
+        """Per stream: source frames shown, ticks held and ticks in a gap."""
+        out = {}
+        for stream, idx in zip(self.streams, self.indices, strict=True):
+            shown = idx[idx >= 0]
+            out[stream.name] = {
+                "frames": int(np.unique(shown).size),
+                "holds": int(np.count_nonzero((idx[1:] == idx[:-1]) & (idx[1:] >= 0))),
+                "gaps": int(np.count_nonzero(idx < 0)),
+            }
+        return out
+
+    def save(self, path: str) -> None:
+        meta = {
+            "fps": self.fps, "t_start_ns": self.t_start_ns, "step_ns": self.step_ns,
+            "streams": [vars(s) for s in self.streams],
+        }
+        with open(path, "wb") as f:
+            np.savez_compressed(f, indices=self.indices, meta=np.array(json.dumps(meta)))
+
+    @classmethod
+    def load(cls, path: str) -> FramePlan:
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            indices = data["indices"]
+        return cls(fps=meta["fps"], t_start_ns=meta["t_start_ns"], step_ns=meta["step_ns"],
+                   streams=[CameraStream(**s) for s in meta["streams"]], indices=indices)
+
+
+# Index of the frame nearest each tick (the later one on a tie), -1 where
+# that frame is more than gap_factor frame intervals away
+_nearest_frames = nearest_indices
+
+
+def _stream_timestamps(stream: CameraStream, timeline: SessionTimeline | None) -> np.ndarray:
+    """A stream's frame timestamps, from the session timeline if it has
+    indexed the stream's CSV, otherwise parsed from the CSV."""
+    video = timeline.video.get(stream.name) if timeline is not None else None
+    if video is not None:
+        csv_rel = os.path.relpath(stream.csv_path, timeline.session_dir)
+        if csv_rel in video.csvs:
+            return video.segment(video.csvs.index(csv_rel))
+    return load_timestamps(stream.csv_path)
+
+
+def build_frame_plan(streams: list[CameraStream], fps: int = DEFAULT_FPS,
+                     gap_factor: float | None = DEFAULT_GAP_FACTOR,
+                     timeline: SessionTimeline | None = None) -> FramePlan:
+    """Align streams on one output grid over their common time window.
+
+    With a timeline (session_timeline.load_or_index()) frame timestamps are
+    read from the session's index rather than parsed from every CSV."""
+    timestamps = [_stream_timestamps(s, timeline) for s in streams]
+    if any(ts.size == 0 for ts in timestamps):
+        raise ValueError("A camera stream in this session has no timestamps")
+    t_start = int(max(ts[0] for ts in timestamps))
+    t_end = int(min(ts[-1] for ts in timestamps))
+    if t_end <= t_start:
+        raise ValueError(
+            "Camera streams in this session have no overlapping time window"
+        )
+    step_ns = int(1e9 / fps)
+    n_out = int((t_end - t_start) / step_ns)
+    ticks = t_start + np.arange(n_out, dtype=np.int64) * step_ns
+    indices = np.stack([_nearest_frames(ts, ticks, gap_factor) for ts in timestamps]) \
+        if n_out else np.zeros((len(streams), 0), dtype=np.int32)
+    return FramePlan(fps=fps, t_start_ns=t_start, step_ns=step_ns,
+                     streams=list(streams), indices=indices)
+
+
+_END = object()
 
-    Advances by decoding frames in order (never seeks — .ts/MPEG-TS
-    seeking via OpenCV is not reliably frame-accurate) and tracks which
-    decoded frame is currently the best match for a requested wall-clock
-    time.
+
+class _StreamDecoder:
+    """Decodes exactly the frames a plan needs from one stream, in order,
+    on its own thread into a bounded queue of (index, frame).
+
+    Frames in between are skipped with grab() (demux + decode, no colour
+    conversion or copy out); a jump of more than seek_threshold frames
+    seeks instead, except in MPEG-TS where OpenCV's seeking isn't frame
+    accurate, or once a seek has overshot in this stream. OpenCV releases
+    the GIL inside grab()/read(), so N decoders genuinely run in parallel.
     """
 
-    def __init__(self, stream: CameraStream):
+    def __init__(self, stream: CameraStream, wanted: np.ndarray,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 seek_threshold: int = SEEK_THRESHOLD_FRAMES):
         self.name = stream.name
+        self.video_path = stream.video_path
+        self.wanted = wanted
+        self.seek_threshold = seek_threshold
+        self.seekable = not stream.video_path.lower().endswith(".ts")
         self.cap = cv2.VideoCapture(stream.video_path)
-        with open(stream.csv_path, newline="") as f:
-            self.timestamps_ns = [int(row["timestamp_ns"]) for row in csv.DictReader(f)]
+        self.frames = 0
+        self.skipped = 0
+        self.seeks = 0
+        self.decode_s = 0.0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"decode-{stream.name}")
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _seek(self, target: int) -> int:
+        """Seek to target; returns the index the next read() will return."""
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        pos = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if pos > target or pos < 0:
+            # Overshot -- no way back but from the start. Seeking in this
+            # stream isn't accurate, so don't try again: every later jump
+            # would rewind to the start too
+            self.seekable = False
+            self.cap.release()
+            self.cap = cv2.VideoCapture(self.video_path)
+            return 0
+        self.seeks += 1
+        return pos
+
+    def _run(self):
+        pos = 0  # index of the frame the next grab()/read() returns
+        try:
+            for target in self.wanted:
+                if self._stop.is_set():
+                    break
+                target = int(target)
+                started = time.perf_counter()
+                if self.seekable and target - pos > self.seek_threshold:
+                    pos = self._seek(target)
+                ok = True
+                while pos < target and ok:
+                    ok = self.cap.grab()
+                    pos += 1
+                    self.skipped += 1
+                ok, frame = self.cap.read() if ok else (False, None)
+                pos += 1
+                self.decode_s += time.perf_counter() - started
+                if not ok or not self._put((target, frame)):
+                    break
+                self.frames += 1
+        finally:
+            self.cap.release()
+            self._put(_END)
+
+    def get(self):
+        """Next (index, frame) the plan asked for, or None once the stream
+        has ended."""
+        item = self._queue.get()
+        return None if item is _END else item
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+
+class _PlannedStream:
+    """The compositor's view of one stream: the frame to show at each tick,
+    pulled from its decoder as the plan reaches it."""
+
+    def __init__(self, stream: CameraStream, indices: np.ndarray,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.name = stream.name
+        self.indices = indices
+        self.decoder = _StreamDecoder(stream, np.unique(indices[indices >= 0]), queue_size)
         self.idx = -1
         self.frame = None
-        self._advance()
-
-    def _advance(self) -> bool:
-        ok, frame = self.cap.read()
-        if not ok:
-            return False
-        self.idx += 1
-        self.frame = frame
-        return True
-
-    def sync_to(self, t_ns: int):
-        """Advance while the *next* decoded frame is closer to t_ns than
-        the current one, then return the current frame."""
-        while self.idx + 1 < len(self.timestamps_ns):
-            cur_ts = self.timestamps_ns[self.idx]
-            nxt_ts = self.timestamps_ns[self.idx + 1]
-            if abs(nxt_ts - t_ns) > abs(cur_ts - t_ns):
-                break
-            if not self._advance():
+        self.wait_s = 0.0
+        self._ended = False
+
+    def at(self, tick: int) -> int:
+        """Move to the planned frame for tick; returns its index (-1 for a
+        gap). Holds the last frame if the video ends before its CSV does."""
+        want = int(self.indices[tick])
+        if want < 0:
+            return -1
+        started = time.perf_counter()
+        while self.idx < want and not self._ended:
+            item = self.decoder.get()
+            if item is None:
+                self._ended = True
                 break
-        return self.frame
+            self.idx, self.frame = item
+        self.wait_s += time.perf_counter() - started
+        return self.idx
 
-    @property
-    def first_ts(self) -> int:
-        return self.timestamps_ns[0]
-
-    @property
-    def last_ts(self) -> int:
-        return self.timestamps_ns[-1]
+    def release(self):
+        self.decoder.close()
+
+
+class _FfmpegWriter:
+    """Pipes raw BGR canvases into an ffmpeg subprocess, which encodes on
+    its own cores while the next canvas is composed."""
+
+    def __init__(self, output_path: str, size: tuple[int, int], fps: int,
+                 codec: str = "libx264", preset: str | None = None,
+                 crf: int | None = None, ffmpeg: str = "ffmpeg"):
+        width, height = size
+        preset = preset if preset is not None else DEFAULT_PRESETS.get(codec)
+        cmd = [
+            ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}",
+            "-r", str(fps), "-i", "-", "-an", "-c:v", codec,
+        ]
+        if preset is not None:
+            cmd += ["-preset", str(preset)]
+        if crf is not None:
+            cmd += ["-crf", str(crf)]
+        cmd += ["-pix_fmt", "yuv420p", "-movflags", "+faststart", output_path]
+        self.cmd = cmd
+        # stderr to a file, not a pipe nobody drains, so ffmpeg can't block on it
+        self._stderr = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self._stderr)
+
+    def _error(self) -> str:
+        self._stderr.seek(0)
+        return self._stderr.read().decode(errors="replace").strip()
+
+    def write(self, frame: np.ndarray):
+        try:
+            self.proc.stdin.write(frame.data)
+        except BrokenPipeError:
+            self.proc.wait()
+            raise RuntimeError(f"ffmpeg exited during encode: {self._error()}") from None
 
     def release(self):
-        self.cap.release()
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self.proc.wait()
+        error = self._error()
+        self._stderr.close()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed ({returncode}): {error}")
+
+
+def open_writer(encoder: str, output_path: str, size: tuple[int, int], fps: int,
+                 codec: str, preset: str | None, crf: int | None):
+    if encoder == "auto":
+        encoder = "ffmpeg" if shutil.which("ffmpeg") else "opencv"
+    if encoder == "ffmpeg":
+        return _FfmpegWriter(output_path, size, fps, codec=codec, preset=preset, crf=crf)
+    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+    writer = cv2.VideoWriter(output_path, fourcc, fps, size)
+    if not writer.isOpened():
+        raise RuntimeError("VideoWriter failed to open — codec unavailable")
+    return writer
 
 
 def _grid_regions(
@@ -140,6 +427,18 @@ def _grid_regions(
     return regions, pane_w * cols, pane_h * rows
 
 
+def _strip_regions(
+    n: int, vertical: bool = False, pane_width: int = DEFAULT_CANVAS_WIDTH // 2,
+    pane_aspect: float = 16 / 9,
+) -> tuple[list[tuple[int, int, int, int]], int, int]:
+    """One row (side by side) or one column (stacked) of equal panes."""
+    pane_w = pane_width // 2 * 2
+    pane_h = round(pane_w / pane_aspect / 2) * 2
+    if vertical:
+        return [(0, i * pane_h, pane_w, pane_h) for i in range(n)], pane_w, pane_h * n
+    return [(i * pane_w, 0, pane_w, pane_h) for i in range(n)], pane_w * n, pane_h
+
+
 def _loom_regions(
     streams: list[CameraStream], right_width: int = 640
 ) -> tuple[list[tuple[int, int, int, int]], int, int] | None:
@@ -177,21 +476,48 @@ def _label(frame: np.ndarray, text: str) -> np.ndarray:
 
 
 def compose_session_video(
-    date_dir: str,
+    date_dir: str | None,
     output_path: str,
     layout: str = "auto",
     fps: int = DEFAULT_FPS,
+    encoder: str = "auto",
+    codec: str = "libx264",
+    preset: str | None = None,
+    crf: int | None = None,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    plan: FramePlan | None = None,
+    stats: dict | None = None,
 ) -> str:
-    streams = discover_camera_streams(date_dir)
-    if not streams:
-        raise ValueError(
-            f"No camera streams (video + *_timestamps.csv) found under {date_dir}"
-        )
+    """Write the layout video for one session date directory.
+
+    With plan (e.g. FramePlan.load() of an earlier render) the alignment is
+    reused as is and date_dir/fps are ignored; otherwise one is built from
+    the streams found under date_dir.
+
+    layout is "auto" (loom for the loom rig's camera set, grid otherwise),
+    "loom", "grid", or "side"/"stack" for one row or column of panes.
+    encoder is "ffmpeg", "opencv" or "auto" (ffmpeg when it's on PATH).
+    codec/preset/crf only apply to ffmpeg. If stats is given it is filled
+    with per-stage throughput: each decoder's frames/s of busy time, the
+    compositor's and the encoder's, how long the compositor waited on
+    decoders, and the plan's holds and gaps per stream.
+    """
+    if plan is None:
+        streams = discover_camera_streams(date_dir)
+        if not streams:
+            raise ValueError(
+                f"No camera streams (video + *_timestamps.csv) found under {date_dir}"
+            )
+        plan = build_frame_plan(streams, fps)
+    streams = plan.streams
+    fps = plan.fps
 
     ordered = streams
     loom_layout = _loom_regions(streams) if layout in ("auto", "loom") else None
     if loom_layout is not None:
         regions, canvas_w, canvas_h, ordered = loom_layout
+    elif layout in ("side", "stack"):
+        regions, canvas_w, canvas_h = _strip_regions(len(streams), vertical=layout == "stack")
     else:
         if layout == "loom":
             raise ValueError(
@@ -200,35 +526,76 @@ def compose_session_video(
             )
         regions, canvas_w, canvas_h = _grid_regions(len(streams))
 
-    cursors = [_StreamCursor(s) for s in ordered]
-    t_start = max(c.first_ts for c in cursors)
-    t_end = min(c.last_ts for c in cursors)
-    if t_end <= t_start:
-        raise ValueError(
-            "Camera streams in this session have no overlapping time window"
-        )
-
-    step_ns = int(1e9 / fps)
-    n_out = int((t_end - t_start) / step_ns)
-
-    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    writer = cv2.VideoWriter(output_path, fourcc, fps, (canvas_w, canvas_h))
-    if not writer.isOpened():
-        raise RuntimeError("VideoWriter failed to open — codec unavailable")
-
+    sources = [_PlannedStream(s, plan.row(s.name), queue_size) for s in ordered]
+    writer = None
     try:
-        for i in range(n_out):
-            t = t_start + i * step_ns
-            canvas = np.zeros((canvas_h, canvas_w, 3), dtype=np.uint8)
-            for cursor, (x, y, w, h) in zip(cursors, regions, strict=True):
-                pane = _label(cv2.resize(cursor.sync_to(t), (w, h)), cursor.name)
-                canvas[y : y + h, x : x + w] = pane
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        writer = open_writer(encoder, output_path, (canvas_w, canvas_h), fps, codec, preset, crf)
+
+        # One canvas for the whole video; each tile is a view into it, so
+        # resize writes straight into place and a tile whose camera is
+        # holding the same frame keeps last tick's pixels untouched
+        canvas = np.zeros((canvas_h, canvas_w, 3), dtype=np.uint8)
+        tiles = [canvas[y : y + h, x : x + w] for x, y, w, h in regions]
+        drawn = [-2] * len(sources)
+        compose_s = encode_s = wait_s = 0.0
+        started = time.perf_counter()
+
+        for i in range(plan.n_out):
+            t0 = time.perf_counter()
+            shown = [source.at(i) for source in sources]
+            t1 = time.perf_counter()
+            for k, (source, tile) in enumerate(zip(sources, tiles, strict=True)):
+                if shown[k] == drawn[k]:
+                    continue
+                if shown[k] < 0 or source.frame is None:
+                    tile[...] = 0
+                    _label(tile, f"{source.name} (no frame)")
+                else:
+                    h, w = tile.shape[:2]
+                    if source.frame.shape[:2] == (h, w):
+                        tile[...] = source.frame
+                    else:
+                        cv2.resize(source.frame, (w, h), dst=tile)
+                    _label(tile, source.name)
+                drawn[k] = shown[k]
+            t2 = time.perf_counter()
             writer.write(canvas)
-    finally:
+            wait_s += t1 - t0
+            compose_s += t2 - t1
+            encode_s += time.perf_counter() - t2
+        # ffmpeg may still be encoding buffered frames; count the flush
+        t0 = time.perf_counter()
         writer.release()
-        for cursor in cursors:
-            cursor.release()
+        encode_s += time.perf_counter() - t0
+        wall_s = time.perf_counter() - started
+        writer = None
+
+        if stats is not None:
+            n_out = plan.n_out
+            stats.update({
+                "frames": n_out,
+                "wall_s": round(wall_s, 3),
+                "output_fps": round(n_out / wall_s, 1) if wall_s else None,
+                "decode_fps": {
+                    s.name: round(s.decoder.frames / s.decoder.decode_s, 1) if s.decoder.decode_s else None
+                    for s in sources
+                },
+                "compose_fps": round(n_out / compose_s, 1) if compose_s else None,
+                "encode_fps": round(n_out / encode_s, 1) if encode_s else None,
+                "decode_wait_s": round(wait_s, 3),
+                "skipped_frames": {s.name: s.decoder.skipped for s in sources},
+                "seeks": {s.name: s.decoder.seeks for s in sources},
+                "plan": plan.summary(),
+            })
+    finally:
+        if writer is not None:
+            try:
+                writer.release()
+            except RuntimeError:
+                pass
+        for source in sources:
+            source.release()
 
     return output_path
 
@@ -242,17 +609,45 @@ def main():
         "--output", default=None,
         help="Output .mp4 path (default: <date_dir>/../<session>_aggregated.mp4)",
     )
-    parser.add_argument("--layout", choices=["auto", "loom"], default="auto")
+    parser.add_argument("--layout", choices=["auto", "loom", "grid", "side", "stack"],
+                        default="auto",
+                        help="auto is loom for the loom rig's cameras, grid otherwise")
     parser.add_argument("--fps", type=int, default=DEFAULT_FPS)
+    parser.add_argument("--encoder", choices=["auto", "ffmpeg", "opencv"], default="auto",
+                        help="auto uses ffmpeg when it's on PATH")
+    parser.add_argument("--codec", choices=["libx264", "libsvtav1"], default="libx264")
+    parser.add_argument("--preset", default=None,
+                        help="Encoder preset (default: veryfast for x264, 10 for SVT-AV1)")
+    parser.add_argument("--crf", type=int, default=None)
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Decoded frames buffered per camera")
+    parser.add_argument("--plan", default=None,
+                        help="Reuse a saved frame plan (.npz) instead of aligning again")
+    parser.add_argument("--save-plan", default=None,
+                        help="Save the frame plan (.npz) for later re-renders")
+    parser.add_argument("--timeline", action="store_true",
+                        help="Read frame timestamps from the session's timeline index "
+                             "(session_timeline.py), building or updating it as needed")
     args = parser.parse_args()
 
     session_dir = os.path.dirname(os.path.normpath(args.date_dir))
     session_name = os.path.basename(session_dir)
     output = args.output or os.path.join(session_dir, f"{session_name}_aggregated.mp4")
+    if args.plan:
+        plan = FramePlan.load(args.plan)
+    else:
+        timeline = load_or_index(session_dir) if args.timeline else None
+        plan = build_frame_plan(discover_camera_streams(args.date_dir), args.fps,
+                                timeline=timeline)
+    if args.save_plan:
+        plan.save(args.save_plan)
+    stats = {}
     result = compose_session_video(
-        args.date_dir, output, layout=args.layout, fps=args.fps
+        args.date_dir, output, layout=args.layout,
+        encoder=args.encoder, codec=args.codec, preset=args.preset, crf=args.crf,
+        queue_size=args.queue_size, plan=plan, stats=stats,
     )
-    print(f"Wrote {result}")
+    print(f"Wrote {result} — {stats['frames']} frames at {stats['output_fps']} fps")
 
 
 if __name__ == "__main__":
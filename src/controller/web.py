@@ -13,12 +13,12 @@ Created: ?
 
 
 import hmac
-import io
 import json
 import logging
 import os
 import secrets
 import subprocess
+import tempfile
 import threading
 import time
 import zipfile
@@ -37,27 +37,27 @@ from flask import (
 from flask_socketio import SocketIO
 
 from src.controller.config import Config
+from src.controller.diagnostics import (
+    DiagnosticsCollection,
+    UploadOffsetError,
+    copy_bundle,
+    write_json,
+)
+from src.controller.file_index import FileIndex, IndexRoot
+from src.controller.log_tail import EventIndex, LogTail
+from src.controller.proxy_worker import PROXY_SUFFIX, SPRITE_SUFFIX, ProxyWorker
+from src.controller.retention import RetentionManager
+from src.controller.self_metrics import SelfMetrics
+from src.controller.self_metrics import diff as _health_diff
+from src.controller.session_journal import format_event_line
+from src.controller.session_timeline import VIDEO_SUFFIXES
+from src.controller.update_distribution import TransferLimiter, UpdateRollout
+from src.controller.zip_stream import CrcCache, ZipLayout, collect_entries
+from src.shared import update_manifest
 from src.shared.zip_extract import extract_preserving_permissions
 
 _SENSITIVE_KEY_FRAGMENTS = {"password", "credential", "secret", "token"}
 
-import queue as _queue
-
-
-class _QueueStream(io.RawIOBase):
-    """Write-only, non-seekable stream that feeds chunks into a SimpleQueue.
-    Used to stream a ZipFile to an HTTP response without buffering in RAM
-    or writing to a temp file. zipfile detects seekable()=False and switches
-    to data-descriptor mode (writes CRC/sizes after data, no back-seeking).
-    """
-    def __init__(self, q: "_queue.SimpleQueue"):
-        self._q = q
-    def write(self, b: bytes) -> int:
-        self._q.put(bytes(b))
-        return len(b)
-    def writable(self) -> bool: return True
-    def seekable(self) -> bool: return False
-    def readable(self) -> bool: return False
 
 def _sanitise_config_dict(cfg: dict) -> dict:
     """Recursively redact values whose key contains a sensitive word."""
@@ -92,6 +92,28 @@ class Web(ABC):
     # sitting somewhere "get_controller_config" could ever echo back.
     _ADMIN_CREDENTIALS_FILE = "/etc/saviour/admin_credentials"
 
+    # Index of files on the export share and NAS (see file_index.py)
+    _FILE_INDEX_DB = "/var/lib/saviour/controller/file_index.db"
+    NAS_MOUNT_POINT = "/mnt/nas"
+
+    # Browse proxies and thumbnail sprites of exported video (see proxy_worker.py)
+    _PROXY_CACHE_DIR = "/var/lib/saviour/controller/proxies"
+    RECORDING_SUFFIXES = (".mp4", ".txt")
+
+    # Lines of a session log sent to the browser, and how often subscribed
+    # logs are checked for new lines
+    SESSION_LOG_LINES = 200
+    SESSION_LOG_POLL_S = 1.0
+
+    # How often the controller samples its own CPU/memory/disk/network and
+    # pushes changes to subscribed dashboards
+    CONTROLLER_HEALTH_INTERVAL_S = 2.0
+
+    # One deadline for the whole bug report, and where its archive and the
+    # uploaded module bundles are spooled (None: the system temp dir)
+    BUG_REPORT_TIMEOUT_S = 30
+    _DIAGNOSTICS_SPOOL = None
+
     def __init__(self, config: Config):
         self.logger = logging.getLogger(__name__)
         self.config = config
@@ -115,6 +137,15 @@ class Web(ABC):
         }
         self.current_experiment_name = self._generate_experiment_name() # To be constructed from metadata, or overriden
 
+        # Controller self-metrics, sampled in the background and pushed to
+        # clients in the "controller_health" room (see
+        # _register_socketio_events for the broadcast callback)
+        self._self_metrics = SelfMetrics(interval_s=self.CONTROLLER_HEALTH_INTERVAL_S)
+        self._health_subs: set = set()
+        self._health_last_sent: dict | None = None
+        self._health_lock = threading.Lock()
+        self._eth0_ip: tuple = (None, 0.0)   # (ip, monotonic time read)
+
         # Register routes and webhooks
         self._register_routes()
         self._register_socketio_events()
@@ -141,10 +172,11 @@ class Web(ABC):
         self._upload_meta: dict = {}
         self._upload_lock = threading.Lock()
 
-        # Bug report state
-        self._diag_pending: dict = {}   # module_id → {'event': Event, 'data': None}
+        # Bug report state. The archive is spooled to disk; only the most
+        # recent one is kept.
+        self._diag_collection: DiagnosticsCollection | None = None
         self._diag_lock = threading.Lock()
-        self._bug_report_store: dict = {}  # token → bytes (at most one kept)
+        self._bug_report_store: dict = {}  # token → (path, filename)
 
         # Authenticated Socket.IO connections (by request.sid). Guests can
         # connect and read state; anything mutating/destructive requires the
@@ -155,6 +187,46 @@ class Web(ABC):
         self._authenticated_sids: set = set()
         self._auth_lock = threading.Lock()
 
+        # Session log tailing. LogTail caches each log's offset/inode so
+        # repeat requests read only appended bytes. Clients that subscribe
+        # join a per-session room and get new lines pushed by one watcher
+        # task, which runs only while anyone is subscribed.
+        self._log_tail = LogTail(max_lines=self.SESSION_LOG_LINES)
+        self._event_index = EventIndex()   # filtered views of session_events.jsonl
+        self._log_subs: dict = {}        # session_name -> set of sids
+        self._log_pushed: dict = {}      # session_name -> LogTail position already pushed
+        self._log_subs_lock = threading.Lock()
+        self._log_watcher_running = False
+
+        # CRCs of files already streamed in session ZIPs, so a resumed
+        # download need not re-read what was sent before
+        self._zip_crcs = CrcCache()
+
+        # Opened on first use (see _get_file_index)
+        self._file_index: FileIndex | None = None
+        self._file_index_lock = threading.Lock()
+
+        # Created on first use (see _get_proxy_worker); renders only while
+        # no exports are in flight
+        self._proxy_worker: ProxyWorker | None = None
+        self._proxy_worker_lock = threading.Lock()
+
+        # Created on first use (see _get_retention); acts only when
+        # retention.enabled is set, but can always report a dry run
+        self._retention: RetentionManager | None = None
+        self._retention_lock = threading.Lock()
+
+        # Update distribution. Downloads of the staged package are capped by
+        # _update_limiter; a fleet deploy is paced by _update_rollout.
+        self._update_limiter = TransferLimiter(
+            self.config.get("update.max_transfers", 4),
+            int(float(self.config.get("update.transfer_rate_mbps", 0) or 0) * 125_000),
+        )
+        self._update_rollout: UpdateRollout | None = None
+        self._update_manifest: dict | None = None
+        # (mtime_ns, size) of the staged ZIP a manifest build last failed on
+        self._update_manifest_failed: tuple | None = None
+
 
     def _generate_experiment_name(self) -> str:
         """Generate experiment name from metadata, skipping empty fields."""
@@ -232,6 +304,186 @@ class Web(ABC):
         return False
 
 
+    @staticmethod
+    def _session_log_room(session_name: str) -> str:
+        return f"session_log:{session_name}"
+
+
+    def _session_log_path(self, session_name: str) -> str:
+        mount = self.config.get("export.mount_path", "/home/pi/controller_share")
+        return os.path.join(mount, session_name, "session_events.log")
+
+
+    def _session_log_snapshot(self, session_name: str,
+                              until: tuple | None = None) -> tuple[dict, tuple | None]:
+        """Last SESSION_LOG_LINES lines of a session's event log, as sent in
+        session_log_response, and the LogTail position they end at (None if
+        the log couldn't be read). With until, the lines end there instead
+        of at the end of the log, if the cached tail still reaches back to it."""
+        try:
+            path = self._session_log_path(session_name)
+            upto = self._log_tail.read_until(path, until) if until is not None else None
+            if upto is not None:
+                (lines, truncated), position = upto, until
+            else:
+                lines, truncated, position = self._log_tail.read(path)
+        except FileNotFoundError:
+            return {'session_name': session_name, 'lines': [], 'truncated': False}, None
+        except Exception as e:
+            return {'session_name': session_name, 'lines': [], 'error': str(e)}, None
+        return {'session_name': session_name, 'lines': lines, 'truncated': truncated}, position
+
+
+    def _unsubscribe_session_log(self, sid: str, session_name: str | None = None) -> None:
+        """Drop sid's log subscription to session_name, or to every session."""
+        with self._log_subs_lock:
+            names = [session_name] if session_name else list(self._log_subs)
+            for name in names:
+                sids = self._log_subs.get(name)
+                if sids is None:
+                    continue
+                sids.discard(sid)
+                if not sids:
+                    del self._log_subs[name]
+                    self._log_pushed.pop(name, None)
+
+
+    def push_session_log_updates(self) -> int:
+        """Emit lines appended to subscribed session logs since the last push.
+
+        Each session room gets session_log_append with just the new lines, or
+        a full session_log_response if the log was rotated/truncated, was
+        missing when last pushed, or more lines arrived than the tail holds.
+        Returns the number of sessions that had updates.
+        """
+        with self._log_subs_lock:
+            names = list(self._log_subs)
+        updated = 0
+        for name in names:
+            with self._log_subs_lock:
+                pushed = self._log_pushed.get(name)
+            lines = None
+            try:
+                if pushed is not None:
+                    lines, position = self._log_tail.read_since(self._session_log_path(name), pushed)
+                    if lines == []:
+                        continue
+                if lines is None:
+                    snapshot, position = self._session_log_snapshot(name)
+                    if position is None:
+                        continue
+            except OSError:
+                continue
+            # Emitted under the lock so a subscriber joining now either gets
+            # these lines here or in its snapshot, never both
+            with self._log_subs_lock:
+                if name not in self._log_subs:
+                    continue
+                self._log_pushed[name] = position
+                room = self._session_log_room(name)
+                if lines is not None:
+                    self.socketio.emit('session_log_append', {'session_name': name, 'lines': lines}, to=room)
+                else:
+                    self.socketio.emit('session_log_response', snapshot, to=room)
+            updated += 1
+        return updated
+
+
+    def _watch_session_logs(self) -> None:
+        """Background task: push session log updates while anyone is subscribed."""
+        while True:
+            with self._log_subs_lock:
+                if not self._log_subs:
+                    self._log_watcher_running = False
+                    return
+            try:
+                self.push_session_log_updates()
+            except Exception as e:
+                self.logger.error(f"Session log watcher error: {e}")
+            self.socketio.sleep(self.SESSION_LOG_POLL_S)
+
+
+    def _get_file_index(self) -> FileIndex:
+        """The share/NAS file index, opened on first use."""
+        with self._file_index_lock:
+            if self._file_index is None:
+                self._file_index = FileIndex(self._FILE_INDEX_DB, [
+                    IndexRoot("share", lambda: str(self.habitat_share_dir)),
+                    IndexRoot("nas", lambda: self.NAS_MOUNT_POINT,
+                              include=lambda name: name in ("recordings", "videos", "ttl")
+                              or name.startswith("export_")),
+                ])
+            return self._file_index
+
+
+    def _ensure_indexed(self, root: str, rel_dir: str = "") -> None:
+        """Scan synchronously when there is nothing indexed to answer from:
+        rel_dir with no rows under it (e.g. a session that finished before
+        the index existed), or a root that has never been fully scanned.
+        Everything else is left to the background reconciler."""
+        index = self._get_file_index()
+        try:
+            if rel_dir:
+                if index.count(root, prefix=rel_dir) == 0:
+                    index.refresh(root, rel_dir)
+            elif index.scanned_at(root) is None:
+                index.refresh(root)
+        except OSError as e:
+            self.logger.warning(f"Could not index {root}:{rel_dir or '/'}: {e}")
+
+
+    def _exports_busy(self) -> bool:
+        facade = getattr(self, "facade", None)
+        return facade is not None and facade.exports_in_progress()
+
+
+    def _get_proxy_worker(self) -> ProxyWorker:
+        """The proxy/sprite worker, created on first use."""
+        with self._proxy_worker_lock:
+            if self._proxy_worker is None:
+                self._proxy_worker = ProxyWorker(
+                    self._PROXY_CACHE_DIR,
+                    lambda: str(self.habitat_share_dir),
+                    busy=self._exports_busy,
+                    max_load=float(self.config.get("proxy.max_load", 0.75)),
+                    width=int(self.config.get("proxy.width", 320)),
+                    max_fps=float(self.config.get("proxy.max_fps", 15)),
+                    thumbnail_interval_s=float(self.config.get("proxy.thumbnail_interval_s", 10)),
+                )
+            return self._proxy_worker
+
+
+    def _ended_session_records(self) -> dict[str, dict]:
+        """Ended sessions' records for retention, found through the session
+        store's state index rather than by scanning every session."""
+        sessions = self.facade.get_recording_sessions()
+        return {name: asdict(sessions[name]) for name in self.facade.get_ended_session_names()
+                if name in sessions}
+
+
+    def _get_retention(self) -> RetentionManager:
+        """The retention manager, created on first use."""
+        with self._retention_lock:
+            if self._retention is None:
+                self._retention = RetentionManager(
+                    self.config,
+                    self._get_file_index,
+                    {"share": lambda: str(self.habitat_share_dir),
+                     "nas": lambda: self.NAS_MOUNT_POINT},
+                    self._ended_session_records,
+                )
+            return self._retention
+
+
+    def on_export_complete(self, export_path: str) -> None:
+        """A module finished exporting to export_path (relative to the share):
+        reindex it and queue proxies of any video in it."""
+        if export_path:
+            self._get_file_index().refresh_later("share", export_path)
+            if self.config.get("proxy.enabled", True):
+                self._get_proxy_worker().enqueue(export_path)
+
+
     def _check_nas_free_space(self) -> "str | None":
         """Mount the NAS and check free space against nas_min_free_pct.
 
@@ -465,6 +717,9 @@ class Web(ABC):
             self.logger.info("Client disconnected")
             with self._auth_lock:
                 self._authenticated_sids.discard(request.sid)
+            self._unsubscribe_session_log(request.sid)
+            with self._health_lock:
+                self._health_subs.discard(request.sid)
 
 
         @self.socketio.on('send_command')
@@ -578,24 +833,66 @@ class Web(ABC):
                 _emit('session_log_response', {'session_name': '', 'lines': []})
                 return
             mount = self.config.get("export.mount_path", "/home/pi/controller_share")
-            log_path = os.path.join(mount, session_name, "session_events.log")
+            levels = (data or {}).get('levels')
+            module_id = (data or {}).get('module_id')
             try:
-                with open(log_path) as f:
-                    lines = [l.rstrip() for l in f.readlines()]
-                total = len(lines)
-                tail = lines[-200:]
-                _emit('session_log_response', {
-                    'session_name': session_name,
-                    'lines': tail,
-                    'total': total,
-                    'truncated': total > 200,
-                })
+                if levels or module_id:
+                    # Filtered views come from the structured journal records,
+                    # indexed so only appended records are parsed again
+                    records, total = self._event_index.select(
+                        os.path.join(mount, session_name, "session_events.jsonl"),
+                        levels, module_id, self.SESSION_LOG_LINES,
+                    )
+                    _emit('session_log_response', {
+                        'session_name': session_name,
+                        'lines': [format_event_line(r).rstrip() for r in records],
+                        'total': total,
+                        'truncated': total > self.SESSION_LOG_LINES,
+                    })
+                else:
+                    _emit('session_log_response', self._session_log_snapshot(session_name)[0])
             except FileNotFoundError:
                 _emit('session_log_response', {'session_name': session_name, 'lines': []})
             except Exception as e:
                 _emit('session_log_response', {'session_name': session_name, 'lines': [], 'error': str(e)})
 
 
+        @self.socketio.on('subscribe_session_log')
+        def handle_subscribe_session_log(data=None):
+            """Send the current tail, then push new lines as they are written."""
+            import re
+
+            from flask_socketio import emit as _emit
+            from flask_socketio import join_room
+            session_name = (data or {}).get('session_name', '')
+            if not re.fullmatch(r"[A-Za-z0-9_\-]+", session_name):
+                _emit('session_log_response', {'session_name': session_name, 'lines': [], 'error': 'invalid name'})
+                return
+            join_room(self._session_log_room(session_name))
+            with self._log_subs_lock:
+                self._log_subs.setdefault(session_name, set()).add(request.sid)
+                # Other subscribers may not have been pushed the newest lines
+                # yet; end the snapshot where their pushes will resume
+                pushed = self._log_pushed.get(session_name)
+                snapshot, position = self._session_log_snapshot(session_name, until=pushed)
+                if position is not None and pushed is None:
+                    self._log_pushed[session_name] = position
+                start_watcher = not self._log_watcher_running
+                self._log_watcher_running = True
+            _emit('session_log_response', snapshot)
+            if start_watcher:
+                self.socketio.start_background_task(self._watch_session_logs)
+
+
+        @self.socketio.on('unsubscribe_session_log')
+        def handle_unsubscribe_session_log(data=None):
+            from flask_socketio import leave_room
+            session_name = (data or {}).get('session_name', '')
+            if session_name:
+                leave_room(self._session_log_room(session_name))
+            self._unsubscribe_session_log(request.sid, session_name or None)
+
+
         @self.socketio.on("get_session_file_info")
         def handle_get_session_file_info(data=None):
             import re
@@ -605,34 +902,30 @@ class Web(ABC):
             if not re.fullmatch(r"[A-Za-z0-9_\-]+", session_name):
                 _emit("session_file_info_response", {"session_name": session_name, "error": "invalid name"})
                 return
-            share = self.config.get("export.mount_path", "/home/pi/controller_share")
-            session_dir = os.path.join(share, session_name)
-            if not os.path.isdir(session_dir):
-                _emit("session_file_info_response", {
-                    "session_name": session_name,
-                    "dir": session_dir,
-                    "files": [],
-                    "total_bytes": 0,
-                })
-                return
-            files = []
-            total = 0
-            for root, dirs, filenames in os.walk(session_dir):
-                dirs.sort()
-                for fn in sorted(filenames):
-                    full = os.path.join(root, fn)
-                    try:
-                        sz = os.path.getsize(full)
-                    except OSError:
-                        sz = 0
-                    rel = os.path.relpath(full, session_dir)
-                    files.append({"name": fn, "path": rel, "size_bytes": sz})
-                    total += sz
+            session_dir = os.path.join(str(self.habitat_share_dir), session_name)
+            offset = int((data or {}).get("offset") or 0)
+            limit = (data or {}).get("limit")
+            index = self._get_file_index()
+            self._ensure_indexed("share", session_name)
+            summary = index.session_summary("share", session_name)
+            rows = [] if limit == 0 else index.files(
+                "share", session=session_name, offset=offset,
+                limit=int(limit) if limit is not None else None,
+            )
             _emit("session_file_info_response", {
                 "session_name": session_name,
                 "dir": session_dir,
-                "files": files,
-                "total_bytes": total,
+                "files": [
+                    {"name": os.path.basename(r["path"]),
+                     "path": r["path"].split("/", 1)[1],
+                     "size_bytes": r["size"],
+                     "module": r["module"]}
+                    for r in rows
+                ],
+                "offset": offset,
+                "file_count": summary["file_count"],
+                "total_bytes": summary["total_bytes"],
+                "modules": summary["modules"],
             })
 
         @self.app.route("/api/sessions/<session_name>/download/<path:filename>")
@@ -663,36 +956,97 @@ class Web(ABC):
             if not os.path.isdir(session_dir):
                 return "Not found", 404
 
-            q = _queue.SimpleQueue()
-
-            def _build():
-                try:
-                    with zipfile.ZipFile(_QueueStream(q), 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
-                        for root, dirs, filenames in os.walk(session_dir):
-                            dirs.sort()
-                            for fn in sorted(filenames):
-                                full = os.path.join(root, fn)
-                                zf.write(full, os.path.relpath(full, session_dir))
-                except Exception as e:
-                    self.logger.error(f"ZIP stream error for '{session_name}': {e}")
-                finally:
-                    q.put(None)
-
-            threading.Thread(target=_build, daemon=True).start()
+            # Optional subsets: ?modules=camera_aa,mic_bb and/or an mtime
+            # window ?since=<epoch>&until=<epoch>
+            modules = request.args.get("modules")
+            modules = {m for m in modules.split(",") if m} if modules else None
+            since = request.args.get("since", None, type=float)
+            until = request.args.get("until", None, type=float)
+            layout = ZipLayout(collect_entries(session_dir, modules, since, until), self._zip_crcs)
+            etag = layout.etag
+            suffix = "" if modules is None and since is None and until is None else "_subset"
+            headers = {
+                "Content-Disposition": f'attachment; filename="{session_name}{suffix}.zip"',
+                "Accept-Ranges": "bytes",
+                "ETag": f'"{etag}"',
+                "X-Accel-Buffering": "no",
+            }
 
-            def _generate():
-                while (chunk := q.get()) is not None:
-                    yield chunk
+            start, stop, status = 0, layout.total_size, 200
+            rng = request.range
+            if_range = request.if_range
+            if rng is not None and (if_range.etag is None and if_range.date is None
+                                    or if_range.etag == etag):
+                span = rng.range_for_length(layout.total_size)
+                if span is None:
+                    return self.app.response_class(
+                        status=416, headers={"Content-Range": f"bytes */{layout.total_size}"}
+                    )
+                start, stop = span
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{stop - 1}/{layout.total_size}"
+            headers["Content-Length"] = str(stop - start)
 
             return self.app.response_class(
-                _generate(),
+                layout.stream(start, stop),
+                status=status,
                 mimetype="application/zip",
-                headers={
-                    "Content-Disposition": f'attachment; filename="{session_name}.zip"',
-                    "X-Accel-Buffering": "no",
-                },
+                headers=headers,
+                direct_passthrough=True,
             )
 
+        @self.app.route("/api/sessions/<session_name>/proxies")
+        def list_session_proxies(session_name):
+            """Every video in the session with its proxy status, and for
+            finished ones the proxy/sprite URLs and sprite index. Videos
+            with no proxy yet are queued for the worker."""
+            import re
+            if not re.fullmatch(r"[A-Za-z0-9_\-]+", session_name):
+                return "Invalid session name", 400
+            worker = self._get_proxy_worker()
+            self._ensure_indexed("share", session_name)
+            rows = [r for r in self._get_file_index().files("share", session=session_name,
+                                                             suffixes=VIDEO_SUFFIXES)
+                    if not os.path.basename(r["path"]).startswith("PENDING_")]
+            if self.config.get("proxy.enabled", True):
+                for rel_dir in sorted({os.path.dirname(r["path"]) for r in rows
+                                       if worker.status(r["path"]) == "missing"}):
+                    worker.enqueue(rel_dir)
+            videos = []
+            for r in rows:
+                path = r["path"].split("/", 1)[1]
+                entry = {"path": path, "module": r["module"], "size_bytes": r["size"],
+                         "status": worker.status(r["path"])}
+                if entry["status"] == "ready":
+                    entry["proxy_url"] = f"/api/sessions/{session_name}/proxy/{path}"
+                    entry["sprite_url"] = f"/api/sessions/{session_name}/sprite/{path}"
+                    entry["sprite"] = worker.index(r["path"])
+                elif entry["status"] == "failed":
+                    entry["error"] = worker.error(r["path"])
+                videos.append(entry)
+            return jsonify({"session_name": session_name, "videos": videos})
+
+        def _send_proxy_file(session_name: str, filename: str, suffix: str, mimetype: str):
+            import re
+            if not re.fullmatch(r"[A-Za-z0-9_\-]+", session_name):
+                return "Invalid session name", 400
+            try:
+                path = self._get_proxy_worker().out_base(f"{session_name}/{filename}") + suffix
+            except ValueError:
+                return "Forbidden", 403
+            if not os.path.isfile(path):
+                return "Not found", 404
+            # conditional: ETag/Last-Modified and Range (206) for seeking
+            return send_file(path, mimetype=mimetype, conditional=True, max_age=3600)
+
+        @self.app.route("/api/sessions/<session_name>/proxy/<path:filename>")
+        def serve_session_proxy(session_name, filename):
+            return _send_proxy_file(session_name, filename, PROXY_SUFFIX, "video/mp4")
+
+        @self.app.route("/api/sessions/<session_name>/sprite/<path:filename>")
+        def serve_session_sprite(session_name, filename):
+            return _send_proxy_file(session_name, filename, SPRITE_SUFFIX, "image/jpeg")
+
         @self.socketio.on("create_session")
         def handle_create_session(data):
             if not self._require_auth("session_error", {"error": "Login required for this action"}):
@@ -767,6 +1121,8 @@ class Web(ABC):
             result = self.facade.delete_session(session_name, delete_files, force)
             if "error" in result:
                 self.socketio.emit("session_error", result)
+            elif delete_files and session_name and self._proxy_worker is not None:
+                self._proxy_worker.remove(session_name)
 
         @self.socketio.on("retry_failed_exports")
         def handle_retry_failed_exports(data):
@@ -1126,88 +1482,60 @@ class Web(ABC):
             self.socketio.emit("controller_info_response", {"ip": ip, "version": version, "hostname": name})
 
 
-        @self.socketio.on("get_controller_health")
-        def handle_get_controller_health(data=None):
-            import shutil
-            health = {}
-            # IP — read eth0 directly so wlan0 is never returned
-            try:
-                nm = subprocess.run(
-                    ["nmcli", "-g", "IP4.ADDRESS", "device", "show", "eth0"],
-                    capture_output=True, text=True, timeout=5
-                )
-                health['ip'] = nm.stdout.strip().split("/")[0] if nm.returncode == 0 else None
-            except Exception:
-                health['ip'] = None
-            # CPU temperature
-            try:
-                with open('/sys/class/thermal/thermal_zone0/temp') as f:
-                    health['cpu_temp'] = round(int(f.read().strip()) / 1000, 1)
-            except Exception:
-                health['cpu_temp'] = None
-            # CPU usage — read /proc/stat twice with a short sleep for accuracy
-            try:
-                def _read_cpu_stat():
-                    with open('/proc/stat') as f:
-                        fields = f.readline().split()
-                    vals = list(map(int, fields[1:]))
-                    idle = vals[3]
-                    total = sum(vals)
-                    return idle, total
-                idle1, total1 = _read_cpu_stat()
-                import time as _time
-                _time.sleep(0.5)
-                idle2, total2 = _read_cpu_stat()
-                delta_total = total2 - total1
-                delta_idle  = idle2  - idle1
-                health['cpu_usage'] = round((1 - delta_idle / delta_total) * 100, 1) if delta_total else 0.0
-            except Exception:
-                health['cpu_usage'] = None
-            # Memory
-            try:
-                import psutil
-                mem = psutil.virtual_memory()
-                health['memory_usage'] = round(mem.percent, 1)
-                health['memory_total_gb'] = round(mem.total / (1024 ** 3), 1)
-            except ImportError:
-                try:
-                    with open('/proc/meminfo') as f:
-                        lines = f.readlines()
-                    info = {l.split(':')[0]: int(l.split()[1]) for l in lines if ':' in l}
-                    total = info.get('MemTotal', 0)
-                    available = info.get('MemAvailable', 0)
-                    health['memory_usage'] = round((total - available) / total * 100, 1) if total else None
-                    health['memory_total_gb'] = round(total / (1024 ** 2), 1) if total else None  # kB → GB
-                except Exception:
-                    health['memory_usage'] = None
-                    health['memory_total_gb'] = None
-            # Disk
-            try:
-                usage = shutil.disk_usage('/var/lib/saviour')
-                health['disk_used_pct'] = round(usage.used / usage.total * 100, 1)
-                health['disk_free_gb'] = round(usage.free / (1024 ** 3), 1)
-                health['disk_used_gb'] = round(usage.used / (1024 ** 3), 1)
-                health['disk_total_gb'] = round(usage.total / (1024 ** 3), 1)
-            except Exception:
-                try:
-                    usage = shutil.disk_usage('/')
-                    health['disk_used_pct'] = round(usage.used / usage.total * 100, 1)
-                    health['disk_free_gb'] = round(usage.free / (1024 ** 3), 1)
-                    health['disk_used_gb'] = round(usage.used / (1024 ** 3), 1)
-                    health['disk_total_gb'] = round(usage.total / (1024 ** 3), 1)
-                except Exception:
-                    health['disk_used_pct'] = None
-                    health['disk_free_gb'] = None
-                    health['disk_used_gb'] = None
-                    health['disk_total_gb'] = None
-            # Version
+        def _controller_health() -> dict:
+            health = self._self_metrics.snapshot()
+            health['ip'] = self._controller_eth0_ip()
             health['version'] = _read_running_version() or None
             # Controller clock (UTC ISO-8601) — lets the frontend detect gross clock drift
-            from datetime import datetime
             health['controller_time'] = datetime.now(UTC).isoformat()
             # Controller uptime in seconds
             health['uptime'] = round(self.facade.get_uptime())
-            self.socketio.emit("controller_health_response", health)
+            return health
+
+        def _broadcast_controller_health(_sample=None):
+            """SelfMetrics callback: push what changed since the last push."""
+            with self._health_lock:
+                if not self._health_subs:
+                    self._health_last_sent = None
+                    return
+                last = self._health_last_sent
+            health = _controller_health()
+            delta = _health_diff(last, health)
+            with self._health_lock:
+                self._health_last_sent = health
+            if delta:
+                self.socketio.emit("controller_health_delta", delta, to="controller_health")
+
+        self._self_metrics.on_sample = _broadcast_controller_health
+
+        @self.socketio.on("get_controller_health")
+        def handle_get_controller_health(data=None):
+            """Answered from the sampler's cached snapshot -- no /proc reads
+            or sampling sleep on the request path."""
+            from flask_socketio import emit as _emit
+            _emit("controller_health_response", _controller_health())
+
+        @self.socketio.on("subscribe_controller_health")
+        def handle_subscribe_controller_health(data=None):
+            """Full snapshot plus the rolling history now, then
+            controller_health_delta every CONTROLLER_HEALTH_INTERVAL_S."""
+            from flask_socketio import emit as _emit
+            from flask_socketio import join_room
+            join_room("controller_health")
+            with self._health_lock:
+                self._health_subs.add(request.sid)
+                # Next push is a full snapshot, so every subscriber's copy
+                # is rebased whatever it joined with
+                self._health_last_sent = None
+            _emit("controller_health_response",
+                  {**_controller_health(), "history": self._self_metrics.history()})
+
+        @self.socketio.on("unsubscribe_controller_health")
+        def handle_unsubscribe_controller_health(data=None):
+            from flask_socketio import leave_room
+            leave_room("controller_health")
+            with self._health_lock:
+                self._health_subs.discard(request.sid)
 
 
         @self.socketio.on("get_health_summary")
@@ -1219,15 +1547,124 @@ class Web(ABC):
         def handle_get_nas_health(data=None):
             self.socketio.emit("nas_health_update", self._nas_health)
 
+        def _retention_report(report: dict) -> dict:
+            report["enabled"] = bool(self.config.get("retention.enabled", False))
+            report["cold_storage_path"] = self.config.get("retention.cold_storage_path", "")
+            report["last_run"] = self._get_retention().last_run
+            return report
+
+        @self.socketio.on("get_retention_report")
+        def handle_get_retention_report(data=None):
+            """Dry run: what retention would delete, archive and hold now."""
+            from flask_socketio import emit as _emit
+            try:
+                report = self._get_retention().run_once(dry_run=True)
+            except Exception as e:
+                self.logger.error(f"Retention report failed: {e}")
+                _emit("retention_error", {"error": str(e)})
+                return
+            _emit("retention_report", _retention_report(report))
+
+        @self.socketio.on("run_retention")
+        def handle_run_retention(data=None):
+            """Apply retention now, within the per-run caps."""
+            if not self._require_auth("retention_error"):
+                return
+
+            def _run():
+                try:
+                    report = self._get_retention().run_once()
+                except Exception as e:
+                    self.logger.error(f"Retention run failed: {e}")
+                    self.socketio.emit("retention_error", {"error": str(e)})
+                    return
+                self.socketio.emit("retention_report", _retention_report(report))
+
+            threading.Thread(target=_run, daemon=True, name="retention-run").start()
+
 
         # ── Update package store ──────────────────────────────────────────────
         _UPDATE_STORE = "/var/lib/saviour/updates"
         _UPDATE_ZIP   = os.path.join(_UPDATE_STORE, "saviour-latest.zip")
         _UPDATE_META  = os.path.join(_UPDATE_STORE, "update_meta.json")
+        _UPDATE_MANIFEST = os.path.join(_UPDATE_STORE, "update_manifest.json")
         _SRC_ROOT     = "/usr/local/src/saviour"
         _STAGE_SKIP_DIRS = {'.git', 'env', '__pycache__', 'node_modules',
                             '.pytest_cache', 'dist', '.eggs'}
 
+        def _staged_zip_signature() -> tuple | None:
+            try:
+                st = os.stat(_UPDATE_ZIP)
+            except OSError:
+                return None
+            return st.st_mtime_ns, st.st_size
+
+        def _publish_manifest(version: str) -> dict:
+            """Hash the staged ZIP into _UPDATE_MANIFEST so modules can fetch
+            only the files that differ from what they run. Returns the
+            fields recorded in the update meta; a failure is logged and
+            leaves modules on the full-package download."""
+            self._update_manifest = None
+            self._update_manifest_failed = None
+            try:
+                manifest = update_manifest.build_manifest(_UPDATE_ZIP, version)
+                tmp = _UPDATE_MANIFEST + ".tmp"
+                with open(tmp, "w") as f:
+                    json.dump(manifest, f)
+                os.replace(tmp, _UPDATE_MANIFEST)
+            except Exception as e:
+                self.logger.error(f"Could not build update manifest: {e}")
+                self._update_manifest_failed = _staged_zip_signature()
+                return {}
+            self._update_manifest = manifest
+            return {"manifest_id": manifest["manifest_id"], "file_count": len(manifest["files"])}
+
+        def _current_manifest() -> dict | None:
+            """The manifest for the staged ZIP -- cached, else read from disk
+            if it is at least as new as the ZIP, else rebuilt (a package
+            staged before manifests existed). A ZIP the build already failed
+            on is not hashed again until it changes; modules fall back to
+            the full package meanwhile."""
+            if not os.path.exists(_UPDATE_ZIP):
+                return None
+            if self._update_manifest is None:
+                try:
+                    if os.path.getmtime(_UPDATE_MANIFEST) >= os.path.getmtime(_UPDATE_ZIP):
+                        with open(_UPDATE_MANIFEST) as f:
+                            self._update_manifest = json.load(f)
+                except (OSError, ValueError):
+                    pass
+            if self._update_manifest is None:
+                if self._update_manifest_failed == _staged_zip_signature():
+                    return None
+                version = ""
+                try:
+                    with open(_UPDATE_META) as f:
+                        version = json.load(f).get("version", "")
+                except (OSError, ValueError):
+                    pass
+                _publish_manifest(version)
+            return self._update_manifest
+
+        def _limited_response(chunks, on_close, headers: dict, mimetype: str):
+            """Stream chunks under the update transfer limiter. The caller has
+            already taken a slot; it is returned when the response closes,
+            whether or not the body was ever read."""
+            response = self.app.response_class(
+                self._update_limiter.limited(chunks),
+                mimetype=mimetype,
+                headers=headers,
+                direct_passthrough=True,
+            )
+            response.call_on_close(on_close)
+            response.call_on_close(self._update_limiter.release)
+            return response
+
+        def _update_busy():
+            return self.app.response_class(
+                "Update server busy", status=503, headers={"Retry-After": "2"},
+            )
+
         def _stage_current_version_zip() -> dict:
             """Zip up _SRC_ROOT's current working tree and write it as the
             staged update package + metadata. Shared by "Stage Current" (the
@@ -1262,6 +1699,7 @@ class Web(ABC):
                 "filename":    f"saviour-{version}.zip",
                 "size_bytes":  size,
                 "uploaded_at": datetime.now().isoformat(),
+                **_publish_manifest(version),
             }
             with open(_UPDATE_META, "w") as f:
                 json.dump(meta, f, indent=2)
@@ -1309,9 +1747,55 @@ class Web(ABC):
         def serve_update_package():
             if not os.path.exists(_UPDATE_ZIP):
                 return "No update staged", 404
-            return send_file(_UPDATE_ZIP, as_attachment=True,
-                             download_name="saviour-update.zip",
-                             mimetype="application/zip")
+            if not self._update_limiter.try_acquire():
+                return _update_busy()
+            try:
+                f = open(_UPDATE_ZIP, "rb")
+            except OSError:
+                self._update_limiter.release()
+                return "No update staged", 404
+            return _limited_response(
+                iter(lambda: f.read(256 * 1024), b""), f.close,
+                {
+                    "Content-Disposition": 'attachment; filename="saviour-update.zip"',
+                    "Content-Length": str(os.fstat(f.fileno()).st_size),
+                },
+                "application/zip",
+            )
+
+        @self.app.route("/update/manifest")
+        def serve_update_manifest():
+            manifest = _current_manifest()
+            if manifest is None:
+                return "No update staged", 404
+            return jsonify(manifest)
+
+        @self.app.route("/update/file/<path:rel_path>")
+        def serve_update_file(rel_path):
+            manifest = _current_manifest()
+            if manifest is None or not update_manifest.safe_path(manifest, rel_path):
+                return "Not found", 404
+            if not self._update_limiter.try_acquire():
+                return _update_busy()
+            try:
+                archive = zipfile.ZipFile(_UPDATE_ZIP)
+                member = archive.open(manifest["prefix"] + rel_path)
+            except (OSError, KeyError, zipfile.BadZipFile):
+                self._update_limiter.release()
+                return "Not found", 404
+
+            def _close():
+                member.close()
+                archive.close()
+
+            return _limited_response(
+                iter(lambda: member.read(256 * 1024), b""), _close,
+                {
+                    "Content-Length": str(manifest["files"][rel_path]["size"]),
+                    "X-Manifest-Id": manifest["manifest_id"],
+                },
+                "application/octet-stream",
+            )
 
         @self.socketio.on("get_update_info")
         def handle_get_update_info(data=None):
@@ -1328,6 +1812,7 @@ class Web(ABC):
                 "running_version": running,
                 "staged": staged,
                 "git": _git_checkout_info(),
+                "rollout": self._update_rollout.summary() if self._update_rollout else None,
             })
 
         @self.socketio.on("upload_update_start")
@@ -1408,6 +1893,7 @@ class Web(ABC):
                     "filename":    filename,
                     "size_bytes":  len(assembled),
                     "uploaded_at": datetime.now().isoformat(),
+                    **_publish_manifest(version),
                 }
                 with open(_UPDATE_META, "w") as f:
                     json.dump(meta, f, indent=2)
@@ -1439,19 +1925,6 @@ class Web(ABC):
                 pass
             controller_url = f"http://{controller_ip}:5000"
 
-            # Send to modules first so they update in parallel while controller applies
-            modules = list(self.facade.get_modules().keys())
-            for mid in modules:
-                try:
-                    self.facade.send_command(
-                        mid, "update_saviour",
-                        {"controller_url": controller_url}
-                    )
-                except Exception as e:
-                    self.logger.error(f"Failed to send update to {mid}: {e}")
-            self.socketio.emit("deploy_update_status",
-                               {"stage": "modules_notified", "count": len(modules)})
-
             def _apply_to_controller():
                 try:
                     extract_dir = "/tmp/saviour_update"
@@ -1515,8 +1988,21 @@ class Web(ABC):
                 time.sleep(2)
                 subprocess.Popen(["sudo", "systemctl", "restart", "saviour.service"])
 
-            threading.Thread(target=_apply_to_controller, daemon=True,
-                             name="saviour-deploy").start()
+            def _modules_finished(summary):
+                self.socketio.emit("deploy_update_status", {
+                    "stage": "applying_controller",
+                    "counts": summary.get("counts", {}),
+                })
+                threading.Thread(target=_apply_to_controller, daemon=True,
+                                 name="saviour-deploy").start()
+
+            # Modules update first, in staggered waves, while the controller
+            # is still up to serve them; it restarts itself only once every
+            # module has finished or failed.
+            modules = list(self.facade.get_modules().keys())
+            self.socketio.emit("deploy_update_status",
+                               {"stage": "modules_notified", "count": len(modules)})
+            self._start_update_rollout(modules, controller_url, on_finished=_modules_finished)
 
         @self.socketio.on("stage_current_version")
         def handle_stage_current_version(data=None):
@@ -1623,11 +2109,10 @@ class Web(ABC):
             except Exception:
                 pass
             controller_url = f"http://{controller_ip}:5000"
-            try:
-                self.facade.send_command(module_id, "update_saviour",
-                                         {"controller_url": controller_url})
-            except Exception as e:
-                _emit("deploy_update_error", {"error": str(e)})
+            rollout = self._update_rollout
+            if rollout is not None and rollout.add(module_id):
+                return
+            self._start_update_rollout([module_id], controller_url)
 
         @self.socketio.on('shutdown_saviour')
         def handle_shutdown_saviour(data=None):
@@ -1716,16 +2201,34 @@ class Web(ABC):
         @self.app.route("/api/bug_report/<token>")
         def download_bug_report(token):
             entry = self._bug_report_store.get(token)
-            if not entry:
+            if not entry or not os.path.exists(entry[0]):
                 return "Not found", 404
-            data_bytes, filename = entry
+            path, filename = entry
             return send_file(
-                io.BytesIO(data_bytes),
+                path,
                 mimetype="application/zip",
                 as_attachment=True,
                 download_name=filename,
             )
 
+        @self.app.route("/api/diagnostics/<collection_id>/<module_id>", methods=["POST"])
+        def upload_diagnostics_chunk(collection_id, module_id):
+            """One chunk of a module's diagnostics bundle. The collection id
+            is only valid while that bug report is being collected."""
+            collection = self._diag_collection
+            if collection is None or not hmac.compare_digest(collection.id, collection_id):
+                return "Not found", 404
+            offset = request.args.get("offset", 0, type=int)
+            try:
+                received = collection.upload_chunk(module_id, offset, request.get_data())
+            except KeyError:
+                return "Not found", 404
+            except UploadOffsetError as e:
+                return jsonify({"received": e.received}), 409
+            except OverflowError as e:
+                return jsonify({"error": str(e)}), 413
+            return jsonify({"received": received})
+
         @self.socketio.on("set_controller_time")
         def handle_set_controller_time(data=None):
             from datetime import datetime
@@ -1771,12 +2274,17 @@ class Web(ABC):
 
         """Viewing exported recordings on the share"""
         @self.socketio.on('get_exported_recordings')
-        def handle_get_exported_recordings():
-            """Handle request for exported recordings"""
+        def handle_get_exported_recordings(data=None):
+            """Handle request for exported recordings (optionally paged with offset/limit)"""
             try:
-                recordings = self.get_exported_recordings()
+                offset = int((data or {}).get('offset') or 0)
+                limit = (data or {}).get('limit')
+                recordings = self.get_exported_recordings(
+                    offset=offset, limit=int(limit) if limit is not None else None
+                )
                 self.socketio.emit('exported_recordings_list', {
-                    'exported_recordings': recordings
+                    'exported_recordings': recordings,
+                    'offset': offset,
                 })
             except Exception as e:
                 self.logger.error(f"Error getting exported recordings: {e!s}")
@@ -1895,95 +2403,144 @@ class Web(ABC):
 
     def handle_diagnostics_ack(self, module_id: str, data: dict) -> None:
         """Called by controller when a get_diagnostics cmd_ack arrives from a module."""
-        with self._diag_lock:
-            entry = self._diag_pending.get(module_id)
-        if entry:
-            entry['data'] = data
-            entry['event'].set()
+        collection = self._diag_collection
+        if collection is not None:
+            collection.acknowledge(module_id, data)
 
     def _collect_bug_report(self) -> None:
-        """Background thread: gather logs from controller + all online modules, emit download token."""
-        self.socketio.emit("bug_report_status", {"status": "collecting"})
-
-        modules = self.facade.get_modules() if self.facade else {}
-        online_ids = [mid for mid, m in modules.items() if m.get('online')]
-
-        # Register pending entries before sending commands (avoid race)
-        pending = {}
-        for mid in online_ids:
-            entry = {'event': threading.Event(), 'data': None}
-            pending[mid] = entry
-        with self._diag_lock:
-            self._diag_pending.update(pending)
-
-        # Fire get_diagnostics to every online module
-        for mid in online_ids:
-            self.facade.send_command(mid, "get_diagnostics", {})
-
-        # Wait up to 15 s for each module
-        TIMEOUT = 15
-        for mid in online_ids:
-            pending[mid]['event'].wait(timeout=TIMEOUT)
+        """Background thread: gather logs from controller + all online modules, emit download token.
 
+        Every online module is asked at once and the whole collection
+        shares one BUG_REPORT_TIMEOUT_S deadline. Modules upload their
+        bundles over HTTP (see DiagnosticsCollection); the archive is
+        written to a temp file under _DIAGNOSTICS_SPOOL.
+        """
         with self._diag_lock:
-            for mid in online_ids:
-                self._diag_pending.pop(mid, None)
-
-        # Collect controller logs
-        try:
-            ctrl_log_result = subprocess.run(
-                ["journalctl", "-u", "saviour.service", "-n", "500",
-                 "--no-pager", "--output=short-precise"],
-                capture_output=True, text=True, timeout=10,
+            if self._diag_collection is not None:
+                self.logger.info("Bug report already being collected")
+                return
+            modules = self.facade.get_modules() if self.facade else {}
+            online_ids = [mid for mid, m in modules.items() if m.get('online')]
+            collection = DiagnosticsCollection(
+                online_ids, self._DIAGNOSTICS_SPOOL,
+                on_ack=lambda mid, responded, total: self.socketio.emit(
+                    "bug_report_status",
+                    {"status": "collecting", "responded": responded, "total": total},
+                ),
             )
-            ctrl_logs = ctrl_log_result.stdout if ctrl_log_result.returncode == 0 else ctrl_log_result.stderr
-        except Exception as e:
-            ctrl_logs = f"Could not collect controller logs: {e}"
-
-        # Build ZIP in memory
-        ts = datetime.now(UTC).strftime("%Y%m%d_%H%M%S")
-        buf = io.BytesIO()
-        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-            zf.writestr(f"saviour_diagnostics_{ts}/controller/logs.txt", ctrl_logs)
+            self._diag_collection = collection
+        self.socketio.emit("bug_report_status",
+                           {"status": "collecting", "responded": 0, "total": len(online_ids)})
+        deadline = time.monotonic() + self.BUG_REPORT_TIMEOUT_S
 
-            ctrl_config = _sanitise_config_dict(self.facade.get_config() if self.facade else {})
-            zf.writestr(f"saviour_diagnostics_{ts}/controller/config.json",
-                        json.dumps(ctrl_config, indent=2, default=str))
-
-            health = self.facade.get_module_health() if self.facade else {}
-            zf.writestr(f"saviour_diagnostics_{ts}/controller/health.json",
-                        json.dumps(health, indent=2, default=str))
-
-            sessions = self.facade.get_recording_sessions() if self.facade else {}
-            zf.writestr(f"saviour_diagnostics_{ts}/controller/sessions.json",
-                        json.dumps(sessions, indent=2, default=str))
+        archive_path = None
+        try:
+            controller_ip = "localhost"
+            try:
+                controller_ip = self.facade.controller.network.ip
+            except Exception:
+                pass
+            upload_base = f"http://{controller_ip}:{self.port}/api/diagnostics/{collection.id}"
+            for mid in online_ids:
+                try:
+                    self.facade.send_command(mid, "get_diagnostics",
+                                             {"upload_url": f"{upload_base}/{mid}"})
+                except Exception as e:
+                    self.logger.error(f"Failed to request diagnostics from {mid}: {e}")
 
-            offline_ids = [mid for mid, m in modules.items() if not m.get('online')]
+            # Controller-side material is gathered while the modules work
+            try:
+                ctrl_log_result = subprocess.run(
+                    ["journalctl", "-u", "saviour.service", "-n", "500",
+                     "--no-pager", "--output=short-precise"],
+                    capture_output=True, text=True, timeout=10,
+                )
+                ctrl_logs = ctrl_log_result.stdout if ctrl_log_result.returncode == 0 else ctrl_log_result.stderr
+            except Exception as e:
+                ctrl_logs = f"Could not collect controller logs: {e}"
+            health_history = {}
+            for mid in modules:
+                try:
+                    health_history[mid] = self.facade.controller.health.get_module_health_history(mid, limit=120)
+                except Exception:
+                    pass
 
-            for mid in online_ids:
-                data = pending[mid].get('data')
-                if data:
-                    zf.writestr(f"saviour_diagnostics_{ts}/modules/{mid}/logs.txt",
-                                data.get('logs', '(no logs)'))
-                    cfg = _sanitise_config_dict(data.get('config', {}))
-                    zf.writestr(f"saviour_diagnostics_{ts}/modules/{mid}/config.json",
-                                json.dumps(cfg, indent=2, default=str))
-                else:
-                    zf.writestr(f"saviour_diagnostics_{ts}/modules/{mid}/logs.txt",
-                                "(no response within timeout)")
-
-            manifest = {
-                "generated_at": ts,
-                "online_modules": online_ids,
-                "offline_modules": offline_ids,
-                "modules_that_responded": [mid for mid in online_ids if pending[mid].get('data')],
-            }
-            zf.writestr(f"saviour_diagnostics_{ts}/manifest.json",
-                        json.dumps(manifest, indent=2))
+            responded = collection.wait(deadline)
+
+            ts = datetime.now(UTC).strftime("%Y%m%d_%H%M%S")
+            root = f"saviour_diagnostics_{ts}"
+            fd, archive_path = tempfile.mkstemp(prefix="saviour_diagnostics_", suffix=".zip",
+                                                dir=self._DIAGNOSTICS_SPOOL)
+            module_sources = {}
+            with os.fdopen(fd, "wb") as out, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr(f"{root}/controller/logs.txt", ctrl_logs)
+                write_json(zf, f"{root}/controller/config.json",
+                           _sanitise_config_dict(self.facade.get_config() if self.facade else {}))
+                write_json(zf, f"{root}/controller/health.json",
+                           self.facade.get_module_health() if self.facade else {})
+                write_json(zf, f"{root}/controller/sessions.json",
+                           self.facade.get_recording_sessions() if self.facade else {})
+
+                for mid in online_ids:
+                    prefix = f"{root}/modules/{mid}/"
+                    if mid in health_history:
+                        write_json(zf, prefix + "health_history.json", health_history[mid])
+                    data = collection.ack(mid)
+                    bundle = collection.bundle_path(mid)
+                    if bundle:
+                        try:
+                            copy_bundle(zf, bundle, prefix)
+                            module_sources[mid] = "bundle"
+                            continue
+                        except Exception as e:
+                            self.logger.warning(f"Could not read diagnostics bundle from {mid}: {e}")
+                    if data and "logs" in data:
+                        # Module predates bundle uploads (or its upload failed)
+                        zf.writestr(prefix + "logs.txt", data.get('logs', '(no logs)'))
+                        write_json(zf, prefix + "config.json",
+                                   _sanitise_config_dict(data.get('config', {})))
+                        extras = {k: v for k, v in data.items()
+                                  if k not in ("logs", "config", "type", "command", "result")}
+                        if extras:
+                            write_json(zf, prefix + "diagnostics.json", extras)
+                        module_sources[mid] = "inline"
+                    else:
+                        zf.writestr(prefix + "logs.txt",
+                                    "(no response within timeout)" if not data
+                                    else f"(bundle upload failed: {data.get('error', 'unknown')})")
+
+                write_json(zf, f"{root}/manifest.json", {
+                    "generated_at": ts,
+                    "online_modules": online_ids,
+                    "offline_modules": [mid for mid, m in modules.items() if not m.get('online')],
+                    "modules_that_responded": responded,
+                    "module_sources": module_sources,
+                    "timeout_s": self.BUG_REPORT_TIMEOUT_S,
+                })
+        except Exception as e:
+            self.logger.error(f"Bug report collection failed: {e}")
+            if archive_path is not None:
+                try:
+                    os.remove(archive_path)
+                except OSError:
+                    pass
+            self.socketio.emit("bug_report_status", {"status": "error", "error": str(e)})
+            return
+        finally:
+            collection.cleanup()
+            with self._diag_lock:
+                self._diag_collection = None
 
         token = secrets.token_urlsafe(16)
-        self._bug_report_store = {token: (buf.getvalue(), f"saviour_diagnostics_{ts}.zip")}
-        self.socketio.emit("bug_report_ready", {"token": token, "filename": f"saviour_diagnostics_{ts}.zip"})
+        filename = f"saviour_diagnostics_{ts}.zip"
+        previous = self._bug_report_store
+        self._bug_report_store = {token: (archive_path, filename)}
+        for old_path, _ in previous.values():
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+        self.socketio.emit("bug_report_ready", {"token": token, "filename": filename})
 
     def _nas_monitor_loop(self):
         NAS_CHECK_INTERVAL_S = self.config.get("export.nas_health_interval_s", 300)
@@ -2018,11 +2575,20 @@ class Web(ABC):
             self._running = True
             self.web_thread = threading.Thread(
                 target=self._run_server,
-                daemon=True
+                daemon=True,
+                name="web-server"
             )
             self.web_thread.start()
             self._nas_monitor_stop.clear()
-            threading.Thread(target=self._nas_monitor_loop, daemon=True).start()
+            threading.Thread(target=self._nas_monitor_loop, daemon=True, name="nas-monitor").start()
+            try:
+                self._get_file_index().start()
+            except Exception as e:
+                self.logger.error(f"Could not start file index: {e}")
+            self._self_metrics.start()
+            if self.config.get("proxy.enabled", True):
+                self._get_proxy_worker().start()
+            self._get_retention().start()
             return self.web_thread
 
 
@@ -2035,9 +2601,55 @@ class Web(ABC):
         """Stop the web interface"""
         if self._running:
             self._running = False
+            if self._file_index is not None:
+                self._file_index.stop()
+            if self._proxy_worker is not None:
+                self._proxy_worker.stop()
+            if self._retention is not None:
+                self._retention.stop()
+            if self._update_rollout is not None:
+                self._update_rollout.stop()
+            self._self_metrics.stop()
             self.socketio.stop()
 
 
+    def _controller_eth0_ip(self) -> str | None:
+        """eth0's address (never wlan0's), re-read from nmcli at most once a
+        minute."""
+        ip, read_at = self._eth0_ip
+        if read_at and time.monotonic() - read_at < 60:
+            return ip
+        try:
+            nm = subprocess.run(
+                ["nmcli", "-g", "IP4.ADDRESS", "device", "show", "eth0"],
+                capture_output=True, text=True, timeout=5
+            )
+            ip = nm.stdout.strip().split("/")[0] if nm.returncode == 0 else None
+        except Exception:
+            ip = None
+        self._eth0_ip = (ip, time.monotonic())
+        return ip
+
+
+    def _start_update_rollout(self, modules: list, controller_url: str, on_finished=None) -> UpdateRollout:
+        """Replace any previous rollout with one for modules and start
+        dispatching. Pacing comes from the update.* config section."""
+        if self._update_rollout is not None:
+            self._update_rollout.stop()
+        rollout = UpdateRollout(
+            modules, controller_url, self.facade.send_command,
+            emit=lambda summary: self.socketio.emit("update_rollout", summary),
+            on_finished=on_finished,
+            max_parallel=self.config.get("update.max_parallel_modules", 3),
+            stagger_s=self.config.get("update.stagger_s", 2.0),
+            module_timeout_s=self.config.get("update.module_timeout_s", 900.0),
+            serve_peers_s=self.config.get("update.serve_peers_s", 120.0),
+        )
+        self._update_rollout = rollout
+        rollout.start()
+        return rollout
+
+
     def list_modules(self):
         """List all discovered modules"""
         self.logger.info("Listing modules")
@@ -2045,100 +2657,56 @@ class Web(ABC):
         return jsonify({"modules": modules})
 
 
-    def get_exported_recordings(self):
-        """Get list of exported recordings from controller share and NAS directories"""
-        recordings = []
-
-        # Get controller share recordings
-        if self.habitat_share_dir.exists():
-            for file in self.habitat_share_dir.glob('**/*'):
-                if file.is_file() and file.suffix in ['.mp4', '.txt']:
-                    recordings.append({
-                        'filename': f"controller/{file.relative_to(self.habitat_share_dir)!s}",
-                        'size': file.stat().st_size,
-                        'created': datetime.fromtimestamp(file.stat().st_ctime).strftime('%Y-%m-%d %H:%M:%S'),
-                        'is_exported': True,
-                        'destination': 'controller'
-                    })
+    def get_exported_recordings(self, offset: int = 0, limit: int | None = None):
+        """Get list of exported recordings from controller share and NAS directories.
+
+        Served from the file index; offset/limit page through the combined
+        list (controller share first, then NAS).
+        """
+        index = self._get_file_index()
+        self._ensure_indexed("share")
+        share_count = index.count("share", suffixes=self.RECORDING_SUFFIXES)
+        recordings = [
+            self._recording_entry("controller", r)
+            for r in index.files("share", suffixes=self.RECORDING_SUFFIXES, offset=offset, limit=limit)
+        ]
 
         # Get NAS recordings (if mounted)
-        nas_recordings = self.get_nas_recordings()
-        recordings.extend(nas_recordings)
+        nas_offset = max(0, offset - share_count)
+        nas_limit = None if limit is None else limit - len(recordings)
+        if nas_limit is None or nas_limit > 0:
+            recordings.extend(self.get_nas_recordings(offset=nas_offset, limit=nas_limit))
 
         return recordings
 
 
-    def get_nas_recordings(self):
-        """Get list of exported recordings from NAS"""
-        recordings = []
-        nas_mount_point = Path("/mnt/nas")
+    @staticmethod
+    def _recording_entry(destination: str, row: dict) -> dict:
+        return {
+            'filename': f"{destination}/{row['path']}",
+            'size': row['size'],
+            'created': datetime.fromtimestamp(row['mtime']).strftime('%Y-%m-%d %H:%M:%S'),
+            'is_exported': True,
+            'destination': destination,
+        }
+
 
-        self.logger.info("Scanning NAS for recordings...")
+    def get_nas_recordings(self, offset: int = 0, limit: int | None = None):
+        """Get list of exported recordings from NAS (recordings/, videos/, ttl/ and export_* directories)"""
+        nas_mount_point = Path(self.NAS_MOUNT_POINT)
 
         # Try to mount NAS if not already mounted
         if not nas_mount_point.exists() or not nas_mount_point.is_mount():
             self.logger.info("NAS not mounted, attempting to mount...")
             if not self.mount_nas():
                 self.logger.error("Failed to mount NAS, returning empty list")
-                return recordings  # Return empty list if mounting failed
-
-        self.logger.info(f"NAS is mounted at {nas_mount_point}")
-
-        # Check what's in the root NAS directory
-        if nas_mount_point.exists():
-            root_contents = list(nas_mount_point.iterdir())
-            self.logger.info(f"NAS root contents: {[item.name for item in root_contents]}")
-
-            # Look specifically for export directories
-            export_dirs = [item for item in root_contents if item.is_dir() and item.name.startswith('export_')]
-            self.logger.info(f"Found export directories: {[item.name for item in export_dirs]}")
-        else:
-            self.logger.error(f"NAS mount point does not exist: {nas_mount_point}")
-            return recordings
-
-        # Scan multiple directories for recordings
-        directories_to_scan = ["recordings", "videos", "ttl"]
-
-        for dir_name in directories_to_scan:
-            scan_path = nas_mount_point / dir_name
-            self.logger.info(f"Looking for recordings in: {scan_path}")
-
-            if scan_path.exists():
-                self.logger.info(f"{dir_name} directory exists, scanning for files...")
-                for file in scan_path.glob('**/*'):
-                    self.logger.info(f"Found file: {file} (suffix: {file.suffix})")
-                    if file.is_file() and file.suffix in ['.mp4', '.txt']:
-                        self.logger.info(f"Adding file to recordings list: {file}")
-                        recordings.append({
-                            'filename': f"nas/{dir_name}/{file.relative_to(scan_path)!s}",
-                            'size': file.stat().st_size,
-                            'created': datetime.fromtimestamp(file.stat().st_ctime).strftime('%Y-%m-%d %H:%M:%S'),
-                            'is_exported': True,
-                            'destination': 'nas'
-                        })
-            else:
-                self.logger.info(f"{dir_name} directory does not exist: {scan_path}")
-
-        # Also scan for export directories (like export_20250624_220253) in the root
-        self.logger.info("Scanning for export directories in root...")
-        for item in nas_mount_point.iterdir():
-            self.logger.info(f"Checking item: {item.name} (is_dir: {item.is_dir()}, starts_with_export: {item.name.startswith('export_')})")
-            if item.is_dir() and item.name.startswith('export_'):
-                self.logger.info(f"Found export directory: {item}")
-                for file in item.glob('**/*'):
-                    self.logger.info(f"Found file in export directory: {file} (suffix: {file.suffix})")
-                    if file.is_file() and file.suffix in ['.mp4', '.txt']:
-                        self.logger.info(f"Adding export file to recordings list: {file}")
-                        recordings.append({
-                            'filename': f"nas/{item.name}/{file.relative_to(item)!s}",
-                            'size': file.stat().st_size,
-                            'created': datetime.fromtimestamp(file.stat().st_ctime).strftime('%Y-%m-%d %H:%M:%S'),
-                            'is_exported': True,
-                            'destination': 'nas'
-                        })
+                return []
 
-        self.logger.info(f"Found {len(recordings)} NAS recordings")
-        return recordings
+        index = self._get_file_index()
+        self._ensure_indexed("nas")
+        rows = index.files("nas", suffixes=self.RECORDING_SUFFIXES, offset=offset, limit=limit)
+        self.logger.info(f"Found {len(rows)} NAS recordings")
+        return [self._recording_entry("nas", r) for r in rows]
 
 
     def mount_nas(self):
@@ -2289,6 +2857,10 @@ class Web(ABC):
                         self.facade.update_module_version(module_id, version)
                     self.facade.send_command(module_id, "heartbeat_ack", {})
 
+                case "update_progress":
+                    if self._update_rollout is not None:
+                        self._update_rollout.on_progress(module_id, status)
+
                 case "cmd_ack":
                     command = status.get("command")
                     if command == "get_sensor_modes":
@@ -2311,6 +2883,10 @@ class Web(ABC):
                                 "success": result == "success",
                                 "output": status.get("output", ""),
                             })
+                            if self._update_rollout is not None:
+                                self._update_rollout.on_ack(
+                                    module_id, result == "success", status.get("output", ""),
+                                )
                     elif command == "shutdown":
                         self.socketio.emit("module_shutdown_ack", {"module_id": module_id})
                     elif command == "set_loom_roi" and status.get("status") == "error":
@@ -2441,5 +3017,8 @@ class Web(ABC):
         def get_exported_recordings_facade():
             """Get list of exported recordings"""
             self.logger.info("/facade/exported_recordings endpoint called")
-            exported_recordings = self.get_exported_recordings()
+            exported_recordings = self.get_exported_recordings(
+                offset=request.args.get("offset", 0, type=int),
+                limit=request.args.get("limit", None, type=int),
+            )
             return jsonify({"exported_recordings": exported_recordings})
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Controller Streaming ZIP
+
+Pull-based ZIP_STORED archive of a session folder with a layout fixed before
+the first byte is sent, so the response has a Content-Length and can serve
+HTTP Range requests (resumed downloads).
+
+The previous implementation ran zipfile on a background thread writing into
+an unbounded queue; when the browser was slower than the share, the whole
+session piled up in controller RAM. Here nothing is produced until the
+response iterator asks for it, and a read-ahead thread keeps at most
+depth x chunk_size bytes of file data in flight, reading the share in
+chunk_size-aligned blocks.
+
+Every header size is known from the file sizes alone: entries are stored
+(no compression) and the CRC-32 of each file goes in a data descriptor after
+its data (general purpose flag bit 3), so it is computed while the data
+streams. Entries, offsets and the central directory switch to ZIP64 fields
+only where a value no longer fits in 32 bits. CRCs are kept in a CrcCache
+keyed by (path, size, mtime), so resuming a download does not need to
+re-read the files that were already sent; a range that starts inside a file
+or covers the central directory reads any uncached file once to compute its
+CRC.
+
+If a file changes size after the layout was computed, its data is truncated
+or zero-padded to the declared size (and logged), so the byte count the
+client was promised stays correct; that entry's CRC will not verify.
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+_LOCAL_SIG = 0x04034B50
+_CENTRAL_SIG = 0x02014B50
+_DESCRIPTOR_SIG = 0x08074B50
+_EOCD_SIG = 0x06054B50
+_ZIP64_EOCD_SIG = 0x06064B50
+_ZIP64_LOCATOR_SIG = 0x07064B50
+
+_FLAG_DESCRIPTOR = 0x0008
+_FLAG_UTF8 = 0x0800
+_VERSION_ZIP64 = 45
+_VERSION_DEFAULT = 20
+_MAX32 = 0xFFFFFFFF
+_MAX16 = 0xFFFF
+# Sizes/offsets at or above this use ZIP64 fields (a module constant so tests can lower it)
+_ZIP64_LIMIT = _MAX32
+
+
+@dataclass
+class ZipEntry:
+    """One file to include; size and mtime are as stat()ed when the layout was built."""
+    arcname: str
+    path: str
+    size: int
+    mtime: float
+
+
+def _dos_datetime(mtime: float) -> tuple[int, int]:
+    t = time.localtime(max(mtime, 315532800))   # DOS dates start in 1980
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class CrcCache:
+    """Thread-safe LRU of file CRC-32s keyed by (path, size, mtime)."""
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._crcs: OrderedDict[tuple, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(entry: ZipEntry) -> tuple:
+        return entry.path, entry.size, entry.mtime
+
+    def get(self, entry: ZipEntry) -> int | None:
+        with self._lock:
+            key = self._key(entry)
+            crc = self._crcs.get(key)
+            if crc is not None:
+                self._crcs.move_to_end(key)
+            return crc
+
+    def put(self, entry: ZipEntry, crc: int) -> None:
+        with self._lock:
+            self._crcs[self._key(entry)] = crc
+            self._crcs.move_to_end(self._key(entry))
+            while len(self._crcs) > self.max_entries:
+                self._crcs.popitem(last=False)
+
+
+class ZipLayout:
+    """Byte layout of a stored ZIP of entries.
+
+    The archive is a list of segments, each (offset, length, kind, index):
+        "local"      local file header of entry index
+        "data"       file contents of entry index
+        "descriptor" data descriptor of entry index (needs its CRC)
+        "central"    central directory + end records (needs every CRC)
+    """
+
+    def __init__(self, entries: list[ZipEntry], crc_cache: CrcCache | None = None,
+                 chunk_size: int = 1 << 20, read_ahead: int = 4):
+        self.logger = logging.getLogger(__name__)
+        self.entries = entries
+        self.crc_cache = crc_cache or CrcCache()
+        self.chunk_size = chunk_size
+        self.read_ahead = read_ahead
+
+        self._names = [e.arcname.encode("utf-8") for e in entries]
+        self._offsets: list[int] = []
+        self._zip64: list[bool] = []
+        self.segments: list[tuple[int, int, str, int]] = []
+        pos = 0
+        for i, e in enumerate(entries):
+            zip64 = e.size >= _ZIP64_LIMIT or pos >= _ZIP64_LIMIT
+            self._offsets.append(pos)
+            self._zip64.append(zip64)
+            for kind, length in (
+                ("local", 30 + len(self._names[i]) + (20 if zip64 else 0)),
+                ("data", e.size),
+                ("descriptor", 24 if zip64 else 16),
+            ):
+                self.segments.append((pos, length, kind, i))
+                pos += length
+        self.central_offset = pos
+        self.central_size = sum(
+            46 + len(self._names[i]) + (28 if self._zip64[i] else 0) for i in range(len(entries))
+        )
+        self.zip64_end = (
+            any(self._zip64) or len(entries) >= _MAX16
+            or self.central_offset >= _ZIP64_LIMIT or self.central_size >= _ZIP64_LIMIT
+        )
+        end_len = self.central_size + 22 + (56 + 20 if self.zip64_end else 0)
+        self.segments.append((pos, end_len, "central", -1))
+        self.total_size = pos + end_len
+
+    @property
+    def etag(self) -> str:
+        """Changes whenever any name, size or mtime does (for If-Range)."""
+        h = hashlib.sha1()
+        for e in self.entries:
+            h.update(f"{e.arcname}\0{e.size}\0{e.mtime}\n".encode())
+        return h.hexdigest()
+
+    # -----------------------------------------------------------------------
+    # Record builders
+    # -----------------------------------------------------------------------
+
+    def _flags(self, i: int) -> int:
+        return _FLAG_DESCRIPTOR | (0 if self.entries[i].arcname.isascii() else _FLAG_UTF8)
+
+    def _local_header(self, i: int) -> bytes:
+        e, name = self.entries[i], self._names[i]
+        dos_time, dos_date = _dos_datetime(e.mtime)
+        if self._zip64[i]:
+            extra = struct.pack("<HHQQ", 0x0001, 16, e.size, e.size)
+            size32 = _MAX32
+        else:
+            extra = b""
+            size32 = e.size
+        return struct.pack(
+            "<IHHHHHIIIHH", _LOCAL_SIG,
+            _VERSION_ZIP64 if self._zip64[i] else _VERSION_DEFAULT,
+            self._flags(i), 0, dos_time, dos_date, 0, size32, size32, len(name), len(extra),
+        ) + name + extra
+
+    def _descriptor(self, i: int, crc: int) -> bytes:
+        size = self.entries[i].size
+        if self._zip64[i]:
+            return struct.pack("<IIQQ", _DESCRIPTOR_SIG, crc, size, size)
+        return struct.pack("<IIII", _DESCRIPTOR_SIG, crc, size, size)
+
+    def _central(self) -> bytes:
+        parts = []
+        for i, e in enumerate(self.entries):
+            name = self._names[i]
+            dos_time, dos_date = _dos_datetime(e.mtime)
+            crc = self._crc(i)
+            version = _VERSION_ZIP64 if self._zip64[i] else _VERSION_DEFAULT
+            if self._zip64[i]:
+                extra = struct.pack("<HHQQQ", 0x0001, 24, e.size, e.size, self._offsets[i])
+                size32 = offset32 = _MAX32
+            else:
+                extra = b""
+                size32, offset32 = e.size, self._offsets[i]
+            parts.append(struct.pack(
+                "<IHHHHHHIIIHHHHHII", _CENTRAL_SIG, 0x0300 | version, version, self._flags(i), 0,
+                dos_time, dos_date, crc, size32, size32, len(name), len(extra), 0, 0, 0,
+                0o100644 << 16, offset32,
+            ) + name + extra)
+        count = len(self.entries)
+        if self.zip64_end:
+            zip64_eocd_offset = self.central_offset + self.central_size
+            parts.append(struct.pack(
+                "<IQHHIIQQQQ", _ZIP64_EOCD_SIG, 44, _VERSION_ZIP64, _VERSION_ZIP64, 0, 0,
+                count, count, self.central_size, self.central_offset,
+            ))
+            parts.append(struct.pack("<IIQI", _ZIP64_LOCATOR_SIG, 0, zip64_eocd_offset, 1))
+        parts.append(struct.pack(
+            "<IHHHHIIH", _EOCD_SIG, 0, 0, min(count, _MAX16), min(count, _MAX16),
+            min(self.central_size, _MAX32), min(self.central_offset, _MAX32), 0,
+        ))
+        return b"".join(parts)
+
+    # -----------------------------------------------------------------------
+    # File data
+    # -----------------------------------------------------------------------
+
+    def _read_file(self, i: int, start: int, stop: int) -> Iterator[bytes]:
+        """Yield bytes [start, stop) of entry i in chunk-aligned reads, sized
+        to the declared size even if the file changed."""
+        e = self.entries[i]
+        pos = start
+        try:
+            with open(e.path, "rb", buffering=0) as f:
+                f.seek(pos - pos % self.chunk_size)
+                skip = pos % self.chunk_size
+                while pos < stop:
+                    block = f.read(self.chunk_size)
+                    if skip:
+                        block = block[skip:]
+                        skip = 0
+                    if not block:
+                        break
+                    block = block[:stop - pos]
+                    pos += len(block)
+                    yield block
+        except OSError as ex:
+            self.logger.error(f"ZIP stream: error reading {e.path}: {ex}")
+        if pos < stop:
+            self.logger.warning(f"ZIP stream: {e.path} shorter than listed — zero-padding {stop - pos} bytes")
+            while pos < stop:
+                n = min(self.chunk_size, stop - pos)
+                pos += n
+                yield bytes(n)
+
+    def _crc(self, i: int) -> int:
+        e = self.entries[i]
+        crc = self.crc_cache.get(e)
+        if crc is None:
+            crc = 0
+            for block in self._read_file(i, 0, e.size):
+                crc = zlib.crc32(block, crc)
+            self.crc_cache.put(e, crc)
+        return crc
+
+    # -----------------------------------------------------------------------
+    # Streaming
+    # -----------------------------------------------------------------------
+
+    def _pieces(self, start: int, stop: int, cancel: threading.Event) -> Iterator[bytes]:
+        """Archive bytes [start, stop), produced in order."""
+        for seg_start, length, kind, i in self.segments:
+            seg_stop = seg_start + length
+            if seg_stop <= start or length == 0:
+                continue
+            if seg_start >= stop or cancel.is_set():
+                return
+            lo, hi = max(start, seg_start) - seg_start, min(stop, seg_stop) - seg_start
+            if kind == "data":
+                whole = lo == 0 and hi == length
+                cached = self.crc_cache.get(self.entries[i])
+                crc = 0
+                for block in self._read_file(i, lo, hi):
+                    if whole and cached is None:
+                        crc = zlib.crc32(block, crc)
+                    yield block
+                    if cancel.is_set():
+                        return
+                if whole and cached is None:
+                    self.crc_cache.put(self.entries[i], crc)
+                continue
+            if kind == "local":
+                record = self._local_header(i)
+            elif kind == "descriptor":
+                record = self._descriptor(i, self._crc(i))
+            else:
+                record = self._central()
+            yield record[lo:hi]
+
+    def stream(self, start: int = 0, stop: int | None = None) -> Iterator[bytes]:
+        """Yield archive bytes [start, stop) with bounded read-ahead.
+
+        A reader thread fills a queue of at most read_ahead chunks and blocks
+        when it is full, so a slow client holds back the share reads instead
+        of buffering the session in memory. Closing the generator (client
+        disconnect) stops the reader.
+        """
+        stop = self.total_size if stop is None else stop
+        q: queue.Queue = queue.Queue(maxsize=self.read_ahead)
+        cancel = threading.Event()
+        done = object()
+
+        def _produce():
+            try:
+                for piece in self._pieces(start, stop, cancel):
+                    while not cancel.is_set():
+                        try:
+                            q.put(piece, timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+            except Exception as ex:
+                self.logger.error(f"ZIP stream error: {ex}", exc_info=True)
+            finally:
+                while not cancel.is_set():
+                    try:
+                        q.put(done, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+
+        reader = threading.Thread(target=_produce, daemon=True, name="zip-read-ahead")
+        reader.start()
+        try:
+            while (piece := q.get()) is not done:
+                yield piece
+        finally:
+            cancel.set()
+
+
+def collect_entries(session_dir: str, modules: set[str] | None = None,
+                    since: float | None = None, until: float | None = None) -> list[ZipEntry]:
+    """Files under session_dir as ZipEntries in walk order, optionally
+    restricted to some module directories (<date>/<module>/...) and/or an
+    mtime window. Files at the session level (logs, metadata) are always
+    included."""
+    entries = []
+    for root, dirs, filenames in os.walk(session_dir):
+        dirs.sort()
+        for fn in sorted(filenames):
+            full = os.path.join(root, fn)
+            rel = os.path.relpath(full, session_dir).replace(os.sep, "/")
+            parts = rel.split("/")
+            top_level = len(parts) == 1
+            if not top_level and modules is not None and (len(parts) < 3 or parts[1] not in modules):
+                continue
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            if not top_level and ((since is not None and st.st_mtime < since)
+                                  or (until is not None and st.st_mtime > until)):
+                continue
+            entries.append(ZipEntry(rel, full, st.st_size, st.st_mtime))
+    return entries
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Module Diagnostics Bundle
+
+Packs the output of Module.get_diagnostics() into a small ZIP -- logs as
+text, config and everything else as JSON -- and uploads it to the
+controller in chunks over HTTP instead of sending it inline as one large
+ZMQ status message. The controller answers each chunk with how many bytes
+it holds, so a failed chunk is retried from where the controller says the
+bundle ends.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+import urllib.error
+import urllib.request
+import zipfile
+
+CHUNK_SIZE = 256 * 1024
+
+
+def write_bundle(diagnostics: dict, path: str) -> None:
+    """logs.txt and config.json as before, one JSON file per structured
+    extra (ptp.json, export.json, ...) and the remaining scalars in
+    diagnostics.json."""
+    scalars = {}
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for key, value in diagnostics.items():
+            if key == "logs":
+                zf.writestr("logs.txt", value or "(no logs)")
+            elif isinstance(value, (dict, list)):
+                zf.writestr(f"{key}.json", json.dumps(value, indent=2, default=str))
+            elif key != "result":
+                scalars[key] = value
+        zf.writestr("diagnostics.json", json.dumps(scalars, indent=2, default=str))
+
+
+def upload_bundle(url: str, path: str, chunk_size: int = CHUNK_SIZE, attempts: int = 4,
+                  timeout: float = 15.0, sleep=time.sleep) -> dict:
+    """POST path to url in chunks (?offset=N). Returns {"size", "sha256"}
+    for the cmd_ack, which the controller checks against what arrived."""
+    logger = logging.getLogger(__name__)
+    size = os.path.getsize(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+
+        offset, failures = 0, 0
+        while offset < size or size == 0:
+            f.seek(offset)
+            chunk = f.read(chunk_size)
+            req = urllib.request.Request(f"{url}?offset={offset}", data=chunk, method="POST",
+                                         headers={"Content-Type": "application/octet-stream"})
+            try:
+                with urllib.request.urlopen(req, timeout=timeout) as resp:
+                    offset = json.loads(resp.read())["received"]
+                if size == 0:
+                    break
+                continue
+            except urllib.error.HTTPError as e:
+                if e.code == 409:
+                    # Out of step with the controller -- resume from its offset
+                    offset = json.loads(e.read())["received"]
+                elif e.code < 500:
+                    raise
+                else:
+                    logger.warning(f"Diagnostics chunk at {offset} rejected: {e}")
+            except (urllib.error.URLError, OSError) as e:
+                logger.warning(f"Diagnostics chunk at {offset} failed: {e}")
+            failures += 1
+            if failures >= attempts:
+                raise RuntimeError(f"Diagnostics upload gave up at {offset}/{size} bytes")
+            sleep(min(2 ** failures, 8))
+    return {"size": size, "sha256": digest.hexdigest()}
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+SAVIOUR System - Batched binary event log
+
+Append-only event log for module event streams (TTL edges, APA shock events,
+habitat motion diagnostics) that used to write one formatted CSV line per
+event straight to a line-buffered file — a str.format plus a write() syscall
+on the caller's thread for every edge, which at a 1 kHz experiment clock is
+enough file I/O to put jitter into the clock itself.
+
+Events are packed as fixed-width binary records into a preallocated buffer
+under a lock (no formatting, no syscall). A background thread hands full or
+stale buffers to the file in one write each; close() drains, fsyncs and
+closes the segment. The CSV layout the rest of the pipeline expects is
+reproduced from the records at export time (Export.export_staged calls
+convert_to_csv on every "*.evlog" in to_export/), so the NAS still receives
+the same CSV files as before.
+
+File layout:
+    MAGIC (8 bytes) | header length (uint32 LE) | header JSON | records...
+
+Each record is (timestamp_ns int64, key int32, code int32, value float64).
+What key/code/value mean is up to the writer; the header carries what is
+needed to turn them back into CSV rows:
+    csv_header   - text written before the first row (comment lines included)
+    row_template - str.format template for one row, see format_row()
+    labels       - code -> label string
+    key_fields   - {key: {field: text}} extra per-key template fields
+
+A crash leaves a valid file minus the unflushed tail; a partial trailing
+record is ignored when reading.
+"""
+
+import datetime
+import json
+import logging
+import math
+import os
+import struct
+import threading
+from collections.abc import Iterable
+
+import numpy as np
+
+EVENT_LOG_SUFFIX = ".evlog"
+MAGIC = b"SVEVLOG1"
+
+_RECORD = struct.Struct("<qiid")
+RECORD_SIZE = _RECORD.size
+RECORD_DTYPE = np.dtype([
+    ("timestamp_ns", "<i8"),
+    ("key", "<i4"),
+    ("code", "<i4"),
+    ("value", "<f8"),
+])
+
+NO_VALUE = float("nan")
+
+
+class EventLog:
+    """Writer for one segment's event log file."""
+
+    def __init__(self, path: str, row_template: str, csv_header: str,
+                 labels: Iterable[str] = (), key_fields: dict | None = None,
+                 buffer_records: int = 4096, flush_interval_s: float = 0.5):
+        """
+        Args:
+            path: File to create (conventionally "<csv filename>.evlog")
+            row_template: str.format template for one CSV row (no newline)
+            csv_header: Text written before the first CSV row
+            labels: Label strings, indexed by record code
+            key_fields: Extra template fields per record key
+            buffer_records: Records per in-memory buffer before a flush is forced
+            flush_interval_s: Longest time a record sits in memory
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.labels = list(labels)
+        self._codes = {label: i for i, label in enumerate(self.labels)}
+        self._capacity = buffer_records
+        self._flush_interval_s = flush_interval_s
+
+        self._lock = threading.Lock()
+        self._buf = bytearray(buffer_records * RECORD_SIZE)
+        self._n = 0
+        self._full: list[tuple[bytearray, int]] = []
+        self._spare: list[bytearray] = [bytearray(buffer_records * RECORD_SIZE)]
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._write_lock = threading.Lock()
+        self.records_written = 0
+        self.flushes = 0
+
+        header = json.dumps({
+            "version": 1,
+            "csv_header": csv_header,
+            "row_template": row_template,
+            "labels": self.labels,
+            "key_fields": {str(k): v for k, v in (key_fields or {}).items()},
+        }).encode("utf-8")
+        self._file = open(path, "wb", buffering=0)
+        self._file.write(MAGIC + struct.pack("<I", len(header)) + header)
+
+        self._thread = threading.Thread(target=self._flush_worker, daemon=True,
+                                        name=f"evlog-{os.path.basename(path)[:24]}")
+        self._thread.start()
+
+
+    def code_for(self, label: str) -> int:
+        """Return the record code of a label declared at construction."""
+        return self._codes[label]
+
+
+    def append(self, timestamp_ns: int, key: int = 0, code: int = 0, value: float = NO_VALUE) -> None:
+        """Add one record. Cheap enough to call from GPIO/serial callbacks."""
+        with self._lock:
+            _RECORD.pack_into(self._buf, self._n * RECORD_SIZE, timestamp_ns, key, code, value)
+            self._n += 1
+            if self._n == self._capacity:
+                self._rotate_locked()
+                self._wake.set()
+
+
+    def extend(self, records: Iterable[tuple]) -> None:
+        """Add several (timestamp_ns, key, code[, value]) records under one lock."""
+        with self._lock:
+            for record in records:
+                if len(record) == 3:
+                    record = (*record, NO_VALUE)
+                _RECORD.pack_into(self._buf, self._n * RECORD_SIZE, *record)
+                self._n += 1
+                if self._n == self._capacity:
+                    self._rotate_locked()
+                    self._wake.set()
+
+
+    def _rotate_locked(self) -> None:
+        """Queue the active buffer for writing and switch to a spare one."""
+        self._full.append((self._buf, self._n))
+        self._buf = self._spare.pop() if self._spare else bytearray(self._capacity * RECORD_SIZE)
+        self._n = 0
+
+
+    def _flush_worker(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self._flush_interval_s)
+            self._wake.clear()
+            self.flush()
+
+
+    def flush(self) -> None:
+        """Write everything appended so far to the file (no fsync)."""
+        with self._write_lock:
+            with self._lock:
+                if self._n:
+                    self._rotate_locked()
+                pending, self._full = self._full, []
+            for buf, n in pending:
+                try:
+                    self._file.write(memoryview(buf)[:n * RECORD_SIZE])
+                    self.records_written += n
+                except Exception as e:
+                    self.logger.error(f"Event log write failed for {self.path}: {e}")
+            if pending:
+                self.flushes += 1
+                with self._lock:
+                    self._spare.extend(buf for buf, _ in pending)
+
+
+    def close(self) -> None:
+        """Drain, fsync and close the segment. Safe to call twice."""
+        if self._file.closed:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        try:
+            os.fsync(self._file.fileno())
+        except OSError as e:
+            self.logger.warning(f"fsync failed for {self.path}: {e}")
+        self._file.close()
+
+
+# ---------------------------------------------------------------------------
+# Reading / conversion
+# ---------------------------------------------------------------------------
+
+def read_event_log(path: str) -> tuple[dict, np.ndarray]:
+    """Return (header, records) for an event log; records is a RECORD_DTYPE array."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a SAVIOUR event log")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_len).decode("utf-8"))
+        data = f.read()
+    usable = len(data) - len(data) % RECORD_SIZE
+    records = np.frombuffer(data[:usable], dtype=RECORD_DTYPE)
+    return header, records
+
+
+def _value_text(value: float) -> str:
+    """Render a value the way the old f-string writers did for int/float/None."""
+    if math.isnan(value):
+        return "None"
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def format_row(header: dict, timestamp_ns: int, key: int, code: int, value: float) -> str:
+    """Format one record with the header's row_template.
+
+    Template fields: timestamp_ns, key, label, value (float), value_text
+    (int/float/None text), utc (CameraBase-style UTC string), plus anything in
+    key_fields for the record's key. Missing key fields render as "None".
+    """
+    labels = header["labels"]
+    fields = _KeyFields(header["key_fields"].get(str(key), {}))
+    fields.update(
+        timestamp_ns=timestamp_ns,
+        key=key,
+        label=labels[code] if 0 <= code < len(labels) else str(code),
+        value=value,
+        value_text=_value_text(value),
+    )
+    if "{utc" in header["row_template"]:
+        dt = datetime.datetime.fromtimestamp(timestamp_ns / 1e9, tz=datetime.UTC)
+        fields["utc"] = dt.strftime("%Y-%m-%d %H:%M:%S.%f") + "+00:00"
+    return header["row_template"].format_map(fields)
+
+
+class _KeyFields(dict):
+    def __missing__(self, name):
+        return "None"
+
+
+def convert_to_csv(path: str, csv_path: str | None = None) -> str:
+    """Write the CSV equivalent of an event log and return its path.
+
+    csv_path defaults to path with the EVENT_LOG_SUFFIX removed. The CSV is
+    written to a temporary name and renamed into place.
+    """
+    if csv_path is None:
+        csv_path = path[:-len(EVENT_LOG_SUFFIX)] if path.endswith(EVENT_LOG_SUFFIX) else f"{path}.csv"
+    header, records = read_event_log(path)
+    tmp_path = f"{csv_path}.tmp"
+    with open(tmp_path, "w", buffering=1 << 20) as f:
+        f.write(header["csv_header"])
+        for ts, key, code, value in records.tolist():
+            f.write(format_row(header, ts, key, code, value))
+            f.write("\n")
+    os.replace(tmp_path, csv_path)
+    return csv_path
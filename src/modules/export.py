@@ -23,6 +23,7 @@ import threading
 import time
 
 from src.modules.config import Config
+from src.modules.event_log import EVENT_LOG_SUFFIX, convert_to_csv
 
 
 class Export:
@@ -150,19 +151,22 @@ class Export:
             The triggered session (first component of export_path) is always
             present in the result so callers can check it directly.
         """
-        all_files = os.listdir(self.to_export_folder)
         triggered_session = export_path.split('/', maxsplit=1)[0] if export_path and '/' in export_path else export_path
 
         with self._export_lock:
             if self.exporting:
                 self.logger.warning("Export already in progress; ignoring concurrent call")
                 return {triggered_session: False} if triggered_session else {}
-            self.staged_for_export = all_files
             self.exporting = True
 
-        self.logger.info(f"Attempting to export {all_files}")
-
         try:
+            self._convert_event_logs()
+            all_files = os.listdir(self.to_export_folder)
+            with self._export_lock:
+                self.staged_for_export = all_files
+
+            self.logger.info(f"Attempting to export {all_files}")
+
             # Group files by the session they belong to
             session_file_map: dict[str, list[str]] = {}
             for filename in all_files:
@@ -266,6 +270,24 @@ class Export:
                 self.exporting = False
 
 
+    def _convert_event_logs(self) -> None:
+        """Turn staged binary event logs (see event_log.py) back into their CSVs.
+
+        On success the .evlog is removed so only the CSV is exported; on failure
+        the .evlog is left in place and exported as-is so no data is lost.
+        """
+        for filename in os.listdir(self.to_export_folder):
+            if not filename.endswith(EVENT_LOG_SUFFIX) or filename.startswith("PENDING_"):
+                continue
+            path = f"{self.to_export_folder}/{filename}"
+            try:
+                csv_path = convert_to_csv(path)
+                os.remove(path)
+                self.logger.info(f"Converted event log {filename} to {os.path.basename(csv_path)}")
+            except Exception as e:
+                self.logger.error(f"Failed to convert event log {filename}: {e}")
+
+
     def _delete_local_files(self, files: list) -> None:
         deleted_count = 0
         if len(files) == 0:
@@ -326,6 +348,32 @@ class Export:
         self.session_name = safe_folder_name
 
 
+    def get_queue_state(self) -> dict:
+        """Snapshot of what is waiting to export, for diagnostics."""
+        with self._export_lock:
+            state = {
+                "exporting": self.exporting,
+                "session_name": self.session_name,
+                "export_path": self.export_path,
+                "staged_for_export": list(self.staged_for_export),
+                "session_file_count": len(self.session_files),
+            }
+        pending = []
+        try:
+            with os.scandir(self.to_export_folder) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        pending.append((entry.name, entry.stat().st_size))
+        except OSError as e:
+            state["to_export_error"] = str(e)
+        state["to_export"] = {
+            "file_count": len(pending),
+            "total_bytes": sum(size for _, size in pending),
+            "files": sorted(name for name, _ in pending)[:200],
+        }
+        return state
+
+
     def clear_session_files(self) -> None:
         self.session_files = []
 
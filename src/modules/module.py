@@ -169,7 +169,7 @@ class Module(ABC):
             "reset_config": self.reset_config,
             "start_export": self.start_export,
             "set_export_config": self.set_export_config,
-            "get_diagnostics": self.get_diagnostics,
+            "get_diagnostics": self._handle_get_diagnostics,
         }
 
         # Register callbacks and facade
@@ -309,85 +309,120 @@ class Module(ABC):
         return {"result": "started"}
 
 
-    def update_saviour(self, controller_url: str = "") -> dict:
-        """Download and apply a staged update from the controller's HTTP endpoint.
+    def update_saviour(self, controller_url: str = "", peers: list | None = None,
+                       serve_peers_s: float = 0) -> dict:
+        """Fetch and apply a staged update from the controller.
 
-        The controller serves the package at GET /update/package.  After rsync
-        the service restarts itself so the ZMQ command thread returns first.
+        Fetches the controller's manifest (GET /update/manifest) and only the
+        files that differ from INSTALL_DIR, preferring any peers (modules
+        that already updated) over the controller, and verifies each file's
+        hash before rsyncing the staged set into place. Controllers without
+        a manifest get the old full-package download from /update/package.
+        With serve_peers_s the module serves the updated files to later
+        modules for that long before restarting. Progress goes back to the
+        controller as update_progress status messages.
         """
         import shutil
         import threading
-        import urllib.request
+        import time as _time
         import zipfile
 
+        from src.modules.update_fetch import PEER_PORT, PeerServer, UpdateFetcher, fetch
+
+        def _progress(stage, **fields):
+            self.communication.send_status({"type": "update_progress", "stage": stage, **fields})
+
+        def _download_full_package(staging_dir) -> str:
+            pkg_url = f"{controller_url.rstrip('/')}/update/package"
+            self.logger.info(f"No update manifest; downloading full package from {pkg_url}")
+            tmp_zip = "/tmp/saviour_update.zip"
+            fetch(pkg_url, tmp_zip, logger=self.logger)
+            if not zipfile.is_zipfile(tmp_zip):
+                raise ValueError("Downloaded file is not a valid ZIP archive")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            os.makedirs(staging_dir)
+            extract_preserving_permissions(tmp_zip, staging_dir)
+            contents = os.listdir(staging_dir)
+            if (len(contents) == 1
+                    and os.path.isdir(os.path.join(staging_dir, contents[0]))):
+                return os.path.join(staging_dir, contents[0])
+            return staging_dir
+
         def _do_update():
             try:
                 if not controller_url:
                     raise ValueError("controller_url parameter is required")
 
-                pkg_url = f"{controller_url.rstrip('/')}/update/package"
-                self.logger.info(f"Downloading update from {pkg_url}")
+                staging_dir = "/tmp/saviour_update_stage"
+                fetcher = UpdateFetcher(controller_url, INSTALL_DIR, staging_dir,
+                                        peers=peers, report=_progress)
+                _progress("manifest")
+                manifest = fetcher.fetch_manifest()
+                if manifest is None:
+                    _progress("fetching")
+                    source = _download_full_package(staging_dir)
+                    changed = True
+                else:
+                    source = staging_dir
+                    changed = bool(fetcher.stage_changes(manifest))
+                    self.logger.info(
+                        f"Update staged: {fetcher.bytes_from_controller} bytes from controller, "
+                        f"{fetcher.bytes_from_peers} from peers"
+                    )
 
-                tmp_zip = "/tmp/saviour_update.zip"
-                # Retry download — the controller may be mid-restart when we
-                # first try, so back off and retry before giving up.
-                for _attempt in range(1, 6):
-                    try:
-                        urllib.request.urlretrieve(pkg_url, tmp_zip)
-                        break
-                    except Exception as _dl_err:
-                        if _attempt == 5:
-                            raise
-                        import time as _t
+                if changed:
+                    _progress("applying")
+                    subprocess.run([
+                        "rsync", "-a",
+                        "--chown=pi:pi",
+                        "--exclude=env/",
+                        "--exclude=.git/",
+                        f"{source}/",
+                        f"{INSTALL_DIR}/",
+                    ], check=True)
+
+                    # pip install is best-effort — modules are offline.
+                    pip_result = subprocess.run([
+                        f"{INSTALL_DIR}/env/bin/pip", "install", "-q",
+                        "--no-index",
+                        f"{INSTALL_DIR}/",
+                    ])
+                    if pip_result.returncode != 0:
                         self.logger.warning(
-                            f"Download attempt {_attempt} failed ({_dl_err}); "
-                            f"retrying in 15s"
+                            "pip install --no-index failed; new dependencies (if any) "
+                            "will need a manual install with internet access"
                         )
-                        _t.sleep(15)
-
-                if not zipfile.is_zipfile(tmp_zip):
-                    raise ValueError("Downloaded file is not a valid ZIP archive")
-
-                extract_dir = "/tmp/saviour_update_extract"
-                shutil.rmtree(extract_dir, ignore_errors=True)
-                os.makedirs(extract_dir)
-                extract_preserving_permissions(tmp_zip, extract_dir)
-
-                contents = os.listdir(extract_dir)
-                source = extract_dir
-                if (len(contents) == 1
-                        and os.path.isdir(os.path.join(extract_dir, contents[0]))):
-                    source = os.path.join(extract_dir, contents[0])
-
-                subprocess.run([
-                    "rsync", "-a",
-                    "--chown=pi:pi",
-                    "--exclude=env/",
-                    "--exclude=.git/",
-                    f"{source}/",
-                    f"{INSTALL_DIR}/",
-                ], check=True)
-
-                # pip install is best-effort — modules are offline.
-                pip_result = subprocess.run([
-                    f"{INSTALL_DIR}/env/bin/pip", "install", "-q",
-                    "--no-index",
-                    f"{INSTALL_DIR}/",
-                ])
-                if pip_result.returncode != 0:
-                    self.logger.warning(
-                        "pip install --no-index failed; new dependencies (if any) "
-                        "will need a manual install with internet access"
-                    )
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+                if serve_peers_s and manifest is not None:
+                    try:
+                        server = PeerServer(manifest, INSTALL_DIR)
+                    except OSError as e:
+                        self.logger.warning(f"Could not serve update to peers: {e}")
+                    else:
+                        server.start()
+                        _progress("serving", peer_url=f"http://{self.network.ip}:{PEER_PORT}")
+                        _time.sleep(float(serve_peers_s))
+                        server.stop()
+
+                if not changed:
+                    self.logger.info("Install already matches the staged update")
+                    self.communication.send_status({
+                        "type": "cmd_ack",
+                        "command": "update_saviour",
+                        "result": "success",
+                        "output": "Already up to date.",
+                    })
+                    return
 
                 self.logger.info("Update applied — restarting module service")
+                _progress("restarting")
                 self.communication.send_status({
                     "type": "cmd_ack",
                     "command": "update_saviour",
                     "result": "success",
                     "output": "Update applied — module is restarting...",
                 })
-                import time as _time
                 _time.sleep(2)
                 subprocess.Popen(["sudo", "systemctl", "restart", "saviour.service"])
 
@@ -852,7 +887,9 @@ class Module(ABC):
         return response
 
     def get_diagnostics(self) -> dict:
-        """Collect logs and sanitised config for a controller-initiated bug report."""
+        """Collect logs, sanitised config and PTP/export state for a
+        controller-initiated bug report. Variants extend this with their own
+        structured sections."""
         try:
             result = subprocess.run(
                 ["journalctl", "-u", "saviour.service", "-n", "500",
@@ -863,13 +900,53 @@ class Module(ABC):
         except Exception as e:
             logs = f"Could not collect logs: {e}"
 
-        return {
+        diagnostics = {
             "result": "success",
             "logs": logs,
             "config": _sanitise_config(self.config.get_all()),
             "module_type": self.module_type,
             "version": self.version,
         }
+        try:
+            diagnostics["ptp"] = {
+                "status": self.ptp.get_status(),
+                "offset_statistics": self.ptp.get_offset_statistics(),
+                "recent": self.ptp.get_ptp_buffer(max_entries=120),
+            }
+        except Exception as e:
+            diagnostics["ptp"] = {"error": str(e)}
+        try:
+            diagnostics["export"] = self.export.get_queue_state()
+        except Exception as e:
+            diagnostics["export"] = {"error": str(e)}
+        return diagnostics
+
+
+    def _handle_get_diagnostics(self, upload_url: str = "") -> dict:
+        """get_diagnostics command. With upload_url the diagnostics go to the
+        controller as a chunked bundle upload and the ack carries only the
+        bundle's size and hash; without one (an older controller) they are
+        returned inline as before."""
+        import tempfile
+
+        from src.modules.diagnostics import upload_bundle, write_bundle
+
+        diagnostics = self.get_diagnostics()
+        if not upload_url:
+            return diagnostics
+        fd, path = tempfile.mkstemp(prefix="saviour_diag_", suffix=".zip")
+        os.close(fd)
+        try:
+            write_bundle(diagnostics, path)
+            bundle = upload_bundle(upload_url, path)
+            self.logger.info(f"Uploaded diagnostics bundle ({bundle['size']} bytes)")
+            return {"result": "success", "module_type": self.module_type,
+                    "version": self.version, "bundle": bundle}
+        except Exception as e:
+            self.logger.error(f"Diagnostics upload failed, sending inline: {e}")
+            return diagnostics
+        finally:
+            os.remove(path)
 
 
     @command()
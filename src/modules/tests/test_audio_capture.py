@@ -0,0 +1,129 @@
+"""
+Tests for src/modules/variants/microphone/audio_capture.py.
+
+StreamClock is fed synthetic read-time observations with positive scheduling
+jitter and a device clock a few ppm off nominal; SampleRing is checked for
+wrap-around and overrun accounting; SegmentWriter encodes a short FLAC file
+(through soundfile) and its sidecar is parsed back.
+"""
+
+import random
+
+import numpy as np
+import pytest
+import soundfile
+
+from src.modules.variants.microphone.audio_capture import (
+    SampleRing,
+    SegmentWriter,
+    StreamClock,
+)
+
+FS = 192_000
+T0_NS = 1_700_000_000 * 1_000_000_000
+
+
+# ---------------------------------------------------------------------------
+# StreamClock
+# ---------------------------------------------------------------------------
+
+class TestStreamClock:
+    def test_regression_recovers_rate_and_offset_despite_jitter(self):
+        true_rate = FS * (1 + 20e-6)  # device crystal 20 ppm fast
+        rng = random.Random(0)
+        clock = StreamClock(FS)
+        for k in range(1, 256):
+            n = k * 16384
+            delay_ns = int(rng.expovariate(1 / 300e-6) * 1e9)  # reads are only ever late
+            if k % 25 == 0:
+                delay_ns += 20_000_000  # occasional long stall
+            clock.observe(n, T0_NS + round(n / true_rate * 1e9) + delay_ns)
+        assert clock.summary()["rate_hz"] == pytest.approx(true_rate, abs=2.0)
+        assert abs(clock.time_of(0) - T0_NS) < 300_000
+        expected = T0_NS + round(100 * 16384 / true_rate * 1e9)
+        assert abs(clock.time_of(100 * 16384) - expected) < 300_000
+
+    def test_nominal_rate_until_enough_points(self):
+        clock = StreamClock(FS, min_points=8)
+        clock.observe(FS, T0_NS + 1_000_000_000)
+        assert not clock.ready
+        assert clock.time_of(0) == T0_NS
+        assert clock.time_of(2 * FS) == T0_NS + 2_000_000_000
+
+    def test_implausible_fit_falls_back_to_nominal(self):
+        clock = StreamClock(FS, min_points=4)
+        for k in range(1, 10):
+            clock.observe(k * 1000, T0_NS + k * 1_000_000_000)  # 1000 Hz, far from nominal
+        assert clock.summary()["rate_hz"] == pytest.approx(FS)
+
+
+# ---------------------------------------------------------------------------
+# SampleRing
+# ---------------------------------------------------------------------------
+
+class TestSampleRing:
+    def test_wraps_and_preserves_order(self):
+        ring = SampleRing(10)
+        assert ring.write(np.arange(6, dtype=np.float32), 0)
+        assert ring.read(4) == (0, pytest.approx(np.arange(4)))
+        assert ring.write(np.arange(6, 12, dtype=np.float32), 6)
+        idx, data = ring.read(100)
+        assert idx == 4
+        assert data.tolist() == list(range(4, 12))
+
+    def test_overrun_drops_block_and_next_run_carries_its_index(self):
+        ring = SampleRing(8)
+        assert ring.write(np.ones(6, dtype=np.float32), 0)
+        assert not ring.write(np.ones(4, dtype=np.float32), 6)
+        assert ring.overruns == 1 and ring.dropped_samples == 4
+        assert ring.write(np.full(2, 2, dtype=np.float32), 10)
+        assert ring.read(100)[0] == 0
+        idx, data = ring.read(100)
+        assert idx == 10
+        assert data.tolist() == [2, 2]
+
+    def test_read_returns_none_when_closed_and_empty(self):
+        ring = SampleRing(4)
+        ring.close()
+        assert ring.read(4, timeout=0.01) is None
+
+
+# ---------------------------------------------------------------------------
+# SegmentWriter
+# ---------------------------------------------------------------------------
+
+def test_segment_writer_encodes_flac_and_writes_anchors(tmp_path):
+    fs = 48_000
+    ring = SampleRing(2 * fs)
+    clock = StreamClock(fs, min_points=2)
+    audio = tmp_path / "seg.flac"
+    sidecar = tmp_path / "seg_timestamps.txt"
+    tone = (0.25 * np.sin(np.arange(fs) * 2 * np.pi * 440 / fs)).astype(np.float32)
+
+    with open(sidecar, "w") as ts_file:
+        writer = SegmentWriter(ring, clock, str(audio), ts_file, fs,
+                               compression_level=0.5, anchor_interval_s=0.25).start()
+        index = 0
+        for block in np.split(tone, 10):
+            clock.observe(index + len(block), T0_NS + round((index + len(block)) / fs * 1e9))
+            ring.write(block, index)
+            index += len(block)
+        # Simulate an overrun of 1000 samples before the last block
+        clock.observe(index + 1000 + 500, T0_NS + round((index + 1500) / fs * 1e9))
+        ring.write(np.zeros(500, dtype=np.float32), index + 1000)
+        ring.close()
+        writer.join(5)
+
+    assert writer.error is None
+    data, rate = soundfile.read(str(audio), dtype="float32")
+    assert rate == fs
+    assert len(data) == fs + 1500
+    assert np.allclose(data[:fs], tone, atol=1 / 32768 * 2)
+
+    lines = sidecar.read_text().splitlines()
+    assert lines[0] == f"SAMPLE_RATE {fs}"
+    anchors = [line.split() for line in lines if line.startswith("ANCHOR")]
+    assert [int(a[1]) for a in anchors[:5]] == [0, 12_000, 24_000, 36_000, 48_000]
+    assert float(anchors[0][2]) == pytest.approx(T0_NS / 1e9, abs=1e-6)
+    assert f"GAP {fs} 1000" in lines
+    assert f"SAMPLES {fs + 1500}" in lines
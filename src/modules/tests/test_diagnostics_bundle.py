@@ -0,0 +1,102 @@
+"""
+Tests for src/modules/diagnostics.py
+
+upload_bundle talks to a throwaway ThreadingHTTPServer that mimics the
+controller's /api/diagnostics route: it appends chunks at the expected
+offset, answers 409 with its current size otherwise, and can be told to
+drop the connection once.
+"""
+
+import json
+import threading
+import urllib.parse
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.modules.diagnostics import upload_bundle, write_bundle
+
+
+@pytest.fixture
+def receiver():
+    state = {"data": b"", "fail_once_at": None, "skew_once": False, "posts": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            state["posts"] += 1
+            offset = int(urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)["offset"][0])
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            if state["fail_once_at"] == offset:
+                state["fail_once_at"] = None
+                self.send_response(500)
+                self.end_headers()
+                return
+            if state["skew_once"] and offset:
+                # Pretend the previous chunk never landed
+                state["skew_once"] = False
+                state["data"] = state["data"][:0]
+            if offset != len(state["data"]):
+                self._reply(409, {"received": len(state["data"])})
+                return
+            state["data"] += body
+            self._reply(200, {"received": len(state["data"])})
+
+        def _reply(self, code, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{httpd.server_address[1]}/api/diagnostics/abc/cam1"
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_write_bundle_layout(tmp_path):
+    path = tmp_path / "b.zip"
+    write_bundle({
+        "result": "success", "logs": "line\n", "config": {"a": 1},
+        "ptp": {"status": {}}, "version": "1.2", "module_type": "camera",
+    }, str(path))
+    with zipfile.ZipFile(path) as zf:
+        assert sorted(zf.namelist()) == ["config.json", "diagnostics.json", "logs.txt", "ptp.json"]
+        assert json.loads(zf.read("diagnostics.json")) == {"version": "1.2", "module_type": "camera"}
+
+
+class TestUpload:
+
+    def test_chunked_upload_matches_file(self, receiver, tmp_path):
+        path = tmp_path / "b.bin"
+        path.write_bytes(bytes(range(256)) * 40)
+        result = upload_bundle(receiver["url"], str(path), chunk_size=1000)
+        assert receiver["data"] == path.read_bytes()
+        assert receiver["posts"] == 11
+        assert result["size"] == 10240
+
+    def test_retries_failed_chunk(self, receiver, tmp_path):
+        path = tmp_path / "b.bin"
+        path.write_bytes(b"z" * 2500)
+        receiver["fail_once_at"] = 1000
+        upload_bundle(receiver["url"], str(path), chunk_size=1000, sleep=lambda s: None)
+        assert receiver["data"] == b"z" * 2500
+
+    def test_resumes_from_controller_offset(self, receiver, tmp_path):
+        path = tmp_path / "b.bin"
+        path.write_bytes(b"0123456789" * 300)
+        receiver["skew_once"] = True
+        upload_bundle(receiver["url"], str(path), chunk_size=1000, sleep=lambda s: None)
+        assert receiver["data"] == path.read_bytes()
+
+    def test_gives_up_after_attempts(self, tmp_path):
+        path = tmp_path / "b.bin"
+        path.write_bytes(b"x")
+        with pytest.raises(RuntimeError, match="gave up"):
+            upload_bundle("http://127.0.0.1:9/none", str(path), attempts=2, sleep=lambda s: None)
@@ -0,0 +1,157 @@
+"""
+Tests for src/modules/event_log.py
+
+Covers: record packing and buffer rotation, background/explicit flushing,
+crash-truncated files, and CSV reconstruction for the TTL, APA shock and
+habitat diagnostic layouts that the modules write through EventLog.
+"""
+
+import os
+import tempfile
+import threading
+
+from src.modules.event_log import (
+    RECORD_SIZE,
+    EventLog,
+    convert_to_csv,
+    read_event_log,
+)
+
+TTL_HEADER = "Timestamp_nanoseconds,pin_number,pin_mode,pin_state,pin_description\n"
+TTL_TEMPLATE = "{timestamp_ns},{key},{mode},{label},{description}"
+
+
+def _ttl_log(path, **kwargs):
+    return EventLog(
+        path, row_template=TTL_TEMPLATE, csv_header=TTL_HEADER,
+        labels=["TTLValue.LOW", "TTLValue.HIGH"],
+        key_fields={19: {"mode": "experiment_clock", "description": "None"}},
+        **kwargs,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Writer
+# ---------------------------------------------------------------------------
+
+class TestEventLogWriter:
+    def test_records_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "ttl.csv.evlog")
+            log = _ttl_log(path)
+            log.append(100, 19, 1)
+            log.extend([(200, 19, 0), (300, 19, 1, 2.5)])
+            log.close()
+
+            header, records = read_event_log(path)
+            assert header["labels"] == ["TTLValue.LOW", "TTLValue.HIGH"]
+            assert records["timestamp_ns"].tolist() == [100, 200, 300]
+            assert records["code"].tolist() == [1, 0, 1]
+            assert records["value"][2] == 2.5
+            assert log.records_written == 3
+
+    def test_full_buffer_rotates_without_losing_records(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "ttl.csv.evlog")
+            log = _ttl_log(path, buffer_records=8, flush_interval_s=60)
+            for i in range(100):
+                log.append(i, 19, i % 2)
+            log.close()
+            _, records = read_event_log(path)
+            assert records["timestamp_ns"].tolist() == list(range(100))
+
+    def test_concurrent_appends_all_recorded(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "ttl.csv.evlog")
+            log = _ttl_log(path, buffer_records=64, flush_interval_s=0.01)
+
+            def _writer(base):
+                for i in range(1000):
+                    log.append(base + i, 19, 0)
+
+            threads = [threading.Thread(target=_writer, args=(k * 10_000,)) for k in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            log.close()
+            _, records = read_event_log(path)
+            assert len(records) == 4000
+            assert len(set(records["timestamp_ns"].tolist())) == 4000
+
+    def test_flush_writes_without_closing(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "ttl.csv.evlog")
+            log = _ttl_log(path, flush_interval_s=60)
+            log.append(1, 19, 0)
+            log.flush()
+            _, records = read_event_log(path)
+            assert len(records) == 1
+            log.close()
+            log.close()  # idempotent
+
+    def test_partial_trailing_record_ignored(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "ttl.csv.evlog")
+            log = _ttl_log(path)
+            log.append(1, 19, 0)
+            log.append(2, 19, 1)
+            log.close()
+            with open(path, "r+b") as f:
+                f.truncate(os.path.getsize(path) - RECORD_SIZE // 2)
+            _, records = read_event_log(path)
+            assert records["timestamp_ns"].tolist() == [1]
+
+
+# ---------------------------------------------------------------------------
+# CSV conversion
+# ---------------------------------------------------------------------------
+
+class TestConvertToCsv:
+    def test_ttl_layout_matches_legacy_rows(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "s_ttl_(0_20250101-000000).csv.evlog")
+            log = _ttl_log(path)
+            log.append(1_000, 19, 1)
+            log.append(2_000, 26, 0)   # pin not in key_fields
+            log.close()
+
+            csv_path = convert_to_csv(path)
+            assert csv_path == path[:-len(".evlog")]
+            with open(csv_path) as f:
+                assert f.read() == (
+                    TTL_HEADER
+                    + "1000,19,experiment_clock,TTLValue.HIGH,None\n"
+                    + "2000,26,None,TTLValue.LOW,None\n"
+                )
+
+    def test_shock_layout_renders_ints_floats_and_none(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "shock.csv.evlog")
+            log = EventLog(path, row_template="{timestamp_ns},{label},{value_text}",
+                           csv_header="# Shock Events Recording\n",
+                           labels=("SENDING_SHOCK", "SHOCK_DELIVERY"))
+            log.append(1, code=log.code_for("SENDING_SHOCK"), value=3)
+            log.append(2, code=log.code_for("SHOCK_DELIVERY"), value=2.5)
+            log.append(3, code=0)
+            log.close()
+            with open(convert_to_csv(path)) as f:
+                assert f.read().splitlines() == [
+                    "# Shock Events Recording",
+                    "1,SENDING_SHOCK,3",
+                    "2,SHOCK_DELIVERY,2.5",
+                    "3,SENDING_SHOCK,None",
+                ]
+
+    def test_habitat_layout_formats_utc_and_score(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "diag.csv.evlog")
+            log = EventLog(path, row_template="{utc},{value:.4f},{label},{clip_open}",
+                           csv_header="timestamp_utc,motion_score,motion_state,clip_open\n",
+                           labels=("idle", "waiting", "active"),
+                           key_fields={0: {"clip_open": "False"}, 1: {"clip_open": "True"}})
+            log.append(1_700_000_000_123_456_000, 1, 2, 0.12345)
+            log.close()
+            with open(convert_to_csv(path)) as f:
+                rows = f.read().splitlines()
+            assert rows[1] == "2023-11-14 22:13:20.123456+00:00,0.1235,active,True"
@@ -2,7 +2,7 @@
 Tests for src/modules/export.py
 
 Covers: PENDING_ rollback on copy failure, thread lock on concurrent exports,
-and _mount_share retry + timeout behaviour.
+event log to CSV conversion, and _mount_share retry + timeout behaviour.
 """
 
 import os
@@ -10,6 +10,7 @@ import subprocess
 import tempfile
 from unittest.mock import MagicMock, patch
 
+from src.modules.event_log import EventLog
 from src.modules.export import Export
 
 # ---------------------------------------------------------------------------
@@ -103,6 +104,46 @@ class TestExportStagedHappyPath:
             )
 
 
+# ---------------------------------------------------------------------------
+# Event log conversion
+# ---------------------------------------------------------------------------
+
+class TestEventLogConversion:
+    def test_event_log_exported_as_csv(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            exp = _make_export(tmpdir)
+            nas_dir = os.path.join(tmpdir, "nas_session")
+            os.makedirs(nas_dir)
+            name = "session_camera_test_(0_20260101-000000).csv"
+            log = EventLog(os.path.join(exp.to_export_folder, f"{name}.evlog"),
+                           row_template="{timestamp_ns},{label}", csv_header="ts,event\n",
+                           labels=["A"])
+            log.append(5)
+            log.close()
+
+            with patch.object(exp, "_setup_export", return_value=nas_dir), \
+                 patch.object(exp, "_update_samba_settings"):
+                results = exp.export_staged("session")
+
+            assert results.get("session") is True
+            assert sorted(os.listdir(nas_dir)) == [name]
+            with open(os.path.join(nas_dir, name)) as f:
+                assert f.read() == "ts,event\n5,A\n"
+
+    def test_unreadable_event_log_exported_raw(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            exp = _make_export(tmpdir)
+            nas_dir = os.path.join(tmpdir, "nas_session")
+            os.makedirs(nas_dir)
+            _write_test_file(exp.to_export_folder, "session_camera_test_x.csv.evlog")
+
+            with patch.object(exp, "_setup_export", return_value=nas_dir), \
+                 patch.object(exp, "_update_samba_settings"):
+                exp.export_staged("session")
+
+            assert os.listdir(nas_dir) == ["session_camera_test_x.csv.evlog"]
+
+
 # ---------------------------------------------------------------------------
 # PENDING_ rollback on copy failure
 # ---------------------------------------------------------------------------
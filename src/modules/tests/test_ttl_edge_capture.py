@@ -0,0 +1,156 @@
+"""
+Tests for src/modules/variants/ttl/edge_capture.py.
+
+EdgeEventReader is driven with a fake line request (a real os.pipe() provides
+the pollable fd) so batching, clock conversion, overflow accounting and the
+reader thread are exercised without libgpiod or GPIO hardware.
+"""
+
+import os
+import threading
+import time
+from enum import Enum
+from types import SimpleNamespace
+
+import pytest
+
+from src.modules.variants.ttl.edge_capture import (
+    EdgeEventReader,
+    measure_realtime_offset_ns,
+)
+
+
+class _Type(Enum):
+    RISING_EDGE = 1
+    FALLING_EDGE = 2
+
+
+def _ev(ts, line, rising=True, seqno=1):
+    return SimpleNamespace(
+        timestamp_ns=ts, line_offset=line, line_seqno=seqno,
+        event_type=_Type.RISING_EDGE if rising else _Type.FALLING_EDGE,
+    )
+
+
+class FakeRequest:
+    def __init__(self, values=None):
+        self._r, self._w = os.pipe()
+        self.fd = self._r
+        self.pending = []
+        self.values = values or {}
+        self.released = False
+        self.lock = threading.Lock()
+
+    def push(self, *events):
+        with self.lock:
+            self.pending.extend(events)
+        os.write(self._w, b"x")
+
+    def read_edge_events(self, max_events):
+        with self.lock:
+            batch, self.pending = self.pending[:max_events], self.pending[max_events:]
+            if not self.pending:
+                os.read(self._r, 4096)
+        return batch
+
+    def get_values(self, offsets):
+        return [self.values.get(o, 0) for o in offsets]
+
+    def release(self):
+        self.released = True
+        os.close(self._r)
+        os.close(self._w)
+
+
+# ---------------------------------------------------------------------------
+# read_batch
+# ---------------------------------------------------------------------------
+
+class TestReadBatch:
+    def test_realtime_timestamps_pass_through(self):
+        req = FakeRequest()
+        reader = EdgeEventReader([17], request=req)
+        req.push(_ev(1_000, 17, True, 1), _ev(2_000, 17, False, 2))
+        events = reader.read_batch()
+        assert [(e.timestamp_ns, e.pin_number, e.rising) for e in events] == [
+            (1_000, 17, True), (2_000, 17, False)
+        ]
+        assert reader.events_read == 2
+        assert reader.max_batch == 2
+
+    def test_monotonic_mode_adds_offset(self):
+        req = FakeRequest()
+        reader = EdgeEventReader([17], request=req)
+        reader.realtime_clock = False
+        reader._offset_ns = 5_000
+        reader._offset_measured_at = time.monotonic()
+        req.push(_ev(1_000, 17))
+        assert reader.read_batch()[0].timestamp_ns == 6_000
+
+    def test_batch_size_caps_events_per_read(self):
+        req = FakeRequest()
+        reader = EdgeEventReader([17], request=req, batch_size=3)
+        req.push(*[_ev(i, 17, seqno=i + 1) for i in range(5)])
+        assert len(reader.read_batch()) == 3
+        assert len(reader.read_batch()) == 2
+
+    def test_line_seqno_gap_counts_dropped_events(self):
+        req = FakeRequest()
+        reader = EdgeEventReader([17, 27], request=req)
+        req.push(_ev(1, 17, seqno=1), _ev(2, 27, seqno=1), _ev(3, 17, seqno=5))
+        reader.read_batch()
+        assert reader.dropped_events == 3
+
+
+# ---------------------------------------------------------------------------
+# Reader thread / lifecycle
+# ---------------------------------------------------------------------------
+
+class TestReaderThread:
+    def test_batches_delivered_to_callback(self):
+        req = FakeRequest()
+        reader = EdgeEventReader([17], request=req, poll_timeout_ms=20)
+        received = []
+        done = threading.Event()
+
+        def _on_events(batch):
+            received.extend(batch)
+            if len(received) >= 2:
+                done.set()
+
+        reader.start(_on_events)
+        req.push(_ev(10, 17, True, 1), _ev(20, 17, False, 2))
+        assert done.wait(2.0)
+        reader.close()
+        assert [e.timestamp_ns for e in received] == [10, 20]
+        assert req.released
+
+    def test_callback_errors_do_not_kill_reader(self):
+        req = FakeRequest()
+        reader = EdgeEventReader([17], request=req, poll_timeout_ms=20)
+        calls = []
+        done = threading.Event()
+
+        def _on_events(batch):
+            calls.append(batch)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            done.set()
+
+        reader.start(_on_events)
+        req.push(_ev(1, 17, seqno=1))
+        time.sleep(0.1)
+        req.push(_ev(2, 17, seqno=2))
+        assert done.wait(2.0)
+        reader.close()
+
+    def test_get_values_maps_pins(self):
+        req = FakeRequest(values={17: 1, 27: 0})
+        reader = EdgeEventReader([17, 27], request=req)
+        assert reader.get_values() == {17: True, 27: False}
+
+
+def test_measure_realtime_offset_close_to_wall_clock():
+    offset = measure_realtime_offset_ns()
+    mono = time.clock_gettime_ns(time.CLOCK_MONOTONIC)
+    assert mono + offset == pytest.approx(time.time_ns(), abs=5_000_000)
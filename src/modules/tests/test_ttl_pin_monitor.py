@@ -0,0 +1,120 @@
+"""
+Tests for src/modules/variants/ttl/pin_monitor.py.
+
+PinStateRing is fed synthetic edges on a fixed clock (1 ms bins) to check
+gap filling, sub-bin pulses, late edges and window wrap-around. TraceRenderer
+is rendered twice against the same ring to check that the frame is kept and
+scrolled rather than redrawn.
+"""
+
+import numpy as np
+
+from src.modules.variants.ttl.pin_monitor import (
+    HIGH_BIT,
+    LOW_BIT,
+    PinStateRing,
+    TraceRenderer,
+)
+
+MS = 1_000_000
+T0 = 1_000_000 * MS  # arbitrary epoch, bin-aligned
+
+
+def _ring(pins=(17,), window_s=1.0):
+    return PinStateRing(pins, window_s=window_s, resolution_hz=1000, now_ns=T0)
+
+
+# ---------------------------------------------------------------------------
+# PinStateRing
+# ---------------------------------------------------------------------------
+
+class TestPinStateRing:
+    def test_bins_between_edges_hold_previous_level(self):
+        ring = _ring()
+        ring.record(17, T0 + 2 * MS, True)
+        ring.record(17, T0 + 5 * MS, False)
+        ring.advance(T0 + 8 * MS)
+        bins = ring.read(T0 // MS, 8)[0].tolist()
+        assert bins == [
+            LOW_BIT, LOW_BIT, LOW_BIT | HIGH_BIT, HIGH_BIT,
+            HIGH_BIT, HIGH_BIT | LOW_BIT, LOW_BIT, LOW_BIT,
+        ]
+        assert ring.states() == {17: False}
+
+    def test_pulse_shorter_than_a_bin_is_visible(self):
+        ring = _ring()
+        ring.record(17, T0 + 3 * MS + 100_000, True)
+        ring.record(17, T0 + 3 * MS + 200_000, False)
+        ring.advance(T0 + 5 * MS)
+        assert ring.read(T0 // MS + 3, 1)[0, 0] == HIGH_BIT | LOW_BIT
+
+    def test_late_edge_rewrites_following_bins(self):
+        ring = _ring()
+        ring.advance(T0 + 10 * MS)
+        ring.record(17, T0 + 4 * MS, True)
+        row = ring.read(T0 // MS, 10)[0].tolist()
+        assert row[4] == HIGH_BIT | LOW_BIT
+        assert row[5:] == [HIGH_BIT] * 5
+
+    def test_other_pins_filled_with_their_own_state(self):
+        ring = _ring(pins=(17, 27))
+        ring.record(27, T0, True)
+        ring.record(17, T0 + 3 * MS, True)
+        bins = ring.read(T0 // MS + 1, 2)
+        assert bins[1].tolist() == [HIGH_BIT, HIGH_BIT]
+        assert bins[0].tolist() == [LOW_BIT, LOW_BIT]
+
+    def test_unknown_pins_ignored(self):
+        ring = _ring()
+        ring.record(99, T0 + MS, True)
+        assert ring.states() == {17: False}
+
+    def test_window_wraps_and_old_bins_read_as_zero(self):
+        ring = _ring(window_s=0.01)  # 10 bins
+        ring.record(17, T0 + 25 * MS, True)
+        ring.advance(T0 + 30 * MS)
+        assert ring.read(T0 // MS, 5).tolist() == [[0, 0, 0, 0, 0]]
+        assert ring.read(T0 // MS + 26, 4).tolist() == [[HIGH_BIT] * 4]
+        # Bins beyond the filled point are unknown
+        assert ring.read(T0 // MS + 30, 2).tolist() == [[0, 0]]
+
+
+# ---------------------------------------------------------------------------
+# TraceRenderer
+# ---------------------------------------------------------------------------
+
+class TestTraceRenderer:
+    def test_frame_kept_and_scrolled_between_renders(self):
+        ring = _ring(window_s=2.0)
+        renderer = TraceRenderer(lag_s=0)
+        configs = {17: {"mode": "input"}}
+
+        ring.record(17, T0 + 10 * MS, True)
+        first = renderer.render(ring, configs, active_low=False, now_ns=T0 + 100 * MS).copy()
+        before_next = renderer._next_bin
+        second = renderer.render(ring, configs, active_low=False, now_ns=T0 + 200 * MS)
+
+        bins_per_px = -(-ring.n_bins // renderer.trace_w)
+        n_cols = (renderer._next_bin - before_next) // bins_per_px
+        assert n_cols > 0
+        ty0 = renderer._row_y0(0) + renderer.HEADER_H
+        rows = slice(ty0 + 1, ty0 + renderer.TRACE_H)
+        x0, x1 = renderer.trace_x0, renderer.trace_x1
+        # The old content moved left by exactly the number of new columns
+        assert np.array_equal(second[rows, x0:x1 - n_cols], first[rows, x0 + n_cols:x1])
+
+    def test_active_level_drawn_in_active_colour(self):
+        ring = _ring(window_s=2.0)
+        renderer = TraceRenderer(lag_s=0)
+        ring.record(17, T0, True)
+        frame = renderer.render(ring, {17: {"mode": "input"}}, active_low=False, now_ns=T0 + 2000 * MS)
+        ty0 = renderer._row_y0(0) + renderer.HEADER_H
+        yhi = ty0 + 6
+        last_col = frame[yhi, renderer.trace_x1 - 1]
+        assert last_col.tolist() == TraceRenderer.ACTIVE_COL.tolist()
+
+    def test_layout_rebuilt_when_ring_replaced(self):
+        renderer = TraceRenderer(lag_s=0)
+        one = renderer.render(_ring(pins=(17,)), {}, True, now_ns=T0 + MS)
+        two = renderer.render(_ring(pins=(17, 27)), {}, True, now_ns=T0 + MS)
+        assert two.shape[0] > one.shape[0]
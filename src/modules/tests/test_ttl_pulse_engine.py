@@ -0,0 +1,177 @@
+"""
+Tests for src/modules/variants/ttl/pulse_engine.py.
+
+Schedules are checked for absolute (non-accumulating) deadlines, PulseTrain is
+run against a recording drive function on the real clock with short periods,
+and HardwarePWM is pointed at a temporary directory laid out like
+/sys/class/pwm.
+"""
+
+import os
+import random
+import threading
+import time
+from itertools import islice
+
+from src.modules.variants.ttl.pulse_engine import (
+    HardwarePWM,
+    PulseTimingStats,
+    PulseTrain,
+    clock_schedule,
+    interval_schedule,
+    pseudorandom_schedule,
+    sleep_until_ns,
+)
+
+# ---------------------------------------------------------------------------
+# Schedules
+# ---------------------------------------------------------------------------
+
+class TestSchedules:
+    def test_clock_edges_are_absolute(self):
+        edges = list(islice(clock_schedule(1_000, 0.01, 0.25), 6))
+        assert edges == [
+            (1_000, True), (2_501_000, False),
+            (10_001_000, True), (12_501_000, False),
+            (20_001_000, True), (22_501_000, False),
+        ]
+
+    def test_clock_full_duty_has_no_inactive_edges(self):
+        edges = list(islice(clock_schedule(0, 0.01, 1.0), 3))
+        assert all(active for _, active in edges)
+
+    def test_pseudorandom_gap_measured_from_pulse_end(self):
+        edges = list(islice(pseudorandom_schedule(0, 1.0, 2.0, 0.1, rng=random.Random(1)), 4))
+        (on1, a1), (off1, a2), (on2, _), (off2, _) = edges
+        assert (a1, a2) == (True, False)
+        assert off1 - on1 == 100_000_000
+        assert 1_000_000_000 <= on2 - off1 <= 2_000_000_000
+        assert off2 - on2 == 100_000_000
+
+    def test_interval_respects_repeat_count(self):
+        edges = list(interval_schedule(0, 2.0, 0.02, repeat_count=2))
+        assert [ts for ts, _ in edges] == [2_000_000_000, 2_020_000_000, 4_000_000_000, 4_020_000_000]
+
+
+# ---------------------------------------------------------------------------
+# Timing
+# ---------------------------------------------------------------------------
+
+def test_sleep_until_does_not_return_early():
+    deadline = time.time_ns() + 5_000_000
+    sleep_until_ns(deadline, spin_ns=500_000)
+    assert time.time_ns() >= deadline
+
+
+def test_stats_period_jitter():
+    stats = PulseTimingStats(nominal_period_ns=1_000_000)
+    for k, late in enumerate([0, 10_000, 0, 10_000]):
+        stats.record(k * 1_000_000, k * 1_000_000 + late, True)
+    summary = stats.summary()
+    assert summary["edges"] == 4
+    assert summary["max_late_us"] == 10.0
+    assert summary["period_jitter_max_us"] == 10.0
+    assert summary["period_jitter_std_us"] > 0
+
+
+# ---------------------------------------------------------------------------
+# PulseTrain
+# ---------------------------------------------------------------------------
+
+class TestPulseTrain:
+    def test_edges_driven_and_recorded_in_order(self):
+        drives, recorded = [], []
+        done = threading.Event()
+
+        def _on_edge(ts, active):
+            recorded.append((ts, active))
+            if len(recorded) == 4:
+                done.set()
+
+        schedule = interval_schedule(time.time_ns(), 0.005, 0.002, repeat_count=2)
+        train = PulseTrain(schedule, drives.append, _on_edge, lambda: True).start()
+        assert done.wait(2.0)
+        train.join(1.0)
+        assert not train.is_alive()
+        assert [a for _, a in recorded] == [True, False, True, False]
+        # Final drive returns the pin to inactive
+        assert drives == [True, False, True, False, False]
+        # No accumulated drift: second onset lands one interval after the first
+        assert abs((recorded[2][0] - recorded[0][0]) - 5_000_000) < 2_000_000
+        assert train.stats.edges == 4
+
+    def test_pulses_missed_by_more_than_a_period_are_skipped(self):
+        # Start ten periods in the past, as after a stall or a clock step
+        period_ns = 20_000_000
+        start = time.time_ns() - 10 * period_ns - period_ns // 4
+        recorded = []
+        done = threading.Event()
+
+        def _on_edge(ts, active):
+            recorded.append((ts, active))
+            if len(recorded) == 4:
+                done.set()
+
+        train = PulseTrain(clock_schedule(start, period_ns / 1e9, 0.5), lambda _: None, _on_edge,
+                           lambda: not done.is_set(), stats=PulseTimingStats(period_ns)).start()
+        assert done.wait(2.0)
+        train.join(1.0)
+        # No burst: onsets 0-9 are more than a period late and skipped (10
+        # too if the thread was slow to start); the next is driven late and
+        # the one after back on schedule
+        skipped = train.stats.skipped
+        assert skipped in (10, 11)
+        assert [a for _, a in recorded] == [True, False, True, False]
+        assert recorded[0][0] - start >= skipped * period_ns
+        assert abs(recorded[2][0] - start - (skipped + 1) * period_ns) < period_ns // 4
+        assert train.stats.summary()["skipped_pulses"] == train.stats.skipped
+
+    def test_stop_interrupts_long_wait(self):
+        running = threading.Event()
+        running.set()
+        drives = []
+        schedule = interval_schedule(time.time_ns(), 60.0, 0.01)
+        train = PulseTrain(schedule, drives.append, lambda *_: None, running.is_set).start()
+        time.sleep(0.05)
+        running.clear()
+        train.join(1.0)
+        assert not train.is_alive()
+        assert drives == [False]
+
+
+# ---------------------------------------------------------------------------
+# HardwarePWM
+# ---------------------------------------------------------------------------
+
+def _fake_pwmchip(root, channel):
+    chip = os.path.join(root, "pwmchip0")
+    pwm = os.path.join(chip, f"pwm{channel}")
+    os.makedirs(pwm)
+    for name in ("period", "duty_cycle", "enable"):
+        with open(os.path.join(pwm, name), "w") as f:
+            f.write("0")
+    return pwm
+
+
+class TestHardwarePWM:
+    def test_configures_sysfs_and_logs_computed_edges(self, tmp_path):
+        pwm_dir = _fake_pwmchip(str(tmp_path), 1)
+        pwm = HardwarePWM(0, 1, sysfs_root=str(tmp_path))
+        pwm.EDGE_LOG_INTERVAL_S = 0.01
+        edges = []
+        pwm.start(0.01, 0.75, active_low=True, on_edge=lambda ts, a: edges.append((ts, a)))
+        time.sleep(0.05)
+        pwm.stop()
+
+        def _read(name):
+            with open(os.path.join(pwm_dir, name)) as f:
+                return f.read()
+
+        assert _read("period") == "10000000"
+        # Active-low: the electrical high part is the inactive quarter
+        assert _read("duty_cycle") == "2500000"
+        assert _read("enable") == "0"
+        assert pwm.active_ns == 7_500_000
+        assert edges[0] == (pwm.enabled_at_ns, True)
+        assert edges[1] == (pwm.enabled_at_ns + 7_500_000, False)
+        assert len(edges) >= 6
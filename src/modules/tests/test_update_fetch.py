@@ -0,0 +1,165 @@
+"""
+Tests for src/modules/update_fetch.py
+
+A throwaway ThreadingHTTPServer stands in for the controller; its handler
+serves /update/manifest and /update/file/<path> from a dict and can be told
+to answer 503 + Retry-After first. Peers are real PeerServer instances on
+ephemeral ports.
+"""
+
+import json
+import os
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.modules.update_fetch import PeerServer, UpdateFetcher, backoff_delay, fetch
+from src.shared.update_manifest import file_sha256
+
+
+@pytest.fixture
+def controller():
+    state = {"manifest": None, "files": {}, "busy": 0, "requests": []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state["requests"].append(self.path)
+            if state["busy"]:
+                state["busy"] -= 1
+                self.send_response(503)
+                self.send_header("Retry-After", "0")
+                self.end_headers()
+                return
+            if self.path == "/update/manifest" and state["manifest"] is not None:
+                body = json.dumps(state["manifest"]).encode()
+            elif self.path.startswith("/update/file/"):
+                body = state["files"].get(urllib.parse.unquote(self.path[len("/update/file/"):]))
+            else:
+                body = None
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _manifest_for(tmp_path, files):
+    """Write files to a scratch dir and return a manifest describing them."""
+    scratch = tmp_path / "scratch"
+    entries = {}
+    for rel, data in files.items():
+        path = scratch / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        entries[rel] = {"sha256": file_sha256(str(path)), "size": len(data), "mode": 0o644}
+    return {"manifest_id": "test", "prefix": "", "files": entries}
+
+
+FILES = {"src/a.py": b"a = 1\n", "src/b.py": b"b = 2\n", "README.md": b"# saviour\n"}
+
+
+class TestBackoff:
+
+    def test_retry_after_wins_with_jitter(self):
+        assert 5.0 <= backoff_delay(1, retry_after=5.0) <= 6.0
+
+    def test_exponential_and_capped(self):
+        assert 1.0 <= backoff_delay(1) <= 2.0
+        assert 4.0 <= backoff_delay(3) <= 8.0
+        assert 30.0 <= backoff_delay(20) <= 60.0
+
+    def test_fetch_retries_503_then_succeeds(self, controller):
+        controller["files"]["x"] = b"payload"
+        controller["busy"] = 2
+        sleeps = []
+        assert fetch(controller["url"] + "/update/file/x", sleep=sleeps.append) == b"payload"
+        assert len(sleeps) == 2 and all(0.0 <= s <= 1.0 for s in sleeps)
+
+    def test_fetch_does_not_retry_404(self, controller):
+        with pytest.raises(Exception, match="404"):
+            fetch(controller["url"] + "/update/file/missing", sleep=lambda s: pytest.fail("retried"))
+
+
+class TestUpdateFetcher:
+
+    def test_missing_manifest_returns_none(self, controller, tmp_path):
+        fetcher = UpdateFetcher(controller["url"], str(tmp_path), str(tmp_path / "stage"))
+        assert fetcher.fetch_manifest() is None
+
+    def test_stages_only_changed_files(self, controller, tmp_path):
+        manifest = _manifest_for(tmp_path, FILES)
+        controller["manifest"] = manifest
+        controller["files"] = dict(FILES)
+        install = tmp_path / "install"
+        (install / "src").mkdir(parents=True)
+        (install / "src/a.py").write_bytes(FILES["src/a.py"])
+        os.chmod(install / "src/a.py", 0o644)
+
+        reports = []
+        fetcher = UpdateFetcher(controller["url"], str(install), str(tmp_path / "stage"),
+                                report=lambda stage, **f: reports.append((stage, f)))
+        assert fetcher.fetch_manifest() == manifest
+        assert fetcher.stage_changes(manifest) == ["README.md", "src/b.py"]
+        assert (tmp_path / "stage/src/b.py").read_bytes() == FILES["src/b.py"]
+        assert not (tmp_path / "stage/src/a.py").exists()
+        assert reports[-1] == ("verifying", {"done": 2, "total": 2})
+        assert fetcher.bytes_from_controller == len(FILES["src/b.py"]) + len(FILES["README.md"])
+
+    def test_corrupt_file_fails(self, controller, tmp_path):
+        manifest = _manifest_for(tmp_path, FILES)
+        controller["files"] = dict(FILES, **{"src/b.py": b"b = 3\n"})
+        fetcher = UpdateFetcher(controller["url"], str(tmp_path / "install"), str(tmp_path / "stage"))
+        with pytest.raises(ValueError, match="Checksum mismatch for src/b.py"):
+            fetcher.stage_changes(manifest)
+
+    def test_prefers_peer_and_drops_bad_ones(self, controller, tmp_path, monkeypatch):
+        monkeypatch.setattr("src.modules.update_fetch.random.shuffle", lambda peers: None)
+        manifest = _manifest_for(tmp_path, FILES)
+        controller["files"] = dict(FILES)
+        peer_root = tmp_path / "peer"
+        for rel, data in FILES.items():
+            (peer_root / rel).parent.mkdir(parents=True, exist_ok=True)
+            (peer_root / rel).write_bytes(data)
+        good = PeerServer(manifest, str(peer_root), host="127.0.0.1", port=0)
+        good.start()
+        try:
+            dead = "http://127.0.0.1:9"   # discard port: connection refused
+            fetcher = UpdateFetcher(controller["url"], str(tmp_path / "install"), str(tmp_path / "stage"),
+                                    peers=[dead, f"http://127.0.0.1:{good.port}"])
+            fetcher.stage_changes(manifest)
+        finally:
+            good.stop()
+        assert fetcher.peers == [f"http://127.0.0.1:{good.port}"]
+        assert fetcher.bytes_from_controller == 0
+        assert not any(p.startswith("/update/file/") for p in controller["requests"])
+
+
+def test_peer_server_only_serves_manifest_paths(tmp_path):
+    manifest = _manifest_for(tmp_path, {"src/a.py": b"a"})
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src/a.py").write_bytes(b"a")
+    (tmp_path / ".env").write_bytes(b"SECRET=1")
+    server = PeerServer(manifest, str(tmp_path), host="127.0.0.1", port=0)
+    server.start()
+    try:
+        base = f"http://127.0.0.1:{server.port}/update/file/"
+        assert fetch(base + "src/a.py", attempts=1) == b"a"
+        for rel in (".env", "..%2F.env", "src/../.env"):
+            with pytest.raises(Exception, match="404"):
+                fetch(base + rel, attempts=1)
+    finally:
+        server.stop()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Module Update Fetcher
+
+Pulls a staged update onto a module file by file. The controller publishes
+a manifest (see src/shared/update_manifest.py) alongside the package; the
+module diffs it against its install tree, fetches only the files that
+differ -- from a peer module that has already updated where one is offered,
+otherwise from the controller -- and verifies every file's sha256 in a
+staging directory before anything is rsynced into place.
+
+The controller sheds load with 503 + Retry-After when too many modules are
+downloading at once, so every controller request backs off exponentially
+with jitter and honours Retry-After rather than retrying on a fixed timer.
+"""
+
+import json
+import logging
+import os
+import random
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.shared.update_manifest import changed_files, safe_path, verify_file
+
+PEER_PORT = 8765
+
+_CHUNK = 256 * 1024
+_RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def backoff_delay(attempt: int, retry_after: float | None = None,
+                  base: float = 2.0, cap: float = 60.0) -> float:
+    """Seconds to wait before retry number attempt (1-based). A server's
+    Retry-After wins, plus up to a second of jitter so modules told the same
+    value don't all come back together; otherwise exponential with equal
+    jitter."""
+    if retry_after is not None:
+        return retry_after + random.uniform(0.0, 1.0)
+    ceiling = min(cap, base * (2 ** (attempt - 1)))
+    return ceiling / 2 + random.uniform(0.0, ceiling / 2)
+
+
+def _retry_after(err: urllib.error.HTTPError) -> float | None:
+    try:
+        return float(err.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def fetch(url: str, dest: str | None = None, attempts: int = 6, timeout: float = 30.0,
+          sleep: Callable[[float], None] = time.sleep, logger: logging.Logger | None = None) -> bytes | None:
+    """GET url, retrying connection errors and 429/5xx with backoff.
+
+    Writes the body to dest (and returns None) when given, else returns it.
+    Other HTTP errors (e.g. 404) are raised immediately -- retrying won't
+    change them.
+    """
+    logger = logger or logging.getLogger(__name__)
+    for attempt in range(1, attempts + 1):
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as resp:
+                if dest is None:
+                    return resp.read()
+                with open(dest, "wb") as f:
+                    shutil.copyfileobj(resp, f, _CHUNK)
+                return None
+        except urllib.error.HTTPError as e:
+            if e.code not in _RETRY_STATUS or attempt == attempts:
+                raise
+            delay = backoff_delay(attempt, _retry_after(e))
+            logger.info(f"{url} answered {e.code}; retrying in {delay:.1f}s")
+        except (urllib.error.URLError, OSError) as e:
+            if attempt == attempts:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"Fetching {url} failed ({e}); retrying in {delay:.1f}s")
+        sleep(delay)
+    return None
+
+
+def file_url(base_url: str, rel: str) -> str:
+    return f"{base_url.rstrip('/')}/update/file/{urllib.parse.quote(rel)}"
+
+
+class UpdateFetcher:
+    """Stages the files a manifest says have changed.
+
+    report(stage, **fields) is called with progress -- "fetching" at most
+    once a second plus once at the end, "verifying" once all files are in.
+    """
+
+    def __init__(self, controller_url: str, install_dir: str, staging_dir: str,
+                 peers: list | None = None, report: Callable[..., None] | None = None,
+                 sleep: Callable[[float], None] = time.sleep, progress_interval: float = 1.0):
+        self.logger = logging.getLogger(__name__)
+        self.controller_url = controller_url.rstrip("/")
+        self.install_dir = install_dir
+        self.staging_dir = staging_dir
+        self.peers = [p.rstrip("/") for p in (peers or [])]
+        random.shuffle(self.peers)   # spread a wave across the offered peers
+        self.report = report or (lambda stage, **fields: None)
+        self.sleep = sleep
+        self.progress_interval = progress_interval
+        self.bytes_from_peers = 0
+        self.bytes_from_controller = 0
+
+
+    def fetch_manifest(self) -> dict | None:
+        """The controller's manifest, or None if it doesn't publish one
+        (an older controller) -- the caller falls back to the full ZIP."""
+        try:
+            body = fetch(f"{self.controller_url}/update/manifest", sleep=self.sleep, logger=self.logger)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+        return json.loads(body)
+
+
+    def stage_changes(self, manifest: dict) -> list[str]:
+        """Fetch and verify every changed file into staging_dir, with its
+        manifest mode applied. Returns the changed paths; raises if any
+        file can't be fetched intact."""
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        os.makedirs(self.staging_dir)
+        changed = changed_files(manifest, self.install_dir)
+        total = len(changed)
+        self.logger.info(f"Update {manifest.get('manifest_id')}: {total} of "
+                         f"{len(manifest.get('files', {}))} files changed")
+        last_report = 0.0
+        for done, rel in enumerate(changed, 1):
+            entry = manifest["files"][rel]
+            dest = os.path.join(self.staging_dir, rel)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            self._fetch_file(rel, entry, dest)
+            if entry.get("mode") is not None:
+                os.chmod(dest, entry["mode"])
+            now = time.monotonic()
+            if now - last_report >= self.progress_interval or done == total:
+                last_report = now
+                self.report("fetching", done=done, total=total,
+                            bytes=self.bytes_from_peers + self.bytes_from_controller)
+        self.report("verifying", done=total, total=total)
+        return changed
+
+
+    def _fetch_file(self, rel: str, entry: dict, dest: str) -> None:
+        # Peers get one try each: a peer that fails or serves a bad file is
+        # dropped for the rest of this update, and the controller (with
+        # full retry/backoff) is always the last resort.
+        for peer in list(self.peers):
+            try:
+                fetch(file_url(peer, rel), dest, attempts=1, timeout=10.0, logger=self.logger)
+                if verify_file(dest, entry):
+                    self.bytes_from_peers += entry["size"]
+                    return
+                self.logger.warning(f"Peer {peer} served a bad copy of {rel}; dropping it")
+            except Exception as e:
+                self.logger.warning(f"Peer {peer} failed for {rel} ({e}); dropping it")
+            self.peers.remove(peer)
+        fetch(file_url(self.controller_url, rel), dest, sleep=self.sleep, logger=self.logger)
+        if not verify_file(dest, entry):
+            raise ValueError(f"Checksum mismatch for {rel}")
+        self.bytes_from_controller += entry["size"]
+
+
+class PeerServer:
+    """Serves manifest files out of an updated install tree to other modules.
+
+    Only paths listed in the manifest are served -- the install dir also
+    holds .env credentials -- and fetchers verify every file regardless.
+    """
+
+    def __init__(self, manifest: dict, install_dir: str, host: str = "0.0.0.0", port: int = PEER_PORT):
+        self.manifest = manifest
+        self.install_dir = install_dir
+        self.logger = logging.getLogger(__name__)
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                prefix = "/update/file/"
+                rel = urllib.parse.unquote(self.path[len(prefix):]) if self.path.startswith(prefix) else ""
+                if not safe_path(server.manifest, rel):
+                    self.send_error(404)
+                    return
+                path = os.path.join(server.install_dir, rel)
+                try:
+                    f = open(path, "rb")
+                except OSError:
+                    self.send_error(404)
+                    return
+                with f:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+                    self.end_headers()
+                    shutil.copyfileobj(f, self.wfile, _CHUNK)
+
+            def log_message(self, format, *args):
+                server.logger.debug(format % args)
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True, name="update-peer-server")
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -26,6 +26,7 @@ from motor import Motor
 from protocol import Protocol
 from shock import Shocker
 
+from modules.event_log import EVENT_LOG_SUFFIX, EventLog
 from modules.module import Module, check, command
 
 
@@ -52,7 +53,7 @@ class APAModule(Module):
         self.send_state_thread: threading.Thread = None
 
         # Recording-specific variables
-        self._shock_file_handle = None
+        self._shock_event_log = None # EventLog, converted to .csv at export
         self.current_shock_events_filename = None
         self._time_series_file_handle = None
         self.recording_shocks: bool = False
@@ -375,38 +376,46 @@ class APAModule(Module):
             return False
 
 
+    SHOCK_EVENTS = ("SENDING_SHOCK", "STOPPING_SHOCK", "SHOCK_DELIVERY", "SHOCK_STOP_DELIVERY")
+
     def _write_shock_event(self, timestamp_ns: int, event: str):
-        """Write a shock event to file"""
-        if self._shock_file_handle:
-            self._shock_file_handle.write(f'{timestamp_ns},{event},{self.motor.speed_from_arduino}\n')
+        """Append a shock event to the event log"""
+        event_log = self._shock_event_log
+        if event_log is not None:
+            rpm = self.motor.speed_from_arduino
+            event_log.append(timestamp_ns, code=event_log.code_for(event),
+                             value=float("nan") if rpm is None else rpm)
 
 
     def _create_shock_event_file(self) ->  bool:
-        filename = f"{self.facade.get_filename_prefix()}_shock_events.csv"
+        filename = f"{self.facade.get_filename_prefix()}_shock_events.csv{EVENT_LOG_SUFFIX}"
         self.current_shock_events_filename = filename
         self.logger.info(f"Creating shock events file {filename}")
         self.facade.add_session_file(filename)
         try:
-            self._shock_file_handle = open(filename, "w", buffering=1)  # line-buffered
-            # Write header with metadata
-            f = self._shock_file_handle
-            f.write("# Shock Events Recording\n")
-            f.write(f"# Session ID: {self.recording_session_id}\n")
-            f.write(f"# Recording Start: {self.recording_start_time}\n")
-            f.write("#\n")
-            f.write("Timestamp_nanoseconds, event, rotation speed (rpm)\n")
+            self._shock_event_log = EventLog(
+                filename,
+                row_template="{timestamp_ns},{label},{value_text}",
+                csv_header=(
+                    "# Shock Events Recording\n"
+                    f"# Session ID: {self.recording_session_id}\n"
+                    f"# Recording Start: {self.recording_start_time}\n"
+                    "#\n"
+                    "Timestamp_nanoseconds, event, rotation speed (rpm)\n"
+                ),
+                labels=self.SHOCK_EVENTS,
+            )
         except Exception as e:
             self.logger.error(f"Failed to open shock events file: {e}")
-            self._shock_file_handle = None
+            self._shock_event_log = None
 
 
     def _close_shock_event_file(self) -> bool:
-        """Close shock events file"""
+        """Drain, fsync and close the shock event log"""
         try:
-            if self._shock_file_handle is not None:
-                self._shock_file_handle.flush()
-                self._shock_file_handle.close()
-                self._shock_file_handle = None
+            if self._shock_event_log is not None:
+                event_log, self._shock_event_log = self._shock_event_log, None
+                event_log.close()
             self.logger.info("Closed shock events file")
         except Exception as e:
             self.logger.warning(f"Error closing shock events file: {e}")
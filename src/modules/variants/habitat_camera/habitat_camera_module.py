@@ -29,7 +29,6 @@ _stop_recording() finalises whatever's open when disarmed.
 Author: Andrew SG
 """
 
-import csv
 import os
 import subprocess
 import sys
@@ -43,6 +42,7 @@ from picamera2.outputs import CircularOutput
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from modules.camera_base import CameraBase
+from modules.event_log import EVENT_LOG_SUFFIX, EventLog
 from modules.module import command
 
 # Per-pixel brightness delta (0-255) above which a pixel counts as "changed"
@@ -142,9 +142,8 @@ class HabitatCameraModule(CameraBase):
         self._clip_open = False        # whether a clip file is currently being written
         self._clip_h264_path = None    # raw encoder output, remuxed to .ts on close
         self._clip_counter = 0         # per-armed-session clip numbering, for unique filenames
-        self._diag_csv_file = None     # continuous score/state log for the whole armed session --
-        self._diag_csv_writer = None   # independent of clip_open, see _open_diagnostic_csv
-        self._diag_csv_path = None
+        self._diag_event_log = None    # continuous score/state log for the whole armed session --
+        self._diag_csv_path = None     # independent of clip_open, see _open_diagnostic_csv
         # CameraBase.__init__ configures the camera via _configure_camera(),
         # not configure_module_special() -- _configure_module_extra() (and
         # thus the motion detector) otherwise wouldn't exist until the first
@@ -234,10 +233,10 @@ class HabitatCameraModule(CameraBase):
         # it impossible to tell after the fact whether a session that never
         # triggered saw no real motion, or saw motion that just never crossed
         # threshold/lasted long enough. See _open_diagnostic_csv().
-        if self._diag_csv_writer is not None:
-            self._diag_csv_writer.writerow(
-                [timing.timestamp_utc, f"{score:.4f}", self._motion_state, self._clip_open]
-            )
+        diag_log = self._diag_event_log
+        if diag_log is not None:
+            diag_log.append(timing.timestamp_ns, int(self._clip_open),
+                            diag_log.code_for(self._motion_state), score)
 
         return {
             "motion_score": f"{score:.4f}",
@@ -364,27 +363,26 @@ class HabitatCameraModule(CameraBase):
         the whole armed session, regardless of whether a clip is open --
         separate from the per-clip _timestamps.csv (which is meant to stay
         aligned 1:1 with an actual clip's video frames; mixing in idle-period
-        rows with no corresponding footage would break that). Not buffered
-        via a background thread like the main timestamp CSV -- plain
-        buffered file writes are cheap enough for one row per frame, and
-        losing whatever's still in the OS write buffer if the process
-        crashes mid-session is an acceptable loss for a diagnostic file."""
-        path = f"{self.facade.get_filename_prefix()}_motion_diagnostic.csv"
-        self._diag_csv_file = open(path, "w", newline="", buffering=1 << 16)
-        self._diag_csv_writer = csv.writer(self._diag_csv_file)
-        self._diag_csv_writer.writerow(
-            ["timestamp_utc", "motion_score", "motion_state", "clip_open"]
+        rows with no corresponding footage would break that). Written as a
+        binary EventLog (key = clip_open, code = motion_state, value =
+        score) so the capture callback only packs a record; the CSV with
+        the same columns is produced at export."""
+        path = f"{self.facade.get_filename_prefix()}_motion_diagnostic.csv{EVENT_LOG_SUFFIX}"
+        self._diag_event_log = EventLog(
+            path,
+            row_template="{utc},{value:.4f},{label},{clip_open}",
+            csv_header="timestamp_utc,motion_score,motion_state,clip_open\n",
+            labels=("idle", "waiting", "active"),
+            key_fields={0: {"clip_open": "False"}, 1: {"clip_open": "True"}},
         )
         self._diag_csv_path = path
         self.facade.add_session_file(path)
 
     def _close_diagnostic_csv(self) -> None:
-        if self._diag_csv_file is None:
+        if self._diag_event_log is None:
             return
-        self._diag_csv_file.flush()
-        self._diag_csv_file.close()
-        self._diag_csv_file = None
-        self._diag_csv_writer = None
+        diag_log, self._diag_event_log = self._diag_event_log, None
+        diag_log.close()
         if self._diag_csv_path:
             self.facade.stage_file_for_export(self._diag_csv_path)
             self._diag_csv_path = None
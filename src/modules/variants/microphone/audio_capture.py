@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+SAVIOUR System - Audiomoth capture pipeline
+
+The recording thread used to stamp each ~683 ms block with time.time() taken
+before recorder.record() — i.e. when Python asked for audio, not when it was
+captured — and wrote to soundfile on the same thread, so a slow FLAC write
+delayed the next read and pushed the backlog into PulseAudio's buffer.
+
+Here the capture thread only reads and copies: each read returns whatever
+PulseAudio has buffered, is stamped on CLOCK_REALTIME (PTP-disciplined by
+phc2sys) immediately afterwards, and the stream latency reported by
+PulseAudio is subtracted to get the capture time of the next unread sample.
+Those (sample index, epoch) observations feed StreamClock, a linear
+regression over a sliding window that absorbs scheduling jitter and measures
+the device's true sample rate against PTP time. Samples go through a
+preallocated SampleRing to a SegmentWriter thread, which does the encoding
+(FLAC by default) and writes regression anchors to the timestamps sidecar.
+
+Sidecar lines written by SegmentWriter (after the module's START_AT /
+STARTED / STARTUP_LATENCY_MS header):
+    SAMPLE_RATE <nominal Hz>
+    ANCHOR <sample index> <epoch seconds>     - fitted, every anchor_interval_s
+    GAP <sample index> <samples>              - ring overrun, padded with silence
+    SAMPLES <total samples in file>
+    RATE_ESTIMATE <Hz> RESIDUAL_US <fit residual std>
+
+Sample indices are file sample indices; the audio is padded over overruns so
+they always equal stream positions.
+"""
+
+import collections
+import logging
+import threading
+
+import numpy as np
+import soundfile
+
+
+class StreamClock:
+    """Maps stream sample index to epoch nanoseconds by linear regression.
+
+    observe() takes (sample_index, epoch_ns) pairs: the capture time of a
+    sample as estimated at read time. Reads can only be late, never early, so
+    after a first least-squares fit the points above the median residual are
+    dropped and the line refitted (twice), tracking the lower envelope.
+    Until min_points observations exist, or if the fitted rate is
+    implausible, the nominal rate is used with the median offset.
+    """
+
+    # Fitted rates further than this from nominal are treated as bad fits
+    MAX_RATE_ERROR = 0.01
+
+    def __init__(self, nominal_rate: float, window: int = 256, min_points: int = 8):
+        self.nominal_rate = float(nominal_rate)
+        self.min_points = min_points
+        self._obs = collections.deque(maxlen=window)
+        self._ref = None   # (sample_index, epoch_ns) of the first observation
+        self._fit = None   # cached (slope s/sample, intercept s, residual std s)
+        self._lock = threading.Lock()
+        self.observations = 0
+
+
+    def observe(self, sample_index: int, epoch_ns: int) -> None:
+        with self._lock:
+            if self._ref is None:
+                self._ref = (sample_index, epoch_ns)
+            self._obs.append((sample_index - self._ref[0], (epoch_ns - self._ref[1]) / 1e9))
+            self._fit = None
+            self.observations += 1
+
+
+    @property
+    def ready(self) -> bool:
+        return self.observations >= self.min_points
+
+
+    def _fit_locked(self) -> tuple[float, float, float]:
+        if self._fit is not None:
+            return self._fit
+        n = np.array([o[0] for o in self._obs], dtype=np.float64)
+        t = np.array([o[1] for o in self._obs], dtype=np.float64)
+        nominal_slope = 1.0 / self.nominal_rate
+        slope = None
+        if len(n) >= self.min_points and np.ptp(n) > 0:
+            slope, intercept = np.polyfit(n, t, 1)
+            # Fit the lower envelope: the least-delayed reads are closest to capture time
+            for _ in range(2):
+                resid = t - (slope * n + intercept)
+                keep = resid <= np.median(resid)
+                if keep.sum() < self.min_points:
+                    break
+                n, t = n[keep], t[keep]
+                slope, intercept = np.polyfit(n, t, 1)
+            if abs(slope * self.nominal_rate - 1.0) > self.MAX_RATE_ERROR:
+                slope = None
+        if slope is None:
+            slope = nominal_slope
+            intercept = float(np.median(t - n * slope)) if len(n) else 0.0
+        resid_std = float(np.std(t - (slope * n + intercept))) if len(n) else 0.0
+        self._fit = (float(slope), float(intercept), resid_std)
+        return self._fit
+
+
+    def time_of(self, sample_index: int) -> int:
+        """Return the estimated capture time of sample_index in epoch ns."""
+        with self._lock:
+            if self._ref is None:
+                raise ValueError("StreamClock has no observations yet")
+            slope, intercept, _ = self._fit_locked()
+            return self._ref[1] + round((intercept + slope * (sample_index - self._ref[0])) * 1e9)
+
+
+    def summary(self) -> dict:
+        with self._lock:
+            if self._ref is None:
+                return {"observations": 0}
+            slope, _, resid = self._fit_locked()
+            return {
+                "observations": self.observations,
+                "rate_hz": round(1.0 / slope, 3),
+                "residual_us": round(resid * 1e6, 1),
+            }
+
+
+class SampleRing:
+    """Preallocated single-producer/single-consumer float32 sample ring.
+
+    write() never blocks: if the ring is full the block is dropped and
+    counted, and the next write starts a new run at its own stream index, so
+    the reader can tell how much is missing. read() returns the stream index
+    of the first sample with each contiguous run.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=np.float32)
+        self._w = 0   # absolute samples written into the ring
+        self._r = 0   # absolute samples read out of it
+        self._next_stream = 0
+        self._read_stream = 0
+        self._marks = collections.deque()  # (absolute ring position, stream index) run starts
+        self._cond = threading.Condition()
+        self.closed = False
+        self.overruns = 0
+        self.dropped_samples = 0
+        self.max_fill = 0
+
+
+    def write(self, samples: np.ndarray, stream_index: int) -> bool:
+        """Copy samples (stream positions stream_index...) into the ring."""
+        n = len(samples)
+        with self._cond:
+            if self.capacity - (self._w - self._r) < n:
+                self.overruns += 1
+                self.dropped_samples += n
+                return False
+            if stream_index != self._next_stream:
+                self._marks.append((self._w, stream_index))
+            a = self._w % self.capacity
+            first = min(n, self.capacity - a)
+            self._buf[a:a + first] = samples[:first]
+            if first < n:
+                self._buf[:n - first] = samples[first:]
+            self._w += n
+            self._next_stream = stream_index + n
+            self.max_fill = max(self.max_fill, self._w - self._r)
+            self._cond.notify()
+        return True
+
+
+    def read(self, max_samples: int, timeout: float = 0.5) -> tuple[int, np.ndarray] | None:
+        """Return (stream_index, samples) for the next contiguous run, or None on timeout/close."""
+        with self._cond:
+            if self._w == self._r and not self.closed:
+                self._cond.wait(timeout)
+            if self._w == self._r:
+                return None
+            if self._marks and self._marks[0][0] == self._r:
+                self._read_stream = self._marks.popleft()[1]
+            end = self._w if not self._marks else self._marks[0][0]
+            n = min(max_samples, end - self._r)
+            a = self._r % self.capacity
+            first = min(n, self.capacity - a)
+            out = np.empty(n, dtype=np.float32)
+            out[:first] = self._buf[a:a + first]
+            if first < n:
+                out[first:] = self._buf[:n - first]
+            stream_index = self._read_stream
+            self._r += n
+            self._read_stream += n
+            return stream_index, out
+
+
+    def close(self) -> None:
+        """Wake the reader; remaining samples can still be read."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class SegmentWriter:
+    """Encodes one segment from a SampleRing and writes its sidecar anchors."""
+
+    def __init__(self, ring: SampleRing, clock: StreamClock, filename: str, timestamps_file,
+                 sample_rate: int, compression_level: float | None = None,
+                 anchor_interval_s: float = 1.0, name: str = "audio-writer"):
+        """
+        Args:
+            ring: Ring the capture thread writes into
+            clock: StreamClock fed by the capture thread
+            filename: Audio file to create; the format follows the extension
+            timestamps_file: Open text file for the sidecar lines
+            sample_rate: Nominal sample rate
+            compression_level: FLAC compression 0..1 (None = libsndfile default)
+            anchor_interval_s: Audio time between ANCHOR lines
+        """
+        self.logger = logging.getLogger(__name__)
+        self.ring = ring
+        self.clock = clock
+        self.filename = filename
+        self.timestamps_file = timestamps_file
+        self.sample_rate = int(sample_rate)
+        self.compression_level = compression_level
+        self.anchor_every = max(1, round(anchor_interval_s * self.sample_rate))
+        self.samples_written = 0
+        self.gap_samples = 0
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True, name=name)
+
+
+    def start(self) -> "SegmentWriter":
+        self.thread.start()
+        return self
+
+
+    def join(self, timeout: float | None = None) -> None:
+        self.thread.join(timeout)
+
+
+    def _write_anchors(self, final: bool = False) -> None:
+        if not (self.clock.ready or final) or self.clock.observations == 0:
+            return
+        while self._next_anchor <= self.samples_written:
+            t = self.clock.time_of(self._next_anchor) / 1e9
+            self.timestamps_file.write(f"ANCHOR {self._next_anchor} {t:.9f}\n")
+            self._next_anchor += self.anchor_every
+        if final and self._next_anchor - self.anchor_every != self.samples_written:
+            t = self.clock.time_of(self.samples_written) / 1e9
+            self.timestamps_file.write(f"ANCHOR {self.samples_written} {t:.9f}\n")
+
+
+    def _run(self) -> None:
+        self._next_anchor = 0
+        kwargs = {}
+        if self.compression_level is not None and self.filename.lower().endswith(".flac"):
+            kwargs["compression_level"] = self.compression_level
+        try:
+            self.timestamps_file.write(f"SAMPLE_RATE {self.sample_rate}\n")
+            with soundfile.SoundFile(self.filename, mode="x", samplerate=self.sample_rate,
+                                     channels=1, subtype="PCM_16", **kwargs) as f:
+                while True:
+                    item = self.ring.read(self.sample_rate // 2)
+                    if item is None:
+                        if self.ring.closed:
+                            break
+                        continue
+                    stream_index, samples = item
+                    if stream_index > self.samples_written:
+                        gap = stream_index - self.samples_written
+                        self.timestamps_file.write(f"GAP {self.samples_written} {gap}\n")
+                        self.logger.warning(f"{self.filename}: capture overrun, padding {gap} samples")
+                        f.write(np.zeros(gap, dtype=np.float32))
+                        self.samples_written += gap
+                        self.gap_samples += gap
+                    f.write(samples)
+                    self.samples_written += len(samples)
+                    self._write_anchors()
+            self._write_anchors(final=True)
+            summary = self.clock.summary()
+            self.timestamps_file.write(f"SAMPLES {self.samples_written}\n")
+            if "rate_hz" in summary:
+                self.timestamps_file.write(
+                    f"RATE_ESTIMATE {summary['rate_hz']} RESIDUAL_US {summary['residual_us']}\n"
+                )
+            self.timestamps_file.flush()
+        except Exception as e:
+            self.error = e
+            self.logger.error(f"Audio writer error for {self.filename}: {e}", exc_info=True)
+            # Keep draining so the capture side never stalls on a full ring
+            while self.ring.read(self.sample_rate) is not None or not self.ring.closed:
+                pass
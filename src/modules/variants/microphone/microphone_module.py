@@ -20,14 +20,18 @@ import time
 import cv2
 import numpy as np
 import soundcard
-import soundfile
 
 AUDIOMOTH_CMD = "/usr/local/bin/AudioMoth-USB-Microphone"
 
 # Import SAVIOUR dependencies
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from modules.mjpeg_stream import MJPEGStreamServer
-from modules.module import Module, command
+from modules.mjpeg_stream import MJPEGStreamServer  # noqa: E402
+from modules.module import Module, command  # noqa: E402
+from modules.variants.microphone.audio_capture import (  # noqa: E402
+    SampleRing,
+    SegmentWriter,
+    StreamClock,
+)
 
 
 class AudiomothModule(Module):
@@ -45,6 +49,7 @@ class AudiomothModule(Module):
         self.current_recording_files = {}  # serial -> current filename
         self._segment_stop_event = threading.Event()
         self._recording_stop_event = threading.Event()
+        self._capture_pipelines = {}  # serial -> (SampleRing, StreamClock) of the latest segment
 
         # State flags
         self.is_recording = False
@@ -270,43 +275,92 @@ class AudiomothModule(Module):
 
 
     def _record_microphone_segment(self, serial: str, mic_id: str, filename: str, intended_start_at: float | None) -> None:
-        """Record audio from one audiomoth to a single file until segment stop or recording stop."""
-        sample_rate = self.config.get("audiomoth.sample_rate", 192000)
-        frame_num = self.config.get("microphone.frame_num", 1024 * 128)
-        block_size = self.config.get("microphone.block_size", 1024 * 128)
+        """Record audio from one audiomoth to a single file until segment stop or recording stop.
+
+        This thread only reads from PulseAudio: each read is timestamped against
+        the stream position (see audio_capture.StreamClock) and copied into a
+        SampleRing; a SegmentWriter thread encodes the file and writes the
+        sample-index -> epoch anchors to the timestamps sidecar.
+        """
+        sample_rate = int(self.config.get("audiomoth.sample_rate", 192000))
+        block_size = self.config.get("microphone.block_size", 16384)
+        ring_seconds = float(self.config.get("microphone.ring_seconds", 10.0))
 
         timestamps_filename = f"{os.path.splitext(filename)[0]}_timestamps.txt"
         self.facade.add_session_file(timestamps_filename)
 
         self.logger.info(f"Recording thread started for audiomoth {serial}: {filename}")
+        writer = None
+        ring = SampleRing(int(sample_rate * ring_seconds))
+        clock = StreamClock(sample_rate)
+        self._capture_pipelines[serial] = (ring, clock)
         try:
             microphone = soundcard.get_microphone(mic_id)
             with open(timestamps_filename, 'w') as timestamps_writer:
-                if intended_start_at is not None:
-                    timestamps_writer.write(f"START_AT {intended_start_at:.6f}\n")
-                with microphone.recorder(samplerate=sample_rate, blocksize=block_size) as recorder:
-                    # Timestamp the moment the recorder is open and ready — this is
-                    # the tightest available proxy for when the first audio sample
-                    # was captured.  Used for post-hoc alignment with video.
-                    actual_start = time.time()
-                    timestamps_writer.write(f"STARTED {actual_start:.6f}\n")
+                try:
                     if intended_start_at is not None:
-                        startup_latency_ms = (actual_start - intended_start_at) * 1000
-                        timestamps_writer.write(f"STARTUP_LATENCY_MS {startup_latency_ms:.1f}\n")
-                    timestamps_writer.flush()
-                    with soundfile.SoundFile(filename, mode='x', samplerate=sample_rate, channels=1, subtype="PCM_16") as f:
+                        timestamps_writer.write(f"START_AT {intended_start_at:.6f}\n")
+                    with microphone.recorder(samplerate=sample_rate, blocksize=block_size) as recorder:
+                        # Coarse marker of when the recorder opened; the ANCHOR lines
+                        # written by the SegmentWriter are the sample-accurate record.
+                        actual_start = time.time()
+                        timestamps_writer.write(f"STARTED {actual_start:.6f}\n")
+                        if intended_start_at is not None:
+                            startup_latency_ms = (actual_start - intended_start_at) * 1000
+                            timestamps_writer.write(f"STARTUP_LATENCY_MS {startup_latency_ms:.1f}\n")
+                        timestamps_writer.flush()
+
+                        writer = SegmentWriter(
+                            ring, clock, filename, timestamps_writer, sample_rate,
+                            compression_level=self.config.get("microphone.flac_compression_level", 0.3),
+                            anchor_interval_s=float(self.config.get("microphone.anchor_interval_s", 1.0)),
+                            name=f"audiomoth-{serial}-writer",
+                        ).start()
+
+                        stream_index = 0
                         while not self._recording_stop_event.is_set() and not self._segment_stop_event.is_set():
-                            # Timestamp BEFORE record() so it marks the start of
-                            # the block, not the end (each block is frame_num /
-                            # sample_rate seconds long, ~683 ms at default settings).
-                            block_start = time.time()
-                            data = recorder.record(numframes=frame_num)
-                            timestamps_writer.write(f"{block_start}\n")
-                            f.write(data)
+                            # Whatever PulseAudio has buffered, stamped as soon as it's returned
+                            data = recorder.record(numframes=None)
+                            read_ns = time.time_ns()
+                            latency_s = recorder.latency
+                            mono = data[:, 0] if data.ndim > 1 else data
+                            n = len(mono)
+                            if n == 0:
+                                continue
+                            # stream latency = age of the next unread sample at the source
+                            clock.observe(stream_index + n, read_ns - int(latency_s * 1e9))
+                            ring.write(mono, stream_index)
+                            stream_index += n
+                finally:
+                    # Drain the ring before the timestamps file closes: the
+                    # writer appends its last ANCHOR lines on the way out
+                    ring.close()
+                    if writer is not None:
+                        writer.join()
         except Exception as e:
             self.logger.error(f"Recording thread error for audiomoth {serial}: {e}", exc_info=True)
-
-        self.logger.info(f"Recording thread finished for audiomoth {serial}")
+        finally:
+            ring.close()
+
+        if ring.overruns:
+            self.logger.warning(f"Audiomoth {serial}: {ring.overruns} ring overruns, "
+                                f"{ring.dropped_samples} samples padded with silence")
+        self.logger.info(f"Recording thread finished for audiomoth {serial} ({clock.summary()})")
+
+
+    def get_diagnostics(self) -> dict:
+        """Base diagnostics plus per-audiomoth capture clock and ring statistics."""
+        diagnostics = super().get_diagnostics()
+        if self._capture_pipelines:
+            diagnostics["audio_capture"] = {
+                serial: {
+                    **clock.summary(),
+                    "ring_overruns": ring.overruns,
+                    "ring_max_fill_pct": round(100 * ring.max_fill / ring.capacity, 1),
+                }
+                for serial, (ring, clock) in self._capture_pipelines.items()
+            }
+        return diagnostics
 
 
     def _check_recording_alive(self) -> tuple[bool, str | None]:
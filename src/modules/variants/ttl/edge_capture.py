@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+SAVIOUR System - Kernel-timestamped GPIO edge capture
+
+libgpiod v2 based input path for the TTL module. gpiozero's Button callbacks
+run on a Python thread and the TTL module stamps them with time.time_ns() when
+the callback gets round to running, so the recorded time carries scheduling
+jitter and bursts of edges queue up behind the GIL. Here the kernel stamps
+each edge in the GPIO interrupt handler and queues it on the line request's
+fd; a single reader thread blocks in poll() on that fd and drains whatever has
+accumulated in one read, handing the batch to a callback.
+
+Timestamps are reported on CLOCK_REALTIME, which phc2sys disciplines to the
+PTP grandmaster on every module. Kernels that support it stamp directly on
+CLOCK_REALTIME; otherwise the request falls back to CLOCK_MONOTONIC and
+timestamps are shifted by a REALTIME-MONOTONIC offset that is re-measured
+periodically, so phc2sys slews are picked up.
+
+Composition, not a Module mixin: the TTL module owns an EdgeEventReader when
+ttl.edge_capture is "gpiod" and keeps using gpiozero for everything else.
+"""
+
+import logging
+import select
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
+
+try:
+    import gpiod
+    from gpiod.line import Bias, Clock, Direction, Edge, Value
+    GPIOD_AVAILABLE = True
+except ImportError:
+    gpiod = None
+    GPIOD_AVAILABLE = False
+
+
+@dataclass(frozen=True, slots=True)
+class EdgeEvent:
+    """One kernel-stamped edge on an input line."""
+    timestamp_ns: int   # CLOCK_REALTIME (PTP-disciplined) epoch nanoseconds
+    pin_number: int     # BCM line offset
+    rising: bool        # True = electrical LOW -> HIGH
+
+
+def measure_realtime_offset_ns(samples: int = 5) -> int:
+    """Return CLOCK_REALTIME - CLOCK_MONOTONIC in nanoseconds.
+
+    Each sample brackets a REALTIME read between two MONOTONIC reads; the
+    sample with the narrowest bracket is the one least disturbed by
+    preemption and is used.
+    """
+    best_width = None
+    best_offset = 0
+    for _ in range(max(1, samples)):
+        m0 = time.clock_gettime_ns(time.CLOCK_MONOTONIC)
+        rt = time.clock_gettime_ns(time.CLOCK_REALTIME)
+        m1 = time.clock_gettime_ns(time.CLOCK_MONOTONIC)
+        width = m1 - m0
+        if best_width is None or width < best_width:
+            best_width = width
+            best_offset = rt - (m0 + width // 2)
+    return best_offset
+
+
+class EdgeEventReader:
+    """Owns a libgpiod edge-event request for a set of input lines.
+
+    Call start(on_events) to begin draining; on_events receives a list of
+    EdgeEvent in kernel order, one call per poll wake-up. Call close() to stop
+    the reader thread and release the lines.
+    """
+
+    # How often to re-measure the REALTIME-MONOTONIC offset in monotonic mode.
+    OFFSET_REFRESH_S = 1.0
+
+    def __init__(self, pin_numbers: list[int], chip_path: str = "/dev/gpiochip0",
+                 pull_up: bool = True, debounce_us: int = 0,
+                 batch_size: int = 64, poll_timeout_ms: int = 100,
+                 consumer: str = "saviour-ttl", request=None):
+        """
+        Args:
+            pin_numbers: BCM line offsets to request as inputs
+            chip_path: GPIO character device the lines live on
+            pull_up: Bias the lines up (active_low wiring) or down
+            debounce_us: Kernel debounce period; 0 disables debouncing
+            batch_size: Maximum events drained per read
+            poll_timeout_ms: poll() timeout, bounds how long close() waits
+            consumer: Label shown in gpioinfo for the held lines
+            request: Pre-built line request (tests / callers that manage
+                their own chip); when given, no lines are requested here
+        """
+        self.logger = logging.getLogger(__name__)
+        self.pin_numbers = [int(p) for p in pin_numbers]
+        self.chip_path = chip_path
+        self.batch_size = batch_size
+        self.poll_timeout_ms = poll_timeout_ms
+
+        self.realtime_clock = True
+        self._offset_ns = 0
+        self._offset_measured_at = 0.0
+
+        if request is None:
+            request = self._request_lines(pull_up, debounce_us, consumer)
+        self._request = request
+
+        self._on_events: Callable[[list[EdgeEvent]], None] | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+        # Diagnostics
+        self.events_read = 0
+        self.batches_read = 0
+        self.max_batch = 0
+        self.dropped_events = 0
+        self._last_line_seqno: dict[int, int] = {}
+
+
+    def _request_lines(self, pull_up: bool, debounce_us: int, consumer: str):
+        """Request the input lines, preferring kernel CLOCK_REALTIME stamps."""
+        if not GPIOD_AVAILABLE:
+            raise RuntimeError("libgpiod v2 Python bindings (gpiod>=2.0) are not installed")
+
+        def _settings(clock):
+            return gpiod.LineSettings(
+                direction=Direction.INPUT,
+                edge_detection=Edge.BOTH,
+                bias=Bias.PULL_UP if pull_up else Bias.PULL_DOWN,
+                debounce_period=timedelta(microseconds=debounce_us),
+                event_clock=clock,
+            )
+
+        event_buffer_size = max(16, self.batch_size * 4)
+        try:
+            return gpiod.request_lines(
+                self.chip_path, consumer=consumer,
+                config={tuple(self.pin_numbers): _settings(Clock.REALTIME)},
+                event_buffer_size=event_buffer_size,
+            )
+        except OSError as e:
+            # CLOCK_REALTIME event stamps need kernel >= 5.11
+            self.logger.warning(f"REALTIME edge timestamps unavailable ({e}), using MONOTONIC + offset")
+            self.realtime_clock = False
+            self._refresh_offset()
+            return gpiod.request_lines(
+                self.chip_path, consumer=consumer,
+                config={tuple(self.pin_numbers): _settings(Clock.MONOTONIC)},
+                event_buffer_size=event_buffer_size,
+            )
+
+
+    def _refresh_offset(self) -> None:
+        self._offset_ns = measure_realtime_offset_ns()
+        self._offset_measured_at = time.monotonic()
+
+
+    def start(self, on_events: Callable[[list[EdgeEvent]], None]) -> None:
+        """Start the reader thread, delivering batches to on_events."""
+        self._on_events = on_events
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._reader_loop, daemon=True, name="ttl-edge-reader")
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        """Stop delivering events; the lines stay requested."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(1.0, 2 * self.poll_timeout_ms / 1000))
+            self._thread = None
+        self._on_events = None
+
+
+    def close(self) -> None:
+        """Stop the reader and release the lines."""
+        self.stop()
+        try:
+            self._request.release()
+        except Exception as e:
+            self.logger.debug(f"Error releasing GPIO lines: {e}")
+
+
+    def get_values(self) -> dict[int, bool]:
+        """Return {pin_number: electrical HIGH} for every requested line."""
+        values = self._request.get_values(self.pin_numbers)
+        return {pn: _is_active(v) for pn, v in zip(self.pin_numbers, values, strict=True)}
+
+
+    def _reader_loop(self) -> None:
+        poller = select.poll()
+        poller.register(self._request.fd, select.POLLIN | select.POLLPRI)
+        while not self._stop.is_set():
+            try:
+                if not poller.poll(self.poll_timeout_ms):
+                    continue
+                batch = self.read_batch()
+            except Exception as e:
+                self.logger.error(f"Edge reader error: {e}")
+                self._stop.wait(0.1)
+                continue
+            callback = self._on_events
+            if batch and callback is not None:
+                try:
+                    callback(batch)
+                except Exception as e:
+                    self.logger.error(f"Edge event callback error: {e}")
+
+
+    def read_batch(self) -> list[EdgeEvent]:
+        """Drain up to batch_size pending events and convert them."""
+        raw = self._request.read_edge_events(self.batch_size)
+        if not raw:
+            return []
+
+        offset = 0
+        if not self.realtime_clock:
+            if time.monotonic() - self._offset_measured_at > self.OFFSET_REFRESH_S:
+                self._refresh_offset()
+            offset = self._offset_ns
+
+        events = []
+        for ev in raw:
+            line = ev.line_offset
+            seqno = ev.line_seqno
+            prev = self._last_line_seqno.get(line)
+            if prev is not None and seqno > prev + 1:
+                # Kernel event FIFO overflowed between reads
+                self.dropped_events += seqno - prev - 1
+            self._last_line_seqno[line] = seqno
+            events.append(EdgeEvent(ev.timestamp_ns + offset, line, ev.event_type.name == "RISING_EDGE"))
+
+        n = len(events)
+        self.events_read += n
+        self.batches_read += 1
+        if n > self.max_batch:
+            self.max_batch = n
+        return events
+
+
+    def get_stats(self) -> dict:
+        return {
+            "clock": "realtime" if self.realtime_clock else "monotonic+offset",
+            "events_read": self.events_read,
+            "batches_read": self.batches_read,
+            "max_batch": self.max_batch,
+            "dropped_events": self.dropped_events,
+        }
+
+
+def _is_active(value) -> bool:
+    if GPIOD_AVAILABLE:
+        return value == Value.ACTIVE
+    return bool(value)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+SAVIOUR System - Edge-driven TTL logic-analyser monitor
+
+The monitor used to poll every pin from Python at 25 Hz and redraw the whole
+trace image from per-pin deques on every frame, so pulses shorter than 40 ms
+were invisible and the CPU cost grew with history length rather than with
+activity.
+
+PinStateRing keeps one uint8 bin per pin per resolution step (1 ms by
+default) in a NumPy ring. Edges are pushed in from wherever the module
+already sees them — output writes, pulse-train edges, gpiozero callbacks and
+kernel edge batches — and bins between edges are filled with slice
+assignments when the next edge or render arrives. Each bin records which
+levels the pin held during it (HIGH_BIT / LOW_BIT), so a pulse narrower than
+a bin still shows up as a transition.
+
+TraceRenderer keeps the frame between renders: trace areas are scrolled left
+in place and only the columns for newly completed time are drawn, from a
+vectorised reduction of the bins behind each pixel. Headers are only redrawn
+when the pin set changes.
+"""
+
+import threading
+import time
+from collections.abc import Iterable
+
+import cv2
+import numpy as np
+
+HIGH_BIT = 1
+LOW_BIT = 2
+
+
+class PinStateRing:
+    """Per-pin level history at a fixed bin resolution, fed by edges."""
+
+    def __init__(self, pin_numbers: Iterable[int], window_s: float = 20.0,
+                 resolution_hz: int = 1000, now_ns: int | None = None):
+        self.pin_numbers = sorted(int(p) for p in pin_numbers)
+        self._row = {pn: i for i, pn in enumerate(self.pin_numbers)}
+        self.bin_ns = 1_000_000_000 // resolution_hz
+        self.n_bins = max(1, round(window_s * resolution_hz))
+        self._bins = np.zeros((len(self.pin_numbers), self.n_bins), dtype=np.uint8)
+        self._state = np.full(len(self.pin_numbers), LOW_BIT, dtype=np.uint8)
+        now_ns = time.time_ns() if now_ns is None else now_ns
+        self._filled_until = now_ns // self.bin_ns  # absolute bin index, exclusive
+        self._lock = threading.Lock()
+
+
+    def _fill_locked(self, rows, start: int, stop: int, values) -> None:
+        """Set bins [start, stop) of *rows* to *values* (column-broadcast)."""
+        start = max(start, stop - self.n_bins)
+        if stop <= start:
+            return
+        a = start % self.n_bins
+        b = a + (stop - start)
+        if b <= self.n_bins:
+            self._bins[rows, a:b] = values
+        else:
+            self._bins[rows, a:] = values
+            self._bins[rows, :b - self.n_bins] = values
+
+
+    def _advance_locked(self, until_bin: int) -> None:
+        if until_bin > self._filled_until:
+            self._fill_locked(slice(None), self._filled_until, until_bin, self._state[:, None])
+            self._filled_until = until_bin
+
+
+    def advance(self, now_ns: int) -> int:
+        """Fill every pin's history up to now_ns; return the first unfilled bin."""
+        with self._lock:
+            self._advance_locked(now_ns // self.bin_ns)
+            return self._filled_until
+
+
+    def _record_locked(self, pin_number: int, timestamp_ns: int, high: bool) -> None:
+        row = self._row.get(pin_number)
+        if row is None:
+            return
+        bit = HIGH_BIT if high else LOW_BIT
+        b = timestamp_ns // self.bin_ns
+        if b >= self._filled_until:
+            # The edge's own bin holds both the old and the new level
+            self._advance_locked(b + 1)
+        elif b >= self._filled_until - self.n_bins:
+            # Late edge (e.g. computed hardware PWM edges): rewrite what followed it
+            self._fill_locked(row, b + 1, self._filled_until, bit)
+        else:
+            self._state[row] = bit
+            return
+        self._bins[row, b % self.n_bins] |= bit
+        self._state[row] = bit
+
+
+    def record(self, pin_number: int, timestamp_ns: int, high: bool) -> None:
+        """Record that *pin_number* became electrically *high* at timestamp_ns."""
+        with self._lock:
+            self._record_locked(pin_number, timestamp_ns, high)
+
+
+    def record_many(self, edges: Iterable[tuple[int, int, bool]]) -> None:
+        """Record several (pin_number, timestamp_ns, high) edges under one lock."""
+        with self._lock:
+            for pin_number, timestamp_ns, high in edges:
+                self._record_locked(pin_number, timestamp_ns, high)
+
+
+    def states(self) -> dict[int, bool]:
+        """Return {pin_number: electrical HIGH} for the latest known levels."""
+        with self._lock:
+            return {pn: bool(self._state[i] == HIGH_BIT) for pn, i in self._row.items()}
+
+
+    def read(self, start_bin: int, count: int) -> np.ndarray:
+        """Return a (pins, count) copy of bins [start_bin, start_bin + count).
+
+        Bins that are not yet filled or have already been overwritten are 0.
+        """
+        out = np.zeros((len(self.pin_numbers), count), dtype=np.uint8)
+        with self._lock:
+            lo = max(start_bin, self._filled_until - self.n_bins)
+            hi = min(start_bin + count, self._filled_until)
+            if hi > lo:
+                idx = np.arange(lo, hi) % self.n_bins
+                out[:, lo - start_bin:hi - start_bin] = self._bins[:, idx]
+        return out
+
+
+class TraceRenderer:
+    """Incrementally rendered logic-analyser frame for a PinStateRing."""
+
+    WIDTH    = 800
+    PADDING  = 12
+    STATE_W  = 110   # right-side badge
+    HEADER_H = 20
+    TRACE_H  = 44
+    GAP_H    = 14
+    ROW_H    = HEADER_H + TRACE_H + GAP_H
+
+    ACTIVE_COL   = np.array((0, 200, 80), dtype=np.uint8)   # green  (BGR)
+    INACTIVE_COL = np.array((65, 65, 65), dtype=np.uint8)
+    TRACE_BG     = np.array((22, 22, 22), dtype=np.uint8)
+    MIDLINE_COL  = np.array((38, 38, 38), dtype=np.uint8)
+
+    def __init__(self, lag_s: float = 0.2):
+        """
+        Args:
+            lag_s: How far behind "now" the right edge of the trace is drawn,
+                so edges reported slightly late land before their column is drawn
+        """
+        self.lag_ns = int(lag_s * 1e9)
+        self._frame = None
+        self._layout_key = None
+        self._next_bin = None
+
+        self.trace_x0 = self.PADDING + 1
+        self.trace_x1 = self.WIDTH - self.STATE_W - self.PADDING   # exclusive, inside border
+        self.trace_w = self.trace_x1 - self.trace_x0
+
+
+    def _row_y0(self, idx: int) -> int:
+        return self.PADDING // 2 + idx * self.ROW_H
+
+
+    def _build_base(self, pin_numbers: list[int], pin_configs: dict) -> None:
+        """Draw the static parts of the frame: headers, trace boxes, separators."""
+        n_pins = len(pin_numbers)
+        height = max(n_pins * self.ROW_H + self.PADDING, 120)
+        frame = np.zeros((height, self.WIDTH, 3), dtype=np.uint8)
+
+        if n_pins == 0:
+            cv2.putText(frame, "No pins assigned",
+                        (self.PADDING, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (140, 140, 140), 1)
+
+        for idx, pin_num in enumerate(pin_numbers):
+            cfg  = pin_configs.get(pin_num, {})
+            parts = [f"GPIO {pin_num}", str(cfg.get("mode", "?")).upper()]
+            if cfg.get("description"):
+                parts.append(cfg["description"])
+            y0 = self._row_y0(idx)
+            cv2.putText(frame, "  |  ".join(parts), (self.PADDING, y0 + 14),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.40, (180, 180, 180), 1)
+
+            ty0 = y0 + self.HEADER_H
+            ty1 = ty0 + self.TRACE_H
+            cv2.rectangle(frame, (self.PADDING, ty0), (self.trace_x1, ty1), (22, 22, 22), -1)
+            cv2.rectangle(frame, (self.PADDING, ty0), (self.trace_x1, ty1), (55, 55, 55), 1)
+            frame[(ty0 + ty1) // 2, self.trace_x0:self.trace_x1] = self.MIDLINE_COL
+
+            if idx < n_pins - 1:
+                sep_y = ty1 + self.GAP_H // 2
+                cv2.line(frame, (0, sep_y), (self.WIDTH, sep_y), (45, 45, 45), 1)
+
+        self._frame = frame
+
+
+    def _draw_columns(self, ring: PinStateRing, bins: np.ndarray, x0: int, active_low: bool) -> None:
+        """Draw columns starting at x0 from bins shaped (pins, n_cols, bins_per_px)."""
+        n_cols = bins.shape[1]
+        any_high = (bins & HIGH_BIT).any(axis=2)
+        any_low = (bins & LOW_BIT).any(axis=2)
+        for idx in range(len(ring.pin_numbers)):
+            ty0 = self._row_y0(idx) + self.HEADER_H
+            ymid = ty0 + self.TRACE_H // 2
+            yhi = ty0 + 6
+            ylo = ty0 + self.TRACE_H - 6
+            area = self._frame[ty0 + 1:ty0 + self.TRACE_H, x0:x0 + n_cols]
+            area[:] = self.TRACE_BG
+            area[ymid - ty0 - 1] = self.MIDLINE_COL
+
+            high, low = any_high[idx], any_low[idx]
+            active = low if active_low else high
+            colours = np.where(active[:, None], self.ACTIVE_COL, self.INACTIVE_COL)
+            both = high & low
+            only_high = high & ~low
+            only_low = low & ~high
+            # Rows are relative to area (which starts one pixel below ty0)
+            area[yhi - ty0 - 2:yhi - ty0, only_high] = colours[only_high]
+            area[ylo - ty0 - 2:ylo - ty0, only_low] = colours[only_low]
+            area[yhi - ty0 - 2:ylo - ty0, both] = colours[both]
+
+
+    def _draw_badges(self, ring: PinStateRing, active_low: bool) -> None:
+        states = ring.states()
+        bx0 = self.WIDTH - self.STATE_W
+        bx1 = self.WIDTH - self.PADDING // 2
+        for idx, pin_num in enumerate(ring.pin_numbers):
+            ty0 = self._row_y0(idx) + self.HEADER_H
+            ty1 = ty0 + self.TRACE_H
+            elec_high = states[pin_num]
+            is_active = elec_high != active_low
+            col = (0, 200, 80) if is_active else (65, 65, 65)
+            cv2.rectangle(self._frame, (bx0, ty0), (bx1, ty1), col, -1)
+            txt = "ACTIVE" if is_active else "IDLE"
+            (tw, th), _ = cv2.getTextSize(txt, cv2.FONT_HERSHEY_SIMPLEX, 0.45, 1)
+            cv2.putText(self._frame, txt, (bx0 + (bx1 - bx0 - tw) // 2, ty0 + (self.TRACE_H + th) // 2),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), 1)
+
+
+    def render(self, ring: PinStateRing, pin_configs: dict, active_low: bool,
+               now_ns: int | None = None) -> np.ndarray:
+        """Bring the persistent frame up to now_ns and return it (not a copy)."""
+        now_ns = time.time_ns() if now_ns is None else now_ns
+        layout_key = (id(ring), tuple(ring.pin_numbers),
+                      tuple(str(pin_configs.get(pn)) for pn in ring.pin_numbers))
+        bins_per_px = -(-ring.n_bins // self.trace_w)
+        end_bin = ring.advance(now_ns - self.lag_ns)
+
+        if layout_key != self._layout_key:
+            self._build_base(ring.pin_numbers, pin_configs)
+            self._layout_key = layout_key
+            self._next_bin = end_bin - self.trace_w * bins_per_px
+
+        n_cols = (end_bin - self._next_bin) // bins_per_px
+        if n_cols > 0 and ring.pin_numbers:
+            if n_cols >= self.trace_w:
+                self._next_bin += (n_cols - self.trace_w) * bins_per_px
+                n_cols = self.trace_w
+            else:
+                # Scroll the trace areas left in place (numpy handles the overlap)
+                for idx in range(len(ring.pin_numbers)):
+                    ty0 = self._row_y0(idx) + self.HEADER_H
+                    rows = slice(ty0 + 1, ty0 + self.TRACE_H)
+                    self._frame[rows, self.trace_x0:self.trace_x1 - n_cols] = \
+                        self._frame[rows, self.trace_x0 + n_cols:self.trace_x1]
+            bins = ring.read(self._next_bin, n_cols * bins_per_px)
+            bins = bins.reshape(len(ring.pin_numbers), n_cols, bins_per_px)
+            self._draw_columns(ring, bins, self.trace_x1 - n_cols, active_low)
+            self._next_bin += n_cols * bins_per_px
+
+        self._draw_badges(ring, active_low)
+        return self._frame
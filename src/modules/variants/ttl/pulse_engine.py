@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+SAVIOUR System - Deadline-scheduled TTL pulse trains
+
+The TTL generators used to toggle a pin and then time.sleep() for the high
+or low time, so every period was (requested time + sleep overshoot + Python
+overhead): the clock ran slow, drifted with CPU load and the duty cycle
+wandered. Here every edge has an absolute deadline on CLOCK_REALTIME — which
+phc2sys keeps PTP-disciplined — computed from the train's start time, so
+lateness on one edge never accumulates into the next. Each wait is a
+clock_nanosleep(TIMER_ABSTIME) to just before the deadline followed by a
+short spin on the clock that yields the GIL on every turn (so other trains
+and the edge reader keep running), and long waits are cut into short
+absolute sleeps so a stop request is noticed promptly.
+
+Pulses whose onset is already more than a period late when the train gets
+to them (a stall, or CLOCK_REALTIME stepped forward) are skipped rather
+than fired back to back, so the train rejoins its schedule in phase; the
+skips are counted in the train's statistics.
+
+The time recorded for an edge is read from CLOCK_REALTIME immediately after
+the GPIO write returns (the write is synchronous, so the level is on the pin
+by then), not reconstructed from the schedule. Per-train lateness and
+period-jitter statistics are kept for module diagnostics.
+
+HardwarePWM drives an experiment clock from the SoC's PWM block via sysfs
+instead (requires the pwm / pwm-2chan overlay on the pin). Its edges are
+computed from the enable time and the period/duty the driver read back, so
+they carry no scheduling jitter; note the PWM runs from the board crystal,
+not the PTP-disciplined clock, so it can drift by the crystal's ppm error.
+"""
+
+import collections
+import ctypes
+import ctypes.util
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator
+
+CLOCK_REALTIME = 0
+TIMER_ABSTIME = 1
+
+# Longest single absolute sleep, so stop requests are seen within this time
+MAX_SLEEP_CHUNK_NS = 50_000_000
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+def _load_clock_nanosleep():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fn = libc.clock_nanosleep
+        fn.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.POINTER(_Timespec), ctypes.POINTER(_Timespec)]
+        fn.restype = ctypes.c_int
+        return fn
+    except (OSError, AttributeError):
+        return None
+
+
+_clock_nanosleep = _load_clock_nanosleep()
+
+
+def sleep_until_ns(deadline_ns: int, spin_ns: int = 50_000) -> None:
+    """Block until CLOCK_REALTIME reaches deadline_ns.
+
+    Sleeps with clock_nanosleep(TIMER_ABSTIME) until spin_ns before the
+    deadline, then spins, releasing the GIL on every turn. Falls back to
+    time.sleep() where clock_nanosleep isn't available.
+    """
+    wake_ns = deadline_ns - spin_ns
+    if wake_ns > time.time_ns():
+        if _clock_nanosleep is not None:
+            ts = _Timespec(wake_ns // 1_000_000_000, wake_ns % 1_000_000_000)
+            # Returns EINTR on signals; the spin below absorbs any early wake-up
+            _clock_nanosleep(CLOCK_REALTIME, TIMER_ABSTIME, ctypes.byref(ts), None)
+        else:
+            remaining = (wake_ns - time.time_ns()) / 1e9
+            if remaining > 0:
+                time.sleep(remaining)
+    while time.time_ns() < deadline_ns:
+        time.sleep(0)
+
+
+# ---------------------------------------------------------------------------
+# Schedules — generators of (deadline_ns, active) edges
+# ---------------------------------------------------------------------------
+
+def clock_schedule(start_ns: int, period_s: float, duty_cycle: float) -> Iterator[tuple[int, bool]]:
+    """Square wave: active at start + k*period, inactive duty_cycle later."""
+    period_ns = round(period_s * 1e9)
+    high_ns = round(period_ns * duty_cycle)
+    k = 0
+    while True:
+        onset = start_ns + k * period_ns
+        yield onset, True
+        if high_ns < period_ns:
+            yield onset + high_ns, False
+        k += 1
+
+
+def pseudorandom_schedule(start_ns: int, min_interval_s: float, max_interval_s: float,
+                          pulse_duration_s: float, rng: random.Random | None = None) -> Iterator[tuple[int, bool]]:
+    """Pulses separated by uniform(min, max) gaps measured from the previous pulse's end."""
+    rng = rng or random
+    pulse_ns = round(pulse_duration_s * 1e9)
+    t = start_ns
+    while True:
+        onset = t + round(rng.uniform(min_interval_s, max_interval_s) * 1e9)
+        yield onset, True
+        yield onset + pulse_ns, False
+        t = onset + pulse_ns
+
+
+def interval_schedule(start_ns: int, interval_s: float, pulse_duration_s: float,
+                      repeat_count: int = 0) -> Iterator[tuple[int, bool]]:
+    """Pulse every interval (onset to onset), first one a full interval after start."""
+    interval_ns = round(interval_s * 1e9)
+    pulse_ns = round(pulse_duration_s * 1e9)
+    k = 1
+    while repeat_count <= 0 or k <= repeat_count:
+        onset = start_ns + k * interval_ns
+        yield onset, True
+        yield onset + pulse_ns, False
+        k += 1
+
+
+# ---------------------------------------------------------------------------
+# Statistics
+# ---------------------------------------------------------------------------
+
+class PulseTimingStats:
+    """Lateness of realised edges against their deadlines, and period jitter
+    of consecutive active edges against the nominal period (if one is set)."""
+
+
+    def __init__(self, nominal_period_ns: int | None = None, window: int = 1000):
+        self.nominal_period_ns = nominal_period_ns
+        self.edges = 0
+        self.skipped = 0
+        self.max_late_ns = 0
+        self._late = collections.deque(maxlen=window)
+        self._periods = collections.deque(maxlen=window)
+        self._last_onset_ns = None
+        self._lock = threading.Lock()
+
+
+    def record(self, deadline_ns: int, realised_ns: int, active: bool) -> None:
+        late = realised_ns - deadline_ns
+        with self._lock:
+            self.edges += 1
+            self._late.append(late)
+            if late > self.max_late_ns:
+                self.max_late_ns = late
+            if active:
+                if self._last_onset_ns is not None:
+                    self._periods.append(realised_ns - self._last_onset_ns)
+                self._last_onset_ns = realised_ns
+
+
+    def skip(self) -> None:
+        """A pulse was dropped because its onset was already too late."""
+        with self._lock:
+            self.skipped += 1
+            # The next onset's period spans the gap; don't count it as jitter
+            self._last_onset_ns = None
+
+
+    def summary(self) -> dict:
+        with self._lock:
+            late = sorted(self._late)
+            periods = list(self._periods)
+        out = {"edges": self.edges, "skipped_pulses": self.skipped,
+               "max_late_us": round(self.max_late_ns / 1e3, 1)}
+        if late:
+            out["late_mean_us"] = round(sum(late) / len(late) / 1e3, 1)
+            out["late_p99_us"] = round(late[min(len(late) - 1, int(0.99 * len(late)))] / 1e3, 1)
+        if len(periods) >= 2:
+            mean = sum(periods) / len(periods)
+            std = math.sqrt(sum((p - mean) ** 2 for p in periods) / len(periods))
+            out["period_mean_us"] = round(mean / 1e3, 1)
+            out["period_jitter_std_us"] = round(std / 1e3, 1)
+            if self.nominal_period_ns:
+                out["period_jitter_max_us"] = round(max(abs(p - self.nominal_period_ns) for p in periods) / 1e3, 1)
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Software pulse train
+# ---------------------------------------------------------------------------
+
+class PulseTrain:
+    """Runs one schedule on one output, on its own thread.
+
+    drive(active) must set the pin's level; on_edge(realised_ns, active) is
+    called after each edge with the CLOCK_REALTIME time read right after the
+    write returned. should_run() is polled between (and during) waits.
+    A pulse whose onset is more than max_late_ns late (default: the stats'
+    nominal period; None never skips) is skipped along with its
+    inactive edge.
+    """
+
+
+    def __init__(self, schedule: Iterator[tuple[int, bool]], drive: Callable[[bool], None],
+                 on_edge: Callable[[int, bool], None], should_run: Callable[[], bool],
+                 stats: PulseTimingStats | None = None, spin_ns: int = 50_000,
+                 max_late_ns: int | None = None, name: str = "pulse-train"):
+        self.logger = logging.getLogger(__name__)
+        self.schedule = schedule
+        self.drive = drive
+        self.on_edge = on_edge
+        self.should_run = should_run
+        self.stats = stats or PulseTimingStats()
+        self.spin_ns = spin_ns
+        self.max_late_ns = max_late_ns if max_late_ns is not None else self.stats.nominal_period_ns
+        self.thread = threading.Thread(target=self._run, daemon=True, name=name)
+
+
+    def start(self) -> "PulseTrain":
+        self.thread.start()
+        return self
+
+
+    def is_alive(self) -> bool:
+        return self.thread.is_alive()
+
+
+    def join(self, timeout: float | None = None) -> None:
+        self.thread.join(timeout)
+
+
+    def _wait(self, deadline_ns: int) -> bool:
+        """Sleep until deadline_ns in stop-checkable chunks. False if stopped."""
+        while True:
+            if not self.should_run():
+                return False
+            remaining = deadline_ns - time.time_ns()
+            if remaining <= MAX_SLEEP_CHUNK_NS:
+                sleep_until_ns(deadline_ns, self.spin_ns)
+                return self.should_run()
+            sleep_until_ns(time.time_ns() + MAX_SLEEP_CHUNK_NS, 0)
+
+
+    def _run(self) -> None:
+        try:
+            skipping = False
+            for deadline_ns, active in self.schedule:
+                if active:
+                    skipping = (self.max_late_ns is not None
+                                and time.time_ns() - deadline_ns > self.max_late_ns)
+                    if skipping:
+                        self.stats.skip()
+                        continue
+                elif skipping:
+                    continue
+                if not self._wait(deadline_ns):
+                    break
+                self.drive(active)
+                realised_ns = time.time_ns()
+                self.stats.record(deadline_ns, realised_ns, active)
+                self.on_edge(realised_ns, active)
+        except Exception as e:
+            self.logger.error(f"Pulse train {self.thread.name} error: {e}")
+        finally:
+            try:
+                self.drive(False)
+            except Exception as e:
+                self.logger.warning(f"Could not return {self.thread.name} to inactive: {e}")
+            self.logger.info(f"Pulse train {self.thread.name} stopped after {self.stats.edges} edges"
+                             + (f" ({self.stats.skipped} late pulses skipped)" if self.stats.skipped else ""))
+
+
+# ---------------------------------------------------------------------------
+# Hardware PWM
+# ---------------------------------------------------------------------------
+
+class HardwarePWM:
+    """Experiment clock on a PWM channel via /sys/class/pwm."""
+
+    # Poll interval for turning elapsed PWM periods into logged edges
+    EDGE_LOG_INTERVAL_S = 0.1
+
+
+    def __init__(self, chip: int, channel: int, sysfs_root: str = "/sys/class/pwm"):
+        self.logger = logging.getLogger(__name__)
+        self.chip_path = os.path.join(sysfs_root, f"pwmchip{chip}")
+        self.path = os.path.join(self.chip_path, f"pwm{channel}")
+        self.channel = channel
+        self.period_ns = None
+        self.active_ns = None
+        self.enabled_at_ns = None
+        self._thread = None
+        self._stop = threading.Event()
+
+
+    def _write(self, name: str, value) -> None:
+        with open(os.path.join(self.path, name), "w") as f:
+            f.write(str(value))
+
+
+    def _read_int(self, name: str) -> int:
+        with open(os.path.join(self.path, name)) as f:
+            return int(f.read().strip())
+
+
+    def start(self, period_s: float, duty_cycle: float, active_low: bool,
+              on_edge: Callable[[int, bool], None]) -> None:
+        """Configure and enable the channel, then log its edges via on_edge."""
+        if not os.path.exists(self.path):
+            with open(os.path.join(self.chip_path, "export"), "w") as f:
+                f.write(str(self.channel))
+            for _ in range(50):  # udev needs a moment to set permissions
+                if os.path.exists(os.path.join(self.path, "period")):
+                    break
+                time.sleep(0.01)
+
+        period_ns = round(period_s * 1e9)
+        active_ns = round(period_ns * duty_cycle)
+        # With active-low wiring the electrical high part is the inactive part
+        high_ns = period_ns - active_ns if active_low else active_ns
+        self._write("enable", 0)
+        self._write("duty_cycle", 0)
+        self._write("period", period_ns)
+        self._write("duty_cycle", high_ns)
+
+        # The driver rounds to its clock; log edges at the rate it actually runs
+        self.period_ns = self._read_int("period")
+        high_read = self._read_int("duty_cycle")
+        self.active_ns = self.period_ns - high_read if active_low else high_read
+
+        self._write("enable", 1)
+        self.enabled_at_ns = time.time_ns()
+        self.logger.info(f"Hardware PWM {self.path} enabled: period={self.period_ns}ns active={self.active_ns}ns")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._log_edges, args=(on_edge,), daemon=True,
+                                        name=f"pwm{self.channel}-edges")
+        self._thread.start()
+
+
+    def _log_edges(self, on_edge: Callable[[int, bool], None]) -> None:
+        for edge_ns, active in clock_schedule(self.enabled_at_ns, self.period_ns / 1e9,
+                                              self.active_ns / self.period_ns):
+            while edge_ns > time.time_ns():
+                if self._stop.wait(self.EDGE_LOG_INTERVAL_S):
+                    return
+            on_edge(edge_ns, active)
+
+
+    def stop(self) -> None:
+        self._stop.set()
+        try:
+            self._write("enable", 0)
+        except OSError as e:
+            self.logger.warning(f"Could not disable {self.path}: {e}")
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+
+    def summary(self) -> dict:
+        return {"mode": "hardware_pwm", "period_ns": self.period_ns, "active_ns": self.active_ns}
@@ -11,7 +11,6 @@ Created: 23/05/2025
 """
 
 import atexit  # Add GPIO cleanup at module level
-import collections
 import os
 import random
 import signal
@@ -23,12 +22,22 @@ from enum import Enum
 
 import cv2
 import gpiozero
-import numpy as np
 
 # Import SAVIOUR dependencies
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from modules.event_log import EVENT_LOG_SUFFIX, EventLog
 from modules.mjpeg_stream import MJPEGStreamServer
 from modules.module import Module
+from modules.variants.ttl.edge_capture import EdgeEventReader
+from modules.variants.ttl.pin_monitor import PinStateRing, TraceRenderer
+from modules.variants.ttl.pulse_engine import (
+    HardwarePWM,
+    PulseTimingStats,
+    PulseTrain,
+    clock_schedule,
+    interval_schedule,
+    pseudorandom_schedule,
+)
 
 
 # Global GPIO cleanup function
@@ -74,7 +83,8 @@ class TTLModule(Module):
         self.config.load_module_config("ttl_config.json")
 
         # TTL specific variables
-        self._ttl_file_handle = None # The open .csv file for storing events
+        self._ttl_event_log = None # EventLog for the current segment, converted to .csv at export
+        self._event_log_lock = threading.Lock()  # held to append to, swap or close _ttl_event_log
 
         # Initialize GPIO
         self.output_pins = []
@@ -86,13 +96,16 @@ class TTLModule(Module):
         self.pseudorandom_pins = []  # Pins configured as pseudorandom
         self.interval_pulse_pins = []  # Pins configured as interval_pulse
         self.generator_threads = {}  # Store generator threads
+        self._pulse_trains = {}  # {pin_number: PulseTrain | HardwarePWM}, kept for diagnostics
+        self._edge_reader = None  # EdgeEventReader when ttl.edge_capture is "gpiod"
 
-        # Rolling pin state buffers: {pin_number: deque of bool (True = electrical HIGH)}
-        # Must be initialised before assign_pins() which populates them
-        self.MONITOR_COLS = 500   # samples; at 25 Hz ≈ 20 s of history
-        self.MONITOR_HZ   = 25
-        self.pin_state_buffers = {}
-        self.pin_state_lock = threading.Lock()
+        # Edge-driven pin history for the monitor stream; rebuilt by assign_pins()
+        self.MONITOR_WINDOW_S      = 20.0
+        self.MONITOR_RESOLUTION_HZ = 1000  # 1 ms bins
+        self.MONITOR_RESYNC_S      = 1.0   # level re-read interval, catches missed edges
+        self.pin_monitor = PinStateRing([])
+        self._monitor_renderer = TraceRenderer()
+        self._active_low = True  # cached ttl.active_logic, refreshed by assign_pins()
 
         # Assign pins from config
         self.assign_pins()
@@ -142,9 +155,13 @@ class TTLModule(Module):
 
 
     def _get_ttl_filename(self) -> str:
-        """Build the CSV filename for the current recording segment."""
+        """Build the event log filename for the current recording segment.
+
+        The binary log is named after the CSV it becomes at export, e.g.
+        "..._(0_20250101-120000).csv.evlog" -> "..._(0_20250101-120000).csv".
+        """
         strtime = self.facade.get_utc_time(self.facade.get_segment_start_time())
-        return f"{self.facade.get_filename_prefix()}_({self.facade.get_segment_id()}_{strtime}).csv"
+        return f"{self.facade.get_filename_prefix()}_({self.facade.get_segment_id()}_{strtime}).csv{EVENT_LOG_SUFFIX}"
 
 
     def _start_new_recording(self):
@@ -172,17 +189,26 @@ class TTLModule(Module):
 
 
     def _start_next_recording_segment(self):
-        """Stage and close the current CSV, then open a new one for the next segment.
+        """Open the next segment's event log, then close and stage the current one.
 
+        The new log is opened first and swapped in, and the old one drained and
+        fsynced, under the lock the writers append under, so no edge is lost at the
+        boundary or appended after the close. The old log is closed before it is
+        staged: an export running during rollover converts and removes any staged
+        log, buffered records and all.
         Input pin callbacks and generators keep running across segments — no restart needed.
         """
-        self.facade.stage_file_for_export(self.current_ttl_events_filename)
-        self._close_ttl_event_file()
+        previous_filename = self.current_ttl_events_filename
 
         filename = self._get_ttl_filename()
         self.current_ttl_events_filename = filename
         self.facade.add_session_file(filename)
-        self._open_ttl_file(filename)
+        new_log = self._new_event_log(filename)
+
+        with self._event_log_lock:
+            previous_log, self._ttl_event_log = self._ttl_event_log, new_log
+            self._close_event_log(previous_log, previous_filename)
+        self.facade.stage_file_for_export(previous_filename)
 
 
     def configure_module_special(self, updated_keys: list):
@@ -332,6 +358,20 @@ class TTLModule(Module):
         return {"result": "success", "message": f"Running {mode or '2 Hz'} test on GPIO {pin_number} for {duration}s"}
 
 
+    def get_diagnostics(self) -> dict:
+        """Base diagnostics plus kernel edge-capture counters and pulse timing."""
+        diagnostics = super().get_diagnostics()
+        if self._edge_reader is not None:
+            diagnostics["edge_capture"] = self._edge_reader.get_stats()
+        if self._pulse_trains:
+            diagnostics["pulse_trains"] = {
+                str(pn): train.summary() if isinstance(train, HardwarePWM)
+                else {"mode": "software", **train.stats.summary()}
+                for pn, train in self._pulse_trains.items()
+            }
+        return diagnostics
+
+
     def _stop_all_pin_tests(self):
         """Cancel any in-progress pin tests (called on recording start and cleanup)."""
         for stop_event in list(self._pin_test_stop_flags.values()):
@@ -341,6 +381,9 @@ class TTLModule(Module):
 
     def _start_recording_all_input_pins(self):
         self.logger.info("Starting to record all input pins")
+        if self._edge_reader is not None:
+            self._edge_reader.start(self._handle_edge_batch)
+            self.logger.info(f"Started kernel edge capture on pins {self._edge_reader.pin_numbers}")
         for pin in self.input_pins:
             self._start_recording_on_output_pin(pin)
 
@@ -401,14 +444,21 @@ class TTLModule(Module):
 
     def stop_recording_all_input_pins(self):
         self.logger.info("Stopping to record all input pins")
+        # The kernel edge reader keeps running for the monitor; with no event
+        # log open _handle_edge_batch writes nothing.
         for pin in self.input_pins:
             self.stop_recording_on_input_pin(pin)
 
 
     def stop_recording_on_input_pin(self, pin):
-        pin.when_pressed = None
-        pin.when_released = None
-        self.logger.info(f"Stopped monitoring input pin {pin.pin}")
+        self._monitor_input_pin(pin)
+        self.logger.info(f"Stopped recording input pin {pin.pin}")
+
+
+    def _monitor_input_pin(self, pin):
+        """Feed the monitor from a Button's callbacks while not recording."""
+        pin.when_pressed = lambda p: self.pin_monitor.record(p.pin.number, time.time_ns(), not self._active_low)
+        pin.when_released = lambda p: self.pin_monitor.record(p.pin.number, time.time_ns(), self._active_low)
 
 
     def stop_recording_on_output_pin(self, pin):
@@ -419,51 +469,104 @@ class TTLModule(Module):
 
     def _handle_input_pin_low(self, pin):
         """Handle input pin going low (pressed)"""
-        self._write_ttl_event(time.time_ns(), pin.pin.number, TTLValue.LOW)
+        timestamp_ns = time.time_ns()
+        self.pin_monitor.record(pin.pin.number, timestamp_ns, not self._active_low)
+        self._write_ttl_event(timestamp_ns, pin.pin.number, TTLValue.LOW)
         self.logger.info(f"Input pin {pin.pin} went low (pressed)")
 
 
     def _handle_input_pin_high(self, pin):
         """Handle input pin going high (released)"""
-        self._write_ttl_event(time.time_ns(), pin.pin.number, TTLValue.HIGH)
+        timestamp_ns = time.time_ns()
+        self.pin_monitor.record(pin.pin.number, timestamp_ns, self._active_low)
+        self._write_ttl_event(timestamp_ns, pin.pin.number, TTLValue.HIGH)
         self.logger.info(f"Input pin {pin.pin} went high (released)")
 
 
+    def _handle_edge_batch(self, events):
+        """Write a batch of kernel-stamped input edges from the EdgeEventReader.
+
+        Uses the same state convention as the gpiozero callbacks above: the edge
+        into the active state (a Button "press") is recorded as LOW, the edge back
+        to rest as HIGH. The whole batch is appended under one lock. The reader
+        runs whenever the pins are assigned, so the monitor sees edges even when
+        nothing is being recorded.
+        """
+        self.pin_monitor.record_many((ev.pin_number, ev.timestamp_ns, ev.rising) for ev in events)
+        if self._ttl_event_log is None:
+            return
+        active_low = self._active_low
+        records = []
+        for ev in events:
+            pressed = (not ev.rising) if active_low else ev.rising
+            state = TTLValue.LOW if pressed else TTLValue.HIGH
+            records.append((ev.timestamp_ns, ev.pin_number, state.value))
+        with self._event_log_lock:
+            if self._ttl_event_log is None:
+                return
+            self._ttl_event_log.extend(records)
+        self.logger.debug(f"Logged {len(events)} kernel-stamped input edges")
+
+
     def _open_ttl_file(self, filename: str):
-        """Open a TTL events CSV file for writing and write the column header."""
+        """Open a TTL event log for the segment and make it the current one."""
+        event_log = self._new_event_log(filename)
+        with self._event_log_lock:
+            self._ttl_event_log = event_log
+
+
+    def _new_event_log(self, filename: str) -> EventLog | None:
+        """Create a TTL event log for the segment (None if it can't be opened).
+
+        Pin mode/description are captured in the log header so each event is
+        just (timestamp, pin, state); the CSV columns are rebuilt at export.
+        """
         self.logger.info(f"Opening TTL events file: {filename}")
         try:
-            self._ttl_file_handle = open(filename, "w", buffering=1)  # line-buffered
-            self._ttl_file_handle.write("Timestamp_nanoseconds,pin_number,pin_mode,pin_state,pin_description\n")
+            return EventLog(
+                filename,
+                row_template="{timestamp_ns},{key},{mode},{label},{description}",
+                csv_header="Timestamp_nanoseconds,pin_number,pin_mode,pin_state,pin_description\n",
+                labels=[str(TTLValue.LOW), str(TTLValue.HIGH)],
+                key_fields={
+                    pn: {"mode": str(cfg.get("mode")), "description": str(cfg.get("description"))}
+                    for pn, cfg in self.pin_configs.items()
+                },
+            )
         except Exception as e:
             self.logger.error(f"Failed to open TTL events file {filename}: {e}")
-            self._ttl_file_handle = None
+            return None
 
 
     def _create_ttl_file(self):
         """Legacy helper used by _start_recording. Delegates to _open_ttl_file."""
-        self.current_ttl_events_filename = f"{self.facade.get_filename_prefix()}_events.csv"
+        self.current_ttl_events_filename = f"{self.facade.get_filename_prefix()}_events.csv{EVENT_LOG_SUFFIX}"
         self.facade.add_session_file(self.current_ttl_events_filename)
         self._open_ttl_file(self.current_ttl_events_filename)
 
 
     def _write_ttl_event(self, timestamp_ns: int, pin_number: int, state: TTLValue):
-        """Write a TTL event to file"""
-        if self._ttl_file_handle:
-            self._ttl_file_handle.write(f'{timestamp_ns},{pin_number},{self.pin_configs[pin_number].get("mode")},{state},{self.pin_configs[pin_number].get("description")}\n')
+        """Append a TTL event to the segment's event log"""
+        with self._event_log_lock:
+            if self._ttl_event_log is not None:
+                self._ttl_event_log.append(timestamp_ns, pin_number, state.value)
 
 
     def _close_ttl_event_file(self, filename=None):
-        """Flush and close the current TTL events file."""
+        """Drain, fsync and close the current TTL event log."""
+        with self._event_log_lock:
+            event_log, self._ttl_event_log = self._ttl_event_log, None
+            self._close_event_log(event_log, filename or self.current_ttl_events_filename)
+
+
+    def _close_event_log(self, event_log, filename):
+        if event_log is None:
+            return
         try:
-            if self._ttl_file_handle:
-                self._ttl_file_handle.flush()
-                self._ttl_file_handle.close()
-                self._ttl_file_handle = None
-                self.logger.info(f"Closed TTL events file: {filename or self.current_ttl_events_filename}")
+            event_log.close()
+            self.logger.info(f"Closed TTL events file: {filename} ({event_log.records_written} events)")
         except Exception as e:
             self.logger.warning(f"Error closing TTL events file: {e}")
-            self._ttl_file_handle = None
 
 
     def start_pseudo_random_pulses(self, pin_number, min_interval=1.0, max_interval=10.0, pulse_duration=0.01):
@@ -652,8 +755,13 @@ class TTLModule(Module):
 
             active_logic = self.config.get("ttl.active_logic", "active_low")
             pull_up = (active_logic == "active_low")
+            self._active_low = pull_up
             self.logger.info(f"Assigning pins with active_logic='{active_logic}' (pull_up={pull_up})")
 
+            # Input pins claimed by the kernel edge reader instead of gpiozero
+            use_gpiod = self.config.get("ttl.edge_capture", "gpiozero") == "gpiod"
+            gpiod_input_pins = []
+
             for pin_number, pin_config in pins_config.items():
                 try:
                     pin_number = int(pin_number)
@@ -662,7 +770,11 @@ class TTLModule(Module):
                     # Store pin configuration
                     self.pin_configs[pin_number] = pin_config
 
-                    if pin_type == "input":
+                    if pin_type == "input" and use_gpiod:
+                        gpiod_input_pins.append(pin_number)
+                        input_pins_assigned.append(pin_number)
+
+                    elif pin_type == "input":
                         # Create input pin (Button object) with proper error handling
                         try:
                             pin_obj = gpiozero.Button(pin_number, bounce_time=0, pull_up=pull_up)
@@ -702,6 +814,13 @@ class TTLModule(Module):
                             except Exception as e2:
                                 self.logger.error(f"Failed to assign output pin {pin_number} after retry: {e2}")
 
+                    elif pin_type == "experiment_clock" and int(pin_config.get("pwm_channel", -1)) >= 0:
+                        # Driven by the PWM block; the pwm overlay owns the pin mux, so no LED here
+                        self.experiment_clock_pins.append(pin_number)
+                        output_pins_assigned.append(pin_number)
+                        self.logger.info(f"Assigned pin {pin_number} as hardware PWM experiment_clock "
+                                         f"(pwmchip{pin_config.get('pwm_chip', 0)}/pwm{pin_config['pwm_channel']})")
+
                     elif pin_type == "experiment_clock":
                         try:
                             pin_obj = gpiozero.LED(pin_number)
@@ -751,19 +870,24 @@ class TTLModule(Module):
                 except Exception as e:
                     self.logger.error(f"Error assigning pin {pin_number}: {e}")
 
+            if gpiod_input_pins:
+                self._assign_gpiod_input_pins(gpiod_input_pins, pull_up)
+
             # Update the pin lists for backward compatibility
             self.ttl_input_pins = input_pins_assigned
             self.ttl_output_pins = output_pins_assigned
 
-            # Sync monitoring buffers: add new pins, remove deassigned ones
-            all_assigned = set(input_pins_assigned + output_pins_assigned)
-            with self.pin_state_lock:
-                for pn in all_assigned:
-                    if pn not in self.pin_state_buffers:
-                        self.pin_state_buffers[pn] = collections.deque(maxlen=self.MONITOR_COLS)
-                for pn in list(self.pin_state_buffers.keys()):
-                    if pn not in all_assigned:
-                        del self.pin_state_buffers[pn]
+            # Fresh monitor history for the new pin set, seeded with current levels
+            self.pin_monitor = PinStateRing(
+                input_pins_assigned + output_pins_assigned,
+                window_s=self.MONITOR_WINDOW_S,
+                resolution_hz=self.MONITOR_RESOLUTION_HZ,
+            )
+            self._resync_monitor()
+            for pin in self.input_pins:
+                self._monitor_input_pin(pin)
+            if self._edge_reader is not None:
+                self._edge_reader.start(self._handle_edge_batch)
 
             self.logger.info(f"Pin assignment complete: {len(self.input_pins)} input pins, {len(self.output_pins)} output pins")
 
@@ -771,9 +895,34 @@ class TTLModule(Module):
             self.logger.error(f"Error in assign_pins: {e}")
 
 
+    def _assign_gpiod_input_pins(self, pin_numbers: list, pull_up: bool) -> None:
+        """Claim input pins with a kernel edge-event request, falling back to gpiozero."""
+        try:
+            self._edge_reader = EdgeEventReader(
+                pin_numbers,
+                chip_path=self.config.get("ttl.gpio_chip", "/dev/gpiochip0"),
+                pull_up=pull_up,
+            )
+            self.logger.info(
+                f"Assigned input pins {pin_numbers} to kernel edge capture "
+                f"({self._edge_reader.get_stats()['clock']} timestamps)"
+            )
+        except Exception as e:
+            self.logger.error(f"Kernel edge capture unavailable ({e}), falling back to gpiozero for {pin_numbers}")
+            self._edge_reader = None
+            for pin_number in pin_numbers:
+                try:
+                    self.input_pins.append(gpiozero.Button(pin_number, bounce_time=0, pull_up=pull_up))
+                except Exception as e2:
+                    self.logger.error(f"Failed to assign input pin {pin_number}: {e2}")
+
+
     def _cleanup_gpio(self):
         """Clean up GPIO resources to prevent conflicts"""
         try:
+            if getattr(self, '_edge_reader', None) is not None:
+                self._edge_reader.close()
+                self._edge_reader = None
             # Close existing pin factory
             # gpiozero.Device.pin_factory.close()
             # Clean up any gpiozero objects
@@ -797,6 +946,7 @@ class TTLModule(Module):
                              f"pseudorandom={self.pseudorandom_pins} "
                              f"interval_pulse={self.interval_pulse_pins} "
                              f"output_pins={[p.pin.number for p in self.output_pins]}")
+            self._pulse_trains.clear()
 
             for pin_number in self.experiment_clock_pins:
                 self._start_experiment_clock(pin_number)
@@ -823,10 +973,15 @@ class TTLModule(Module):
             # Set recording flag to False to signal threads to stop
             self.is_recording = False
 
-            # Give threads a moment to exit naturally and execute finally blocks
-            time.sleep(0.1)  # 100ms should be enough for daemon threads to check the flag and cleanup
+            # Software trains see the flag within one sleep chunk; hardware clocks are disabled here
+            for pin_number, train in self._pulse_trains.items():
+                if isinstance(train, HardwarePWM):
+                    train.stop()
+                    self.pin_monitor.record(pin_number, time.time_ns(), self._active_low)
+            for thread in self.generator_threads.values():
+                thread.join(timeout=0.5)
 
-            # Clear thread references
+            # Clear thread references (trains are kept for diagnostics until the next start)
             self.generator_threads.clear()
             self.logger.info("Stopped all pin generators")
 
@@ -836,19 +991,19 @@ class TTLModule(Module):
 
     def _set_output_active(self, pin_obj) -> None:
         """Drive pin to its electrically active state."""
-        active_logic = self.config.get("ttl.active_logic", "active_low")
-        if active_logic == "active_low":
+        if self._active_low:
             pin_obj.off()   # active = LOW
         else:
             pin_obj.on()    # active = HIGH
+        self.pin_monitor.record(pin_obj.pin.number, time.time_ns(), not self._active_low)
 
     def _set_output_inactive(self, pin_obj) -> None:
         """Drive pin to its electrically inactive (resting) state."""
-        active_logic = self.config.get("ttl.active_logic", "active_low")
-        if active_logic == "active_low":
+        if self._active_low:
             pin_obj.on()    # inactive = HIGH
         else:
             pin_obj.off()   # inactive = LOW
+        self.pin_monitor.record(pin_obj.pin.number, time.time_ns(), self._active_low)
 
     def _set_all_output_pins_inactive(self):
         """Set all output pins to their resting (inactive) electrical state."""
@@ -873,31 +1028,18 @@ class TTLModule(Module):
             period = float(pin_config.get("period", 1.0))
             self.logger.info(f"Duty cycle for experiment clock {duty_cycle} from config")
 
-            # Find the pin object
-            pin_obj = None
-            for pin in self.output_pins:
-                if pin.pin.number == pin_number:
-                    pin_obj = pin
-                    break
+            if int(pin_config.get("pwm_channel", -1)) >= 0:
+                return self._start_hardware_clock(pin_number, pin_config, duty_cycle, period)
 
+            pin_obj = next((p for p in self.output_pins if p.pin.number == pin_number), None)
             if not pin_obj:
                 self.logger.error(f"Could not find pin object for experiment clock pin {pin_number}")
                 return False
 
-            # Set initial state to active (clock is active as soon as recording begins)
-            self._set_output_active(pin_obj)
-            self._write_ttl_event(time.time_ns(), pin_number, TTLValue.HIGH)
+            # First active edge immediately: the clock is active as soon as recording begins
+            schedule = clock_schedule(time.time_ns(), period, duty_cycle)
+            self._start_pulse_train(pin_number, pin_obj, schedule, nominal_period_s=period)
             self.logger.info(f"Started experiment clock on pin {pin_number} with {duty_cycle} duty cycle")
-
-            # Start generator thread
-            thread = threading.Thread(
-                target=self._experiment_clock_worker,
-                args=(pin_obj, pin_number, duty_cycle, period),
-                daemon=True
-            )
-            thread.start()
-            self.generator_threads[pin_number] = thread
-
             return True
 
         except Exception as e:
@@ -905,34 +1047,17 @@ class TTLModule(Module):
             return False
 
 
-    def _experiment_clock_worker(self, pin_obj, pin_number, duty_cycle, period):
-        """Worker thread for experiment clock generation"""
+    def _start_hardware_clock(self, pin_number, pin_config, duty_cycle, period):
+        """Run an experiment clock on a hardware PWM channel (pin muxed by the pwm overlay)."""
+        pwm = HardwarePWM(int(pin_config.get("pwm_chip", 0)), int(pin_config["pwm_channel"]))
         try:
-            self.logger.info(f"Experiment clock worker started on pin {pin_number}")
-
-            while self.is_recording:
-                # Calculate timing
-                high_time = period * duty_cycle
-                low_time = period * (1.0 - duty_cycle)
-
-                # Active phase
-                self._set_output_active(pin_obj)
-                self._write_ttl_event(time.time_ns(), pin_number, TTLValue.HIGH)
-                time.sleep(high_time)
-
-                if not self.is_recording:
-                    break
-
-                # Inactive phase
-                self._set_output_inactive(pin_obj)
-                self._write_ttl_event(time.time_ns(), pin_number, TTLValue.LOW)
-                time.sleep(low_time)
-
-        except Exception as e:
-            self.logger.error(f"Error in experiment clock worker for pin {pin_number}: {e}")
-        finally:
-            self._set_output_inactive(pin_obj)
-            self.logger.info(f"Experiment clock worker stopped for pin {pin_number}, returned to inactive state")
+            pwm.start(period, duty_cycle, self._active_low, self._edge_writer(pin_number))
+        except OSError as e:
+            self.logger.error(f"Hardware PWM unavailable for experiment clock pin {pin_number}: {e}")
+            return False
+        self._pulse_trains[pin_number] = pwm
+        self.logger.info(f"Started hardware PWM experiment clock on pin {pin_number} with {duty_cycle} duty cycle")
+        return True
 
 
     def _start_pseudorandom_generator(self, pin_number):
@@ -946,28 +1071,16 @@ class TTLModule(Module):
 
             self.logger.info(f"Min interval {min_interval}, max interval {max_interval}, pulse_duration {pulse_duration}")
 
-            # Find the pin object
-            pin_obj = None
-            for pin in self.output_pins:
-                if pin.pin.number == pin_number:
-                    pin_obj = pin
-                    break
-
+            pin_obj = next((p for p in self.output_pins if p.pin.number == pin_number), None)
             if not pin_obj:
                 self.logger.error(f"Could not find pin object for pseudorandom pin {pin_number}")
                 return False
 
+            # Uniform distribution: equal probability of any gap in [min, max]
+            schedule = pseudorandom_schedule(time.time_ns(), min_interval, max_interval, pulse_duration)
+            self._start_pulse_train(pin_number, pin_obj, schedule,
+                                    max_late_s=min_interval + pulse_duration)
             self.logger.info(f"Started pseudorandom generator on pin {pin_number}")
-
-            # Start generator thread
-            thread = threading.Thread(
-                target=self._pseudorandom_worker,
-                args=(pin_obj, pin_number, min_interval, max_interval, pulse_duration),
-                daemon=True
-            )
-            thread.start()
-            self.generator_threads[pin_number] = thread
-
             return True
 
         except Exception as e:
@@ -975,43 +1088,13 @@ class TTLModule(Module):
             return False
 
 
-    def _pseudorandom_worker(self, pin_obj, pin_number, min_interval, max_interval, pulse_duration):
-        """Worker thread for pseudorandom pulse generation"""
-        try:
-            self.logger.info(f"Pseudorandom worker started on pin {pin_number} "
-                             f"(min={min_interval}s max={max_interval}s pulse={pulse_duration}s)")
-            pulse_count = 0
-
-            while self.is_recording:
-                # Uniform distribution: equal probability of any interval in [min, max].
-                interval = random.uniform(min_interval, max_interval)
-                pulse_count += 1
-                self.logger.debug(f"Pseudorandom pin {pin_number} pulse #{pulse_count}: "
-                                  f"waiting {interval:.3f}s")
-
-                # Wait for the interval
-                time.sleep(interval)
-
-                # Check if still recording
-                if not self.is_recording:
-                    break
-
-                # Generate pulse: active for pulse_duration, then return to inactive
-                self._set_output_active(pin_obj)
-                self._write_ttl_event(time.time_ns(), pin_number, TTLValue.HIGH)
-                time.sleep(pulse_duration)
-                self._set_output_inactive(pin_obj)
-                self._write_ttl_event(time.time_ns(), pin_number, TTLValue.LOW)
-
-        except Exception as e:
-            self.logger.error(f"Error in pseudorandom worker for pin {pin_number}: {e}")
-        finally:
-            self._set_output_inactive(pin_obj)
-            self.logger.info(f"Pseudorandom worker stopped for pin {pin_number}, returned to inactive state")
-
-
     def _start_interval_pulse(self, pin_number):
-        """Start interval pulse generator for a specific pin."""
+        """Start interval pulse generator for a specific pin.
+
+        Fires a pulse of pulse_duration_s every interval_s seconds (onset-to-onset),
+        stopping after repeat_count pulses (or running until recording ends if repeat_count=0).
+        The first pulse fires after the first full interval has elapsed.
+        """
         try:
             pin_config = self.pin_configs.get(pin_number, {})
             interval_s = float(pin_config.get("interval_s", 120.0))
@@ -1023,19 +1106,13 @@ class TTLModule(Module):
                 self.logger.error(f"Could not find pin object for interval_pulse pin {pin_number}")
                 return False
 
+            schedule = interval_schedule(time.time_ns(), interval_s, pulse_duration_s, repeat_count)
+            self._start_pulse_train(pin_number, pin_obj, schedule, nominal_period_s=interval_s)
             self.logger.info(
                 f"Started interval_pulse on pin {pin_number}: "
                 f"interval={interval_s}s pulse={pulse_duration_s}s "
                 f"repeat={repeat_count or '∞'}"
             )
-
-            thread = threading.Thread(
-                target=self._interval_pulse_worker,
-                args=(pin_obj, pin_number, interval_s, pulse_duration_s, repeat_count),
-                daemon=True,
-            )
-            thread.start()
-            self.generator_threads[pin_number] = thread
             return True
 
         except Exception as e:
@@ -1043,193 +1120,87 @@ class TTLModule(Module):
             return False
 
 
-    def _interval_pulse_worker(self, pin_obj, pin_number, interval_s, pulse_duration_s, repeat_count):
-        """Worker thread for interval pulse generation.
+    def _start_pulse_train(self, pin_number, pin_obj, schedule, nominal_period_s=None, max_late_s=None):
+        """Run *schedule* on *pin_obj* on a deadline-scheduled PulseTrain thread.
+        Pulses more than max_late_s (default: the nominal period) late are skipped."""
+        # Resolve the active level once instead of reading config on every edge
+        active_level = not self._active_low
 
-        Fires a pulse of *pulse_duration_s* every *interval_s* seconds (onset-to-onset),
-        stopping after *repeat_count* pulses (or running until recording ends if repeat_count=0).
-        The first pulse fires after the first full interval has elapsed.
-        """
-        try:
-            self.logger.info(
-                f"Interval pulse worker started on pin {pin_number} "
-                f"(interval={interval_s}s pulse={pulse_duration_s}s repeat={repeat_count or '∞'})"
-            )
-            delivered = 0
-            next_fire = time.monotonic() + interval_s
+        def _drive(active: bool) -> None:
+            if active == active_level:
+                pin_obj.on()
+            else:
+                pin_obj.off()
 
-            while self.is_recording:
-                if repeat_count > 0 and delivered >= repeat_count:
-                    self.logger.info(f"Interval pulse pin {pin_number}: completed {delivered} pulses, stopping")
-                    break
+        train = PulseTrain(
+            schedule,
+            drive=_drive,
+            on_edge=self._edge_writer(pin_number),
+            should_run=lambda: self.is_recording,
+            stats=PulseTimingStats(round(nominal_period_s * 1e9) if nominal_period_s else None),
+            spin_ns=int(self.config.get("ttl.pulse_spin_us", 50)) * 1000,
+            max_late_ns=round(max_late_s * 1e9) if max_late_s else None,
+            name=f"ttl-pulse-{pin_number}",
+        ).start()
+        self._pulse_trains[pin_number] = train
+        self.generator_threads[pin_number] = train.thread
 
-                # Sleep in short chunks so is_recording is checked regularly
-                while self.is_recording:
-                    remaining = next_fire - time.monotonic()
-                    if remaining <= 0:
-                        break
-                    time.sleep(min(0.05, remaining))
 
-                if not self.is_recording:
-                    break
-                if repeat_count > 0 and delivered >= repeat_count:
-                    break
-
-                self._set_output_active(pin_obj)
-                self._write_ttl_event(time.time_ns(), pin_number, TTLValue.HIGH)
-                time.sleep(pulse_duration_s)
-                self._set_output_inactive(pin_obj)
-                self._write_ttl_event(time.time_ns(), pin_number, TTLValue.LOW)
-
-                delivered += 1
-                next_fire += interval_s
-                self.logger.debug(
-                    f"Interval pulse pin {pin_number}: pulse {delivered}"
-                    + (f"/{repeat_count}" if repeat_count else "")
-                    + f", next in {interval_s}s"
-                )
-
-        except Exception as e:
-            self.logger.error(f"Error in interval_pulse worker for pin {pin_number}: {e}")
-        finally:
-            self._set_output_inactive(pin_obj)
-            self.logger.info(f"Interval pulse worker stopped for pin {pin_number}, returned to inactive state")
+    def _edge_writer(self, pin_number):
+        """Return an on_edge callback writing realised edges for *pin_number*."""
+        def _on_edge(timestamp_ns: int, active: bool) -> None:
+            self.pin_monitor.record(pin_number, timestamp_ns, active != self._active_low)
+            self._write_ttl_event(timestamp_ns, pin_number, TTLValue.HIGH if active else TTLValue.LOW)
+        return _on_edge
 
 
     """Monitoring stream"""
 
     def _get_electrical_high(self, pin_obj, is_input: bool) -> bool:
         """Return True if the pin is electrically HIGH."""
-        active_logic = self.config.get("ttl.active_logic", "active_low")
         if is_input:
             # Button.is_pressed = True when active.
             # active_low: active = LOW → electrical HIGH = not is_pressed
             # active_high: active = HIGH → electrical HIGH = is_pressed
-            return not pin_obj.is_pressed if active_logic == "active_low" else pin_obj.is_pressed
+            return not pin_obj.is_pressed if self._active_low else pin_obj.is_pressed
         else:
             # LED.is_lit = True when HIGH
             return pin_obj.is_lit
 
+    def _resync_monitor(self) -> None:
+        """Read every pin's level and record any the monitor has got wrong.
+
+        Edges normally reach the monitor from the callbacks and writers that
+        cause or observe them; this catches anything they missed (e.g. a
+        gpiozero callback dropped under load) and seeds a fresh ring.
+        """
+        levels = {}
+        if self._edge_reader is not None:
+            try:
+                levels.update(self._edge_reader.get_values())
+            except Exception as e:
+                self.logger.debug(f"Could not read kernel edge-capture levels: {e}")
+        for pin_obj, is_input in [(p, True) for p in self.input_pins] + [(p, False) for p in self.output_pins]:
+            try:
+                levels[pin_obj.pin.number] = self._get_electrical_high(pin_obj, is_input)
+            except Exception:
+                pass
+        known = self.pin_monitor.states()
+        now_ns = time.time_ns()
+        self.pin_monitor.record_many(
+            (pn, now_ns, high) for pn, high in levels.items() if known.get(pn) != high
+        )
+
     def _sample_pins(self) -> None:
-        """Background thread: poll all pins at MONITOR_HZ, fill state buffers."""
-        interval = 1.0 / self.MONITOR_HZ
+        """Background thread: periodically reconcile the monitor with actual pin levels."""
         while not self.should_stop_monitoring:
-            input_pairs  = [(p, True)  for p in self.input_pins]
-            output_pairs = [(p, False) for p in self.output_pins]
-            with self.pin_state_lock:
-                for pin_obj, is_input in input_pairs + output_pairs:
-                    pn = pin_obj.pin.number
-                    if pn in self.pin_state_buffers:
-                        try:
-                            self.pin_state_buffers[pn].append(
-                                self._get_electrical_high(pin_obj, is_input)
-                            )
-                        except Exception:
-                            self.pin_state_buffers[pn].append(False)
-            time.sleep(interval)
+            self._resync_monitor()
+            time.sleep(self.MONITOR_RESYNC_S)
 
     def _render_monitor_frame(self) -> bytes | None:
         """Render a logic-analyser style MJPEG frame for all assigned pins."""
         try:
-            active_logic = self.config.get("ttl.active_logic", "active_low")
-
-            with self.pin_state_lock:
-                snapshot = {pn: list(buf) for pn, buf in self.pin_state_buffers.items()}
-
-            pin_numbers = sorted(snapshot.keys())
-            n_pins = len(pin_numbers)
-
-            WIDTH    = 800
-            PADDING  = 12
-            STATE_W  = 110   # right-side badge
-            HEADER_H = 20
-            TRACE_H  = 44
-            GAP_H    = 14
-            ROW_H    = HEADER_H + TRACE_H + GAP_H
-
-            height = max(n_pins * ROW_H + PADDING, 120)
-            frame = np.zeros((height, WIDTH, 3), dtype=np.uint8)
-
-            if n_pins == 0:
-                cv2.putText(frame, "No pins assigned",
-                            (PADDING, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (140, 140, 140), 1)
-                _, jpeg = cv2.imencode('.jpg', frame)
-                return jpeg.tobytes()
-
-            trace_x0 = PADDING
-            trace_x1 = WIDTH - STATE_W - PADDING
-            trace_w  = trace_x1 - trace_x0
-
-            ACTIVE_COL   = (0, 200, 80)   # green  (BGR)
-            INACTIVE_COL = (65, 65, 65)
-
-            for idx, pin_num in enumerate(pin_numbers):
-                cfg  = self.pin_configs.get(pin_num, {})
-                mode = cfg.get("mode", "?")
-                desc = cfg.get("description", "")
-                buf  = snapshot[pin_num]
-
-                y0 = PADDING // 2 + idx * ROW_H
-
-                # Current state
-                elec_high = buf[-1] if buf else False
-                is_active = elec_high if active_logic == "active_high" else not elec_high
-
-                # ── Header ────────────────────────────────────────────────
-                parts = [f"GPIO {pin_num}", mode.upper()]
-                if desc:
-                    parts.append(desc)
-                cv2.putText(frame, "  |  ".join(parts),
-                            (trace_x0, y0 + 14),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.40, (180, 180, 180), 1)
-
-                # ── Waveform ──────────────────────────────────────────────
-                ty0  = y0 + HEADER_H
-                ty1  = ty0 + TRACE_H
-                ymid = (ty0 + ty1) // 2
-                yhi  = ty0 + 6
-                ylo  = ty1 - 6
-
-                # Background and border
-                cv2.rectangle(frame, (trace_x0, ty0), (trace_x1, ty1), (22, 22, 22), -1)
-                cv2.rectangle(frame, (trace_x0, ty0), (trace_x1, ty1), (55, 55, 55),  1)
-                cv2.line(frame, (trace_x0, ymid), (trace_x1, ymid), (38, 38, 38), 1)
-
-                if buf:
-                    N = len(buf)
-                    px_per = trace_w / N
-
-                    prev_y = yhi if buf[0] else ylo
-                    prev_x = trace_x0
-
-                    for i, high in enumerate(buf):
-                        cur_y = yhi if high else ylo
-                        cur_x = trace_x0 + int((i + 1) * px_per)
-                        seg_active = high if active_logic == "active_high" else not high
-                        col = ACTIVE_COL if seg_active else INACTIVE_COL
-
-                        cv2.line(frame, (prev_x, prev_y), (cur_x, prev_y), col, 2)
-                        if cur_y != prev_y:
-                            cv2.line(frame, (cur_x, prev_y), (cur_x, cur_y), col, 2)
-                        prev_y = cur_y
-                        prev_x = cur_x
-
-                # ── State badge ───────────────────────────────────────────
-                bx0 = WIDTH - STATE_W
-                bx1 = WIDTH - PADDING // 2
-                badge_col = ACTIVE_COL if is_active else INACTIVE_COL
-                cv2.rectangle(frame, (bx0, ty0), (bx1, ty1), badge_col, -1)
-                badge_txt = "ACTIVE" if is_active else "IDLE"
-                (tw, th), _ = cv2.getTextSize(badge_txt, cv2.FONT_HERSHEY_SIMPLEX, 0.45, 1)
-                cv2.putText(frame, badge_txt,
-                            (bx0 + (bx1 - bx0 - tw) // 2, ty0 + (TRACE_H + th) // 2),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), 1)
-
-                # ── Row separator ─────────────────────────────────────────
-                if idx < n_pins - 1:
-                    sep_y = ty1 + GAP_H // 2
-                    cv2.line(frame, (0, sep_y), (WIDTH, sep_y), (45, 45, 45), 1)
-
+            frame = self._monitor_renderer.render(self.pin_monitor, self.pin_configs, self._active_low)
             _, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
             return jpeg.tobytes()
 
@@ -0,0 +1,113 @@
+"""Content manifest for staged update packages.
+
+The controller publishes one manifest next to each staged ZIP: a sha256,
+size and mode for every file the update would rsync into the install
+directory. A module diffs the manifest against its own install tree, fetches
+only the files whose hash differs, and verifies each one before it is
+applied. Shared here because the controller builds manifests and modules
+consume them (same reasoning as zip_extract).
+"""
+
+import hashlib
+import json
+import os
+import stat
+import zipfile
+
+# Mirrors the rsync --exclude flags both update paths pass -- anything under
+# these is never applied, so it is never listed either.
+EXCLUDED_PREFIXES = ("env/", ".git/")
+
+_BLOCK = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _strip_prefix(names: list[str]) -> str:
+    """Release ZIPs wrap everything in one top-level directory
+    (saviour-1.2.0/...), which extraction strips by rsyncing from inside it.
+    Return that directory (with trailing slash) so manifest paths match the
+    install tree, or "" when the archive is already flat."""
+    tops = {n.split("/", 1)[0] for n in names}
+    if len(tops) == 1 and all("/" in n for n in names):
+        return tops.pop() + "/"
+    return ""
+
+
+def build_manifest(zip_path: str, version: str = "") -> dict:
+    """Hash every regular file in zip_path.
+
+    Returns {"manifest_id", "version", "prefix", "files": {rel: {...}}}
+    where prefix is the ZIP member prefix that was stripped from each rel
+    path and manifest_id is a digest over the sorted entries, so two
+    packages with identical content share an id regardless of ZIP timestamps.
+    """
+    files = {}
+    with zipfile.ZipFile(zip_path) as z:
+        infos = [i for i in z.infolist() if not i.is_dir()]
+        prefix = _strip_prefix([i.filename for i in infos])
+        for info in infos:
+            rel = info.filename[len(prefix):]
+            if not rel or rel.startswith(EXCLUDED_PREFIXES):
+                continue
+            digest = hashlib.sha256()
+            with z.open(info) as src:
+                for block in iter(lambda: src.read(_BLOCK), b""):
+                    digest.update(block)
+            # ZIPs built off-Unix carry no mode bits; None leaves the mode to
+            # whatever extraction would have produced.
+            mode = stat.S_IMODE(info.external_attr >> 16) or None
+            files[rel] = {"sha256": digest.hexdigest(), "size": info.file_size, "mode": mode}
+
+    listing = json.dumps(sorted((k, v["sha256"], v["mode"]) for k, v in files.items()))
+    return {
+        "manifest_id": hashlib.sha256(listing.encode()).hexdigest()[:16],
+        "version": version,
+        "prefix": prefix,
+        "files": files,
+    }
+
+
+def safe_path(manifest: dict, rel: str) -> bool:
+    """Whether rel is a path listed in the manifest. Both the controller's
+    and a peer's file route only ever serve manifest paths, never arbitrary
+    files under the install dir (which also holds .env credentials)."""
+    return rel in manifest.get("files", {})
+
+
+def verify_file(path: str, entry: dict) -> bool:
+    try:
+        if os.path.getsize(path) != entry["size"]:
+            return False
+        return file_sha256(path) == entry["sha256"]
+    except OSError:
+        return False
+
+
+def changed_files(manifest: dict, root: str) -> list[str]:
+    """Manifest paths whose copy under root is missing or differs.
+
+    The size check short-circuits most changed files without hashing; files
+    of equal size are hashed. Mode-only changes count as changed so the
+    staged copy carries the new mode into rsync.
+    """
+    changed = []
+    for rel, entry in sorted(manifest.get("files", {}).items()):
+        local = os.path.join(root, rel)
+        if not verify_file(local, entry):
+            changed.append(rel)
+            continue
+        if entry.get("mode") is None:
+            continue
+        try:
+            if stat.S_IMODE(os.stat(local).st_mode) != entry["mode"]:
+                changed.append(rel)
+        except OSError:
+            changed.append(rel)
+    return changed
@@ -0,0 +1,33 @@
+"""
+SAVIOUR Fleet Simulator
+
+Synthetic modules speaking the real DEALER/PUB protocol, fault injection,
+and a scenario runner that reports command round trips, status processing
+lag and controller CPU -- so the controller's hot path can be load tested
+with 50+ modules and no Pis. Run with ``python -m src.simulator --help``.
+"""
+
+from src.simulator.fleet import Faults, Fleet
+from src.simulator.harness import ControllerHarness
+from src.simulator.module import SyntheticModule
+from src.simulator.remote import WebCommander
+from src.simulator.scenario import (
+    CONTROLLER_HANDLER,
+    DEFAULT_SCENARIO,
+    load_scenario,
+    run_scenario,
+    summarise,
+)
+
+__all__ = [
+    "CONTROLLER_HANDLER",
+    "DEFAULT_SCENARIO",
+    "ControllerHarness",
+    "Faults",
+    "Fleet",
+    "SyntheticModule",
+    "WebCommander",
+    "load_scenario",
+    "run_scenario",
+    "summarise",
+]
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Fleet simulator CLI.
+
+Usage:
+    python -m src.simulator --modules 100 --duration 30
+    python -m src.simulator --scenario scenario.json --json
+    python -m src.simulator --controller 192.168.1.10 --controller-pid 1234
+    python -m src.simulator --handler controller
+    python -m src.simulator --handler mypkg.bench:handle_status_update
+
+Without --controller the real controller Communication runs in-process on
+ipc:// (or --transport tcp) endpoints; --handler puts a status handler
+under load behind it: "controller" for the real Controller's, or a
+callable "module:attr" taking (topic, data).
+
+With --controller, command steps are sent through the controller's web
+interface, logged in with --web-password (default: $SAVIOUR_ADMIN_PASSWORD).
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import sys
+
+from src.simulator.scenario import (
+    CONTROLLER_HANDLER,
+    DEFAULT_SCENARIO,
+    load_scenario,
+    run_scenario,
+)
+
+
+def _print_report(report: dict) -> None:
+    for key, value in report.items():
+        if isinstance(value, dict) and value and all(isinstance(v, dict) for v in value.values()):
+            print(f"{key}:")
+            for name, stats in value.items():
+                print(f"  {name:<20} {stats}")
+        else:
+            print(f"{key:<22} {value}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenario", help="Scenario JSON (see src/simulator/scenario.py)")
+    ap.add_argument("--modules", type=int, help="Override the scenario's fleet size")
+    ap.add_argument("--duration", type=float, help="Override the scenario's duration (s)")
+    ap.add_argument("--heartbeat", type=float, help="Override the heartbeat interval (s)")
+    ap.add_argument("--transport", choices=["ipc", "tcp"], default="ipc")
+    ap.add_argument("--controller", help="host[:command_port] of a running controller")
+    ap.add_argument("--controller-pid", type=int, help="Report this process's CPU")
+    ap.add_argument("--handler", help=f"Status handler behind the in-process harness: "
+                                      f"{CONTROLLER_HANDLER!r} or module:attr")
+    ap.add_argument("--web-port", type=int, default=5000, help="--controller's web interface port")
+    ap.add_argument("--web-password", default=os.environ.get("SAVIOUR_ADMIN_PASSWORD"),
+                    help="--controller's admin password, for command steps")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--json", action="store_true", help="Print the report as JSON")
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s")
+
+    scenario = load_scenario(args.scenario) if args.scenario else dict(DEFAULT_SCENARIO)
+    for key, value in (("modules", args.modules), ("duration_s", args.duration),
+                       ("heartbeat_interval_s", args.heartbeat)):
+        if value is not None:
+            scenario[key] = value
+
+    handler = args.handler
+    if args.handler and args.handler != CONTROLLER_HANDLER:
+        module_name, _, attr = args.handler.partition(":")
+        handler = getattr(importlib.import_module(module_name), attr)
+
+    report = run_scenario(scenario, handler=handler, transport=args.transport,
+                          controller=args.controller, controller_pid=args.controller_pid,
+                          seed=args.seed, web_port=args.web_port, web_password=args.web_password)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+    return 0 if report["registered"] == report["modules"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Simulated Controller
+
+The real Controller's status handling behind a ControllerHarness, for
+``--handler controller``: the Controller's own handle_status_update with its
+real Modules, Health, Web, Recording and ExportQueue managers, so a scenario
+loads the same code a running controller would. Only the network side is
+left out -- the harness's Communication stands in for the controller's, and
+there is no zeroconf discovery or PTP (modules register the way an
+undiscovered module does, from their first config).
+
+Everything the controller would keep under /var/lib/saviour goes to a
+private state directory instead, removed by stop().
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+
+from src.controller import export_queue, recording
+from src.controller.communication import Communication
+from src.controller.config import Config
+from src.controller.controller import Controller
+from src.controller.export_queue import ExportQueue
+from src.controller.facade import ControllerFacade
+from src.controller.health import Health
+from src.controller.modules import Modules
+from src.controller.notify import Notifier
+from src.controller.recording import Recording
+from src.controller.web import Web
+
+BASE_CONFIG = os.path.join(os.path.dirname(os.path.dirname(__file__)), "controller", "base_config.json")
+
+
+class SimulatedController(Controller):
+    """A Controller wired to an existing Communication, with no network side."""
+
+    def __init__(self, communication: Communication):
+        self.logger = logging.getLogger(__name__)
+        self._dir = tempfile.mkdtemp(prefix="saviour-sim-controller-")
+        # Recording and ExportQueue keep their files at module-level paths
+        self._saved_paths = (recording.SESSIONS_FILE, export_queue.QUEUE_FILE)
+        recording.SESSIONS_FILE = os.path.join(self._dir, "sessions.json")
+        export_queue.QUEUE_FILE = os.path.join(self._dir, "export_queue.json")
+
+        self.config = Config(base_config_path=BASE_CONFIG,
+                             active_config_path=os.path.join(self._dir, "active_config.json"))
+        self.is_running = True
+        self.communication = communication
+        self.web = Web(self.config)
+        self.health = Health(self.config)
+        self.modules = Modules()
+        self.recording = Recording(journal_dir=os.path.join(self._dir, "session_journal"))
+        self.export_queue = ExportQueue(self.config)
+        self.notifier = Notifier(self.config)
+        self.facade = ControllerFacade(self)
+
+        for manager in (self.health, self.communication, self.web, self.modules,
+                        self.recording, self.export_queue):
+            manager.facade = self.facade
+        self.start_time = None
+
+
+    def configure_controller(self, updated_keys: list[str] | None):
+        pass
+
+
+    def stop(self) -> bool:
+        """Stop the session timers and journal and remove the state directory.
+        The Communication belongs to the harness and is left to it."""
+        self.is_running = False
+        self.recording.stop()
+        self.recording.journal.stop()
+        if self.recording._store is not None:
+            self.recording._store.close()
+        recording.SESSIONS_FILE, export_queue.QUEUE_FILE = self._saved_paths
+        shutil.rmtree(self._dir, ignore_errors=True)
+        return True
@@ -0,0 +1,238 @@
+"""
+Simulated Fleet
+
+N SyntheticModules speaking the module side of the real protocol: each has
+its own DEALER (identity = module_id, registers with b"hello") and PUB
+socket ("status/<module_id> <json>"), exactly as src/modules/communication.py
+does. All sockets are driven from one event loop thread with a timer heap,
+so a few hundred modules cost one thread rather than three each.
+
+Faults are applied on the module side: outgoing statuses can be dropped or
+delayed, and a recording module can restart -- its sockets are closed, it
+stays dark for restart_downtime_s, then reconnects with a fresh hello and
+recording=False in its next heartbeat, the way a power-cycled Pi would.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import zmq
+
+from src.simulator.module import SyntheticModule
+
+
+@dataclass
+class Faults:
+    """Fault injection rates. delay_s is a uniform (min, max) range added
+    to every outgoing status; restart_rate is the chance per heartbeat that
+    a recording module restarts."""
+
+    drop_rate: float = 0.0
+    delay_s: tuple[float, float] = (0.0, 0.0)
+    restart_rate: float = 0.0
+    restart_downtime_s: float = 2.0
+
+    @classmethod
+    def from_dict(cls, d: dict | None) -> "Faults":
+        d = dict(d or {})
+        if "delay_s" in d:
+            delay = d["delay_s"]
+            d["delay_s"] = tuple(delay) if isinstance(delay, (list, tuple)) else (0.0, float(delay))
+        return cls(**d)
+
+
+class Fleet:
+    """Synthetic modules connected to one controller's ROUTER and SUB."""
+
+    def __init__(self, count: int, command_endpoint: str, status_endpoint: str,
+                 heartbeat_interval_s: float = 5.0, faults: Faults | None = None,
+                 seed: int | None = None, prefix: str = "sim", export_s: float = 1.0):
+        self.logger = logging.getLogger(__name__)
+        self.command_endpoint = command_endpoint
+        self.status_endpoint = status_endpoint
+        self.heartbeat_interval_s = heartbeat_interval_s
+        self.faults = faults or Faults()
+        self.rng = random.Random(seed)
+        width = len(str(count))
+        self.modules = {
+            mid: SyntheticModule(mid, export_s=export_s, rng=random.Random(self.rng.random()))
+            for mid in (f"{prefix}{i:0{width}d}" for i in range(1, count + 1))
+        }
+
+        self.context = zmq.Context()
+        self._dealers: dict[str, zmq.Socket] = {}
+        self._pubs: dict[str, zmq.Socket] = {}
+        self._by_socket: dict[zmq.Socket, str] = {}
+        self._poller = zmq.Poller()
+        self._generation = dict.fromkeys(self.modules, 0)
+        self._timers: list = []
+        self._seq = itertools.count()
+        self._calls: queue.Queue = queue.Queue()
+        self._hb_sent: dict[str, float] = {}
+        self._running = False
+        self._thread = None
+
+        # Counters and samples, read by the scenario runner after stop()
+        self.sent = 0
+        self.dropped = 0
+        self.commands_received = 0
+        self.heartbeat_rtt_s: list[float] = []
+        # Called as (module_id, command) for every command a module receives
+        self.on_command: Callable[[str, str], None] | None = None
+
+
+    def start(self) -> None:
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="sim-fleet")
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        for mid in list(self._dealers):
+            self._disconnect(mid)
+        self.context.term()
+
+
+    def restart(self, module_ids: list[str], downtime_s: float | None = None) -> None:
+        """Restart modules from any thread; applied on the fleet loop."""
+        self._calls.put((self._restart, (list(module_ids), downtime_s)))
+
+
+    # ------------------------------------------------------------------
+    # Event loop (fleet thread only below here)
+    # ------------------------------------------------------------------
+
+    def _schedule(self, delay_s: float, action, *args) -> None:
+        heapq.heappush(self._timers, (time.monotonic() + delay_s, next(self._seq), action, args))
+
+
+    def _run(self) -> None:
+        for mid in self.modules:
+            self._connect(mid)
+        while self._running:
+            while not self._calls.empty():
+                fn, args = self._calls.get_nowait()
+                fn(*args)
+            timeout = 50
+            if self._timers:
+                timeout = max(0, min(timeout, int((self._timers[0][0] - time.monotonic()) * 1000)))
+            for sock, _ in self._poller.poll(timeout):
+                mid = self._by_socket.get(sock)
+                if mid is not None:
+                    self._receive(mid, sock)
+            now = time.monotonic()
+            while self._timers and self._timers[0][0] <= now:
+                _, _, action, args = heapq.heappop(self._timers)
+                try:
+                    action(*args)
+                except Exception as e:
+                    self.logger.error(f"Simulated module action failed: {e}")
+
+
+    def _connect(self, mid: str) -> None:
+        dealer = self.context.socket(zmq.DEALER)
+        dealer.setsockopt(zmq.IDENTITY, mid.encode())
+        dealer.setsockopt(zmq.LINGER, 0)
+        dealer.connect(self.command_endpoint)
+        pub = self.context.socket(zmq.PUB)
+        pub.setsockopt(zmq.LINGER, 0)
+        pub.connect(self.status_endpoint)
+        dealer.send(b"hello")
+        self._dealers[mid], self._pubs[mid] = dealer, pub
+        self._by_socket[dealer] = mid
+        self._poller.register(dealer, zmq.POLLIN)
+        # Spread first heartbeats across one interval so N modules don't
+        # arrive as a single burst every interval
+        gen = self._generation[mid]
+        self._schedule(self.rng.uniform(0.1, max(0.1, self.heartbeat_interval_s)), self._heartbeat, mid, gen)
+
+
+    def _disconnect(self, mid: str) -> None:
+        dealer = self._dealers.pop(mid, None)
+        pub = self._pubs.pop(mid, None)
+        if dealer is not None:
+            self._poller.unregister(dealer)
+            self._by_socket.pop(dealer, None)
+            dealer.close()
+        if pub is not None:
+            pub.close()
+        self._hb_sent.pop(mid, None)
+
+
+    def _restart(self, module_ids: list[str], downtime_s: float | None) -> None:
+        downtime = self.faults.restart_downtime_s if downtime_s is None else downtime_s
+        for mid in module_ids:
+            if mid not in self._dealers:
+                continue
+            self.logger.info(f"Restarting simulated module {mid} for {downtime}s")
+            self._disconnect(mid)
+            # Anything scheduled for the old connection is now stale
+            self._generation[mid] += 1
+            self.modules[mid].restart()
+            self._schedule(downtime, self._connect, mid)
+
+
+    def _heartbeat(self, mid: str, gen: int) -> None:
+        if gen != self._generation[mid]:
+            return
+        module = self.modules[mid]
+        if module.recording and self.faults.restart_rate and self.rng.random() < self.faults.restart_rate:
+            self._restart([mid], None)
+            return
+        self._hb_sent[mid] = time.monotonic()
+        self._send(mid, gen, module.heartbeat())
+        self._schedule(self.heartbeat_interval_s, self._heartbeat, mid, gen)
+
+
+    def _receive(self, mid: str, sock: zmq.Socket) -> None:
+        try:
+            raw = sock.recv_string(zmq.NOBLOCK)
+        except zmq.Again:
+            return
+        command, _, params = raw.partition(" ")
+        if command == "heartbeat_ack":
+            sent = self._hb_sent.pop(mid, None)
+            if sent is not None:
+                self.heartbeat_rtt_s.append(time.monotonic() - sent)
+            return
+        self.commands_received += 1
+        if self.on_command is not None:
+            self.on_command(mid, command)
+        try:
+            params = json.loads(params) if params else {}
+        except ValueError:
+            params = {}
+        gen = self._generation[mid]
+        for delay, status in self.modules[mid].handle(command, params):
+            if delay > 0:
+                self._schedule(delay, self._send, mid, gen, status)
+            else:
+                self._send(mid, gen, status)
+
+
+    def _send(self, mid: str, gen: int, status: dict, delayed: bool = False) -> None:
+        if gen != self._generation[mid] or mid not in self._pubs:
+            return
+        low, high = self.faults.delay_s
+        if high > 0 and not delayed:
+            self._schedule(self.rng.uniform(low, high), self._send, mid, gen, status, True)
+            return
+        if self.faults.drop_rate and self.rng.random() < self.faults.drop_rate:
+            self.dropped += 1
+            return
+        status["timestamp"] = time.time()
+        status["module_id"] = mid
+        status["module_name"] = self.modules[mid].module_name
+        self._pubs[mid].send_string(f"status/{mid} {json.dumps(status)}")
+        self.sent += 1
@@ -0,0 +1,138 @@
+"""
+Controller Harness
+
+Runs the real controller Communication (ROUTER + SUB + zmq-listener thread)
+on private endpoints and times everything that passes through it:
+
+- command round trip: send_command() to the matching cmd_ack arriving
+- status processing lag: module send timestamp to the downstream handler
+  returning, i.e. wire + listener queueing + handling
+- handler time: the downstream handler alone
+
+The downstream handler is whatever should be under load -- typically a
+Controller's handle_status_update. Heartbeats are acked the way the web
+layer does, so the fleet can measure heartbeat round trips too.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable
+
+import zmq
+
+from src.controller.communication import Communication
+from src.controller.self_metrics import read_thread_ticks
+
+
+class ControllerHarness:
+    """A controller Communication with timing around its status callback."""
+
+    def __init__(self, transport: str = "ipc",
+                 handler: Callable[[str, str], None] | None = None,
+                 ack_heartbeats: bool = True):
+        self.logger = logging.getLogger(__name__)
+        self.handler = handler
+        self.ack_heartbeats = ack_heartbeats
+        self._dir = None
+        if transport == "ipc":
+            self._dir = tempfile.mkdtemp(prefix="saviour-sim-")
+            command_bind = f"ipc://{os.path.join(self._dir, 'command')}"
+            status_bind = f"ipc://{os.path.join(self._dir, 'status')}"
+        else:
+            command_bind = status_bind = "tcp://127.0.0.1:*"
+
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[str, str], deque] = defaultdict(deque)
+        self.command_rtt_s: dict[str, list[float]] = defaultdict(list)
+        self.status_lag_s: list[float] = []
+        self.handler_s: list[float] = []
+        self.status_counts: dict[str, int] = defaultdict(int)
+        self.handler_errors = 0
+
+        self.communication = Communication(status_callback=self._on_status,
+                                           command_endpoint=command_bind,
+                                           status_endpoint=status_bind)
+        self.command_endpoint = self._endpoint(self.communication.command_socket)
+        self.status_endpoint = self._endpoint(self.communication.status_socket)
+
+
+    @staticmethod
+    def _endpoint(sock: zmq.Socket) -> str:
+        return sock.getsockopt(zmq.LAST_ENDPOINT).decode()
+
+
+    def connected(self) -> set[str]:
+        with self.communication._dealers_lock:
+            return set(self.communication._connected_dealers)
+
+
+    def wait_for_modules(self, count: int, timeout_s: float = 30.0) -> int:
+        """Block until count dealers have said hello; returns how many did."""
+        deadline = time.monotonic() + timeout_s
+        while len(self.connected()) < count and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return len(self.connected())
+
+
+    def send(self, module_id: str, command: str, params: dict | None = None) -> None:
+        """send_command, remembering when so the cmd_ack can be timed."""
+        targets = sorted(self.connected()) if module_id == "all" else [module_id]
+        now = time.monotonic()
+        with self._lock:
+            for target in targets:
+                self._pending[(target, command)].append(now)
+        self.communication.send_command(module_id, command, params or {})
+
+
+    def unanswered(self) -> int:
+        with self._lock:
+            return sum(len(q) for q in self._pending.values())
+
+
+    def listener_ticks(self) -> int:
+        """CPU clock ticks used so far by the controller's zmq-listener thread."""
+        thread = self.communication.listener_thread
+        if thread.native_id is None:
+            return 0
+        return read_thread_ticks({thread.native_id: "zmq-listener"}).get("zmq-listener", 0)
+
+
+    def _on_status(self, topic: str, data: str) -> None:
+        received = time.monotonic()
+        module_id = topic.split("/", 1)[1]
+        try:
+            status = json.loads(data)
+        except ValueError:
+            return
+        status_type = status.get("type", "unknown")
+        with self._lock:
+            self.status_counts[status_type] += 1
+            if status_type == "cmd_ack":
+                sent = self._pending.get((module_id, status.get("command")))
+                if sent:
+                    self.command_rtt_s[status["command"]].append(received - sent.popleft())
+        if status_type == "heartbeat" and self.ack_heartbeats:
+            self.communication.send_command(module_id, "heartbeat_ack", {})
+
+        if self.handler is not None:
+            started = time.monotonic()
+            try:
+                self.handler(topic, data)
+            except Exception as e:
+                self.handler_errors += 1
+                self.logger.error(f"Status handler failed on {status_type} from {module_id}: {e}")
+            self.handler_s.append(time.monotonic() - started)
+        if "timestamp" in status:
+            self.status_lag_s.append(max(0.0, time.time() - status["timestamp"]))
+
+
+    def close(self) -> None:
+        self.communication.cleanup()
+        if self._dir:
+            shutil.rmtree(self._dir, ignore_errors=True)
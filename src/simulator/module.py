@@ -0,0 +1,144 @@
+"""
+Synthetic Module
+
+The behaviour of one simulated module, kept free of sockets so it can be
+tested on its own: commands in, status messages out. Message shapes follow
+the real module -- a heartbeat is a ModuleHealthSnapshot with type
+"heartbeat", command results are cmd_ack with the handler's dict merged in,
+and recording/export commands send the same recording_started,
+recording_stopped, export_ready and export_complete statuses as
+src/modules/recording.py and Module.start_export.
+
+Each output is a (delay_s, status) pair; the fleet adds fault delays on top
+and stamps timestamp/module_id/module_name the way Communication.send_status
+does.
+"""
+
+import random
+import time
+
+from src.shared.health import ModuleHealthSnapshot
+
+
+class SyntheticModule:
+    """One simulated module's recording/export state and replies."""
+
+    def __init__(self, module_id: str, module_type: str = "camera", version: str = "sim",
+                 export_s: float = 1.0, rng: random.Random | None = None):
+        self.module_id = module_id
+        self.module_name = module_id
+        self.module_type = module_type
+        self.version = version
+        self.export_s = export_s
+        self.rng = rng or random.Random()
+        self.recording = False
+        self.session_name = None
+        self.booted_at = time.time()
+        self.restarts = 0
+
+
+    def restart(self) -> None:
+        """Lose everything a power cycle loses: the recording and uptime."""
+        self.recording = False
+        self.session_name = None
+        self.booted_at = time.time()
+        self.restarts += 1
+
+
+    # ------------------------------------------------------------------
+    # Outgoing
+    # ------------------------------------------------------------------
+
+    def health(self, now: float | None = None) -> dict:
+        now = time.time() if now is None else now
+        snapshot = ModuleHealthSnapshot(
+            timestamp=now,
+            cpu_temp=round(self.rng.uniform(45, 65), 1),
+            cpu_usage=round(self.rng.uniform(20, 60 if self.recording else 15), 1),
+            memory_usage=round(self.rng.uniform(30, 50), 1),
+            memory_total_gb=4.0,
+            uptime=now - self.booted_at,
+            disk_space=round(self.rng.uniform(10, 40), 1),
+            disk_used_gb=12.0,
+            disk_total_gb=58.0,
+            ptp4l_offset_ns=self.rng.gauss(0, 200),
+            ptp4l_freq=self.rng.gauss(0, 5),
+            phc2sys_offset_ns=self.rng.gauss(0, 50),
+            phc2sys_freq=self.rng.gauss(0, 5),
+            recording=self.recording,
+            version=self.version,
+        )
+        return snapshot.to_dict()
+
+
+    def heartbeat(self, now: float | None = None) -> dict:
+        status = self.health(now)
+        status["type"] = "heartbeat"
+        return status
+
+
+    # ------------------------------------------------------------------
+    # Commands
+    # ------------------------------------------------------------------
+
+    def handle(self, command: str, params: dict) -> list[tuple[float, dict]]:
+        """Statuses to send in reply to one command, with their delays."""
+        handler = getattr(self, f"_cmd_{command}", None)
+        if handler is None:
+            return [(0.0, {"type": "cmd_ack", "command": command, "result": "success"})]
+        try:
+            out = handler(**(params or {}))
+        except TypeError as e:
+            return [(0.0, {"type": "error", "error": str(e)})]
+        return out
+
+
+    def _ack(self, command: str, **result) -> tuple[float, dict]:
+        return (0.0, {"type": "cmd_ack", "command": command, **result})
+
+
+    def _cmd_start_recording(self, session_name: str | None = None, duration: str | None = None,
+                             start_at: float | None = None) -> list:
+        if self.recording:
+            return [(0.0, {"type": "recording_start_failed", "error": "Already recording"}),
+                    self._ack("start_recording", result="error", error="Already recording")]
+        delay = max(0.0, start_at - time.time()) if start_at else 0.0
+        self.recording = True
+        self.session_name = session_name or "sim"
+        return [(delay, {"type": "recording_started", "status": "success", "recording": True}),
+                self._ack("start_recording", result="success")]
+
+
+    def _cmd_stop_recording(self) -> list:
+        if not self.recording:
+            return [(0.0, {"type": "recording_stop_failed", "error": "Not recording"}),
+                    self._ack("stop_recording", result="error")]
+        self.recording = False
+        date = time.strftime("%Y%m%d", time.gmtime())
+        export_path = f"{self.session_name}/{date}/{self.module_name}"
+        return [(0.0, {"type": "recording_stopped", "status": "success", "recording": False}),
+                (0.0, {"type": "export_ready", "export_path": export_path,
+                       "file_count": self.rng.randint(2, 6)}),
+                self._ack("stop_recording", result="Success")]
+
+
+    def _cmd_start_export(self, export_path: str | None = None) -> list:
+        return [self._ack("start_export", result="accepted"),
+                (self.export_s, {"type": "export_complete", "export_path": export_path})]
+
+
+    def _cmd_get_config(self) -> list:
+        config = {"module": {"name": self.module_name, "type": self.module_type}}
+        return [self._ack("get_config", result="success", config=config)]
+
+
+    def _cmd_reset_config(self) -> list:
+        return [self._ack("reset_config", result="success", config={})]
+
+
+    def _cmd_get_health(self) -> list:
+        return [self._ack("get_health", result="success", **self.health())]
+
+
+    def _cmd_validate_readiness(self) -> list:
+        return [self._ack("validate_readiness", result="success", ready=True, message="")]
@@ -0,0 +1,97 @@
+"""
+Remote Commands
+
+Command steps against a running controller go in through its web interface,
+the way the browser sends them, on a Socket.IO connection logged in with the
+admin password: start_recording and stop_recording as the web's own events
+of those names (so the controller creates and stops a session, with its
+readiness checks, for the step's target), anything else as a "send_command"
+event ({type, module_id, params}). The controller sends the commands on to
+the modules over its ROUTER as usual, so the simulated fleet sees them
+arrive; the time from the event to that arrival is reported as the
+command's delivery time. The module's cmd_ack goes to the controller, so a
+full round trip can't be timed here.
+
+Needs the Socket.IO client transport: pip install "python-socketio[client]".
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+# Commands sent as the web interface's session events rather than send_command
+SESSION_EVENTS = ("start_recording", "stop_recording")
+
+
+class WebCommander:
+    """Sends commands through a controller's web interface and times their
+    arrival at the simulated modules."""
+
+    def __init__(self, client):
+        """
+        Args:
+            client: A connected Socket.IO client (anything with emit(event,
+                data) and disconnect())
+        """
+        self.logger = logging.getLogger(__name__)
+        self.client = client
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[str, str], deque] = defaultdict(deque)
+        self.delivery_s: dict[str, list[float]] = defaultdict(list)
+        self.rejected = 0
+
+
+    @classmethod
+    def connect(cls, url: str, password: str | None, timeout_s: float = 10.0) -> "WebCommander":
+        """Log in to the web interface at url (e.g. http://host:5000)."""
+        try:
+            import socketio
+        except ImportError as e:
+            raise RuntimeError('Commands to a running controller need pip install "python-socketio[client]"') from e
+        client = socketio.Client(reconnection=False)
+        commander = cls(client)
+        client.on("auth_required", commander._on_rejected)
+        client.connect(url, auth={"password": password or ""}, wait_timeout=timeout_s)
+        return commander
+
+
+    def send(self, module_ids: list[str], command: str, params: dict | None = None,
+             everyone: bool = False) -> None:
+        """Send command to module_ids; everyone says they are the whole
+        fleet, so a session event can target "all"."""
+        params = dict(params or {})
+        now = time.monotonic()
+        with self._lock:
+            for mid in module_ids:
+                self._pending[(mid, command)].append(now)
+        if command in SESSION_EVENTS:
+            for target in (["all"] if everyone else module_ids):
+                self.client.emit(command, {**params, "target": target})
+        else:
+            for mid in module_ids:
+                self.client.emit("send_command", {"type": command, "module_id": mid, "params": params})
+
+
+    def delivered(self, module_id: str, command: str) -> None:
+        """A simulated module received command; called from the fleet loop."""
+        received = time.monotonic()
+        with self._lock:
+            sent = self._pending.get((module_id, command))
+            if sent:
+                self.delivery_s[command].append(received - sent.popleft())
+
+
+    def undelivered(self) -> int:
+        with self._lock:
+            return sum(len(q) for q in self._pending.values())
+
+
+    def _on_rejected(self, data=None) -> None:
+        self.rejected += 1
+        if self.rejected == 1:
+            self.logger.error("Controller rejected a command: not logged in (wrong or missing password?)")
+
+
+    def close(self) -> None:
+        self.client.disconnect()
@@ -0,0 +1,240 @@
+"""
+Scenario Runner
+
+A scenario is a JSON document: fleet size, heartbeat rate, faults, and a
+list of timed steps run against either an in-process ControllerHarness or an
+already running controller.
+
+    {
+      "modules": 50,
+      "heartbeat_interval_s": 1.0,
+      "duration_s": 30,
+      "faults": {"drop_rate": 0.01, "delay_s": [0, 0.05], "restart_rate": 0.0},
+      "steps": [
+        {"at": 1,  "command": "get_config"},
+        {"at": 3,  "command": "start_recording", "params": {"session_name": "sim"}},
+        {"at": 10, "restart": 3, "downtime_s": 2},
+        {"at": 20, "command": "stop_recording"},
+        {"at": 22, "command": "start_export", "target": ["sim01"],
+         "params": {"export_path": "sim"}}
+      ]
+    }
+
+"target" is "all" (default), a list of module ids, or a count (the first N
+modules). "restart" takes the same forms. Step times are seconds after every
+module has registered; the run lasts duration_s or until the last step,
+whichever is later.
+
+Against a running controller, command steps are sent through its web
+interface (see remote.py) and timed until they reach the simulated modules;
+heartbeat round trips (answered by the controller's web layer) and, given
+its pid, the controller's CPU are reported too. If the web interface can't
+be reached, command steps are skipped.
+
+handler="controller" runs the real Controller.handle_status_update behind
+the in-process harness (see controller.py).
+"""
+
+import json
+import logging
+import os
+import time
+from collections.abc import Callable
+
+from src.simulator.fleet import Faults, Fleet
+from src.simulator.harness import ControllerHarness
+from src.simulator.remote import WebCommander
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+# handler value that puts the real controller behind the harness
+CONTROLLER_HANDLER = "controller"
+
+DEFAULT_SCENARIO = {
+    "modules": 50,
+    "heartbeat_interval_s": 1.0,
+    "duration_s": 20,
+    "faults": {},
+    "steps": [
+        {"at": 1, "command": "get_config"},
+        {"at": 3, "command": "start_recording", "params": {"session_name": "sim"}},
+        {"at": 12, "command": "stop_recording"},
+        {"at": 14, "command": "get_health"},
+    ],
+}
+
+
+def load_scenario(path: str) -> dict:
+    with open(path) as f:
+        return {**DEFAULT_SCENARIO, **json.load(f)}
+
+
+def summarise(samples_s: list[float]) -> dict:
+    """count, mean and p50/p95/p99/max of durations, in milliseconds."""
+    if not samples_s:
+        return {"count": 0}
+    ordered = sorted(samples_s)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50": pct(50), "p95": pct(95), "p99": pct(99),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+def process_ticks(pid: int, proc_root: str = "/proc") -> int | None:
+    """utime+stime clock ticks of another process, None if it's gone."""
+    try:
+        with open(os.path.join(proc_root, str(pid), "stat")) as f:
+            stat = f.read()
+    except OSError:
+        return None
+    fields = stat[stat.rindex(")") + 2:].split()
+    return int(fields[11]) + int(fields[12])
+
+
+def _targets(spec, module_ids: list[str]) -> list[str]:
+    if spec in (None, "all"):
+        return list(module_ids)
+    if isinstance(spec, int):
+        return list(module_ids)[:spec]
+    return [mid for mid in spec if mid in module_ids]
+
+
+def run_scenario(scenario: dict, handler: Callable[[str, str], None] | str | None = None,
+                 transport: str = "ipc", controller: str | None = None,
+                 controller_pid: int | None = None, seed: int | None = None,
+                 settle_s: float = 1.0, drain_s: float = 2.0,
+                 web_port: int = 5000, web_password: str | None = None,
+                 commander: WebCommander | None = None) -> dict:
+    """Run one scenario and return its report.
+
+    handler receives every status the harness sees, like
+    Controller.handle_status_update; CONTROLLER_HANDLER runs the real one.
+    controller ("host" or "host:port", command port; status port is the
+    next one up) targets a running controller instead of an in-process
+    harness; its command steps go through the web interface on web_port,
+    logged in with web_password, unless a connected commander is given.
+    The commander is closed when the run ends.
+    """
+    logger = logging.getLogger(__name__)
+    scenario = {**DEFAULT_SCENARIO, **scenario}
+    count = int(scenario["modules"])
+
+    harness = simulated = None
+    if controller:
+        host, _, port = controller.partition(":")
+        port = int(port or 5555)
+        command_endpoint, status_endpoint = f"tcp://{host}:{port}", f"tcp://{host}:{port + 1}"
+        if commander is None:
+            try:
+                commander = WebCommander.connect(f"http://{host}:{web_port}", web_password)
+            except Exception as e:
+                logger.error(f"Can't send commands through http://{host}:{web_port}: {e}")
+    elif handler == CONTROLLER_HANDLER:
+        from src.simulator.controller import SimulatedController
+        # The controller's web layer acks heartbeats itself
+        harness = ControllerHarness(transport=transport, ack_heartbeats=False)
+        simulated = SimulatedController(harness.communication)
+        harness.handler = simulated.handle_status_update
+        command_endpoint, status_endpoint = harness.command_endpoint, harness.status_endpoint
+    else:
+        harness = ControllerHarness(transport=transport, handler=handler)
+        command_endpoint, status_endpoint = harness.command_endpoint, harness.status_endpoint
+
+    fleet = Fleet(count, command_endpoint, status_endpoint,
+                  heartbeat_interval_s=float(scenario["heartbeat_interval_s"]),
+                  faults=Faults.from_dict(scenario.get("faults")), seed=seed)
+    module_ids = list(fleet.modules)
+    if commander is not None:
+        fleet.on_command = commander.delivered
+    try:
+        fleet.start()
+        registered = count
+        if harness is not None:
+            registered = harness.wait_for_modules(count)
+            if registered < count:
+                logger.warning(f"Only {registered}/{count} simulated modules registered")
+        # PUB/SUB slow joiner: give status sockets a moment before measuring
+        time.sleep(settle_s)
+
+        cpu_start = (time.monotonic(),
+                     harness.listener_ticks() if harness else None,
+                     process_ticks(controller_pid) if controller_pid else None)
+        started = time.monotonic()
+        skipped = 0
+        for step in sorted(scenario.get("steps", []), key=lambda s: s.get("at", 0)):
+            delay = started + float(step.get("at", 0)) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if "restart" in step:
+                fleet.restart(_targets(step["restart"], module_ids), step.get("downtime_s"))
+            elif "command" in step:
+                targets = _targets(step.get("target"), module_ids)
+                if harness is not None:
+                    for mid in targets:
+                        harness.send(mid, step["command"], step.get("params"))
+                elif commander is not None:
+                    commander.send(targets, step["command"], step.get("params"),
+                                   everyone=step.get("target") in (None, "all"))
+                else:
+                    skipped += 1
+        remaining = started + float(scenario["duration_s"]) - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        # Let replies to the last steps land before counting them unanswered
+        outstanding = (harness.unanswered if harness is not None
+                       else commander.undelivered if commander is not None else lambda: 0)
+        drain_until = time.monotonic() + drain_s
+        while outstanding() and time.monotonic() < drain_until:
+            time.sleep(0.05)
+
+        elapsed = time.monotonic() - cpu_start[0]
+        report = {
+            "modules": count,
+            "registered": registered,
+            "duration_s": round(elapsed, 2),
+            "statuses_sent": fleet.sent,
+            "statuses_dropped": fleet.dropped,
+            "commands_received": fleet.commands_received,
+            "restarts": sum(m.restarts for m in fleet.modules.values()),
+            "heartbeat_rtt_ms": summarise(fleet.heartbeat_rtt_s),
+        }
+        if skipped:
+            report["command_steps_skipped"] = skipped
+        if harness is not None:
+            report.update({
+                "statuses_received": dict(harness.status_counts),
+                "command_rtt_ms": {cmd: summarise(s) for cmd, s in harness.command_rtt_s.items()},
+                "commands_unanswered": harness.unanswered(),
+                "status_lag_ms": summarise(harness.status_lag_s),
+                "handler_ms": summarise(harness.handler_s),
+                "handler_errors": harness.handler_errors,
+                "listener_cpu_pct": round(100 * (harness.listener_ticks() - cpu_start[1])
+                                          / (_CLK_TCK * elapsed), 1),
+            })
+        if simulated is not None:
+            report["controller_modules"] = len(simulated.modules.get_modules())
+        if commander is not None:
+            report.update({
+                "command_delivery_ms": {cmd: summarise(s) for cmd, s in commander.delivery_s.items()},
+                "commands_undelivered": commander.undelivered(),
+                "commands_rejected": commander.rejected,
+            })
+        if controller_pid:
+            end = process_ticks(controller_pid)
+            if end is not None and cpu_start[2] is not None:
+                report["controller_cpu_pct"] = round(100 * (end - cpu_start[2]) / (_CLK_TCK * elapsed), 1)
+        return report
+    finally:
+        fleet.stop()
+        if harness is not None:
+            harness.close()
+        if simulated is not None:
+            simulated.stop()
+        if commander is not None:
+            commander.close()
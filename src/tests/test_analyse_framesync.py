@@ -0,0 +1,146 @@
+"""
+Tests for tools/analyse_framesync.py
+
+Sessions are laid out in tmp_path as per-camera *_timestamps.csv files with
+known, small offsets between cameras. Batch runs use one worker process and
+the trend report is fed longitudinal rows directly.
+"""
+
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "tools"))
+
+from analyse_framesync import (
+    align_frames,
+    load_csvs,
+    prune_cache,
+    read_timestamps_csv,
+    report_trends,
+    run_batch,
+)
+
+T0_NS = 1_775_894_400_000_000_000
+FRAME_NS = 33_333_333
+
+
+def _camera(session_dir, session, camera, frames=60, offset_ns=0, drops=()):
+    path = session_dir / camera / f"{session}_{camera}_(0_20260411-080000)_timestamps.csv"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = [f"{i},{T0_NS + i * FRAME_NS + offset_ns},{int(i in drops)},33.333"
+            for i in range(frames)]
+    path.write_text("frame_id,timestamp_ns,dropped_before,delta_ms\n" + "\n".join(rows) + "\n")
+    return path
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / "recordings"
+    for session, jitter in (("exp_a", 100_000), ("exp_b", 400_000)):
+        _camera(root / session, session, "rat1_cam1", frames=60)
+        noise = np.random.default_rng(0).integers(-jitter, jitter, 60)
+        path = _camera(root / session, session, "rat1_cam2", frames=59, offset_ns=2_000_000)
+        df = pd.read_csv(path)
+        df["timestamp_ns"] += noise[:59]
+        df.to_csv(path, index=False)
+    return root
+
+
+# ---------------------------------------------------------------------------
+# Parsed-CSV cache
+# ---------------------------------------------------------------------------
+
+def test_unchanged_csv_is_read_from_the_cache(tmp_path):
+    csv = _camera(tmp_path / "exp", "exp", "rat1_cam1", frames=5)
+    cache = tmp_path / "cache"
+    first = read_timestamps_csv(csv, cache)
+    assert len(list(cache.glob("*.npz"))) == 1
+
+    with patch("analyse_framesync.pd.read_csv", side_effect=AssertionError("parsed again")):
+        cached = read_timestamps_csv(csv, cache)
+    pd.testing.assert_frame_equal(cached, first)
+
+
+def test_changed_csv_is_parsed_again_and_stale_entries_pruned(tmp_path):
+    csv = _camera(tmp_path / "exp", "exp", "rat1_cam1", frames=5)
+    cache = tmp_path / "cache"
+    read_timestamps_csv(csv, cache)
+
+    _camera(tmp_path / "exp", "exp", "rat1_cam1", frames=7)
+    st = csv.stat()
+    os.utime(csv, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert len(read_timestamps_csv(csv, cache)) == 7
+    assert len(list(cache.glob("*.npz"))) == 2
+
+    assert prune_cache(cache, [csv]) == 1
+    assert len(read_timestamps_csv(csv, cache)) == 7
+    csv.unlink()
+    assert prune_cache(cache, []) == 1
+    assert list(cache.glob("*.npz")) == []
+
+
+# ---------------------------------------------------------------------------
+# Reference camera
+# ---------------------------------------------------------------------------
+
+def test_reference_camera_can_be_pinned(root):
+    cameras = load_csvs(root / "exp_a", quiet=True)
+    assert align_frames(cameras)[1:] == ("rat1_cam1", ["rat1_cam2"])
+    assert align_frames(cameras, "rat1_cam2")[1:] == ("rat1_cam2", ["rat1_cam1"])
+    assert align_frames(cameras, "absent")[1] == "rat1_cam1"
+
+
+# ---------------------------------------------------------------------------
+# Batch and trends
+# ---------------------------------------------------------------------------
+
+def test_batch_aggregates_one_row_per_camera_per_session(root):
+    cache = root / ".framesync_cache"
+    df = run_batch(root, 1, cache, fps=None)
+
+    assert sorted(zip(df["camera"], df["session"], strict=True)) == [
+        ("rat1_cam1", "exp_a"), ("rat1_cam1", "exp_b"),
+        ("rat1_cam2", "exp_a"), ("rat1_cam2", "exp_b"),
+    ]
+    assert set(df["ref_camera"]) == {"rat1_cam1"}
+    client = df[df["camera"] == "rat1_cam2"].set_index("session")
+    assert client.loc["exp_a", "mean_offset_us"] == pytest.approx(2000, abs=100)
+    assert client.loc["exp_b", "detrended_p95_us"] > client.loc["exp_a", "detrended_p95_us"]
+    assert len(list(cache.glob("*.npz"))) == 4
+
+    pinned = run_batch(root, 1, cache, fps=None, ref_camera="rat1_cam2")
+    assert set(pinned["ref_camera"]) == {"rat1_cam2"}
+
+
+def _trend_rows(camera, p95s, drops, refs=None):
+    refs = refs or ["rat1_cam1"] * len(p95s)
+    return [{"session": f"exp_{i}", "session_start_utc": f"2026-04-{i + 1:02d}T08:00:00+00:00",
+             "camera": camera, "ref_camera": ref, "detrended_p95_us": p95,
+             "drift_us_per_sec": 0.5, "drop_event_pct": drop}
+            for i, (p95, drop, ref) in enumerate(zip(p95s, drops, refs, strict=True))]
+
+
+def test_trend_flags_cameras_getting_worse(capsys):
+    df = pd.DataFrame(
+        _trend_rows("rat1_cam2", [40.0, 42.0, 41.0, 95.0], [0.0, 0.0, 0.0, 0.0])
+        + _trend_rows("rat2_cam3", [40.0, 41.0, 40.0, 42.0], [0.1, 0.1, 0.1, 1.5])
+        + _trend_rows("rat3_cam4", [40.0, 40.0, 41.0, 40.0], [0.0, 0.0, 0.0, 0.0])
+    )
+    assert report_trends(df) == ["rat1_cam2", "rat2_cam3"]
+
+    lines = {line.split()[0]: line for line in capsys.readouterr().out.splitlines()[2:]}
+    assert "95.0 / 41.0" in lines["rat1_cam2"] and "p95 offset" in lines["rat1_cam2"]
+    assert "dropped frames" in lines["rat2_cam3"]
+    assert "degrading" not in lines["rat3_cam4"]
+
+
+def test_trend_ignores_sessions_against_another_reference():
+    rows = _trend_rows("rat1_cam2", [40.0, 42.0, 41.0, 95.0], [0.0] * 4,
+                       refs=["rat1_cam1"] * 3 + ["rat9_cam9"])
+    assert report_trends(pd.DataFrame(rows)) == []
@@ -0,0 +1,99 @@
+"""
+Tests for tools/export_nwb.py
+
+A two-segment session is generated with tools/synthetic_session.py into
+tmp_path, exported, checked with pynwb's validator and read back. Skipped
+where pynwb (the [nwb] extra) is not installed.
+"""
+
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+pynwb = pytest.importorskip("pynwb")
+soundfile = pytest.importorskip("soundfile")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "tools"))
+
+from export_nwb import export_session, parse_audio_sidecar  # noqa: E402
+from synthetic_session import make_session  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    root = tmp_path_factory.mktemp("nwb")
+    session_dir = make_session(root, segments=2, duration_s=6.0)
+    out = export_session(session_dir, session_dir / "synthetic.nwb", species="Rattus norvegicus")
+    return session_dir, out
+
+
+def _csv_rows(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_output_validates(exported):
+    _, out = exported
+    result = pynwb.validate(path=str(out))
+    errors = result[0] if isinstance(result, tuple) else result
+    assert list(errors) == []
+
+
+def test_round_trip(exported):
+    session_dir, out = exported
+    with pynwb.NWBHDF5IO(str(out), "r") as io:
+        nwb = io.read()
+        assert nwb.session_id == "synthetic"
+        assert nwb.subject.subject_id == "R001"
+        assert nwb.subject.species == "Rattus norvegicus"
+        assert "ptp4l |offset|" in nwb.notes
+        assert set(nwb.devices) == {"camera_5e4f", "camera_7a21", "microphone_2f10",
+                                    "ttl_c4e2", "apa_arduino_d93a"}
+
+        # Video: every CSV row becomes a timestamp, one external file per segment
+        camera_dir = next(session_dir.glob("*/camera_7a21"))
+        csvs = sorted(camera_dir.glob("*_timestamps.csv"))
+        rows = [_csv_rows(c) for c in csvs]
+        video = nwb.acquisition["camera_7a21"]
+        assert len(video.external_file) == 2
+        assert all((out.parent / p).exists() for p in video.external_file[:])
+        assert list(video.starting_frame) == [0, len(rows[0])]
+        ts = video.timestamps[:]
+        assert len(ts) == sum(map(len, rows))
+        # camera_7a21 dropped two frames: the gap is kept, not respaced
+        assert ts[11] - ts[10] == pytest.approx(3 / 30, abs=1e-6)
+        t0 = nwb.timestamps_reference_time.timestamp()
+        assert ts[0] + t0 == pytest.approx(int(rows[0][0]["timestamp_ns"]) / 1e9, abs=1e-6)
+
+        # Audio: embedded whole, chunked and compressed, on the shared timeline
+        flacs = sorted(next(session_dir.glob("*/microphone_2f10")).glob("*.flac"))
+        for i, flac in enumerate(flacs):
+            audio = nwb.acquisition[f"microphone_2f10_audio_{i}"]
+            assert audio.data.shape == (soundfile.info(str(flac)).frames,)
+            assert audio.data.chunks is not None
+            assert audio.data.compression == "gzip"
+            start, rate = parse_audio_sidecar(flac.with_name(f"{flac.stem}_timestamps.txt"), 0)
+            assert audio.rate == rate
+            assert audio.starting_time + t0 == pytest.approx(start, abs=1e-5)
+
+        # TTL: one IntervalSeries per pin, +1 HIGH / -1 LOW
+        pin17 = nwb.acquisition["ttl_c4e2_pin17"]
+        # pin 17 is an input, whose active edge TTLModule logs as LOW
+        assert list(pin17.data[:4]) == [-1, 1, -1, 1]
+        assert "sync pulse" in pin17.description
+        assert "ttl_c4e2_pin27" in nwb.acquisition
+
+        command = nwb.acquisition["apa_arduino_d93a_shock_command"]
+        delivery = nwb.acquisition["apa_arduino_d93a_shock_delivery"]
+        assert len(command.data) == len(delivery.data) == 2 * 2
+        assert nwb.acquisition["apa_arduino_d93a_rotation_speed"].unit == "rpm"
+
+
+def test_legacy_audio_sidecar(tmp_path):
+    sidecar = tmp_path / "old_timestamps.txt"
+    sidecar.write_text("START_AT 100.0\nSTARTED 100.5\n101.2\n101.9\n")
+    assert parse_audio_sidecar(sidecar, 48000) == (100.5, 48000.0)
+    sidecar.write_text("101.2\n101.9\n")
+    assert parse_audio_sidecar(sidecar, 48000) == (101.2, 48000.0)
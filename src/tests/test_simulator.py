@@ -0,0 +1,210 @@
+"""
+Tests for src/simulator
+
+SyntheticModule is exercised directly; the scenario tests run a small fleet
+against the real controller Communication over ipc:// with short heartbeat
+intervals, so they take a couple of seconds each. The --controller test
+stands a bare Communication in for the running controller, with its web
+layer's send_command handler reduced to forwarding the event.
+"""
+
+import json
+import socket
+
+from src.controller import recording
+from src.controller.communication import Communication
+from src.shared.health import ModuleHealthSnapshot
+from src.simulator import (
+    CONTROLLER_HANDLER,
+    Faults,
+    SyntheticModule,
+    WebCommander,
+    run_scenario,
+    summarise,
+)
+
+
+class TestSyntheticModule:
+
+    def test_heartbeat_is_a_health_snapshot(self):
+        hb = SyntheticModule("sim1").heartbeat(now=100.0)
+        assert hb["type"] == "heartbeat"
+        assert set(hb) - {"type"} == ModuleHealthSnapshot.field_names()
+        assert hb["recording"] is False
+
+    def test_recording_and_export_flow(self):
+        module = SyntheticModule("sim1", export_s=0.5)
+        started = module.handle("start_recording", {"session_name": "s1"})
+        assert [s["type"] for _, s in started] == ["recording_started", "cmd_ack"]
+        assert module.recording
+
+        again = module.handle("start_recording", {"session_name": "s1"})
+        assert again[0][1] == {"type": "recording_start_failed", "error": "Already recording"}
+
+        stopped = module.handle("stop_recording", {})
+        assert [s["type"] for _, s in stopped] == ["recording_stopped", "export_ready", "cmd_ack"]
+        export_path = stopped[1][1]["export_path"]
+        assert export_path.startswith("s1/") and export_path.endswith("/sim1")
+
+        exported = module.handle("start_export", {"export_path": export_path})
+        assert exported[0][1]["result"] == "accepted"
+        assert exported[1] == (0.5, {"type": "export_complete", "export_path": export_path})
+
+    def test_restart_drops_recording(self):
+        module = SyntheticModule("sim1")
+        module.handle("start_recording", {})
+        module.restart()
+        assert module.heartbeat()["recording"] is False
+        assert module.restarts == 1
+
+    def test_unknown_command_is_acked(self):
+        out = SyntheticModule("sim1").handle("set_config", {"config": {}})
+        assert out == [(0.0, {"type": "cmd_ack", "command": "set_config", "result": "success"})]
+
+
+def test_faults_from_dict():
+    assert Faults.from_dict({"delay_s": 0.1}).delay_s == (0.0, 0.1)
+    assert Faults.from_dict({"delay_s": [0.01, 0.02], "drop_rate": 0.5}).drop_rate == 0.5
+    assert Faults.from_dict(None) == Faults()
+
+
+def test_summarise():
+    stats = summarise([0.001 * i for i in range(1, 101)])
+    assert stats["count"] == 100
+    assert stats["p50"] == 51.0
+    assert stats["max"] == 100.0
+    assert summarise([]) == {"count": 0}
+
+
+class TestScenario:
+
+    def test_commands_round_trip_through_controller(self):
+        seen = []
+        scenario = {
+            "modules": 5, "heartbeat_interval_s": 0.2, "duration_s": 1.0,
+            "steps": [
+                {"at": 0.1, "command": "get_config"},
+                {"at": 0.3, "command": "start_recording", "params": {"session_name": "s"}},
+                {"at": 0.6, "command": "stop_recording", "target": 2},
+            ],
+        }
+        report = run_scenario(scenario, handler=lambda topic, data: seen.append(json.loads(data)),
+                              seed=1, settle_s=0.3)
+
+        assert report["registered"] == 5
+        assert report["command_rtt_ms"]["get_config"]["count"] == 5
+        assert report["command_rtt_ms"]["start_recording"]["count"] == 5
+        assert report["command_rtt_ms"]["stop_recording"]["count"] == 2
+        assert report["commands_unanswered"] == 0
+        assert report["statuses_received"]["export_ready"] == 2
+        assert report["heartbeat_rtt_ms"]["count"] > 0
+        # The listener keeps running while the report is read, so the
+        # handler may have seen a status or two more than were timed
+        assert 0 < report["handler_ms"]["count"] <= len(seen)
+        assert {s["module_id"] for s in seen} == {f"sim{i}" for i in range(1, 6)}
+
+    def test_restart_and_drops_are_reported(self):
+        scenario = {
+            "modules": 3, "heartbeat_interval_s": 0.1, "duration_s": 1.0,
+            "faults": {"drop_rate": 1.0},
+            "steps": [{"at": 0.2, "restart": ["sim1"], "downtime_s": 0.2}],
+        }
+        report = run_scenario(scenario, seed=1, settle_s=0.2, drain_s=0)
+
+        assert report["restarts"] == 1
+        assert report["statuses_sent"] == 0
+        assert report["statuses_dropped"] > 0
+        assert report["status_lag_ms"] == {"count": 0}
+
+    def test_real_controller_handles_the_statuses(self):
+        sessions_file = recording.SESSIONS_FILE
+        scenario = {
+            "modules": 3, "heartbeat_interval_s": 0.2, "duration_s": 1.0,
+            "steps": [
+                {"at": 0.1, "command": "get_config"},
+                {"at": 0.3, "command": "start_recording", "params": {"session_name": "s"}},
+                {"at": 0.6, "command": "stop_recording"},
+            ],
+        }
+        report = run_scenario(scenario, handler=CONTROLLER_HANDLER, seed=1, settle_s=0.3)
+
+        assert report["handler_errors"] == 0
+        assert report["handler_ms"]["count"] > 0
+        # Registered from their get_config replies, as undiscovered modules are
+        assert report["controller_modules"] == 3
+        # export_ready is queued by the controller, which sends start_export
+        # (to two modules at once, its default concurrency)
+        assert report["statuses_received"]["export_ready"] == 3
+        assert report["commands_received"] >= 3 * 3 + 2
+        # The controller's web layer acks heartbeats (and only it)
+        assert report["heartbeat_rtt_ms"]["count"] > 0
+        assert recording.SESSIONS_FILE == sessions_file
+
+
+class _WebStandIn:
+    """The controller's web event handlers, reduced to forwarding commands."""
+
+    def __init__(self, communication):
+        self.communication = communication
+        self.events = []
+        self.closed = False
+
+    def emit(self, event, data):
+        self.events.append((event, data.get("target", data.get("module_id"))))
+        if event == "send_command":
+            self.communication.send_command(data["module_id"], data["type"], data["params"])
+        elif event == "start_recording":
+            self.communication.send_command(data["target"], event, {"session_name": data["session_name"]})
+        else:
+            self.communication.send_command(data["target"], event, {})
+
+    def disconnect(self):
+        self.closed = True
+
+
+def _free_port_pair() -> int:
+    """A port p with p and p + 1 both free (command and status ports)."""
+    for _ in range(50):
+        with socket.socket() as a:
+            a.bind(("127.0.0.1", 0))
+            port = a.getsockname()[1]
+            with socket.socket() as b:
+                try:
+                    b.bind(("127.0.0.1", port + 1))
+                except OSError:
+                    continue
+        return port
+    raise RuntimeError("no free port pair")
+
+
+def test_command_steps_go_through_a_running_controllers_web_interface():
+    port = _free_port_pair()
+    statuses = []
+    controller = Communication(status_callback=lambda topic, data: statuses.append(json.loads(data)),
+                               command_endpoint=f"tcp://127.0.0.1:{port}",
+                               status_endpoint=f"tcp://127.0.0.1:{port + 1}")
+    web = _WebStandIn(controller)
+    scenario = {
+        "modules": 3, "heartbeat_interval_s": 0.2, "duration_s": 1.0,
+        "steps": [
+            {"at": 0.1, "command": "get_config"},
+            {"at": 0.3, "command": "start_recording", "params": {"session_name": "s"}, "target": 2},
+            {"at": 0.5, "command": "stop_recording"},
+        ],
+    }
+    try:
+        report = run_scenario(scenario, controller=f"127.0.0.1:{port}",
+                              commander=WebCommander(web), seed=1, settle_s=0.3)
+    finally:
+        controller.cleanup()
+
+    assert "command_steps_skipped" not in report
+    assert report["command_delivery_ms"]["get_config"]["count"] == 3
+    assert report["command_delivery_ms"]["start_recording"]["count"] == 2
+    assert report["commands_undelivered"] == 0
+    # Session commands are the web's own events, one for the whole fleet
+    assert [e for e in web.events if e[0] != "send_command"] == [
+        ("start_recording", "sim1"), ("start_recording", "sim2"), ("stop_recording", "all")]
+    assert web.closed
+    started = [s for s in statuses if s["type"] == "recording_started"]
+    assert sorted(s["module_id"] for s in started) == ["sim1", "sim2"]
@@ -0,0 +1,118 @@
+"""
+Tests for src/controller/sync_qc.py
+
+Sessions with a TTL experiment clock are generated with
+tools/synthetic_session.py: every camera films a square that lights with
+the clock and the microphone records a click at each onset. One session is
+clean, the other has a camera stamping 40 ms late, a microphone whose
+clock runs 300 ppm fast and the clock's TTL input loopback 2 ms late.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("soundfile")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "tools"))
+
+from synthetic_session import SYNC_ROI, make_session
+
+from src.controller.session_timeline import load_or_index
+from src.controller.sync_qc import (
+    ModuleFit,
+    find_reference,
+    fit_against_reference,
+    run_qc,
+    write_report,
+)
+
+
+def _session(root, **kwargs):
+    return make_session(root, segments=2, duration_s=10.0, clock_period=0.97,
+                        audio_format="wav", **kwargs)
+
+
+@pytest.fixture(scope="module")
+def clean(tmp_path_factory):
+    return _session(tmp_path_factory.mktemp("clean"))
+
+
+@pytest.fixture(scope="module")
+def skewed(tmp_path_factory):
+    return _session(tmp_path_factory.mktemp("skewed"),
+                    sync_errors={"camera_7a21": (0.040, 0.0), "microphone_2f10": (0.0, 300.0),
+                                 "ttl_c4e2:pin26": (0.002, 0.0)})
+
+
+def test_reference_is_the_experiment_clock_pin(clean):
+    name, pin, onsets = find_reference(load_or_index(str(clean)))
+    assert (name, pin) == ("ttl_c4e2", 19)
+    assert np.median(np.diff(onsets)) == pytest.approx(0.97e9, abs=1e3)
+    # The 1 s sync pulse on input pin 17 is also regular, but not the clock
+    assert find_reference(load_or_index(str(clean)), clock_pin=17)[1] == 17
+
+
+def test_clean_session_passes(clean):
+    report = run_qc(str(clean), rois={"*": SYNC_ROI})
+    assert report.passed
+    fits = {f.module: f for f in report.fits}
+    assert set(fits) == {"camera_5e4f", "camera_7a21", "microphone_2f10", "ttl_c4e2:pin26"}
+    for f in fits.values():
+        assert f.status == "PASS"
+        assert f.matched == f.expected > 0
+    assert abs(fits["microphone_2f10"].offset_ms) < 0.5
+    assert fits["microphone_2f10"].residual_p95_ms < 0.1
+    # The loopback input is measured on its active (LOW) edges
+    assert abs(fits["ttl_c4e2:pin26"].offset_ms) < 0.01
+
+    (json_path, *_) = write_report(report)
+    written = json.loads(Path(json_path).read_text())
+    assert written["result"] == "PASS"
+    assert sum(written["modules"][0]["histogram"]["counts"]) == fits["camera_5e4f"].matched
+
+
+def test_offset_and_drift_fail(skewed):
+    report = run_qc(str(skewed), rois={"*": SYNC_ROI})
+    assert not report.passed
+    fits = {f.module: f for f in report.fits}
+
+    assert fits["camera_5e4f"].status == "PASS"
+    late = fits["camera_7a21"]
+    assert late.status == "FAIL"
+    assert late.offset_ms == pytest.approx(40, abs=10)
+    assert not late.drift_resolved
+
+    mic = fits["microphone_2f10"]
+    assert mic.status == "FAIL"
+    assert mic.drift_resolved
+    assert mic.drift_ppm == pytest.approx(300, abs=10)
+    assert abs(mic.offset_ms) < 1
+    assert any("drift" in p for p in mic.problems)
+
+    loopback = fits["ttl_c4e2:pin26"]
+    assert loopback.status == "FAIL"
+    assert loopback.matched == loopback.expected
+    assert loopback.offset_ms == pytest.approx(2.0, abs=0.01)
+
+
+def test_camera_without_the_led_is_no_signal(clean):
+    # An ROI away from the square sees a flat grey frame
+    report = run_qc(str(clean), rois={"camera_7a21": (40, 30, 8, 8), "*": SYNC_ROI})
+    fits = {f.module: f for f in report.fits}
+    assert fits["camera_7a21"].status == "NO SIGNAL"
+    assert report.passed
+
+
+def test_fit_ignores_spurious_onsets():
+    reference = np.arange(20) * 1_000_000_000
+    detected = np.concatenate([reference + 2_000_000, [reference[5] + 400_000_000]])
+    fit = fit_against_reference(ModuleFit("m", "ttl", 0.5), reference, detected,
+                                (int(reference[0]), int(reference[-1])))
+    assert (fit.detected, fit.matched, fit.expected) == (21, 20, 20)
+    assert fit.offset_ms == pytest.approx(2.0)
+    assert fit.status == "FAIL"
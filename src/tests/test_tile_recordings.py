@@ -0,0 +1,176 @@
+"""
+Tests for tools/tile_recordings.py
+
+Hour-groups are laid out in tmp_path with tiny .ts files and per-frame
+timestamp CSVs whose first frames are staggered by known amounts. Nothing
+is encoded: the ledger tests stop at dry runs, and a previous successful
+run is stood in for by recording its ledger entry and writing its output.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "tools"))
+
+from tile_recordings import (
+    Ledger,
+    build_ffmpeg_cmd,
+    compute_offsets,
+    file_complete,
+    find_groups,
+    first_timestamp_ns,
+    group_fingerprint,
+    process_group,
+)
+
+T0_NS = 1_775_894_400_000_000_000
+SESSION, DATE, HOUR = "exp", "20260411", "20260411-08"
+LABEL = f"{SESSION}/{DATE}/{HOUR}"
+
+
+def _segment(root, module, start_ns, frames=5, csv=True):
+    video = root / SESSION / DATE / module / f"{SESSION}_{module}_(0_20260411-080000).ts"
+    video.parent.mkdir(parents=True, exist_ok=True)
+    video.write_bytes(b"\x47" * 188 * 4)
+    if csv:
+        rows = [f"{i},{start_ns + i * 40_000_000}" for i in range(frames)]
+        video.with_name(f"{video.stem}_timestamps.csv").write_text(
+            "frame_number,timestamp_ns\n" + "\n".join(rows) + "\n")
+    return video
+
+
+@pytest.fixture
+def group(tmp_path):
+    rec = tmp_path / "recording"
+    _segment(rec, "A1", T0_NS)
+    _segment(rec, "A2", T0_NS + 2_500_000_000)
+    _segment(rec, "B3", T0_NS + 1_000_000_000)
+    groups = find_groups(rec)
+    assert list(groups) == [(SESSION, DATE, HOUR)]
+    return groups[(SESSION, DATE, HOUR)]
+
+
+def _process(group, out, ledger, **kwargs):
+    kwargs.setdefault("dry_run", True)
+    status, label = process_group(SESSION, DATE, HOUR, group, out, "libsvtav1", 1,
+                                  show_progress=False, ledger=ledger, settle_s=0, **kwargs)
+    assert label == LABEL
+    return status
+
+
+# ---------------------------------------------------------------------------
+# Start alignment
+# ---------------------------------------------------------------------------
+
+def test_offsets_start_every_tile_at_the_latest_first_frame(group):
+    # A2 started last, so it starts at 0 and the others skip their head
+    assert compute_offsets(group) == {"A1": 2.5, "A2": 0.0, "B3": 1.5}
+
+    cmd = build_ffmpeg_cmd(group, Path("out.mkv"), "libsvtav1", 1, compute_offsets(group))
+    a1, a2 = cmd.index(str(group["A1"])), cmd.index(str(group["A2"]))
+    assert cmd[a1 - 3:a1] == ["-ss", "2.500000", "-i"]
+    assert cmd[a2 - 3] != "-ss"
+
+
+def test_inputs_without_timestamps_start_unaligned(tmp_path, group):
+    rec = tmp_path / "recording"
+    no_csv = _segment(rec, "C1", T0_NS + 9_000_000_000, csv=False)
+    assert "C1" not in compute_offsets({**group, "C1": no_csv})
+    assert compute_offsets({"C1": no_csv}) == {}
+
+
+def test_first_timestamp_skips_unparseable_rows(tmp_path):
+    path = tmp_path / "x_timestamps.csv"
+    path.write_text("frame_number,timestamp_ns\n0,\n1,1000.0\n2,2000\n")
+    assert first_timestamp_ns(path) == 1000
+    path.write_text("frame_number,pts\n0,1\n")
+    assert first_timestamp_ns(path) is None
+    assert first_timestamp_ns(tmp_path / "missing.csv") is None
+
+
+# ---------------------------------------------------------------------------
+# Ledger: resume and skip
+# ---------------------------------------------------------------------------
+
+def test_unchanged_group_is_skipped_after_a_successful_run(tmp_path, group):
+    out = tmp_path / "tiled"
+    ledger = Ledger(out / ".tile_ledger.json")
+    assert _process(group, out, ledger) == "dry_run"        # nothing tiled yet
+
+    # What a successful encode leaves behind
+    output = out / SESSION / DATE / f"{SESSION}_{HOUR}_4x4.mkv"
+    output.parent.mkdir(parents=True)
+    output.write_bytes(b"mkv")
+    ledger.record(LABEL, {"output": str(output), "inputs": group_fingerprint(group),
+                          "offsets": compute_offsets(group), "tiled_at": "2026-04-11T09:30:00"})
+
+    # A later run (a fresh process) resumes from the ledger on disk
+    resumed = Ledger(out / ".tile_ledger.json")
+    assert resumed.get(LABEL)["offsets"] == {"A1": 2.5, "A2": 0.0, "B3": 1.5}
+    assert _process(group, out, resumed) == "skipped"
+    assert _process(group, out, resumed, force=True) == "dry_run"
+
+
+def test_changed_inputs_are_retiled(tmp_path, group):
+    out = tmp_path / "tiled"
+    output = out / SESSION / DATE / f"{SESSION}_{HOUR}_4x4.mkv"
+    output.parent.mkdir(parents=True)
+    output.write_bytes(b"mkv")
+    ledger = Ledger(out / ".tile_ledger.json")
+    ledger.record(LABEL, {"output": str(output), "inputs": group_fingerprint(group),
+                          "offsets": None, "tiled_at": None})
+
+    # A camera's late export replaces its segment after the hour was tiled
+    group["B3"].write_bytes(b"\x47" * 188 * 8)
+    assert _process(group, out, ledger) == "dry_run"
+    # A camera that wasn't there before counts as a change too
+    late = _segment(tmp_path / "recording", "D4", T0_NS)
+    ledger.record(LABEL, {**ledger.get(LABEL), "inputs": group_fingerprint(group)})
+    assert _process({**group, "D4": late}, out, ledger) == "dry_run"
+
+
+def test_output_from_before_the_ledger_is_adopted(tmp_path, group):
+    out = tmp_path / "tiled"
+    output = out / SESSION / DATE / f"{SESSION}_{HOUR}_4x4.mkv"
+    output.parent.mkdir(parents=True)
+    output.write_bytes(b"mkv")
+    ledger = Ledger(out / ".tile_ledger.json")
+
+    assert _process(group, out, ledger, dry_run=False) == "skipped"
+
+    entry = json.loads((out / ".tile_ledger.json").read_text())[LABEL]
+    assert entry["inputs"] == group_fingerprint(group)
+    assert entry["offsets"] is None
+
+
+def test_incomplete_group_is_left_for_later(tmp_path, group):
+    pending = group["A2"].with_name(f"PENDING_{group['A2'].name}")
+    pending.write_bytes(b"")
+    ledger = Ledger(tmp_path / "tiled" / ".tile_ledger.json")
+    assert _process(group, tmp_path / "tiled", ledger) == "incomplete"
+    assert ledger.get(LABEL) is None
+
+
+def test_manifest_skips_the_settle_time_only(tmp_path):
+    video = _segment(tmp_path / "recording", "A1", T0_NS)
+    (video.parent / "export_manifest_20260411-090000.txt").write_text(f"Files:\n- {video.name}\n")
+    assert file_complete(video, settle_s=3600) == (True, "manifest")
+
+    pending = video.with_name(f"PENDING_{video.stem}_timestamps.csv")
+    pending.write_bytes(b"")
+    assert file_complete(video, settle_s=0)[0] is False
+    pending.unlink()
+    video.with_name(f"{video.stem}_timestamps.csv").unlink()
+    assert file_complete(video, settle_s=0) == (False, f"{video.stem}_timestamps.csv not exported yet")
+
+
+def test_unreadable_ledger_starts_empty(tmp_path):
+    path = tmp_path / ".tile_ledger.json"
+    path.write_text("{not json")
+    ledger = Ledger(path)
+    assert ledger.entries == {}
+    ledger.record("a/b/c", {"inputs": {}})
+    assert json.loads(path.read_text()) == {"a/b/c": {"inputs": {}}}
@@ -0,0 +1,87 @@
+"""
+Tests for src/shared/update_manifest.py
+
+Packages are written with zipfile into tmp_path; the "install tree" is a
+plain directory next to them.
+"""
+
+import os
+import zipfile
+
+from src.shared.update_manifest import build_manifest, changed_files, safe_path
+
+
+def _package(path, files, prefix="", date=(2026, 1, 1, 0, 0, 0)):
+    with zipfile.ZipFile(path, "w") as zf:
+        for rel, (data, mode) in files.items():
+            info = zipfile.ZipInfo(prefix + rel, date_time=date)
+            # mode 0 stands in for an archive made off-Unix: DOS attributes only
+            info.external_attr = mode << 16 if mode else 0x20
+            zf.writestr(info, data)
+    return str(path)
+
+
+def _install(root, files):
+    for rel, (data, mode) in files.items():
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        os.chmod(path, mode)
+
+
+FILES = {
+    "src/modules/module.py": (b"print('module')\n", 0o644),
+    "scripts/setup.sh": (b"#!/bin/sh\n", 0o755),
+    "env/bin/python": (b"ignored", 0o755),
+    ".git/HEAD": (b"ref: main", 0o644),
+}
+
+
+class TestBuildManifest:
+
+    def test_strips_release_prefix_and_excluded_dirs(self, tmp_path):
+        manifest = build_manifest(_package(tmp_path / "p.zip", FILES, "saviour-1.2/"), "1.2")
+        assert manifest["prefix"] == "saviour-1.2/"
+        assert manifest["version"] == "1.2"
+        assert sorted(manifest["files"]) == ["scripts/setup.sh", "src/modules/module.py"]
+        assert manifest["files"]["scripts/setup.sh"]["mode"] == 0o755
+        assert manifest["files"]["src/modules/module.py"]["size"] == 16
+
+    def test_flat_archive_has_no_prefix(self, tmp_path):
+        manifest = build_manifest(_package(tmp_path / "p.zip", FILES))
+        assert manifest["prefix"] == ""
+        assert safe_path(manifest, "scripts/setup.sh")
+        assert not safe_path(manifest, ".env")
+
+    def test_id_depends_on_content_not_timestamps(self, tmp_path):
+        a = build_manifest(_package(tmp_path / "a.zip", FILES))
+        b = build_manifest(_package(tmp_path / "b.zip", FILES, date=(2026, 6, 1, 12, 0, 0)))
+        edited = dict(FILES, **{"scripts/setup.sh": (b"#!/bin/bash\n", 0o755)})
+        c = build_manifest(_package(tmp_path / "c.zip", edited))
+        assert a["manifest_id"] == b["manifest_id"] != c["manifest_id"]
+
+
+class TestChangedFiles:
+
+    def test_only_differing_files_listed(self, tmp_path):
+        manifest = build_manifest(_package(tmp_path / "p.zip", FILES))
+        root = str(tmp_path / "install")
+        _install(root, {
+            "src/modules/module.py": FILES["src/modules/module.py"],
+            "scripts/setup.sh": (b"#!/bin/zsh\n", 0o755),   # same size, new content
+        })
+        assert changed_files(manifest, root) == ["scripts/setup.sh"]
+
+    def test_missing_and_mode_changes_count(self, tmp_path):
+        manifest = build_manifest(_package(tmp_path / "p.zip", FILES))
+        root = str(tmp_path / "install")
+        _install(root, {"scripts/setup.sh": (b"#!/bin/sh\n", 0o644)})
+        assert changed_files(manifest, root) == ["scripts/setup.sh", "src/modules/module.py"]
+
+    def test_entries_without_mode_ignore_local_mode(self, tmp_path):
+        manifest = build_manifest(_package(tmp_path / "p.zip", {"a.txt": (b"a", 0)}))
+        assert manifest["files"]["a.txt"]["mode"] is None
+        root = str(tmp_path / "install")
+        _install(root, {"a.txt": (b"a", 0o600)})
+        assert changed_files(manifest, root) == []
@@ -5,6 +5,8 @@ analyse_framesync.py — inter-camera frame-sync analysis for SAVIOUR recordings
 Usage:
     python3 tools/analyse_framesync.py /path/to/session_dir [/another ...]
     python3 tools/analyse_framesync.py /path/to/session_dir --fps 60 --no-plot
+    python3 tools/analyse_framesync.py --batch /path/to/recordings_root [--workers 8]
+    python3 tools/analyse_framesync.py /path/to/session_dir --timeline
 
 Finds all *_timestamps.csv files in each session directory, aligns frames
 across cameras by nearest PTP timestamp, and reports inter-camera offset stats.
@@ -12,16 +14,37 @@ across cameras by nearest PTP timestamp, and reports inter-camera offset stats.
 CSV output (always written):
   ./framesync_summary.csv             — one row per camera pair, appended each run
   {session_dir}/framesync_per_frame.csv  — per-frame offsets for the session
+
+Batch mode treats every directory under the recordings root as a session,
+analyses them in a process pool and writes one longitudinal CSV —
+{root}/framesync_longitudinal.csv, a row per camera per session with its
+detrended p95 offset, drift and dropped frames — then prints each camera's
+trend across sessions, flagging cameras whose timing or drops are getting
+worse, so a degrading PTP slave shows up weeks before it fails. Offsets are
+measured against each session's longest camera unless --ref-camera pins
+one; the CSV records which camera was the reference, and a camera's p95
+trend only uses sessions measured against its usual reference. Parsed
+timestamp columns are cached as .npz under {root}/.framesync_cache, keyed by
+each CSV's path, size and mtime, so only new or changed segments are parsed
+again; entries for CSVs that have changed or gone are pruned after the run.
 """
 
 import argparse
+import hashlib
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import UTC, datetime
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.controller.session_timeline import load_or_index
+
 # ---------------------------------------------------------------------------
 # Loading
 # ---------------------------------------------------------------------------
@@ -34,39 +57,129 @@ def _camera_tag(p: Path) -> str:
     return "_".join(parts[-2:]) if len(parts) >= 2 else stem
 
 
-def load_csvs(session_dir: Path) -> dict[str, pd.DataFrame]:
+# Only these columns are used; everything else in the CSV is skipped at parse time
+CSV_COLUMNS = ("frame_id", "timestamp_ns", "dropped_before", "delta_ms")
+
+
+def _cache_path(p: Path, cache_dir: Path) -> Path:
+    st = p.stat()
+    key = hashlib.sha1(f"{p.resolve()}|{st.st_size}|{st.st_mtime_ns}".encode()).hexdigest()
+    return cache_dir / f"{key}.npz"
+
+
+def read_timestamps_csv(p: Path, cache_dir: Path | None = None) -> pd.DataFrame:
+    """Parse one *_timestamps.csv, or reuse its cached columns if the file
+    hasn't changed since they were cached."""
+    cached = _cache_path(p, cache_dir) if cache_dir else None
+    if cached is not None and cached.exists():
+        try:
+            with np.load(cached) as data:
+                return pd.DataFrame({k: data[k] for k in data.files})
+        except (OSError, ValueError):
+            pass  # unreadable cache entry — parse again and overwrite it
+
+    df = pd.read_csv(p, usecols=lambda c: c in CSV_COLUMNS)
+    for col in df.columns:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df = df.dropna(subset=["timestamp_ns"]).reset_index(drop=True)
+    df["timestamp_ns"] = df["timestamp_ns"].astype("int64")
+
+    if cached is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **{c: df[c].to_numpy() for c in df.columns})
+        os.replace(tmp, cached)
+    return df
+
+
+def prune_cache(cache_dir: Path, csvs: list[Path]) -> int:
+    """Remove cache entries that don't belong to any of csvs as they are
+    now; returns how many were removed."""
+    keep = set()
+    for p in csvs:
+        try:
+            keep.add(_cache_path(p, cache_dir).name)
+        except OSError:
+            continue
+    removed = 0
+    for entry in cache_dir.glob("*.npz"):
+        if entry.name not in keep:
+            entry.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def load_csvs(session_dir: Path, cache_dir: Path | None = None,
+              quiet: bool = False) -> dict[str, pd.DataFrame]:
     csvs = sorted(session_dir.rglob("*_timestamps.csv"))
     if not csvs:
         sys.exit(f"No *_timestamps.csv files found under {session_dir}")
 
-    cameras: dict[str, pd.DataFrame] = {}
+    segments: dict[str, list[pd.DataFrame]] = {}
     for p in csvs:
         tag = _camera_tag(p)
-        df = pd.read_csv(p)
-        df["timestamp_ns"] = pd.to_numeric(df["timestamp_ns"], errors="coerce")
-        df = df.dropna(subset=["timestamp_ns"]).reset_index(drop=True)
-        if tag in cameras:
-            cameras[tag] = pd.concat([cameras[tag], df], ignore_index=True)
-            print(f"  + segment  {p.name}  →  {tag}")
-        else:
-            cameras[tag] = df
-            print(f"  Loaded     {p.name}  →  {tag}  ({len(df)} frames)")
-
+        df = read_timestamps_csv(p, cache_dir)
+        if not quiet:
+            if tag in segments:
+                print(f"  + segment  {p.name}  →  {tag}")
+            else:
+                print(f"  Loaded     {p.name}  →  {tag}  ({len(df)} frames)")
+        segments.setdefault(tag, []).append(df)
+
+    # One concat per camera rather than one per segment
+    return {tag: dfs[0] if len(dfs) == 1 else pd.concat(dfs, ignore_index=True)
+            for tag, dfs in segments.items()}
+
+
+def load_timeline(session_dir: Path, quiet: bool = False) -> dict[str, pd.DataFrame]:
+    """The same per-camera frames as load_csvs(), read from the session's
+    timeline index (src/controller/session_timeline.py), which is built or
+    brought up to date first. delta_ms is recomputed within each segment."""
+    timeline = load_or_index(str(session_dir))
+    cameras = {}
+    for video in timeline.video.values():
+        if not len(video.timestamps):
+            continue
+        tag = _camera_tag(Path(video.csvs[0]))
+        starts = np.append(video.segment_starts, len(video.timestamps))
+        frame_id = np.arange(len(video.timestamps)) - np.repeat(starts[:-1], np.diff(starts))
+        delta_ms = np.diff(video.timestamps, prepend=video.timestamps[0]) / 1e6
+        delta_ms[starts[:-1][starts[:-1] < len(delta_ms)]] = np.nan
+        cameras[tag] = pd.DataFrame({
+            "frame_id": frame_id, "timestamp_ns": video.timestamps,
+            "dropped_before": video.dropped_before, "delta_ms": delta_ms,
+        })
+        if not quiet:
+            print(f"  Indexed    {video.name}  →  {tag}  "
+                  f"({len(video.timestamps)} frames, {len(video.csvs)} segments)")
+    if not cameras:
+        sys.exit(f"No camera timestamps indexed under {session_dir}")
     return cameras
 
 
+def detect_fps(cameras: dict[str, pd.DataFrame]) -> float:
+    """Median inter-frame interval of the longest camera, as a whole fps."""
+    ref_df = max(cameras.values(), key=len)
+    if "delta_ms" not in ref_df:
+        return 30.0
+    median_delta = pd.to_numeric(ref_df["delta_ms"], errors="coerce").median()
+    return round(1000.0 / median_delta) if pd.notna(median_delta) and median_delta > 0 else 30.0
+
+
 # ---------------------------------------------------------------------------
 # Alignment
 # ---------------------------------------------------------------------------
 
-def align_frames(cameras: dict[str, pd.DataFrame]) -> tuple:
-    """Nearest-neighbour match on PTP timestamp_ns.
+def align_frames(cameras: dict[str, pd.DataFrame], ref_tag: str | None = None) -> tuple:
+    """Nearest-neighbour match on PTP timestamp_ns, against ref_tag if it is
+    one of the cameras, otherwise the camera with the most frames.
 
     Returns (per_frame_df, ref_tag, [client_tags]).
     per_frame_df columns: frame_id, timestamp_s,
                           offset_us_{tag}, offset_s_{tag}  per client.
     """
-    sorted_cams = sorted(cameras.items(), key=lambda kv: len(kv[1]), reverse=True)
+    sorted_cams = sorted(cameras.items(), key=lambda kv: (kv[0] != ref_tag, -len(kv[1])))
     ref_tag, ref_df = sorted_cams[0]
     ref_ts = ref_df["timestamp_ns"].to_numpy()
 
@@ -101,16 +214,31 @@ def _outlier_threshold_us(fps: float) -> float:
 # Console report
 # ---------------------------------------------------------------------------
 
-def report_dropped(cameras: dict[str, pd.DataFrame]) -> None:
-    print("\n── Dropped frames ─────────────────────────────────────")
+def report_dropped(cameras: dict[str, pd.DataFrame], quiet: bool = False) -> list[dict]:
+    """Print dropped-frame counts per camera and return them as rows."""
+    if not quiet:
+        print("\n── Dropped frames ─────────────────────────────────────")
+    rows = []
     for tag, df in cameras.items():
         total    = len(df)
-        drops    = pd.to_numeric(df["dropped_before"], errors="coerce").fillna(0).astype(int)
+        if "dropped_before" in df:
+            drops = pd.to_numeric(df["dropped_before"], errors="coerce").fillna(0).astype(int)
+        else:
+            drops = pd.Series(0, index=df.index)
         n_events = int((drops > 0).sum())
         n_lost   = int(drops.sum())
         pct      = 100.0 * n_events / total if total else 0
-        print(f"  {tag:25s}  {total} frames  |  "
-              f"{n_events} events ({pct:.1f}%)  |  {n_lost} frames lost")
+        if not quiet:
+            print(f"  {tag:25s}  {total} frames  |  "
+                  f"{n_events} events ({pct:.1f}%)  |  {n_lost} frames lost")
+        rows.append({
+            "camera":          tag,
+            "frames":          total,
+            "drop_events":     n_events,
+            "frames_lost":     n_lost,
+            "drop_event_pct":  round(pct, 3),
+        })
+    return rows
 
 
 def _verdict(detrended_p95_us: float, drift_us_per_sec: float,
@@ -140,13 +268,17 @@ def _verdict(detrended_p95_us: float, drift_us_per_sec: float,
 
 
 def report_offsets(per_frame: pd.DataFrame, ref_tag: str, client_tags: list,
-                   fps: float) -> list[dict]:
+                   fps: float, quiet: bool = False) -> list[dict]:
     """Print stats and return summary rows for CSV."""
+    def out(*args) -> None:
+        if not quiet:
+            print(*args)
+
     half_frame_us  = 1e6 / fps / 2.0
     outlier_thr_us = _outlier_threshold_us(fps)
 
-    print(f"\n── Inter-camera offset  (ref: {ref_tag}) ───────────────")
-    print(f"   Frame period: {1e6/fps:.0f} µs  |  half-frame: {half_frame_us:.0f} µs")
+    out(f"\n── Inter-camera offset  (ref: {ref_tag}) ───────────────")
+    out(f"   Frame period: {1e6/fps:.0f} µs  |  half-frame: {half_frame_us:.0f} µs")
 
     rows = []
     for tag in client_tags:
@@ -168,28 +300,28 @@ def report_offsets(per_frame: pd.DataFrame, ref_tag: str, client_tags: list,
             detrended = real.values - (slope * x + intercept)
             detrended_p95_us = float(np.percentile(np.abs(detrended), 95))
 
-        print(f"\n  {tag}")
+        out(f"\n  {tag}")
         if len(real):
             mean_us = real.mean()
-            print(f"    phase offset     : {mean_us:+.1f} ± {real.std():.1f} µs"
-                  f"  [fixed per session; random at session start due to hardware sync limits]")
-            print(f"    within ½ frame   : {within:.1f}%  ({len(real)} frames)"
-                  f"  [100% = nearest-neighbour matching always picks the correct frame]")
+            out(f"    phase offset     : {mean_us:+.1f} ± {real.std():.1f} µs"
+                f"  [fixed per session; random at session start due to hardware sync limits]")
+            out(f"    within ½ frame   : {within:.1f}%  ({len(real)} frames)"
+                f"  [100% = nearest-neighbour matching always picks the correct frame]")
         if drift_us_per_sec is not None:
             if abs(drift_us_per_sec) > 0:
                 safe_min = half_frame_us / abs(drift_us_per_sec) / 60.0
                 safe_str = f"  [misassignment risk after {safe_min:.0f} min without timestamp alignment]"
             else:
                 safe_str = ""
-            print(f"    clock drift      : {drift_us_per_sec:+.3f} µs/sec ({drift_us_per_sec:.2f} ppm)"
-                  + safe_str)
-            print(f"  ★ timing accuracy  : {detrended_p95_us:.1f} µs p95"
-                  f"  [residual uncertainty after phase+drift correction — report this number]")
+            out(f"    clock drift      : {drift_us_per_sec:+.3f} µs/sec ({drift_us_per_sec:.2f} ppm)"
+                + safe_str)
+            out(f"  ★ timing accuracy  : {detrended_p95_us:.1f} µs p95"
+                f"  [residual uncertainty after phase+drift correction — report this number]")
         if len(artefacts):
-            print(f"    matching artefacts (|offset| ≥ {outlier_thr_us/1000:.0f} ms): "
-                  f"{len(artefacts)} — differing frame counts, not real sync error")
+            out(f"    matching artefacts (|offset| ≥ {outlier_thr_us/1000:.0f} ms): "
+                f"{len(artefacts)} — differing frame counts, not real sync error")
 
-        if detrended_p95_us is not None and drift_us_per_sec is not None and len(real):
+        if not quiet and detrended_p95_us is not None and drift_us_per_sec is not None and len(real):
             _verdict(detrended_p95_us, drift_us_per_sec, half_frame_us, fps, real.mean())
 
         rows.append({
@@ -307,6 +439,150 @@ def plot(per_frame: pd.DataFrame, ref_tag: str, client_tags: list,
     plt.show()
 
 
+# ---------------------------------------------------------------------------
+# Batch / longitudinal
+# ---------------------------------------------------------------------------
+
+# A camera is flagged when its latest session is this much worse than its own
+# median over earlier sessions (needs at least TREND_MIN_SESSIONS sessions)
+TREND_DEGRADE_FACTOR = 2.0
+TREND_MIN_SESSIONS   = 3
+
+
+def find_sessions(root: Path) -> list[Path]:
+    """Directories directly under root that hold any *_timestamps.csv."""
+    return [d for d in sorted(root.iterdir())
+            if d.is_dir() and not d.name.startswith(".")
+            and next(d.rglob("*_timestamps.csv"), None) is not None]
+
+
+def analyse_session(session_dir: Path, fps: float | None,
+                    cache_dir: Path | None, use_timeline: bool = False,
+                    ref_camera: str | None = None) -> list[dict]:
+    """One row per camera for the longitudinal CSV. Runs in a worker process,
+    so it prints nothing and writes no per-session files (apart from the
+    session's timeline index, with use_timeline)."""
+    if use_timeline:
+        cameras = load_timeline(session_dir, quiet=True)
+    else:
+        cameras = load_csvs(session_dir, cache_dir, quiet=True)
+    fps = fps or detect_fps(cameras)
+    first_ns = min(int(df["timestamp_ns"].iloc[0]) for df in cameras.values() if len(df))
+    started = datetime.fromtimestamp(first_ns / 1e9, tz=UTC).isoformat(timespec="seconds")
+
+    offsets = {}
+    ref_tag = None
+    if len(cameras) >= 2:
+        per_frame, ref_tag, client_tags = align_frames(cameras, ref_camera)
+        offsets = {r["client_camera"]: r
+                   for r in report_offsets(per_frame, ref_tag, client_tags, fps, quiet=True)}
+
+    rows = []
+    for drop in report_dropped(cameras, quiet=True):
+        off = offsets.get(drop["camera"], {})
+        rows.append({
+            "session":           session_dir.name,
+            "session_start_utc": started,
+            "camera":            drop["camera"],
+            "ref_camera":        ref_tag,
+            "is_ref":            drop["camera"] == ref_tag,
+            "fps":               fps,
+            **{k: v for k, v in drop.items() if k != "camera"},
+            "mean_offset_us":    off.get("mean_offset_us"),
+            "drift_us_per_sec":  off.get("drift_us_per_sec"),
+            "detrended_p95_us":  off.get("detrended_p95_us"),
+        })
+    return rows
+
+
+def run_batch(root: Path, workers: int | None, cache_dir: Path | None,
+              fps: float | None, use_timeline: bool = False,
+              ref_camera: str | None = None) -> pd.DataFrame:
+    sessions = find_sessions(root)
+    if not sessions:
+        sys.exit(f"No session directories with *_timestamps.csv under {root}")
+    print(f"\nBatch: {len(sessions)} sessions under {root}  ({workers or os.cpu_count()} workers)")
+
+    rows: list[dict] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(analyse_session, s, fps, cache_dir, use_timeline, ref_camera): s
+                   for s in sessions}
+        for fut in as_completed(futures):
+            session_dir = futures[fut]
+            try:
+                session_rows = fut.result()
+            except Exception as e:
+                print(f"  [fail] {session_dir.name}: {e}", file=sys.stderr)
+                continue
+            print(f"  Analysed   {session_dir.name}  ({len(session_rows)} cameras)")
+            rows.extend(session_rows)
+
+    if cache_dir is not None and cache_dir.is_dir() and not use_timeline:
+        removed = prune_cache(cache_dir, sorted(root.rglob("*_timestamps.csv")))
+        if removed:
+            print(f"  Pruned     {removed} stale cache entries")
+
+    df = pd.DataFrame(rows)
+    if len(df):
+        df = df.sort_values(["camera", "session_start_utc", "session"], ignore_index=True)
+    return df
+
+
+def _trend_per_week(days: np.ndarray, values: np.ndarray) -> float | None:
+    ok = ~np.isnan(values)
+    if ok.sum() < 2 or np.ptp(days[ok]) == 0:
+        return None
+    return float(np.polyfit(days[ok], values[ok], 1)[0] * 7)
+
+
+def report_trends(df: pd.DataFrame) -> list[str]:
+    """Print one trend line per camera; returns the cameras flagged as
+    degrading. A camera's offsets are only comparable across sessions
+    measured against the same reference, so its p95 trend uses only the
+    sessions whose ref_camera is the one it was most often measured
+    against (never itself)."""
+    print("\n── Longitudinal trend per camera ───────────────────────")
+    print(f"  {'camera':25s} {'sessions':>8s}  {'p95 µs (latest/median)':>23s}  "
+          f"{'p95 µs/wk':>9s}  {'drift µs/s':>10s}  {'drops % (latest/median)':>24s}")
+    flagged = []
+    for tag, cam in df.groupby("camera", sort=True):
+        starts = pd.to_datetime(cam["session_start_utc"])
+        days = ((starts - starts.min()).dt.total_seconds() / 86400).to_numpy()
+        p95 = pd.to_numeric(cam["detrended_p95_us"], errors="coerce")
+        refs = cam["ref_camera"].where(cam["ref_camera"] != tag)
+        if refs.notna().any():
+            p95 = p95.where(refs == refs.mode().iloc[0])
+        p95 = p95.to_numpy(dtype=float)
+        drift = pd.to_numeric(cam["drift_us_per_sec"], errors="coerce").to_numpy(dtype=float)
+        drops = cam["drop_event_pct"].to_numpy(dtype=float)
+
+        reasons = []
+        p95_known = p95[~np.isnan(p95)]
+        p95_str = "—"
+        if len(p95_known):
+            latest, baseline = p95_known[-1], np.median(p95_known[:-1]) if len(p95_known) > 1 else np.nan
+            p95_str = f"{latest:.1f} / {baseline:.1f}" if not np.isnan(baseline) else f"{latest:.1f}"
+            if len(p95_known) >= TREND_MIN_SESSIONS and latest > TREND_DEGRADE_FACTOR * baseline:
+                reasons.append("p95 offset")
+        drop_baseline = np.median(drops[:-1]) if len(drops) > 1 else np.nan
+        if (len(drops) >= TREND_MIN_SESSIONS
+                and drops[-1] > TREND_DEGRADE_FACTOR * drop_baseline and drops[-1] > 0.1):
+            reasons.append("dropped frames")
+
+        slope = _trend_per_week(days, p95)
+        drift_known = drift[~np.isnan(drift)]
+        drop_str = (f"{drops[-1]:.2f} / {drop_baseline:.2f}" if not np.isnan(drop_baseline)
+                    else f"{drops[-1]:.2f}")
+        print(f"  {tag:25s} {len(cam):8d}  {p95_str:>23s}  "
+              f"{(f'{slope:+.2f}' if slope is not None else '—'):>9s}  "
+              f"{(f'{drift_known[-1]:+.3f}' if len(drift_known) else '—'):>10s}  "
+              f"{drop_str:>24s}"
+              + (f"  ⚠ degrading: {', '.join(reasons)}" if reasons else ""))
+        if reasons:
+            flagged.append(tag)
+    return flagged
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
@@ -314,13 +590,44 @@ def plot(per_frame: pd.DataFrame, ref_tag: str, client_tags: list,
 def main() -> None:
     ap = argparse.ArgumentParser(description=__doc__,
                                  formatter_class=argparse.RawDescriptionHelpFormatter)
-    ap.add_argument("session_dirs", nargs="+",
+    ap.add_argument("session_dirs", nargs="*",
                     help="Session directories containing *_timestamps.csv files")
     ap.add_argument("--fps", type=float, default=None,
                     help="Expected frame rate (auto-detected if omitted)")
     ap.add_argument("--no-plot", action="store_true", help="Skip matplotlib output")
+    ap.add_argument("--batch", metavar="ROOT", type=Path, default=None,
+                    help="Analyse every session under ROOT and report per-camera trends")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="Worker processes for --batch (default: CPU count)")
+    ap.add_argument("--cache-dir", type=Path, default=None,
+                    help="Parsed-CSV cache (default: ROOT/.framesync_cache with --batch, "
+                         "none otherwise)")
+    ap.add_argument("--no-cache", action="store_true", help="Always reparse the CSVs")
+    ap.add_argument("--ref-camera", metavar="TAG", default=None,
+                    help="Measure offsets against this camera ({animal}_{module_id}) "
+                         "wherever it recorded, rather than the longest one")
+    ap.add_argument("--timeline", action="store_true",
+                    help="Read frames from each session's timeline index "
+                         "(src/controller/session_timeline.py) instead of the CSVs")
     args = ap.parse_args()
 
+    if args.batch:
+        root = args.batch.resolve()
+        if not root.is_dir():
+            sys.exit(f"Not a directory: {root}")
+        cache_dir = None if args.no_cache else (args.cache_dir or root / ".framesync_cache")
+        df = run_batch(root, args.workers, cache_dir, args.fps, args.timeline, args.ref_camera)
+        if len(df):
+            report_trends(df)
+            out = root / "framesync_longitudinal.csv"
+            df.to_csv(out, index=False)
+            print(f"\nLongitudinal CSV → {out}")
+        print()
+        return
+    if not args.session_dirs:
+        ap.error("give at least one session directory, or --batch ROOT")
+    cache_dir = None if args.no_cache else args.cache_dir
+
     # Summary CSV goes next to the session dirs, not in the shell's cwd
     summary_dir = Path(args.session_dirs[0]).resolve().parent
     all_summary_rows: list[dict] = []
@@ -332,14 +639,15 @@ def main() -> None:
             continue
 
         print(f"\nSession: {session_dir.name}")
-        cameras = load_csvs(session_dir)
+        if args.timeline:
+            cameras = load_timeline(session_dir)
+        else:
+            cameras = load_csvs(session_dir, cache_dir)
 
         if args.fps:
             fps = args.fps
         else:
-            ref_df       = max(cameras.values(), key=len)
-            median_delta = pd.to_numeric(ref_df["delta_ms"], errors="coerce").median()
-            fps          = round(1000.0 / median_delta) if pd.notna(median_delta) and median_delta > 0 else 30.0
+            fps = detect_fps(cameras)
             print(f"  Auto-detected FPS: {fps}")
 
         report_dropped(cameras)
@@ -348,7 +656,7 @@ def main() -> None:
             print("  Only one camera found — skipping offset analysis.")
             continue
 
-        per_frame, ref_tag, client_tags = align_frames(cameras)
+        per_frame, ref_tag, client_tags = align_frames(cameras, args.ref_camera)
         session_rows = report_offsets(per_frame, ref_tag, client_tags, fps)
 
         print("\n── CSV output ──────────────────────────────────────────")
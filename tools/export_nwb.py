@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+export_nwb.py — package an exported SAVIOUR session as one NWB file.
+
+Reads a complete session directory on the share and writes a single .nwb
+file on the session's shared PTP timeline (see docs/NWB_EXPORT_DESIGN.md for
+the mapping and its open questions):
+
+  session_metadata.json     → NWBFile metadata + Subject (rat_id, strain)
+  camera .ts + timestamps   → ImageSeries per camera, external links to the
+                              segment files (relative to the .nwb) with the
+                              real per-frame timestamps
+  microphone .flac + .txt   → TimeSeries per segment, int16 PCM in a chunked,
+                              gzip-compressed dataset; start time and rate
+                              from the sidecar's regression anchors
+  TTL _events.csv           → IntervalSeries per pin (+1 HIGH, -1 LOW)
+  _shock_events.csv         → IntervalSeries for shock command and delivery,
+                              TimeSeries for rotation speed
+  health metadata CSVs      → not embedded; a PTP offset summary per module
+                              goes in NWBFile.notes
+
+Nothing is loaded whole: timestamps are read from the CSVs row by row and
+audio block by block while the file is being written, so memory use does not
+grow with session length. Every module becomes a Device.
+
+Timestamps are seconds from the session start (session_metadata.json
+created_at), or from the earliest sample if anything predates it. Camera
+timestamps are raw — no phase-offset calibration between cameras is applied.
+
+Usage:
+    python3 tools/export_nwb.py /path/to/share/SESSION
+    python3 tools/export_nwb.py /path/to/share/SESSION -o SESSION.nwb --species "Rattus norvegicus"
+
+Requirements: pynwb (pip install -e ".[nwb]"), soundfile, numpy.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import uuid
+from datetime import UTC, datetime
+from pathlib import Path
+
+import numpy as np
+import soundfile
+from hdmf.backends.hdf5.h5_utils import H5DataIO
+from hdmf.data_utils import AbstractDataChunkIterator, DataChunk, DataChunkIterator
+from pynwb import NWBHDF5IO, NWBFile, TimeSeries
+from pynwb.file import Subject
+from pynwb.image import ImageSeries
+from pynwb.misc import IntervalSeries
+
+AUDIO_BLOCK_SAMPLES = 1 << 16      # samples read and written per audio chunk
+TIMESTAMP_BUFFER    = 1 << 14      # timestamps buffered per write
+
+
+# ---------------------------------------------------------------------------
+# Discovery
+# ---------------------------------------------------------------------------
+
+def _segment_index(p: Path) -> int:
+    m = re.search(r'_\((\d+)_', p.name)
+    return int(m.group(1)) if m else 0
+
+
+def _by_segment(paths) -> list[Path]:
+    return sorted(paths, key=lambda p: (_segment_index(p), p.name))
+
+
+def find_module_dirs(session_dir: Path) -> list[Path]:
+    """Every {date}/{module} directory in the session, in date then name order."""
+    return [m for d in sorted(session_dir.iterdir())
+            if d.is_dir() and re.fullmatch(r"\d{8}", d.name)
+            for m in sorted(d.iterdir()) if m.is_dir()]
+
+
+def _csv_header(path: Path) -> list[str]:
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if row and not row[0].startswith("#"):
+                return [c.strip() for c in row]
+    return []
+
+
+def module_streams(module_dir: Path) -> dict[str, list[Path]]:
+    """The files in a module directory, by stream kind."""
+    streams = {}
+    timestamp_csvs = _by_segment(module_dir.glob("*_timestamps.csv"))
+    videos = [p for p in (p.with_name(p.name[:-len("_timestamps.csv")] + ".ts") for p in timestamp_csvs)
+              if p.exists()]
+    if videos:
+        streams["video"] = videos
+    audio = _by_segment(module_dir.glob("*.flac"))
+    if audio:
+        streams["audio"] = audio
+    shocks = _by_segment(module_dir.glob("*_shock_events.csv"))
+    if shocks:
+        streams["shock"] = shocks
+    ttl = [p for p in _by_segment(module_dir.glob("*_events.csv"))
+           if p not in shocks and _csv_header(p)[:2] == ["Timestamp_nanoseconds", "pin_number"]]
+    if ttl:
+        streams["ttl"] = ttl
+    health = _by_segment(module_dir.glob("*_health_metadata_*.csv"))
+    if health:
+        streams["health"] = health
+    return streams
+
+
+# ---------------------------------------------------------------------------
+# Streaming readers
+# ---------------------------------------------------------------------------
+
+def _rows(path: Path):
+    """Data rows of a CSV as dicts, skipping '#' comment lines."""
+    with open(path, newline="") as f:
+        lines = (line for line in f if not line.startswith("#"))
+        for row in csv.DictReader(lines, skipinitialspace=True):
+            yield row
+
+
+def _first_video_ns(csv_path: Path) -> int | None:
+    for row in _rows(csv_path):
+        try:
+            return int(row["timestamp_ns"])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+def count_frames(csv_path: Path) -> int:
+    return sum(1 for row in _rows(csv_path) if row.get("timestamp_ns"))
+
+
+def frame_times(csv_paths: list[Path], t_ref_ns: int):
+    """Seconds from t_ref_ns of every frame across segments, in order."""
+    for p in csv_paths:
+        for row in _rows(p):
+            if row.get("timestamp_ns"):
+                yield (int(row["timestamp_ns"]) - t_ref_ns) / 1e9
+
+
+def parse_audio_sidecar(path: Path, nominal_rate: int) -> tuple[float | None, float]:
+    """(start epoch seconds of sample 0, sample rate) from a mic _timestamps.txt.
+
+    Uses the first ANCHOR and RATE_ESTIMATE when present; older sidecars with
+    one epoch per block fall back to STARTED or the first block time.
+    """
+    started = first_block = anchor = None
+    rate = float(nominal_rate)
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if not parts:
+                    continue
+                try:
+                    if parts[0] == "ANCHOR" and anchor is None:
+                        anchor = (int(parts[1]), float(parts[2]))
+                    elif parts[0] == "RATE_ESTIMATE":
+                        rate = float(parts[1])
+                    elif parts[0] == "STARTED":
+                        started = float(parts[1])
+                    elif first_block is None and len(parts) == 1:
+                        first_block = float(parts[0])
+                except (IndexError, ValueError):
+                    continue
+    except OSError:
+        return None, rate
+    if anchor is not None:
+        return anchor[1] - anchor[0] / rate, rate
+    return (started if started is not None else first_block), rate
+
+
+class AudioChunkIterator(AbstractDataChunkIterator):
+    """Yields an audio file's int16 samples block by block, so the dataset
+    is written chunk by chunk without decoding the whole file."""
+
+    def __init__(self, path: Path, block: int = AUDIO_BLOCK_SAMPLES):
+        self.path = path
+        self.block = block
+        info = soundfile.info(str(path))
+        self.frames = info.frames
+        self.channels = info.channels
+        self._file = None
+        self._pos = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> DataChunk:
+        if self._file is None:
+            self._file = soundfile.SoundFile(str(self.path))
+        data = self._file.read(self.block, dtype="int16", always_2d=self.channels > 1)
+        if not len(data):
+            self._file.close()
+            raise StopIteration
+        start, self._pos = self._pos, self._pos + len(data)
+        return DataChunk(data=data, selection=np.s_[start:self._pos])
+
+    def recommended_chunk_shape(self):
+        rows = max(1, min(self.block, self.frames))
+        return (rows,) if self.channels == 1 else (rows, self.channels)
+
+    def recommended_data_shape(self):
+        return self.maxshape
+
+    @property
+    def dtype(self):
+        return np.dtype("int16")
+
+    @property
+    def maxshape(self):
+        return (self.frames,) if self.channels == 1 else (self.frames, self.channels)
+
+
+def _stream_start_ns(kind: str, path: Path) -> int | None:
+    """Earliest timestamp a stream file holds, without reading it all."""
+    if kind == "video":
+        return _first_video_ns(path.with_name(f"{path.stem}_timestamps.csv"))
+    if kind == "audio":
+        start, _ = parse_audio_sidecar(path.with_name(f"{path.stem}_timestamps.txt"), 1)
+        return int(start * 1e9) if start is not None else None
+    if kind in ("ttl", "shock"):
+        for row in _rows(path):
+            try:
+                return int(row["Timestamp_nanoseconds"])
+            except (KeyError, TypeError, ValueError):
+                continue
+    return None
+
+
+# ---------------------------------------------------------------------------
+# NWB containers
+# ---------------------------------------------------------------------------
+
+def add_video(nwb: NWBFile, module: str, videos: list[Path], out_dir: Path,
+              t_ref_ns: int, device) -> ImageSeries:
+    csvs = [v.with_name(f"{v.stem}_timestamps.csv") for v in videos]
+    counts = [count_frames(c) for c in csvs]
+    timestamps = DataChunkIterator(data=frame_times(csvs, t_ref_ns), maxshape=(None,),
+                                   dtype=np.dtype("float64"), buffer_size=TIMESTAMP_BUFFER)
+    series = ImageSeries(
+        name=module,
+        description=f"{module} video, one external file per recording segment",
+        external_file=[os.path.relpath(v, out_dir) for v in videos],
+        format="external",
+        starting_frame=[int(x) for x in np.concatenate(([0], np.cumsum(counts)[:-1]))],
+        timestamps=H5DataIO(timestamps, compression="gzip"),
+        device=device,
+    )
+    nwb.add_acquisition(series)
+    return series
+
+
+def add_audio(nwb: NWBFile, module: str, files: list[Path], t_ref_ns: int) -> list[TimeSeries]:
+    out = []
+    for f in files:
+        info = soundfile.info(str(f))
+        start, rate = parse_audio_sidecar(f.with_name(f"{f.stem}_timestamps.txt"), info.samplerate)
+        if start is None:
+            print(f"  [skip] {f.name}: no start time in its _timestamps.txt", file=sys.stderr)
+            continue
+        it = AudioChunkIterator(f)
+        series = TimeSeries(
+            name=f"{module}_audio_{_segment_index(f)}",
+            description=f"{f.name}: 16-bit PCM, rate fitted against PTP time",
+            data=H5DataIO(it, compression="gzip", chunks=it.recommended_chunk_shape()),
+            unit="n.a.",
+            conversion=1 / 32768,
+            starting_time=start - t_ref_ns / 1e9,
+            rate=rate,
+        )
+        nwb.add_acquisition(series)
+        out.append(series)
+    return out
+
+
+def _is_high(state: str) -> bool:
+    state = state.strip().upper()
+    return state.endswith("HIGH") or state == "1"
+
+
+def add_ttl(nwb: NWBFile, module: str, files: list[Path], t_ref_ns: int) -> list[IntervalSeries]:
+    pins: dict[str, dict] = {}
+    for f in files:
+        for row in _rows(f):
+            try:
+                ns = int(row["Timestamp_nanoseconds"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            pin = pins.setdefault(row["pin_number"].strip(), {
+                "t": [], "v": [],
+                "description": f"{row.get('pin_description', '')} ({row.get('pin_mode', '')})".strip(),
+            })
+            pin["t"].append((ns - t_ref_ns) / 1e9)
+            pin["v"].append(1 if _is_high(row["pin_state"]) else -1)
+
+    out = []
+    for pin, edges in sorted(pins.items()):
+        series = IntervalSeries(
+            name=f"{module}_pin{pin}",
+            description=f"TTL edges on pin {pin}: {edges['description']}; +1 HIGH, -1 LOW",
+            data=np.array(edges["v"], dtype=np.int8),
+            timestamps=np.array(edges["t"]),
+        )
+        nwb.add_acquisition(series)
+        out.append(series)
+    return out
+
+
+SHOCK_INTERVALS = {
+    "shock_command":  ("SENDING_SHOCK", "STOPPING_SHOCK"),
+    "shock_delivery": ("SHOCK_DELIVERY", "SHOCK_STOP_DELIVERY"),
+}
+
+
+def add_shocks(nwb: NWBFile, module: str, files: list[Path], t_ref_ns: int) -> list[TimeSeries]:
+    intervals = {name: ([], []) for name in SHOCK_INTERVALS}
+    rpm_t, rpm_v = [], []
+    for f in files:
+        for row in _rows(f):
+            values = list(row.values())
+            try:
+                t = (int(values[0]) - t_ref_ns) / 1e9
+            except (IndexError, TypeError, ValueError):
+                continue
+            event = (values[1] or "").strip() if len(values) > 1 else ""
+            for name, (start, stop) in SHOCK_INTERVALS.items():
+                if event in (start, stop):
+                    intervals[name][0].append(t)
+                    intervals[name][1].append(1 if event == start else -1)
+            try:
+                rpm_v.append(float(values[2]))
+                rpm_t.append(t)
+            except (IndexError, TypeError, ValueError):
+                pass
+
+    out = []
+    for name, (t, v) in intervals.items():
+        if t:
+            out.append(IntervalSeries(
+                name=f"{module}_{name}", data=np.array(v, dtype=np.int8), timestamps=np.array(t),
+                description=f"{SHOCK_INTERVALS[name][0]} (+1) to {SHOCK_INTERVALS[name][1]} (-1)",
+            ))
+    if rpm_t:
+        out.append(TimeSeries(name=f"{module}_rotation_speed", data=np.array(rpm_v),
+                              timestamps=np.array(rpm_t), unit="rpm",
+                              description="Arena rotation speed at each shock event"))
+    for series in out:
+        nwb.add_acquisition(series)
+    return out
+
+
+def ptp_summary(module: str, files: list[Path]) -> str | None:
+    """One line of PTP offset statistics from a module's health CSVs."""
+    columns = {"ptp4l": ("ptp4l_offset_ns",), "phc2sys": ("phc2sys_offset_ns", "phc2sys_offset")}
+    values: dict[str, list[float]] = {k: [] for k in columns}
+    for f in files:
+        for row in _rows(f):
+            for key, names in columns.items():
+                for name in names:
+                    try:
+                        values[key].append(abs(float(row[name])))
+                        break
+                    except (KeyError, TypeError, ValueError):
+                        continue
+    parts = [f"{k} |offset| mean {np.mean(v) / 1e3:.1f} µs, max {np.max(v) / 1e3:.1f} µs"
+             for k, v in values.items() if v]
+    return f"{module}: " + "; ".join(parts) if parts else None
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def _parse_time(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=UTC)
+
+
+def export_session(session_dir: Path, output: Path, species: str | None = None,
+                   identifier: str | None = None) -> Path:
+    """Write session_dir as one NWB file at output and return its path."""
+    session_dir = Path(session_dir).resolve()
+    output = Path(output).resolve()
+    meta_path = session_dir / "session_metadata.json"
+    meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+
+    modules = {m.name: module_streams(m) for m in find_module_dirs(session_dir)}
+    modules = {name: s for name, s in modules.items() if s}
+    if not modules:
+        sys.exit(f"No module recordings found under {session_dir}")
+
+    starts = [ns for streams in modules.values() for kind, files in streams.items()
+              if kind != "health" for ns in [_stream_start_ns(kind, files[0])] if ns is not None]
+    session_start = _parse_time(meta.get("created_at"))
+    if session_start is None:
+        if not starts:
+            sys.exit("No session_metadata.json created_at and no timestamped data to start from")
+        session_start = datetime.fromtimestamp(min(starts) // 1_000_000_000, tz=UTC)
+    reference = session_start
+    if starts and min(starts) < session_start.timestamp() * 1e9:
+        reference = datetime.fromtimestamp(min(starts) // 1_000_000_000, tz=UTC)
+    t_ref_ns = int(reference.timestamp()) * 1_000_000_000 + reference.microsecond * 1000
+
+    subject = None
+    if meta.get("rat_id"):
+        subject = Subject(subject_id=str(meta["rat_id"]), strain=meta.get("strain") or None,
+                          species=species or meta.get("species") or None,
+                          description=f"batch {meta.get('batch', '')}".strip())
+
+    qc = [line for name, streams in modules.items() if "health" in streams
+          for line in [ptp_summary(name, streams["health"])] if line]
+    notes = ["Timestamps are raw per-module PTP-disciplined times; no inter-camera "
+             "phase calibration has been applied."]
+    if qc:
+        notes += ["PTP synchronisation during the session:"] + qc
+
+    nwb = NWBFile(
+        session_description=meta.get("experiment") or f"SAVIOUR session {session_dir.name}",
+        identifier=identifier or str(uuid.uuid4()),
+        session_start_time=session_start,
+        timestamps_reference_time=reference,
+        session_id=meta.get("session_name") or session_dir.name,
+        experimenter=[meta["experimenter"]] if meta.get("experimenter") else None,
+        experiment_description=" ".join(
+            f"{k}={meta[k]}" for k in ("target", "stage", "trial") if meta.get(k)
+        ) or None,
+        notes="\n".join(notes),
+        subject=subject,
+    )
+
+    for name, streams in modules.items():
+        device = nwb.create_device(name=name, description=", ".join(sorted(streams)))
+        print(f"  {name}: {', '.join(f'{k} ×{len(v)}' for k, v in sorted(streams.items()))}")
+        if "video" in streams:
+            add_video(nwb, name, streams["video"], output.parent, t_ref_ns, device)
+        if "audio" in streams:
+            add_audio(nwb, name, streams["audio"], t_ref_ns)
+        if "ttl" in streams:
+            add_ttl(nwb, name, streams["ttl"], t_ref_ns)
+        if "shock" in streams:
+            add_shocks(nwb, name, streams["shock"], t_ref_ns)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(f".{output.stem}.partial.nwb")
+    with NWBHDF5IO(str(tmp), "w") as io:
+        io.write(nwb)
+    os.replace(tmp, output)
+    return output
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("session_dir", type=Path, help="Exported session directory on the share")
+    ap.add_argument("--output", "-o", type=Path, default=None,
+                    help="Output .nwb path (default: SESSION_DIR/SESSION.nwb)")
+    ap.add_argument("--species", default=None,
+                    help='Subject species, e.g. "Rattus norvegicus" (SAVIOUR does not record it)')
+    ap.add_argument("--identifier", default=None,
+                    help="NWB identifier (default: a new UUID; session_id is the session name)")
+    args = ap.parse_args()
+
+    session_dir = args.session_dir.resolve()
+    if not session_dir.is_dir():
+        sys.exit(f"Directory not found: {session_dir}")
+    output = args.output or session_dir / f"{session_dir.name}.nwb"
+
+    print(f"\nSession : {session_dir.name}")
+    result = export_session(session_dir, output, species=args.species, identifier=args.identifier)
+    print(f"\nDone: {result}  ({result.stat().st_size / 1_048_576:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
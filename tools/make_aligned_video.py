@@ -3,8 +3,22 @@
 make_aligned_video.py — frame-aligned side-by-side video from SAVIOUR recordings.
 
 Finds camera modules in a session directory, checks PTP synchronisation quality
-from health metadata, computes per-camera frame offsets from PTP timestamps, and
-calls ffmpeg to produce a trimmed, frame-aligned output video.
+from health metadata, and resamples every camera onto one constant-rate output
+timeline by PTP timestamp: each output frame shows, for every camera, the
+source frame whose timestamp is nearest that output tick. Cameras that drop
+frames or run slightly fast or slow stay in sync for the whole recording —
+source frames are held (duplicated) or skipped as needed — rather than only
+being lined up at the first frame.
+
+Residuals (source frame timestamp minus output tick) are reported per camera
+over time windows, along with held and skipped frames, and written per output
+frame to {output}_residuals.csv.
+
+Pre-stage rows — timestamp CSV rows written before the encoder started at a
+scheduled start, with no matching video frame — are trimmed using the sidecar
+itself: rows timestamped more than half a frame before the recording start (the
+segment start time in the first segment's filename, or --start-at) are
+dropped, so CSV row i is video frame i.
 
 Only cameras that used picamera2 framesync (sync_mode == 'server' or 'client' in
 config.json) are included. Cameras with sync_mode == 'none' are skipped with a
@@ -15,21 +29,40 @@ Usage:
     python3 tools/make_aligned_video.py SESSION_DIR/20260703
     python3 tools/make_aligned_video.py SESSION_DIR --output out.mp4 --layout stack
     python3 tools/make_aligned_video.py SESSION_DIR --ptp-threshold 100
+    python3 tools/make_aligned_video.py SESSION_DIR --fps 30 --report-window 300
+    python3 tools/make_aligned_video.py SESSION_DIR --timeline
 
-Requirements: ffmpeg on PATH; pandas + numpy (source env2/bin/activate).
+Requirements: ffmpeg on PATH (segment concatenation and encoding); pandas,
+numpy and opencv (source env2/bin/activate). Rendering is done by
+src/controller/video_compose.py.
 """
 
 import argparse
 import json
+import os
 import re
 import subprocess
 import sys
 import tempfile
+from datetime import UTC, datetime
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.controller.session_timeline import (
+    SessionTimeline,
+    load_or_index,
+    nearest_indices,
+)
+from src.controller.video_compose import (
+    CameraStream,
+    FramePlan,
+    compose_session_video,
+)
+
 PTP_THRESHOLD_NS = 50_000  # 50 µs — matches the recording gate
 
 
@@ -89,7 +122,9 @@ def check_ptp(camera_dir: Path, threshold_ns: int) -> tuple[bool, str]:
     health = pd.concat(rows, ignore_index=True)
 
     ptp4l_abs  = health["ptp4l_offset_ns"].dropna().abs()
-    phc2sys_abs = health["phc2sys_offset"].dropna().abs()
+    # ModuleHealthSnapshot names it phc2sys_offset_ns; older CSVs phc2sys_offset
+    phc2sys_col = "phc2sys_offset_ns" if "phc2sys_offset_ns" in health else "phc2sys_offset"
+    phc2sys_abs = health[phc2sys_col].dropna().abs()
 
     ptp4l_p95  = ptp4l_abs.quantile(0.95)
     phc2sys_p95 = phc2sys_abs.quantile(0.95)
@@ -113,83 +148,116 @@ def _segment_index(p: Path) -> int:
     return int(m.group(1)) if m else 0
 
 
-def _video_frame_count(video: Path) -> int:
-    """Return the number of video frames in a .ts file via ffprobe packet scan.
+def _segment_start_ns(p: Path) -> int | None:
+    """Segment start time from a '..._(N_YYYYMMDD-HHMMSS)...' filename, in
+    UTC epoch ns. Whole seconds only — the filename truncates it."""
+    m = re.search(r'_\(\d+_(\d{8}-\d{6})\)', p.name)
+    if not m:
+        return None
+    start = datetime.strptime(m.group(1), "%Y%m%d-%H%M%S").replace(tzinfo=UTC)
+    return int(start.timestamp()) * 1_000_000_000
+
 
-    Uses -count_packets (reads index/headers, ~0.3s) rather than -count_frames
-    (decodes every frame, ~15s).  For well-formed MPEG-TS the two values are
-    identical.
+def prestage_rows(ts: np.ndarray, start_ns: int | None) -> int:
+    """Number of leading rows captured before the recording started.
+
+    For scheduled starts the camera's timestamp CSV can be opened before
+    the encoder starts at start_at, leaving rows at the head of the first
+    segment with no corresponding video frame. A row is only counted as
+    pre-stage if it is more than half a frame interval before start_ns, so a
+    frame whose exposure straddled the start (and was still encoded) is
+    kept.
     """
-    result = subprocess.run(
-        ["ffprobe", "-v", "quiet", "-select_streams", "v:0",
-         "-count_packets", "-show_entries", "stream=nb_read_packets",
-         "-of", "csv=p=0", str(video)],
-        capture_output=True, text=True,
-    )
-    try:
-        return int(result.stdout.split()[0])
-    except (ValueError, IndexError):
+    if start_ns is None or len(ts) < 2:
         return 0
+    half_interval = int(np.median(np.diff(ts))) // 2
+    return int(np.searchsorted(ts, start_ns - half_interval, side="left"))
 
 
-def load_timestamps(camera_dir: Path) -> np.ndarray:
-    """Load per-frame timestamp_ns arrays across all segments, trimming any
-    pre-stage frames from the first segment.
+def load_timestamps(camera_dir: Path, start_ns: int | None = None,
+                    timeline: SessionTimeline | None = None) -> tuple[np.ndarray, int]:
+    """Load per-frame timestamp_ns across all segments as one int64 array,
+    trimming pre-stage rows from the first segment.
 
-    The camera's pre_callback runs from when _open_timestamp_csv is called, but
-    the encoder only starts later (at the scheduled start time).  For the first
-    segment of scheduled recordings this creates extra rows at the head of the
-    CSV that have no corresponding video frame.  We detect and strip them by
-    comparing CSV row count to the actual video frame count.
+    start_ns is the recording's start time; by default it is taken from the
+    first segment's filename. Segments the session timeline has indexed are
+    read from it instead of their CSVs. Returns (timestamps,
+    pre_stage_rows_trimmed).
     """
     csvs = sorted(camera_dir.glob("*_timestamps.csv"),
                   key=lambda p: _segment_index(p))
     if not csvs:
         sys.exit(f"No *_timestamps.csv found in {camera_dir}")
-
-    videos = sorted(camera_dir.glob("*.ts"), key=lambda p: _segment_index(p))
+    video = timeline.video.get(camera_dir.name) if timeline is not None else None
 
     parts = []
+    trimmed = 0
     for i, p in enumerate(csvs):
-        df = pd.read_csv(p, usecols=["timestamp_ns"])
-        ts = pd.to_numeric(df["timestamp_ns"], errors="coerce").dropna().values
-
-        if i == 0 and videos:
-            # Strip pre-stage frames: CSV rows written before the encoder started.
-            n_video = _video_frame_count(videos[0])
-            pre_stage = len(ts) - n_video
-            if pre_stage > 0:
-                ts = ts[pre_stage:]
-
+        rel = os.path.relpath(p, timeline.session_dir) if video is not None else None
+        if video is not None and rel in video.csvs:
+            ts = video.segment(video.csvs.index(rel))
+        else:
+            df = pd.read_csv(p, usecols=["timestamp_ns"])
+            ts = pd.to_numeric(df["timestamp_ns"], errors="coerce").dropna().to_numpy(dtype=np.int64)
+        if i == 0:
+            trimmed = prestage_rows(ts, start_ns if start_ns is not None else _segment_start_ns(p))
+            ts = ts[trimmed:]
         parts.append(ts)
-    return np.concatenate(parts)
+    return np.concatenate(parts), trimmed
 
 
-def compute_alignment(timestamps: dict[str, np.ndarray]) -> dict[str, int]:
-    """Return {camera_id: frame_skip} so all cameras start at the same PTP time.
+def compute_resample_plan(timestamps: dict[str, np.ndarray], fps: float) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """Constant-rate output ticks over the window every camera covers, and
+    for each camera the source frame nearest every tick.
 
-    Strategy: take the camera whose first frame is latest (i.e. the one that
-    started last) as the common start. For every other camera, find the frame
-    index whose timestamp is nearest to that common start.
+    Returns (ticks_ns, {camera_id: frame_index_per_tick}). A camera that
+    dropped frames or runs slow repeats an index (a held frame); one that
+    runs fast skips indices.
     """
-    t0s = {cam: ts[0] for cam, ts in timestamps.items()}
-    common_start = max(t0s.values())  # latest first-frame across cameras
-
-    skips: dict[str, int] = {}
-    for cam, ts in timestamps.items():
-        idx = int(np.argmin(np.abs(ts - common_start)))
-        skips[cam] = idx
-
-    return skips
-
-
-def alignment_residuals(timestamps: dict[str, np.ndarray],
-                        skips: dict[str, int]) -> dict[str, float]:
-    """Return residual offset in µs after alignment for each camera relative to
-    the reference (skip=0) camera."""
-    aligned_t0s = {cam: timestamps[cam][skips[cam]] for cam in timestamps}
-    ref_t0 = min(aligned_t0s.values())
-    return {cam: (t0 - ref_t0) / 1e3 for cam, t0 in aligned_t0s.items()}
+    t_start = int(max(ts[0] for ts in timestamps.values()))
+    t_end = int(min(ts[-1] for ts in timestamps.values()))
+    if t_end <= t_start:
+        sys.exit("Cameras have no overlapping time window — nothing to align.")
+    step_ns = int(1e9 / fps)
+    ticks = t_start + np.arange((t_end - t_start) // step_ns + 1, dtype=np.int64) * step_ns
+    return ticks, {cam: nearest_indices(ts, ticks) for cam, ts in timestamps.items()}
+
+
+def residual_table(ticks: np.ndarray, timestamps: dict[str, np.ndarray],
+                   indices: dict[str, np.ndarray]) -> pd.DataFrame:
+    """Per output frame: each camera's source frame and its residual
+    (source timestamp - tick) in µs."""
+    table = pd.DataFrame({"output_frame": np.arange(len(ticks)),
+                          "time_s": (ticks - ticks[0]) / 1e9})
+    for cam, idx in indices.items():
+        table[f"frame_{cam}"] = idx
+        table[f"residual_us_{cam}"] = (timestamps[cam][idx] - ticks) / 1e3
+    return table
+
+
+def residual_windows(table: pd.DataFrame, cameras: list[str], window_s: float) -> pd.DataFrame:
+    """Residual and hold/skip statistics per camera per time window.
+
+    held    — output frames that repeat the previous source frame
+    skipped — source frames never shown (jumped over between output frames)
+    spread  — p95 across output frames of (max - min) residual over cameras,
+              i.e. the worst misalignment between any two cameras
+    """
+    window = (table["time_s"] // window_s).astype(int)
+    rows = []
+    for w, chunk in table.groupby(window, sort=True):
+        row = {"window_start_s": w * window_s, "frames": len(chunk)}
+        res = chunk[[f"residual_us_{c}" for c in cameras]]
+        row["spread_p95_us"] = round(float((res.max(axis=1) - res.min(axis=1)).quantile(.95)), 1)
+        for cam in cameras:
+            abs_res = chunk[f"residual_us_{cam}"].abs()
+            step = np.diff(chunk[f"frame_{cam}"].to_numpy())
+            row[f"p95_us_{cam}"] = round(float(abs_res.quantile(.95)), 1)
+            row[f"max_us_{cam}"] = round(float(abs_res.max()), 1)
+            row[f"held_{cam}"] = int((step == 0).sum())
+            row[f"skipped_{cam}"] = int(np.clip(step - 1, 0, None).sum())
+        rows.append(row)
+    return pd.DataFrame(rows)
 
 
 # ---------------------------------------------------------------------------
@@ -205,63 +273,13 @@ def find_video_segments(camera_dir: Path) -> list[Path]:
 # ffmpeg helpers
 # ---------------------------------------------------------------------------
 
-def build_ffmpeg_cmd(
-    inputs: list[tuple[Path, int]],   # [(video_path, skip_frames), ...]
-    output: Path,
-    layout: str,
-    fps: int,
-    n_frames: int,
-) -> list[str]:
-    """Build the ffmpeg command for frame-aligned multi-camera video output.
-
-    Uses the select filter to drop leading frames rather than time-based seek,
-    so alignment is exact to the frame.
-    """
-    n = len(inputs)
-    cmd = ["ffmpeg", "-y"]
-
-    for video, _ in inputs:
-        cmd += ["-i", str(video)]
-
-    filter_parts = []
-    labels = []
-    for i, (_, skip) in enumerate(inputs):
-        label = f"v{i}"
-        if skip > 0:
-            filter_parts.append(
-                f"[{i}:v]select=gte(n\\,{skip}),setpts=PTS-STARTPTS[{label}]"
-            )
-        else:
-            filter_parts.append(f"[{i}:v]setpts=PTS-STARTPTS[{label}]")
-        labels.append(f"[{label}]")
-
-    joined = "".join(labels)
-    if layout == "stack":
-        filter_parts.append(f"{joined}vstack=inputs={n}[out]")
-    elif layout == "grid" and n == 4:
-        filter_parts.append("[v0][v1]hstack[top];[v2][v3]hstack[bot];[top][bot]vstack[out]")
-    else:  # side (hstack) — default
-        filter_parts.append(f"{joined}hstack=inputs={n}[out]")
-
-    cmd += [
-        "-filter_complex", ";".join(filter_parts),
-        "-map", "[out]",
-        "-c:v", "libx264",
-        "-preset", "fast",
-        "-crf", "18",
-        "-frames:v", str(n_frames),
-        str(output),
-    ]
-    return cmd
-
-
-def concat_segments(segments: list[Path], tmp_dir: str) -> Path:
+def concat_segments(segments: list[Path], tmp_dir: str, name: str) -> Path:
     """Concatenate multiple .ts segments into a single file using ffmpeg concat."""
-    list_path = Path(tmp_dir) / "concat.txt"
+    list_path = Path(tmp_dir) / f"{name}_concat.txt"
     with open(list_path, "w") as f:
         for seg in segments:
             f.write(f"file '{seg.resolve()}'\n")
-    out_path = Path(tmp_dir) / "concat.ts"
+    out_path = Path(tmp_dir) / f"{name}_concat.ts"
     subprocess.run(
         ["ffmpeg", "-y", "-f", "concat", "-safe", "0",
          "-i", str(list_path), "-c", "copy", str(out_path)],
@@ -287,6 +305,16 @@ def main():
                     help="Max allowed PTP offset p95 in µs (default: 50)")
     ap.add_argument("--include-unsynced", action="store_true",
                     help="Include cameras with sync_mode='none' (not recommended)")
+    ap.add_argument("--fps", type=float, default=None,
+                    help="Output frame rate (default: the cameras' configured fps)")
+    ap.add_argument("--start-at", type=float, default=None,
+                    help="Recording start as a UTC epoch (s) for pre-stage trimming "
+                         "(default: first segment's filename, whole seconds)")
+    ap.add_argument("--report-window", type=float, default=60.0,
+                    help="Seconds per residual report window (default: 60)")
+    ap.add_argument("--timeline", action="store_true",
+                    help="Read frame timestamps from the session's timeline index "
+                         "(src/controller/session_timeline.py), building or updating it as needed")
     args = ap.parse_args()
 
     session_dir = args.session_dir.resolve()
@@ -341,67 +369,85 @@ def main():
     else:
         print(f"\n  All cameras within {args.ptp_threshold}µs threshold.\n")
 
-    # --- Load timestamps and compute alignment ---
+    # --- Load timestamps and resample onto one output timeline ---
     print("--- Frame alignment ---")
+    start_ns = int(args.start_at * 1e9) if args.start_at is not None else None
+    timeline = load_or_index(str(date_dir.parent)) if args.timeline else None
     timestamps: dict[str, np.ndarray] = {}
-    fps_per_cam: dict[str, int] = {}
+    fps_per_cam: dict[str, float] = {}
     for cam_dir in included:
-        ts = load_timestamps(cam_dir)
+        ts, trimmed = load_timestamps(cam_dir, start_ns, timeline)
         timestamps[cam_dir.name] = ts
         cfg = load_config(cam_dir)
         fps_per_cam[cam_dir.name] = cfg.get("camera", {}).get("fps", 30)
-        print(f"  {cam_dir.name}  {len(ts)} frames  t0={ts[0]/1e9:.3f}s")
+        measured = 1e9 / np.median(np.diff(ts)) if len(ts) > 1 else float("nan")
+        note = f"  trimmed {trimmed} pre-stage rows" if trimmed else ""
+        print(f"  {cam_dir.name}  {len(ts)} frames  t0={ts[0]/1e9:.3f}s  "
+              f"measured {measured:.3f} fps{note}")
 
     fps_values = list(fps_per_cam.values())
-    if len(set(fps_values)) > 1:
-        print(f"\n  WARNING: cameras have different fps {fps_per_cam} — alignment may be imprecise.")
-    fps = fps_values[0]
-    frame_period_us = 1e6 / fps
-
-    skips = compute_alignment(timestamps)
-    residuals = alignment_residuals(timestamps, skips)
-
-    print()
-    for cam, skip in skips.items():
-        res = residuals[cam]
-        print(f"  {cam}  skip={skip} frames ({skip/fps*1000:.2f}ms)  residual={res:.1f}µs  ({abs(res)/frame_period_us*100:.1f}% of frame period)")
+    if len(set(fps_values)) > 1 and args.fps is None:
+        print(f"\n  WARNING: cameras have different fps {fps_per_cam} — output uses {fps_values[0]}; "
+              f"the faster cameras will have frames skipped (pass --fps to choose).")
+    fps = args.fps or fps_values[0]
+
+    ticks, indices = compute_resample_plan(timestamps, fps)
+    n_frames = len(ticks)
+    cameras = list(timestamps)
+    table = residual_table(ticks, timestamps, indices)
+    windows = residual_windows(table, cameras, args.report_window)
+
+    print(f"\n  Output timeline: {n_frames} frames = {n_frames/fps:.2f}s @ {fps}fps\n")
+    for cam in cameras:
+        res = table[f"residual_us_{cam}"].abs()
+        print(f"  {cam}  residual p95={res.quantile(.95):.1f}µs  max={res.max():.1f}µs  "
+              f"held={windows[f'held_{cam}'].sum()}  skipped={windows[f'skipped_{cam}'].sum()}  "
+              f"({res.quantile(.95)/(1e6/fps)*100:.1f}% of frame period at p95)")
+
+    print(f"\n  Residuals over time (|source - tick| p95 µs, held/skipped per {args.report_window:g}s):")
+    print("  " + f"{'t (s)':>8s}  {'spread':>8s}  " + "  ".join(f"{c:>24s}" for c in cameras))
+    for _, w in windows.iterrows():
+        cells = "  ".join(f"{w[f'p95_us_{c}']:>10.1f} {int(w[f'held_{c}']):>5d}/{int(w[f'skipped_{c}']):<7d}"
+                          for c in cameras)
+        print(f"  {w['window_start_s']:>8.0f}  {w['spread_p95_us']:>8.1f}  {cells}")
+
+    # --- Build output path ---
+    if args.output:
+        output = args.output.resolve()
+    else:
+        output = session_dir / f"{session_dir.name}_aligned.mp4"
+    output.parent.mkdir(parents=True, exist_ok=True)
 
-    # Usable frame count = shortest aligned sequence
-    n_frames = min(len(timestamps[cam]) - skips[cam] for cam in timestamps)
-    print(f"\n  Aligned duration: {n_frames} frames = {n_frames/fps:.2f}s @ {fps}fps\n")
+    residuals_out = output.with_name(f"{output.stem}_residuals.csv")
+    table.to_csv(residuals_out, index=False, float_format="%.3f")
+    print(f"\n  Per-frame residuals → {residuals_out}\n")
 
     # --- Find video files, concatenate segments if needed ---
     print("--- Video files ---")
-    inputs: list[tuple[Path, int]] = []
-
     with tempfile.TemporaryDirectory() as tmp_dir:
+        streams: list[CameraStream] = []
         for cam_dir in included:
             segments = find_video_segments(cam_dir)
             if not segments:
                 sys.exit(f"No .ts files found in {cam_dir}")
             if len(segments) > 1:
                 print(f"  {cam_dir.name}  {len(segments)} segments — concatenating...")
-                video = concat_segments(segments, tmp_dir)
+                video = concat_segments(segments, tmp_dir, cam_dir.name)
             else:
                 video = segments[0]
                 print(f"  {cam_dir.name}  {video.name}")
-            inputs.append((video, skips[cam_dir.name]))
+            streams.append(CameraStream(name=cam_dir.name, video_path=str(video), csv_path=""))
 
-        # --- Build output path ---
-        if args.output:
-            output = args.output.resolve()
-        else:
-            output = session_dir / f"{session_dir.name}_aligned.mp4"
-        output.parent.mkdir(parents=True, exist_ok=True)
+        plan = FramePlan(fps=fps, t_start_ns=int(ticks[0]), step_ns=int(1e9 / fps),
+                         streams=streams, indices=np.stack([indices[s.name] for s in streams]))
 
-        # --- Run ffmpeg ---
-        cmd = build_ffmpeg_cmd(inputs, output, args.layout, fps, n_frames)
+        # --- Render and encode ---
         print(f"\n--- Encoding → {output} ---")
-        print(f"  {' '.join(cmd)}\n")
-
-        result = subprocess.run(cmd)
-        if result.returncode != 0:
-            sys.exit(f"\nffmpeg failed (exit {result.returncode})")
+        try:
+            compose_session_video(None, str(output), layout=args.layout, encoder="auto",
+                                  codec="libx264", preset="fast", crf=18, plan=plan)
+        except RuntimeError as e:
+            sys.exit(f"\nffmpeg failed: {e}")
 
     print(f"\nDone: {output}")
     print(f"  {n_frames} frames  {n_frames/fps:.2f}s  {fps}fps  layout={args.layout}")
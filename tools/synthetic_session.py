@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+synthetic_session.py — write a small synthetic SAVIOUR session directory.
+
+Produces the files an exported session has on the share, with known content,
+so tools that read sessions (export_nwb.py, analyse_framesync.py, ...) can be
+run and tested without any hardware:
+
+  {out}/{session}/session_metadata.json
+  {out}/{session}/{date}/camera_<id>/         video + _timestamps.csv per segment,
+                                              config.json, health metadata CSV
+  {out}/{session}/{date}/microphone_<id>/     .flac + _timestamps.txt
+  {out}/{session}/{date}/ttl_<id>/            _events.csv (edges on two pins)
+  {out}/{session}/{date}/apa_arduino_<id>/    _shock_events.csv
+
+Filenames follow the module convention
+'{session}_{module}_({segment}_{YYYYMMDD-HHMMSS})...'. Camera timestamps are
+evenly spaced per camera apart from a few dropped frames (dropped_before
+set on the next row), and each camera starts a few ms after the session.
+Videos are tiny solid-grey MPEG-4 streams written with OpenCV (stored under
+a .ts name, as the camera modules name theirs); without OpenCV a
+placeholder file is written instead. Audio is a 1 kHz tone.
+
+With --clock-period the TTL module also drives an experiment clock on pin
+19, loops it back into input pin 26, every camera sees a sync LED
+following it (a white square in SYNC_ROI) and the microphone hears a click
+at every clock onset over low noise instead of the tone. Edges are logged
+as TTLModule does: an input's active edge as LOW, an output's as HIGH.
+--sync-error MODULE=OFFSET_MS[,DRIFT_PPM] makes a module (or
+ttl_c4e2:pin26, the loopback) stamp what it sees that far off the TTL
+clock, for testing sync QC.
+
+Usage:
+    python3 tools/synthetic_session.py OUT_DIR
+    python3 tools/synthetic_session.py OUT_DIR --session demo --duration 30 --segments 2
+    python3 tools/synthetic_session.py OUT_DIR --clock-period 0.97 --sync-error camera_7a21=40
+"""
+
+import argparse
+import csv
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_START = datetime(2026, 7, 3, 9, 0, 0, tzinfo=UTC)
+
+CAMERA_IDS = ("5e4f", "7a21", "9c03", "b1d8")
+MIC_ID     = "2f10"
+TTL_ID     = "c4e2"
+APA_ID     = "d93a"
+
+CLOCK_PIN  = 19
+LOOPBACK_PIN = 26                    # input pin the clock is looped back into
+CLOCK_DUTY = 0.5
+SYNC_ROI   = (8, 8, 16, 16)          # x, y, w, h of the sync LED in each frame
+
+TIMESTAMP_COLUMNS = [
+    "frame_id", "timestamp_ns", "timestamp_utc", "wall_mono_offset_s",
+    "delta_ms", "dropped_before", "sync_lag_us", "exposure_time_us",
+    "analogue_gain", "colour_gain_r", "colour_gain_b",
+]
+HEALTH_COLUMNS = [
+    "timestamp", "cpu_temp", "cpu_usage", "memory_usage", "memory_total_gb",
+    "uptime", "disk_space", "disk_used_gb", "disk_total_gb", "ptp4l_offset_ns",
+    "ptp4l_freq", "phc2sys_offset_ns", "phc2sys_freq", "recording", "version",
+]
+
+
+def _stamp(epoch_s: float) -> str:
+    return datetime.fromtimestamp(epoch_s, tz=UTC).strftime("%Y%m%d-%H%M%S")
+
+
+def _utc(ns: int) -> str:
+    dt = datetime.fromtimestamp(ns / 1e9, tz=UTC)
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f") + "+00:00"
+
+
+class SyncClock:
+    """The TTL experiment clock, and how far off it each module stamps."""
+
+    def __init__(self, start_s: float, duration_s: float, period_s: float,
+                 errors: dict[str, tuple[float, float]] | None = None):
+        self.start_s = start_s
+        self.period_s = period_s
+        self.onsets = np.arange(start_s + 0.5, start_s + duration_s - period_s * CLOCK_DUTY, period_s)
+        self.errors = errors or {}
+
+    def high(self, t: np.ndarray) -> np.ndarray:
+        """Whether the clock is active at true times t."""
+        phase = (np.asarray(t) - self.onsets[0]) % self.period_s
+        return ((phase < self.period_s * CLOCK_DUTY) & (np.asarray(t) >= self.onsets[0])
+                & (np.asarray(t) < self.onsets[-1] + self.period_s * CLOCK_DUTY))
+
+    def error(self, module: str, t):
+        """Seconds module's stamp of an event at true time t is late by."""
+        offset_s, drift_ppm = self.errors.get(module, (0.0, 0.0))
+        return offset_s + drift_ppm * 1e-6 * (np.asarray(t) - self.start_s)
+
+
+def _write_video(path: Path, n_frames: int, fps: int, grey: int,
+                 lit: np.ndarray | None = None) -> None:
+    try:
+        import cv2
+    except ImportError:
+        path.write_bytes(b"\x47" * 188)   # one empty MPEG-TS packet's worth
+        return
+    tmp = path.with_suffix(".mp4")
+    writer = cv2.VideoWriter(str(tmp), cv2.VideoWriter_fourcc(*"mp4v"), fps, (64, 48))
+    frame = np.full((48, 64, 3), grey, np.uint8)
+    x, y, w, h = SYNC_ROI
+    for i in range(n_frames):
+        if lit is not None:
+            frame[y:y + h, x:x + w] = 255 if lit[i] else grey
+        writer.write(frame)
+    writer.release()
+    tmp.rename(path)
+
+
+def _write_health(path: Path, start_s: float, duration_s: float, ptp_offset_ns: float) -> None:
+    rng = np.random.default_rng(len(path.name))
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEALTH_COLUMNS)
+        for t in np.arange(start_s, start_s + duration_s, 1.0):
+            writer.writerow([
+                round(t, 3), 52.1, 18.0, 31.0, 3.7, 3600 + t - start_s, 40.0, 10.2, 28.5,
+                round(rng.normal(0, ptp_offset_ns)), -12.3,
+                round(rng.normal(0, ptp_offset_ns / 2)), 4.1, True, "1.0.0",
+            ])
+
+
+def _write_camera(module_dir: Path, prefix: str, start_ns: int, segment_s: float,
+                  segments: int, fps: int, grey: int, drops: set,
+                  clock: SyncClock | None = None) -> None:
+    period_ns = 1_000_000_000 // fps
+    frame_id = 0
+    t = start_ns
+    for seg in range(segments):
+        seg_start = t
+        stem = f"{prefix}_({seg}_{_stamp(seg_start / 1e9)})"
+        rows = []
+        prev = None
+        dropped = 0
+        while t < seg_start + int(segment_s * 1e9):
+            if frame_id in drops:
+                dropped += 1
+            else:
+                rows.append([
+                    len(rows), t, _utc(t), 1.7e9,
+                    round((t - prev) / 1e6, 3) if prev is not None else "",
+                    dropped, 12, 8000, 2.0, 1.6, 1.9,
+                ])
+                prev = t
+                dropped = 0
+            frame_id += 1
+            t += period_ns
+        with open(module_dir / f"{stem}_timestamps.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(TIMESTAMP_COLUMNS)
+            writer.writerows(rows)
+        lit = None
+        if clock is not None:
+            # What the camera stamped at ts it actually saw error(ts) earlier
+            stamped = np.array([r[1] for r in rows], dtype=np.int64) / 1e9
+            lit = clock.high(stamped - clock.error(module_dir.name, stamped))
+        _write_video(module_dir / f"{stem}.ts", len(rows), fps, grey, lit)
+
+
+def _clicks(n: int, sample_rate: int, positions: np.ndarray, seed: int) -> np.ndarray:
+    """Low noise with a short 3 kHz click starting at each sample position."""
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0, 0.003, n)
+    k = np.arange(int(0.005 * sample_rate))
+    click = 0.8 * np.sin(2 * np.pi * 3000 * k / sample_rate) * np.exp(-k / (0.001 * sample_rate))
+    for p in positions:
+        if 0 <= p < n:
+            audio[p:p + len(click)] += click[:n - p]
+    return audio
+
+
+def _write_microphone(module_dir: Path, prefix: str, start_s: float, segment_s: float,
+                      segments: int, sample_rate: int, clock: SyncClock | None = None,
+                      audio_format: str = "flac") -> None:
+    import soundfile
+
+    for seg in range(segments):
+        seg_start = start_s + seg * segment_s
+        stem = f"{prefix}_({seg}_{_stamp(seg_start)})"
+        n = int(segment_s * sample_rate)
+        if clock is None:
+            t = np.arange(n) / sample_rate
+            audio = 0.25 * np.sin(2 * np.pi * 1000 * t)
+        else:
+            # Sample i is stamped seg_start + 0.004 + i / rate (the ANCHORs below)
+            stamped = clock.onsets + clock.error(module_dir.name, clock.onsets)
+            positions = np.round((stamped - seg_start - 0.004) * sample_rate).astype(np.int64)
+            audio = _clicks(n, sample_rate, positions, seed=seg)
+        soundfile.write(str(module_dir / f"{stem}.{audio_format}"),
+                        (audio * 32767).astype(np.int16), sample_rate, subtype="PCM_16")
+        with open(module_dir / f"{stem}_timestamps.txt", "w") as f:
+            f.write(f"START_AT {seg_start:.6f}\n")
+            f.write(f"STARTED {seg_start + 0.004:.6f}\n")
+            f.write("STARTUP_LATENCY_MS 4.0\n")
+            f.write(f"SAMPLE_RATE {sample_rate}\n")
+            for idx in range(0, n, sample_rate):
+                f.write(f"ANCHOR {idx} {seg_start + 0.004 + idx / sample_rate:.6f}\n")
+            f.write(f"SAMPLES {n}\n")
+            f.write(f"RATE_ESTIMATE {sample_rate:.3f} RESIDUAL_US 21.0\n")
+
+
+def _write_ttl(module_dir: Path, prefix: str, start_s: float, duration_s: float,
+               clock: SyncClock | None = None) -> None:
+    # TTLModule logs an input's active edge as LOW and an output's as HIGH
+    edges = {"input": ("TTLValue.LOW", "TTLValue.HIGH"), "output": ("TTLValue.HIGH", "TTLValue.LOW"),
+             "experiment_clock": ("TTLValue.HIGH", "TTLValue.LOW")}
+    pins = {17: ("input", "sync pulse"), 27: ("output", "LED stimulus")}
+    rows = []
+    for pin, (mode, description) in pins.items():
+        period = 1.0 if pin == 17 else 2.5
+        for k, t in enumerate(np.arange(start_s + 0.5, start_s + duration_s - 0.2, period)):
+            for edge_t, state in zip((t, t + 0.1), edges[mode], strict=True):
+                rows.append((int(edge_t * 1e9) + k, pin, mode, state, description))
+    if clock is not None:
+        width = clock.period_s * CLOCK_DUTY
+        looped = clock.onsets + clock.error(f"ttl_{TTL_ID}:pin{LOOPBACK_PIN}", clock.onsets)
+        for t, t_in in zip(clock.onsets, looped, strict=True):
+            for edge_t, state in zip((t, t + width), edges["experiment_clock"], strict=True):
+                rows.append((round(edge_t * 1e9), CLOCK_PIN, "experiment_clock", state, "experiment clock"))
+            for edge_t, state in zip((t_in, t_in + width), edges["input"], strict=True):
+                rows.append((round(edge_t * 1e9), LOOPBACK_PIN, "input", state, "clock loopback"))
+    rows.sort()
+    with open(module_dir / f"{prefix}_(0_{_stamp(start_s)})_events.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Timestamp_nanoseconds", "pin_number", "pin_mode", "pin_state", "pin_description"])
+        writer.writerows(rows)
+
+
+def _write_shocks(module_dir: Path, prefix: str, start_s: float, duration_s: float) -> None:
+    with open(module_dir / f"{prefix}_(0_{_stamp(start_s)})_shock_events.csv", "w") as f:
+        f.write("# Shock Events Recording\n")
+        f.write(f"# Session ID: {prefix}\n")
+        f.write(f"# Recording Start: {start_s}\n#\n")
+        f.write("Timestamp_nanoseconds, event, rotation speed (rpm)\n")
+        for t in np.arange(start_s + 1.0, start_s + duration_s - 1.0, 3.0):
+            ns = int(t * 1e9)
+            for offset_ms, event in ((0, "SENDING_SHOCK"), (2, "SHOCK_DELIVERY"),
+                                     (500, "SHOCK_STOP_DELIVERY"), (502, "STOPPING_SHOCK")):
+                f.write(f"{ns + offset_ms * 1_000_000},{event},1.0\n")
+
+
+def make_session(out_dir: Path, session: str = "synthetic", start: datetime = DEFAULT_START,
+                 duration_s: float = 10.0, segments: int = 1, cameras: int = 2, fps: int = 30,
+                 sample_rate: int = 16000, clock_period: float | None = None,
+                 sync_errors: dict[str, tuple[float, float]] | None = None,
+                 audio_format: str = "flac") -> Path:
+    """Write a synthetic session under out_dir and return its directory.
+
+    clock_period adds the TTL experiment clock with a sync LED in every
+    camera, clicks on the microphone and the clock looped back into TTL
+    input LOOPBACK_PIN; sync_errors maps a module name (or
+    "ttl_<id>:pin<n>" for the loopback) to the (offset s, drift ppm) it
+    stamps those with, relative to the clock.
+    """
+    session_dir = Path(out_dir) / session
+    date_dir = session_dir / start.strftime("%Y%m%d")
+    start_s = start.timestamp()
+    segment_s = duration_s / segments
+    clock = SyncClock(start_s, duration_s, clock_period, sync_errors) if clock_period else None
+
+    metadata = {
+        "session_name": session,
+        "created_at": datetime.fromtimestamp(start_s - 5, tz=UTC).isoformat(),
+        "target": "all",
+        "experimenter": "Synthetic Experimenter",
+        "experiment": "synthetic",
+        "rat_id": "R001",
+        "strain": "Lister Hooded",
+        "batch": "1",
+        "stage": "test",
+        "trial": "1",
+    }
+    session_dir.mkdir(parents=True, exist_ok=True)
+    (session_dir / "session_metadata.json").write_text(json.dumps(metadata, indent=2))
+
+    for i, cam_id in enumerate(CAMERA_IDS[:cameras]):
+        module = f"camera_{cam_id}"
+        module_dir = date_dir / module
+        module_dir.mkdir(parents=True, exist_ok=True)
+        prefix = f"{session}_{module}"
+        cam_start_ns = int(start_s * 1e9) + (i + 1) * 3_000_000
+        _write_camera(module_dir, prefix, cam_start_ns, segment_s, segments, fps,
+                      grey=40 + 60 * i, drops={10 + i, 11 + i} if i else set(), clock=clock)
+        (module_dir / "config.json").write_text(json.dumps(
+            {"camera": {"fps": fps, "sync_mode": "server" if i == 0 else "client"}}
+        ))
+        _write_health(module_dir / f"{prefix}_health_metadata_(0_{_stamp(start_s)}).csv",
+                      start_s, duration_s, ptp_offset_ns=200 * (i + 1))
+
+    modules = [
+        (f"microphone_{MIC_ID}", lambda d, p: _write_microphone(d, p, start_s, segment_s, segments,
+                                                                  sample_rate, clock, audio_format)),
+        (f"ttl_{TTL_ID}", lambda d, p: _write_ttl(d, p, start_s, duration_s, clock)),
+        (f"apa_arduino_{APA_ID}", lambda d, p: _write_shocks(d, p, start_s, duration_s)),
+    ]
+    for module, write in modules:
+        module_dir = date_dir / module
+        module_dir.mkdir(parents=True, exist_ok=True)
+        write(module_dir, f"{session}_{module}")
+    return session_dir
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("out_dir", type=Path, help="Directory to create the session in")
+    ap.add_argument("--session", default="synthetic", help="Session name (default: synthetic)")
+    ap.add_argument("--duration", type=float, default=10.0, help="Seconds of recording (default: 10)")
+    ap.add_argument("--segments", type=int, default=1, help="Segments per module (default: 1)")
+    ap.add_argument("--cameras", type=int, default=2, choices=range(1, len(CAMERA_IDS) + 1))
+    ap.add_argument("--fps", type=int, default=30)
+    ap.add_argument("--clock-period", type=float, default=None,
+                    help="Add a TTL experiment clock with this period (s), seen and heard by every module")
+    ap.add_argument("--sync-error", action="append", default=[], metavar="MODULE=OFFSET_MS[,DRIFT_PPM]",
+                    help="Make MODULE stamp the clock this far off (repeatable)")
+    ap.add_argument("--audio-format", choices=["flac", "wav"], default="flac")
+    args = ap.parse_args()
+
+    errors = {}
+    for spec in args.sync_error:
+        module, _, values = spec.partition("=")
+        offset_ms, _, drift_ppm = values.partition(",")
+        errors[module] = (float(offset_ms) / 1e3, float(drift_ppm or 0))
+    session_dir = make_session(args.out_dir, args.session, duration_s=args.duration,
+                               segments=args.segments, cameras=args.cameras, fps=args.fps,
+                               clock_period=args.clock_period, sync_errors=errors,
+                               audio_format=args.audio_format)
+    print(f"Wrote {session_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,29 @@ Scans RECORDING_DIR for .ts files matching the SAVIOUR filename convention:
 Groups by session + date + hour, then tiles all 16 cameras (A1–D4) into a single
 4000×4000 AV1 video. Missing cameras are replaced with a black placeholder.
 
+Cameras' segments for an hour start a few seconds apart, so each input is
+started at its own offset (-ss) into the file, computed from the per-frame
+timestamp CSV exported next to it, so that every tile begins at the same PTP
+time — the latest first frame across the group.
+
+A group is only tiled once all its files are complete: each .ts is listed in
+an export manifest in its module directory, or else it has no PENDING_ copy
+in flight, its timestamp CSV has arrived, and neither has changed for
+--settle-minutes. Incomplete groups are left for a later run.
+
+Processed groups are recorded in a ledger (OUTPUT_DIR/.tile_ledger.json)
+with a fingerprint of their inputs (size, mtime and a hash of the head and
+tail of every video and timestamp CSV). Reruns skip groups whose inputs
+are unchanged and re-tile any group whose inputs changed — e.g. a camera's
+late export arriving after the hour was first tiled. Outputs from before
+the ledger existed are adopted as-is rather than re-encoded.
+
 Output:
   OUTPUT_DIR/<session>/<date>/<session>_<YYYYMMDD-HH>_4x4.mkv
 
 Usage:
   python3 tile_recordings.py [--dry-run] [--session NAME] [--date YYYYMMDD] [--workers N]
+  python3 tile_recordings.py --force --session NAME    # re-tile regardless of the ledger
   python3 tile_recordings.py --help
 
 Cron example (run every 30 minutes, process all complete hour-groups):
@@ -20,14 +38,20 @@ Cron example (run every 30 minutes, process all complete hour-groups):
 """
 
 import argparse
+import csv
 import fcntl
+import hashlib
+import json
 import logging
 import os
 import re
 import subprocess
 import sys
+import threading
+import time
 from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from pathlib import Path
 
 # ── Paths ─────────────────────────────────────────────────────────────────────
@@ -35,6 +59,12 @@ from pathlib import Path
 RECORDING_DIR = Path("/home/saviour-smb/habitat_recording")
 OUTPUT_DIR    = Path("/home/saviour-smb/habitat_tiled")
 LOCK_FILE     = Path("/var/tmp/tile_recordings.lock")
+LEDGER_NAME   = ".tile_ledger.json"   # kept in OUTPUT_DIR
+
+# ── Completeness ──────────────────────────────────────────────────────────────
+
+SETTLE_MINUTES   = 15           # unmanifested files must be this old to count as complete
+FINGERPRINT_SPAN = 1 << 20      # bytes hashed from each end of an input file
 
 # ── Grid layout ───────────────────────────────────────────────────────────────
 
@@ -64,7 +94,9 @@ def find_groups(recording_dir: Path) -> dict:
     """
     groups: dict = defaultdict(dict)
 
-    for f in recording_dir.glob("*/*/*/*.ts"):
+    for f in sorted(recording_dir.glob("*/*/*/*.ts")):
+        if f.name.startswith("PENDING_"):     # export copy still in flight
+            continue
         m = _FILENAME_RE.match(f.name)
         if not m:
             continue
@@ -79,6 +111,155 @@ def find_groups(recording_dir: Path) -> dict:
     return groups
 
 
+def sidecar_csv(video: Path) -> Path:
+    """The per-frame timestamp CSV exported alongside a segment."""
+    return video.with_name(f"{video.stem}_timestamps.csv")
+
+
+def _manifested_files(module_dir: Path) -> set:
+    """Filenames listed in any export manifest in module_dir."""
+    names = set()
+    for manifest in module_dir.glob("export_manifest_*.txt"):
+        try:
+            for line in manifest.read_text().splitlines():
+                if line.startswith("- "):
+                    names.add(line[2:].strip())
+        except OSError:
+            continue
+    return names
+
+
+def file_complete(video: Path, settle_s: float, now: float | None = None) -> tuple[bool, str]:
+    """Whether a segment and its timestamp CSV have finished exporting.
+
+    Both files must be present with no PENDING_ copy left; an export
+    manifest listing the segment then stands in for the settle time.
+    Returns (complete, reason) — reason says what is still missing.
+    """
+    csv_path = sidecar_csv(video)
+    for f in (video, csv_path):
+        if (f.parent / f"PENDING_{f.name}").exists():
+            return False, f"{f.name} still being exported"
+        if not f.exists():
+            return False, f"{f.name} not exported yet"
+    if video.name in _manifested_files(video.parent):
+        return True, "manifest"
+    now = time.time() if now is None else now
+    # Export copies keep the source mtime, so ctime is when it landed here
+    changed = max(max(st.st_mtime, st.st_ctime) for st in (video.stat(), csv_path.stat()))
+    if now - changed < settle_s:
+        return False, f"{video.name} changed {now - changed:.0f}s ago"
+    return True, "settled"
+
+
+def group_complete(group_files: dict, settle_s: float) -> tuple[bool, str]:
+    now = time.time()
+    for pos in sorted(group_files):
+        ok, reason = file_complete(group_files[pos], settle_s, now)
+        if not ok:
+            return False, f"{pos}: {reason}"
+    return True, ""
+
+
+# ── Start alignment ───────────────────────────────────────────────────────────
+
+def first_timestamp_ns(csv_path: Path) -> int | None:
+    """timestamp_ns of the first frame in a timestamp CSV, or None."""
+    try:
+        with open(csv_path, newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            if "timestamp_ns" not in header:
+                return None
+            col = header.index("timestamp_ns")
+            for row in reader:
+                try:
+                    return int(float(row[col]))
+                except (ValueError, IndexError):
+                    continue
+    except OSError:
+        return None
+    return None
+
+
+def compute_offsets(group_files: dict) -> dict:
+    """Seconds to skip into each input so all tiles start at the same PTP time.
+
+    The common start is the latest first frame across the group; each input
+    is started that far after its own first frame. Inputs without a usable
+    timestamp CSV start at 0.
+    """
+    logger = logging.getLogger("tile_recordings")
+    firsts = {}
+    for pos, video in group_files.items():
+        t0 = first_timestamp_ns(sidecar_csv(video))
+        if t0 is None:
+            logger.warning(f"{video.name}: no timestamp CSV — starting unaligned")
+        else:
+            firsts[pos] = t0
+    if not firsts:
+        return {}
+    common_start = max(firsts.values())
+    return {pos: round((common_start - t0) / 1e9, 6) for pos, t0 in firsts.items()}
+
+
+# ── Ledger ────────────────────────────────────────────────────────────────────
+
+def file_fingerprint(path: Path) -> str:
+    """Size, mtime and a hash of the first and last FINGERPRINT_SPAN bytes —
+    cheap enough for hour-long videos on every run, and changes whenever a
+    file is re-exported or truncated."""
+    st = path.stat()
+    h = hashlib.sha1(f"{path.name}|{st.st_size}|{st.st_mtime_ns}".encode())
+    with open(path, "rb") as f:
+        h.update(f.read(FINGERPRINT_SPAN))
+        if st.st_size > 2 * FINGERPRINT_SPAN:
+            f.seek(-FINGERPRINT_SPAN, os.SEEK_END)
+            h.update(f.read(FINGERPRINT_SPAN))
+    return h.hexdigest()
+
+
+def group_fingerprint(group_files: dict) -> dict:
+    """{position: fingerprint of video + timestamp CSV} for a group."""
+    out = {}
+    for pos, video in sorted(group_files.items()):
+        parts = [file_fingerprint(video)]
+        csv_path = sidecar_csv(video)
+        if csv_path.exists():
+            parts.append(file_fingerprint(csv_path))
+        out[pos] = ":".join(parts)
+    return out
+
+
+class Ledger:
+    """Groups already tiled and the inputs they were tiled from, persisted
+    as JSON in the output directory. Safe to update from worker threads."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: dict = {}
+        if path.exists():
+            try:
+                self.entries = json.loads(path.read_text())
+            except (OSError, ValueError) as e:
+                logging.getLogger("tile_recordings").warning(
+                    f"Ledger {path} unreadable ({e}) — starting a new one"
+                )
+
+    def get(self, label: str) -> dict | None:
+        with self._lock:
+            return self.entries.get(label)
+
+    def record(self, label: str, entry: dict) -> None:
+        with self._lock:
+            self.entries[label] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(self.entries, indent=1, sort_keys=True))
+            os.replace(tmp, self.path)
+
+
 # ── AV1 encoder detection ─────────────────────────────────────────────────────
 
 def detect_av1_encoder() -> str:
@@ -98,18 +279,25 @@ def build_ffmpeg_cmd(
     output_path: Path,
     encoder: str,
     threads_per_job: int,
+    offsets: dict | None = None,
 ) -> list:
     """
     Build an ffmpeg xstack command for 16 tiles.
     Each missing grid position gets its own lavfi black source so ffmpeg never
     needs to read the same input pad twice (avoids filter_complex fan-out issues).
+    offsets ({position: seconds}) become input -ss so tiles start together;
+    when transcoding ffmpeg decodes from the preceding keyframe and discards
+    up to the offset, so the cut is frame accurate.
     """
     cmd  = ["ffmpeg", "-y"]
     idx  = 0
     slot_index: dict = {}
+    offsets = offsets or {}
 
     for pos in GRID:
         if pos in group_files:
+            if offsets.get(pos, 0) > 0:
+                cmd += ["-ss", f"{offsets[pos]:.6f}"]
             cmd += ["-i", str(group_files[pos])]
         else:
             cmd += ["-f", "lavfi", "-i",
@@ -162,17 +350,35 @@ def process_group(
     threads_per_job: int,
     dry_run: bool,
     show_progress: bool,
+    ledger: Ledger | None = None,
+    settle_s: float = SETTLE_MINUTES * 60,
+    force: bool = False,
 ) -> tuple[str, str]:
-    """Returns (status, label) where status is ok/skipped/failed/dry_run."""
+    """Returns (status, label) where status is ok/skipped/incomplete/failed/dry_run."""
     logger = logging.getLogger("tile_recordings")
     label  = f"{session}/{date}/{hour}"
 
     out_dir = output_dir / session / date
-    out_dir.mkdir(parents=True, exist_ok=True)
     out_path = out_dir / f"{session}_{hour}_4x4.mkv"
 
-    if out_path.exists():
-        return "skipped", label
+    complete, reason = group_complete(group_files, settle_s)
+    if not complete:
+        logger.info(f"{label}: not complete yet ({reason}) — leaving for a later run")
+        return "incomplete", label
+
+    fingerprint = group_fingerprint(group_files)
+    entry = ledger.get(label) if ledger else None
+    if not force and out_path.exists():
+        if entry is None and ledger is not None and not dry_run:
+            # Tiled before the ledger existed: adopt rather than re-encode
+            ledger.record(label, {"output": str(out_path), "inputs": fingerprint,
+                                  "offsets": None, "tiled_at": None})
+            return "skipped", label
+        if entry is None or entry.get("inputs") == fingerprint:
+            return "skipped", label
+        changed = sorted(p for p in set(fingerprint) | set(entry["inputs"])
+                         if fingerprint.get(p) != entry["inputs"].get(p))
+        logger.info(f"{label}: inputs changed since last tiled ({', '.join(changed)}) — re-tiling")
 
     present = sorted(group_files)
     missing = [p for p in GRID if p not in group_files]
@@ -185,12 +391,19 @@ def process_group(
         logger.warning(f"{label}: no camera files, skipping")
         return "skipped", label
 
-    cmd = build_ffmpeg_cmd(group_files, out_path, encoder, threads_per_job)
+    offsets = compute_offsets(group_files)
+    if offsets:
+        logger.info(
+            f"{label}: start offsets " + ", ".join(f"{p}={offsets[p]:.3f}s" for p in sorted(offsets))
+        )
+    cmd = build_ffmpeg_cmd(group_files, out_path, encoder, threads_per_job, offsets)
 
     if dry_run:
         logger.info("DRY RUN: " + " ".join(str(c) for c in cmd))
         return "dry_run", label
 
+    out_dir.mkdir(parents=True, exist_ok=True)
+
     logger.info(f"Encoding → {out_path.name}")
     stderr_lines = []
     try:
@@ -222,6 +435,13 @@ def process_group(
 
     size_mb = out_path.stat().st_size / 1_048_576
     logger.info(f"Done: {out_path.name} ({size_mb:.1f} MB)")
+    if ledger is not None:
+        ledger.record(label, {
+            "output":   str(out_path),
+            "inputs":   fingerprint,
+            "offsets":  offsets,
+            "tiled_at": datetime.now().isoformat(timespec="seconds"),
+        })
     return "ok", label
 
 
@@ -239,6 +459,11 @@ def main() -> None:
     parser.add_argument("--date",    help="Process only this date (YYYYMMDD)")
     parser.add_argument("--workers", type=int, default=1,
                         help=f"Parallel encode jobs (default: 1, this machine has {cpu_count} cores)")
+    parser.add_argument("--settle-minutes", type=float, default=SETTLE_MINUTES,
+                        help="Minutes an unmanifested file must be unchanged to count as "
+                             f"exported (default: {SETTLE_MINUTES})")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-tile selected groups even if the ledger says they're up to date")
     parser.add_argument("--dry-run", action="store_true")
     parser.add_argument("--verbose", action="store_true")
     args = parser.parse_args()
@@ -276,7 +501,9 @@ def main() -> None:
             all_groups = [(k, v) for k, v in all_groups if k[1] == args.date]
         logger.info(f"Discovered {len(all_groups)} hour-groups to process")
 
-        counts: dict = {"ok": 0, "skipped": 0, "failed": 0, "dry_run": 0}
+        ledger = Ledger(args.output_dir / LEDGER_NAME)
+        settle_s = args.settle_minutes * 60
+        counts: dict = {"ok": 0, "skipped": 0, "incomplete": 0, "failed": 0, "dry_run": 0}
         show_progress = args.workers == 1
 
         if args.workers == 1:
@@ -285,6 +512,7 @@ def main() -> None:
                 status, _ = process_group(
                     session, date, hour, group_files,
                     args.output_dir, encoder, threads_per_job, args.dry_run, show_progress,
+                    ledger, settle_s, args.force,
                 )
                 counts[status] += 1
                 done = counts["ok"] + counts["failed"]
@@ -302,6 +530,7 @@ def main() -> None:
                         process_group,
                         session, date, hour, group_files,
                         args.output_dir, encoder, threads_per_job, args.dry_run, False,
+                        ledger, settle_s, args.force,
                     ): (session, date, hour)
                     for (session, date, hour), group_files in all_groups
                 }
@@ -320,7 +549,7 @@ def main() -> None:
 
         logger.info(
             f"Finished — ok:{counts['ok']} skipped:{counts['skipped']} "
-            f"failed:{counts['failed']}"
+            f"incomplete:{counts['incomplete']} failed:{counts['failed']}"
             + (f" dry_run:{counts['dry_run']}" if args.dry_run else "")
         )
 
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+ttl_edge_benchmark.py — input-edge timestamp latency/jitter for the TTL module.
+
+Usage (on a TTL module Pi, with the saviour service stopped):
+    python3 tools/ttl_edge_benchmark.py --out-pin 19 --in-pin 20
+    python3 tools/ttl_edge_benchmark.py --out-pin 19 --in-pin 20 --edges 2000 --period-ms 2
+
+Wire OUT-PIN straight to IN-PIN. The output is toggled with gpiozero, exactly
+as TTLModule drives its experiment clock, and each edge is captured twice —
+once through the gpiozero Button callback path (time.time_ns() in the
+callback) and once through the kernel-stamped EdgeEventReader — so the two
+input paths are measured against the same stimulus.
+
+For every edge, latency = captured timestamp - time.time_ns() taken just
+before the output write. Period jitter is the spread of the captured
+inter-edge intervals around the commanded half-period.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import gpiozero
+
+from modules.variants.ttl.edge_capture import EdgeEventReader
+
+
+def drive(led, edges: int, half_period_s: float) -> list[int]:
+    """Toggle led *edges* times on an absolute schedule; return drive times (ns)."""
+    drive_ns = []
+    next_t = time.monotonic() + 0.1
+    for i in range(edges):
+        while True:
+            remaining = next_t - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.001) if remaining > 0.002 else 0)
+        drive_ns.append(time.time_ns())
+        if i % 2 == 0:
+            led.on()
+        else:
+            led.off()
+        next_t += half_period_s
+    led.off()
+    return drive_ns
+
+
+def run_gpiozero(led, in_pin: int, edges: int, half_period_s: float) -> tuple[list[int], list[int]]:
+    captured = []
+    lock = threading.Lock()
+
+    def _stamp(_pin):
+        ts = time.time_ns()
+        with lock:
+            captured.append(ts)
+
+    button = gpiozero.Button(in_pin, bounce_time=0, pull_up=False)
+    button.when_pressed = _stamp
+    button.when_released = _stamp
+    try:
+        drive_ns = drive(led, edges, half_period_s)
+        time.sleep(0.2)
+    finally:
+        button.close()
+    return drive_ns, captured
+
+
+def run_gpiod(led, in_pin: int, edges: int, half_period_s: float, chip: str) -> tuple[list[int], list[int], dict]:
+    captured = []
+    reader = EdgeEventReader([in_pin], chip_path=chip, pull_up=False)
+    reader.start(lambda batch: captured.extend(ev.timestamp_ns for ev in batch))
+    try:
+        drive_ns = drive(led, edges, half_period_s)
+        time.sleep(0.2)
+        stats = reader.get_stats()
+    finally:
+        reader.close()
+    return drive_ns, captured, stats
+
+
+def summarise(name: str, drive_ns: list[int], captured: list[int], half_period_s: float) -> dict:
+    n = min(len(drive_ns), len(captured))
+    row = {"path": name, "driven": len(drive_ns), "captured": len(captured)}
+    if n < 2:
+        print(f"  {name:<10} captured {len(captured)}/{len(drive_ns)} edges — is the loopback wired?")
+        return row
+    latency_us = (np.asarray(captured[:n], dtype=np.int64) - np.asarray(drive_ns[:n], dtype=np.int64)) / 1e3
+    intervals_us = np.diff(np.asarray(captured[:n], dtype=np.int64)) / 1e3
+    jitter_us = intervals_us - half_period_s * 1e6
+    row.update({
+        "latency_p50_us": float(np.percentile(latency_us, 50)),
+        "latency_p95_us": float(np.percentile(latency_us, 95)),
+        "latency_p99_us": float(np.percentile(latency_us, 99)),
+        "latency_max_us": float(latency_us.max()),
+        "jitter_std_us": float(jitter_us.std()),
+        "jitter_p99_abs_us": float(np.percentile(np.abs(jitter_us), 99)),
+    })
+    print(f"  {name:<10} {len(captured)}/{len(drive_ns)} edges  "
+          f"latency p50={row['latency_p50_us']:8.1f}µs p95={row['latency_p95_us']:8.1f}µs "
+          f"p99={row['latency_p99_us']:8.1f}µs max={row['latency_max_us']:8.1f}µs  "
+          f"period jitter σ={row['jitter_std_us']:7.1f}µs |p99|={row['jitter_p99_abs_us']:7.1f}µs")
+    return row
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out-pin", type=int, required=True, help="BCM output pin driving the loopback")
+    ap.add_argument("--in-pin", type=int, required=True, help="BCM input pin wired to --out-pin")
+    ap.add_argument("--edges", type=int, default=1000, help="Edges per path (default 1000)")
+    ap.add_argument("--period-ms", type=float, default=10.0,
+                    help="Full square-wave period in ms (default 10)")
+    ap.add_argument("--chip", default="/dev/gpiochip0", help="GPIO chip for the kernel reader")
+    ap.add_argument("--skip-gpiozero", action="store_true", help="Only measure the kernel path")
+    args = ap.parse_args()
+
+    half_period_s = args.period_ms / 2000.0
+    led = gpiozero.LED(args.out_pin)
+    led.off()
+    print(f"Loopback GPIO {args.out_pin} -> GPIO {args.in_pin}, "
+          f"{args.edges} edges at {args.period_ms} ms period")
+    try:
+        if not args.skip_gpiozero:
+            drive_ns, captured = run_gpiozero(led, args.in_pin, args.edges, half_period_s)
+            summarise("gpiozero", drive_ns, captured, half_period_s)
+        drive_ns, captured, stats = run_gpiod(led, args.in_pin, args.edges, half_period_s, args.chip)
+        summarise("gpiod", drive_ns, captured, half_period_s)
+        print(f"  gpiod reader: {stats}")
+    finally:
+        led.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+video_compose_benchmark.py — per-stage throughput of the session video compositor.
+
+Usage:
+    python3 tools/video_compose_benchmark.py
+    python3 tools/video_compose_benchmark.py --streams 16 --seconds 20 --size 1280x720
+    python3 tools/video_compose_benchmark.py --encoders opencv ffmpeg --codec libsvtav1 --preset 10
+
+Writes N synthetic test-pattern camera streams (moving bars plus a frame
+counter, each camera at a slightly different real framerate, with a
+*_timestamps.csv like the camera module's) into a temp session directory,
+then composes them with src/controller/video_compose.py once per encoder
+and prints frames/s for each stage: decode (per stream, busy time only),
+compose (resize into tiles), encode (pipe write / VideoWriter.write plus
+the final flush) and end to end.
+"""
+
+import argparse
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.controller.video_compose import compose_session_video
+
+
+def write_test_pattern_stream(module_dir: str, name: str, seconds: float, fps: float,
+                              size: tuple[int, int], start_ns: int) -> None:
+    """One camera: name.mp4 plus name_timestamps.csv at the given real fps."""
+    os.makedirs(module_dir, exist_ok=True)
+    width, height = size
+    writer = cv2.VideoWriter(os.path.join(module_dir, f"{name}.mp4"),
+                             cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    bars = np.tile(np.linspace(0, 255, width, dtype=np.uint8)[None, :, None], (height, 1, 3))
+    frames = int(seconds * fps)
+    with open(os.path.join(module_dir, f"{name}_timestamps.csv"), "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["frame_id", "timestamp_ns"])
+        for i in range(frames):
+            frame = np.roll(bars, i * 8, axis=1)
+            cv2.putText(frame, f"{name} {i}", (20, height // 2), cv2.FONT_HERSHEY_SIMPLEX,
+                        height / 240, (0, 0, 255), 2)
+            writer.write(frame)
+            out.writerow([i, start_ns + round(i * 1e9 / fps)])
+    writer.release()
+
+
+def make_session(root: str, streams: int, seconds: float, size: tuple[int, int],
+                 fps: float) -> str:
+    date_dir = os.path.join(root, "benchmark-session", "20260101")
+    start_ns = time.time_ns()
+    for i in range(streams):
+        name = f"cam{i + 1:02d}"
+        # Real cameras drift apart by a fraction of a percent
+        write_test_pattern_stream(os.path.join(date_dir, name), name, seconds,
+                                  fps * (1 + 0.002 * i), size, start_ns + i * 3_000_000)
+    return date_dir
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--streams", type=int, default=4)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--size", default="640x360", help="Per-stream WxH")
+    ap.add_argument("--fps", type=float, default=30)
+    ap.add_argument("--encoders", nargs="+", default=["opencv", "ffmpeg"],
+                    choices=["opencv", "ffmpeg"])
+    ap.add_argument("--codec", default="libx264", choices=["libx264", "libsvtav1"])
+    ap.add_argument("--preset", default=None)
+    ap.add_argument("--queue-size", type=int, default=8)
+    ap.add_argument("--keep", action="store_true", help="Keep the temp session and outputs")
+    args = ap.parse_args()
+
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+    root = tempfile.mkdtemp(prefix="compose-bench-")
+    try:
+        print(f"Writing {args.streams} x {args.seconds:g}s {args.size} test streams...")
+        date_dir = make_session(root, args.streams, args.seconds, size, args.fps)
+        for encoder in args.encoders:
+            if encoder == "ffmpeg" and not shutil.which("ffmpeg"):
+                print("ffmpeg: not on PATH, skipped")
+                continue
+            stats = {}
+            compose_session_video(date_dir, os.path.join(root, f"out-{encoder}.mp4"),
+                                  fps=int(args.fps), encoder=encoder, codec=args.codec,
+                                  preset=args.preset, queue_size=args.queue_size, stats=stats)
+            decode = [v for v in stats["decode_fps"].values() if v]
+            label = f"{encoder} ({args.codec})" if encoder == "ffmpeg" else f"{encoder} (mp4v)"
+            print(f"\n{label}: {stats['frames']} frames in {stats['wall_s']}s")
+            print(f"  end to end   {stats['output_fps']:>8} fps")
+            if decode:
+                print(f"  decode       {min(decode):>8} fps per stream (slowest), "
+                      f"{sum(decode) / len(decode):.1f} mean")
+            print(f"  compose      {stats['compose_fps']:>8} fps")
+            print(f"  encode       {stats['encode_fps']:>8} fps")
+            print(f"  decode wait  {stats['decode_wait_s']:>8} s")
+        if args.keep:
+            print(f"\nKept {root}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()